@@ -10,8 +10,10 @@ Alerts Blueprint - User Notifications & Alert System
 """
 
 import os
+import json
+import time
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from bson import ObjectId
 import logging
 
@@ -21,10 +23,10 @@ logger = logging.getLogger(__name__)
 
 # Import auth decorator
 try:
-    from blueprints.auth import auth_required
+    from blueprints.auth import auth_required, generate_stream_token
 except ImportError:
     # Mock decorator for development
-    def auth_required(allowed_roles=None):
+    def auth_required(allowed_roles=None, allow_stream_token=False):
         def decorator(f):
             def decorated_function(*args, **kwargs):
                 request.current_user = {
@@ -37,6 +39,9 @@ except ImportError:
                 return f(*args, **kwargs)
             return decorated_function
         return decorator
+    
+    def generate_stream_token(user_id):
+        return None
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -69,6 +74,8 @@ except ImportError as e:
         def create(self, data): return ObjectId()
         def find_many(self, query, **kwargs): return []
         def update_by_id(self, id, data): return True
+        def mark_read(self, user_id, notification_id): return True
+        def mark_all_read(self, user_id): return 0
         def count(self, query=None): return 0
     
     class Users:
@@ -87,6 +94,44 @@ notification_history_model = NotificationHistory()
 users_model = Users()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Chunked, rate-limited bulk notification writes
+try:
+    from services.notification_fanout import get_notification_fanout as build_notification_fanout
+except ImportError as e:
+    logger.warning(f"Notification fan-out unavailable: {e}")
+    build_notification_fanout = None
+get_notification_fanout = lazy_service('Notification fan-out', build_notification_fanout)
+
+# Per-user unread counters behind the notification badge; writers wait for it
+# rather than skip a counter update
+try:
+    from services.unread_counter import get_unread_counter as build_unread_counter
+except ImportError as e:
+    logger.warning(f"Unread counter unavailable: {e}")
+    build_unread_counter = None
+get_unread_counter = lazy_service('Unread counter', build_unread_counter, blocking=True)
+
+# In-process pub/sub feeding the notification event stream
+try:
+    from services.notification_stream import get_notification_stream_broker as build_notification_stream, StreamFull
+except ImportError as e:
+    logger.warning(f"Notification stream unavailable: {e}")
+    build_notification_stream = None
+    
+    class StreamFull(Exception):
+        pass
+get_notification_stream = lazy_service('Notification stream', build_notification_stream)
+
+# Event stream tuning
+STREAM_HEARTBEAT_SECONDS = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT_SECONDS', 20))
+STREAM_RETRY_MS = int(os.getenv('NOTIFICATION_STREAM_RETRY_MS', 5000))
+STREAM_REPLAY_LIMIT = 50  # Notifications replayed to a reconnecting client
+# Streams end after this long and the client reconnects, so no connection holds a worker indefinitely
+STREAM_MAX_SECONDS = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', 900))
+
 
 # =====================================================
 # UTILITY FUNCTIONS
@@ -201,6 +246,29 @@ def validate_alert_data(data):
     
     return errors
 
+def get_unread_notification_count(user_id):
+    """Unread notification count from the user's counter, or a full count without one"""
+    unread_counter = get_unread_counter()
+    if unread_counter is not None:
+        try:
+            return unread_counter.get_unread(user_id)
+        except Exception as e:
+            logger.error(f"Unread counter lookup failed: {e}")
+    
+    return notification_history_model.count({
+        'user_id': ObjectId(user_id),
+        'read': False
+    })
+
+def record_notifications_read(user_id, count):
+    """Decrement the user's unread counter by the number of notifications just marked read"""
+    unread_counter = get_unread_counter()
+    if unread_counter is not None and count:
+        try:
+            unread_counter.record_read(user_id, count)
+        except Exception as e:
+            logger.error(f"Failed to update unread counter: {e}")
+
 def create_notification(user_id, title, message, notification_type='general', 
                        priority='normal', related_protest_id=None, related_alert_id=None, 
                        action_url='', metadata=None):
@@ -234,6 +302,13 @@ def create_notification(user_id, title, message, notification_type='general',
         }
         notification_queue_model.create(queue_data)
         
+        unread_counter = get_unread_counter()
+        if unread_counter is not None:
+            try:
+                unread_counter.record_created([user_id])
+            except Exception as e:
+                logger.error(f"Failed to update unread counter: {e}")
+        
         return notification_id
         
     except Exception as e:
@@ -710,10 +785,7 @@ def get_user_notifications():
         total_pages = (total_count + limit - 1) // limit
         
         # Get unread count for user
-        unread_count = notification_history_model.count({
-            'user_id': ObjectId(user_id),
-            'read': False
-        })
+        unread_count = get_unread_notification_count(user_id)
         
         return jsonify({
             'success': True,
@@ -777,18 +849,9 @@ def mark_notification_read(notification_id):
                 'message': 'The requested notification could not be found'
             }), 404
         
-        # Mark as read
-        success = notification_history_model.update_by_id(ObjectId(notification_id), {
-            'read': True,
-            'read_at': datetime.utcnow()
-        })
-        
-        if not success:
-            return jsonify({
-                'success': False,
-                'error': 'Update failed',
-                'message': 'Failed to mark notification as read'
-            }), 500
+        # Mark as read; only an unread -> read change moves the counter
+        if notification_history_model.mark_read(ObjectId(user_id), ObjectId(notification_id)):
+            record_notifications_read(user_id, 1)
         
         return jsonify({
             'success': True,
@@ -812,18 +875,8 @@ def mark_all_notifications_read():
         user_id = request.current_user['id']
         
         # Mark all unread notifications as read
-        result = notification_history_model.update_many(
-            {
-                'user_id': ObjectId(user_id),
-                'read': False
-            },
-            {
-                'read': True,
-                'read_at': datetime.utcnow()
-            }
-        )
-        
-        marked_count = getattr(result, 'modified_count', 0)
+        marked_count = notification_history_model.mark_all_read(ObjectId(user_id))
+        record_notifications_read(user_id, marked_count)
         
         return jsonify({
             'success': True,
@@ -849,10 +902,7 @@ def get_unread_count():
     try:
         user_id = request.current_user['id']
         
-        unread_count = notification_history_model.count({
-            'user_id': ObjectId(user_id),
-            'read': False
-        })
+        unread_count = get_unread_notification_count(user_id)
         
         return jsonify({
             'success': True,
@@ -871,6 +921,244 @@ def get_unread_count():
         }), 500
 
 
+# =====================================================
+# NOTIFICATION STREAM
+# =====================================================
+
+def format_sse(event, data, event_id=None):
+    """Encode one server-sent event"""
+    lines = [f'event: {event}']
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+@bp.route('/notifications/stream/token', methods=['POST'])
+@auth_required()
+def create_stream_token():
+    """Short-lived token for opening the notification stream from EventSource"""
+    token = generate_stream_token(request.current_user['id'])
+    if not token:
+        return jsonify({
+            'success': False,
+            'error': 'Token generation failed',
+            'message': 'Could not create a stream token'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'message': 'Stream token created',
+        'data': {'stream_token': token}
+    })
+
+@bp.route('/notifications/stream', methods=['GET'])
+@auth_required(allow_stream_token=True)
+def stream_notifications():
+    """
+    Server-sent events: new notifications and updates to followed protests.
+    Browsers authenticate with ?stream_token= from POST /notifications/stream/token,
+    since EventSource cannot send an Authorization header; fetch a fresh token
+    before each reconnect. Every open stream holds a request thread for its
+    lifetime, so streams per process are capped by
+    NOTIFICATION_STREAM_MAX_CONNECTIONS; the stream also closes after
+    NOTIFICATION_STREAM_MAX_SECONDS and the client resumes from Last-Event-ID.
+    """
+    notification_stream = get_notification_stream()
+    if notification_stream is None:
+        return jsonify({
+            'success': False,
+            'error': 'Stream unavailable',
+            'message': 'Notification streaming is not available on this server'
+        }), 503
+    
+    try:
+        user_id = ObjectId(request.current_user['id'])
+        subscription = notification_stream.subscribe(user_id)
+    except StreamFull:
+        response = jsonify({
+            'success': False,
+            'error': 'Too many connections',
+            'message': 'Notification stream is at capacity, poll instead or retry shortly'
+        })
+        response.headers['Retry-After'] = str(STREAM_RETRY_MS // 1000)
+        return response, 503
+    except Exception as e:
+        logger.error(f"Notification stream error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to open stream',
+            'message': 'An error occurred while opening the notification stream'
+        }), 500
+    
+    try:
+        # A reconnecting client gets what it missed since its last notification
+        missed = []
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id and ObjectId.is_valid(last_event_id):
+            missed = notification_history_model.find_many(
+                {'user_id': user_id, '_id': {'$gt': ObjectId(last_event_id)}},
+                sort=[('_id', 1)],
+                limit=STREAM_REPLAY_LIMIT
+            )
+        unread_count = get_unread_notification_count(user_id)
+    except Exception as e:
+        notification_stream.unsubscribe(subscription)
+        logger.error(f"Notification stream error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to open stream',
+            'message': 'An error occurred while opening the notification stream'
+        }), 500
+    
+    def generate():
+        try:
+            yield f'retry: {STREAM_RETRY_MS}\n\n'
+            yield format_sse('unread_count', {'unread_count': unread_count})
+            
+            replayed = set()
+            for notification in missed:
+                replayed.add(str(notification['_id']))
+                yield format_sse('notification', format_notification(notification), str(notification['_id']))
+            
+            closes_at = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < closes_at:
+                events = subscription.wait(STREAM_HEARTBEAT_SECONDS)
+                if not events:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                
+                for event in events:
+                    if event['event'] == 'notification':
+                        if event['id'] in replayed:
+                            continue
+                        yield format_sse('notification', format_notification(event['data']), event['id'])
+                    else:
+                        yield format_sse(event['event'], event['data'])
+                
+                notification_stream.refresh_follows(subscription, force=False)
+        finally:
+            notification_stream.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+    # A client that disconnects before the first chunk never runs the generator's finally
+    response.call_on_close(lambda: notification_stream.unsubscribe(subscription))
+    return response
+
+
+# =====================================================
+# BULK NOTIFICATIONS (Admin)
+# =====================================================
+
+@bp.before_app_request
+def start_notification_fanout():
+    """Start this process's broadcast workers (after any fork by the app server)"""
+    notification_fanout = get_notification_fanout()
+    if notification_fanout is not None:
+        notification_fanout.start()
+
+def format_fanout_job(job):
+    """Format fan-out job progress for API response"""
+    formatted = dict(job)
+    for field in ('submitted_at', 'started_at', 'finished_at'):
+        formatted[field] = job[field].isoformat() if job.get(field) else None
+    return formatted
+
+@bp.route('/notifications/broadcast', methods=['POST'])
+@auth_required(allowed_roles=['admin'])
+def broadcast_notification():
+    """Notify a list of users or all followers of a protest in the background"""
+    try:
+        notification_fanout = get_notification_fanout()
+        if notification_fanout is None:
+            return jsonify({
+                'success': False,
+                'error': 'Fan-out unavailable',
+                'message': 'Bulk notifications are not available on this server'
+            }), 503
+        
+        data = request.get_json() or {}
+        title = data.get('title', '').strip()
+        message = data.get('message', '').strip()
+        protest_id = data.get('protest_id')
+        user_ids = data.get('user_ids')
+        audience = data.get('audience', 'users')
+        
+        errors = []
+        if not title or not message:
+            errors.append('Title and message are required')
+        if audience not in ('users', 'followers'):
+            errors.append('Audience must be one of: users, followers')
+        if protest_id and not ObjectId.is_valid(protest_id):
+            errors.append('Invalid protest ID')
+        if audience == 'followers' and not protest_id:
+            errors.append('protest_id is required to notify followers')
+        if audience == 'users':
+            if not isinstance(user_ids, list) or not user_ids:
+                errors.append('user_ids must be a non-empty list')
+            elif not all(isinstance(user_id, str) and ObjectId.is_valid(user_id) for user_id in user_ids):
+                errors.append('user_ids must contain valid user IDs')
+        
+        if errors:
+            return jsonify({
+                'success': False,
+                'error': 'Validation failed',
+                'message': '; '.join(errors)
+            }), 400
+        
+        template = {
+            'notification_type': data.get('notification_type', 'protest_update'),
+            'priority': data.get('priority', 'normal'),
+            'metadata': {'broadcast_by': request.current_user['id']}
+        }
+        if audience == 'followers':
+            job_id = notification_fanout.submit_follower_fanout(protest_id, title, message, **template)
+        else:
+            if protest_id:
+                template['related_protest_id'] = protest_id
+                template['action_url'] = f'/protests/{protest_id}'
+            job_id = notification_fanout.submit_user_fanout(
+                user_ids, title, message, description=f'broadcast to {len(user_ids)} users', **template
+            )
+        
+        logger.info(f"Notification broadcast {job_id} queued by {request.current_user['username']} ({audience})")
+        
+        return jsonify({
+            'success': True,
+            'message': 'Notification broadcast queued',
+            'data': format_fanout_job(notification_fanout.get_job(job_id))
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Broadcast notification error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to queue broadcast',
+            'message': 'An error occurred while queueing the notification broadcast'
+        }), 500
+
+@bp.route('/notifications/broadcast/<job_id>', methods=['GET'])
+@auth_required(allowed_roles=['admin'])
+def get_broadcast_progress(job_id):
+    """Progress of a notification broadcast"""
+    notification_fanout = get_notification_fanout()
+    job = notification_fanout.get_job(job_id) if notification_fanout is not None else None
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Broadcast not found',
+            'message': 'No broadcast with this ID exists'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'message': 'Broadcast progress retrieved successfully',
+        'data': format_fanout_job(job)
+    }), 200
+
+
 # =====================================================
 # TESTING ENDPOINTS (Development)
 # =====================================================
@@ -968,10 +1256,7 @@ def get_alerts_statistics():
             'total_notifications': notification_history_model.count({
                 'user_id': ObjectId(user_id)
             }),
-            'unread_notifications': notification_history_model.count({
-                'user_id': ObjectId(user_id),
-                'read': False
-            }),
+            'unread_notifications': get_unread_notification_count(user_id),
             'recent_notifications': notification_history_model.count({
                 'user_id': ObjectId(user_id),
                 'created_at': {'$gte': datetime.utcnow() - timedelta(days=7)}
@@ -1019,6 +1304,9 @@ def alerts_health_check():
         # Test database connectivity
         alerts_count = user_alerts_model.count()
         notifications_count = notification_history_model.count()
+        notification_fanout = get_notification_fanout()
+        unread_counter = get_unread_counter()
+        notification_stream = get_notification_stream()
         
         return jsonify({
             'success': True,
@@ -1035,14 +1323,17 @@ def alerts_health_check():
                     'notification_history': True,
                     'alert_statistics': True,
                     'bulk_operations': True,
-                    'real_time_alerts': False  # Would require background processing
+                    'real_time_alerts': True  # Matched by the collector as protests are stored
                 },
                 'alert_types_supported': [
                     'keyword', 'category', 'location', 'combined'
                 ],
                 'notification_delivery': [
                     'in_app'  # Only in-app for simplified version
-                ]
+                ],
+                'notification_fanout': notification_fanout.get_stats() if notification_fanout is not None else None,
+                'unread_counters': unread_counter.get_stats() if unread_counter is not None else None,
+                'notification_stream': notification_stream.get_stats() if notification_stream is not None else None
             }
         }), 200
         
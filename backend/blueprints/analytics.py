@@ -11,8 +11,11 @@ Analytics Blueprint - Analytics & Research Data
 """
 
 import os
+import time
+import threading
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, current_app
+from functools import wraps
+from flask import Blueprint, request, jsonify, current_app, copy_current_request_context
 from bson import ObjectId
 import logging
 import calendar
@@ -120,6 +123,53 @@ bookmarks_model = UserBookmarks()
 follows_model = UserFollows()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Materialized per-day rollups behind the dashboard endpoints
+try:
+    from services.analytics_rollups import get_analytics_rollups as build_analytics_rollups
+except ImportError as e:
+    logger.warning(f"Analytics rollups unavailable, using live aggregations: {e}")
+    build_analytics_rollups = None
+get_analytics_rollups = lazy_service('Analytics rollups', build_analytics_rollups)
+
+# Bounded thread pool for running a request's independent pipelines concurrently
+try:
+    from services.pipeline_executor import get_pipeline_executor as build_pipeline_executor
+except ImportError as e:
+    logger.warning(f"Pipeline executor unavailable, running analytics pipelines serially: {e}")
+    build_pipeline_executor = None
+get_pipeline_executor = lazy_service('Pipeline executor', build_pipeline_executor)
+
+# Columnar in-memory snapshot for custom research queries
+try:
+    from services.analytics_snapshot import get_analytics_snapshot_store as build_analytics_snapshot_store
+    from services.analytics_snapshot import SnapshotQueryError
+except ImportError as e:
+    logger.warning(f"Analytics snapshot unavailable, custom queries will use live aggregations: {e}")
+    build_analytics_snapshot_store = None
+    
+    class SnapshotQueryError(ValueError):
+        pass
+get_analytics_snapshot_store = lazy_service('Analytics snapshot', build_analytics_snapshot_store)
+
+# Response cache with stale-while-revalidate for dashboard endpoints
+try:
+    from services.analytics_cache import get_analytics_cache
+    analytics_cache = get_analytics_cache()
+except ImportError as e:
+    logger.warning(f"Analytics response cache unavailable: {e}")
+    analytics_cache = None
+
+# In-memory category co-occurrence matrix, maintained incrementally by the collector
+try:
+    from services.category_cooccurrence import get_category_cooccurrence_index as build_category_index
+except ImportError as e:
+    logger.warning(f"Category co-occurrence index unavailable: {e}")
+    build_category_index = None
+get_category_index = lazy_service('Category co-occurrence index', build_category_index)
+
 
 # =====================================================
 # UTILITY FUNCTIONS
@@ -159,6 +209,130 @@ def calculate_growth_rate(current, previous):
         return 100.0 if current > 0 else 0.0
     return ((current - previous) / previous) * 100
 
+def use_rollups():
+    """Whether dashboard analytics can be served from the materialized rollups"""
+    analytics_rollups = get_analytics_rollups()
+    return analytics_rollups is not None and analytics_rollups.is_ready()
+
+def use_category_index():
+    """Whether category relationships can be served from the in-memory co-occurrence matrix"""
+    category_index = get_category_index()
+    return category_index is not None and category_index.is_ready()
+
+def aggregation_task(model, pipeline):
+    """Build a task running an aggregation on a model's collection (with maxTimeMS when concurrent)"""
+    def task():
+        pipeline_executor = get_pipeline_executor()
+        if pipeline_executor is not None:
+            return list(model.collection.aggregate(pipeline, maxTimeMS=pipeline_executor.max_time_ms))
+        return list(model.collection.aggregate(pipeline))
+    return task
+
+def count_task(model, query):
+    """Build a task counting documents on a model's collection (with maxTimeMS when concurrent)"""
+    def task():
+        pipeline_executor = get_pipeline_executor()
+        if pipeline_executor is not None:
+            return model.collection.count_documents(query, maxTimeMS=pipeline_executor.max_time_ms)
+        return model.count(query)
+    return task
+
+def run_concurrently(tasks):
+    """Run independent {name: (task, fallback)} queries, returning results and per-query timings"""
+    pipeline_executor = get_pipeline_executor()
+    if pipeline_executor is not None:
+        return pipeline_executor.run(tasks)
+    
+    started = time.perf_counter()
+    results = {}
+    timings = {}
+    for name, (task, fallback) in tasks.items():
+        task_started = time.perf_counter()
+        try:
+            results[name] = task()
+            status = 'ok'
+        except Exception as e:
+            logger.warning(f"Analytics query '{name}' failed, using fallback: {e}")
+            results[name] = fallback
+            status = 'failed'
+        timings[name] = {'time_ms': round((time.perf_counter() - task_started) * 1000, 1), 'status': status}
+    
+    return results, {
+        'execution': 'serial',
+        'total_time_ms': round((time.perf_counter() - started) * 1000, 1),
+        'pipelines': timings
+    }
+
+def get_analytics_snapshot():
+    """Current columnar protest snapshot, or None when it cannot be used"""
+    analytics_snapshot_store = get_analytics_snapshot_store()
+    if analytics_snapshot_store is None:
+        return None
+    try:
+        return analytics_snapshot_store.get()
+    except Exception as e:
+        logger.warning(f"Analytics snapshot unavailable, using live aggregations: {e}")
+        return None
+
+def cached_analytics(endpoint, default_granularity=None):
+    """
+    Cache a GET analytics endpoint per query args and caller role.
+    Fresh entries are returned directly; stale ones are returned immediately
+    while a single background request recomputes them.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if analytics_cache is None:
+                return f(*args, **kwargs)
+            
+            user = getattr(request, 'current_user', None) or {}
+            key = analytics_cache.make_key(endpoint, request.args, user.get('user_type', 'public'))
+            ttl = analytics_cache.ttl_for(request.args.get('granularity', default_granularity))
+            
+            def compute():
+                response = f(*args, **kwargs)
+                body, status = response if isinstance(response, tuple) else (response, 200)
+                if status == 200:
+                    analytics_cache.store(key, body.get_json(), ttl)
+                return body, status
+            
+            cached, state = analytics_cache.lookup(endpoint, key)
+            
+            if state == 'stale' and analytics_cache.begin_refresh(key):
+                @copy_current_request_context
+                def refresh():
+                    success = False
+                    try:
+                        success = compute()[1] == 200
+                    except Exception as e:
+                        logger.error(f"Background refresh of {endpoint} failed: {e}")
+                    finally:
+                        analytics_cache.end_refresh(endpoint, key, success, background=True)
+                
+                threading.Thread(target=refresh, daemon=True).start()
+            
+            if cached is None and not analytics_cache.begin_refresh(key):
+                # Another request is already computing this key; wait for it instead of duplicating the work
+                analytics_cache.wait_for_refresh(key)
+                cached, state = analytics_cache.lookup(endpoint, key)
+                if cached is None and not analytics_cache.begin_refresh(key):
+                    return f(*args, **kwargs)
+            
+            if cached is not None:
+                response = jsonify(cached)
+                response.headers['X-Cache'] = 'HIT' if state == 'fresh' else 'STALE'
+                return response, 200
+            
+            try:
+                body, status = compute()
+            finally:
+                analytics_cache.end_refresh(endpoint, key, True)
+            body.headers['X-Cache'] = 'MISS'
+            return body, status
+        return decorated_function
+    return decorator
+
 def aggregate_with_fallback(collection, pipeline, fallback_value=None):
     """Run aggregation with fallback for mock collections"""
     try:
@@ -393,6 +567,7 @@ def get_personal_analytics():
 # =====================================================
 
 @bp.route('/analytics/protests/trends', methods=['GET'])
+@cached_analytics('protest_trends', default_granularity='daily')
 def get_protest_trends():
     """Get protest trends and patterns analysis"""
     try:
@@ -410,107 +585,140 @@ def get_protest_trends():
             date_format = '%Y-%m-%d'
         
         # Protests over time
-        time_series_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': {
-                        '$dateToString': {
-                            'format': date_format,
-                            'date': '$start_date'
-                        }
-                    },
-                    'protest_count': {'$sum': 1},
-                    'avg_quality_score': {'$avg': '$data_quality_score'},
-                    'verified_count': {
-                        '$sum': {
-                            '$cond': [
-                                {'$eq': ['$verification_status', 'verified']}, 
-                                1, 0
-                            ]
-                        }
-                    }
-                }
-            },
-            {'$sort': {'_id': 1}}
-        ]
-        
-        time_series_data = aggregate_with_fallback(
-            protest_model.collection, 
-            time_series_pipeline, 
-            []
-        )
+        results = None
+        if use_rollups():
+            results, query_info = run_concurrently({
+                dimension: (
+                    lambda dimension=dimension: get_analytics_rollups().time_series(
+                        start_date, end_date, date_format, dimension=dimension
+                    ),
+                    None
+                )
+                for dimension in ('total', 'category', 'country')
+            })
+            if any(series is None for series in results.values()):
+                # A failed or timed-out rollup read is answered from the live collections instead
+                logger.warning("Analytics rollup series unavailable, using live aggregations")
+                results = None
         
-        # Category trends
-        category_trends_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
+        if results is not None:
+            query_info['source'] = 'rollups'
+            
+            time_series_data = results['total']
+            category_trends_data = [
+                {
+                    '_id': {'category': item['_id']['key'], 'period': item['_id']['period']},
+                    'count': item['protest_count'],
+                    'avg_trending_score': item['avg_trending_score']
                 }
-            },
-            {'$unwind': '$categories'},
-            {
-                '$group': {
-                    '_id': {
-                        'category': '$categories',
-                        'period': {
+                for item in results['category']
+            ]
+            geographic_trends_data = [
+                {
+                    '_id': {'country': item['_id']['key'], 'period': item['_id']['period']},
+                    'count': item['protest_count'],
+                    'avg_quality': item['avg_quality_score']
+                }
+                for item in results['country']
+                if item['_id']['key'] not in (None, '')
+            ]
+        else:
+            time_series_pipeline = [
+                {
+                    '$match': {
+                        'visibility': 'public',
+                        'start_date': {'$gte': start_date, '$lte': end_date}
+                    }
+                },
+                {
+                    '$group': {
+                        '_id': {
                             '$dateToString': {
                                 'format': date_format,
                                 'date': '$start_date'
                             }
+                        },
+                        'protest_count': {'$sum': 1},
+                        'avg_quality_score': {'$avg': '$data_quality_score'},
+                        'verified_count': {
+                            '$sum': {
+                                '$cond': [
+                                    {'$eq': ['$verification_status', 'verified']}, 
+                                    1, 0
+                                ]
+                            }
                         }
-                    },
-                    'count': {'$sum': 1},
-                    'avg_trending_score': {'$avg': '$trending_score'}
-                }
-            },
-            {'$sort': {'_id.period': 1, 'count': -1}}
-        ]
+                    }
+                },
+                {'$sort': {'_id': 1}}
+            ]
         
-        category_trends_data = aggregate_with_fallback(
-            protest_model.collection, 
-            category_trends_pipeline, 
-            []
-        )
+            # Category trends
+            category_trends_pipeline = [
+                {
+                    '$match': {
+                        'visibility': 'public',
+                        'start_date': {'$gte': start_date, '$lte': end_date}
+                    }
+                },
+                {'$unwind': '$categories'},
+                {
+                    '$group': {
+                        '_id': {
+                            'category': '$categories',
+                            'period': {
+                                '$dateToString': {
+                                    'format': date_format,
+                                    'date': '$start_date'
+                                }
+                            }
+                        },
+                        'count': {'$sum': 1},
+                        'avg_trending_score': {'$avg': '$trending_score'}
+                    }
+                },
+                {'$sort': {'_id.period': 1, 'count': -1}}
+            ]
         
-        # Geographic distribution trends
-        geographic_trends_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': {
-                        'country': '$source_metadata.country',
-                        'period': {
-                            '$dateToString': {
-                                'format': date_format,
-                                'date': '$start_date'
+            # Geographic distribution trends
+            geographic_trends_pipeline = [
+                {
+                    '$match': {
+                        'visibility': 'public',
+                        'start_date': {'$gte': start_date, '$lte': end_date}
+                    }
+                },
+                {
+                    '$group': {
+                        '_id': {
+                            'country': '$source_metadata.country',
+                            'period': {
+                                '$dateToString': {
+                                    'format': date_format,
+                                    'date': '$start_date'
+                                }
                             }
-                        }
-                    },
-                    'count': {'$sum': 1},
-                    'avg_quality': {'$avg': '$data_quality_score'}
-                }
-            },
-            {'$match': {'_id.country': {'$ne': None, '$ne': ''}}},
-            {'$sort': {'_id.period': 1, 'count': -1}}
-        ]
+                        },
+                        'count': {'$sum': 1},
+                        'avg_quality': {'$avg': '$data_quality_score'}
+                    }
+                },
+                {'$match': {'_id.country': {'$ne': None, '$ne': ''}}},
+                {'$sort': {'_id.period': 1, 'count': -1}}
+            ]
         
-        geographic_trends_data = aggregate_with_fallback(
-            protest_model.collection, 
-            geographic_trends_pipeline, 
-            []
-        )
+            
+            # The three pipelines are independent, so run them concurrently
+            results, query_info = run_concurrently({
+                'time_series': (aggregation_task(protest_model, time_series_pipeline), []),
+                'category_trends': (aggregation_task(protest_model, category_trends_pipeline), []),
+                'geographic_trends': (aggregation_task(protest_model, geographic_trends_pipeline), [])
+            })
+            query_info['source'] = 'live'
+            
+            time_series_data = results['time_series']
+            category_trends_data = results['category_trends']
+            geographic_trends_data = results['geographic_trends']
         
         # Calculate growth rates for time series
         formatted_time_series = []
@@ -589,7 +797,8 @@ def get_protest_trends():
                     'start_date': start_date.isoformat(),
                     'end_date': end_date.isoformat(),
                     'total_days': (end_date - start_date).days
-                }
+                },
+                'query_info': query_info
             }
         }), 200
         
@@ -610,6 +819,7 @@ def get_protest_trends():
 
 
 @bp.route('/analytics/protests/statistics', methods=['GET'])
+@cached_analytics('protest_statistics')
 def get_protest_statistics():
     """Get comprehensive protest statistics"""
     try:
@@ -618,177 +828,177 @@ def get_protest_statistics():
         
         start_date, end_date = get_date_range(period)
         
-        # Basic statistics for current period
-        current_stats = {
-            'total_protests': protest_model.count({
-                'visibility': 'public',
-                'start_date': {'$gte': start_date, '$lte': end_date}
-            }),
-            'active_protests': protest_model.count({
-                'visibility': 'public',
-                'status': {'$in': ['active', 'ongoing']},
-                'start_date': {'$gte': start_date, '$lte': end_date}
-            }),
-            'verified_protests': protest_model.count({
-                'visibility': 'public',
-                'verification_status': 'verified',
-                'start_date': {'$gte': start_date, '$lte': end_date}
-            }),
-            'featured_protests': protest_model.count({
-                'visibility': 'public',
-                'featured': True,
-                'start_date': {'$gte': start_date, '$lte': end_date}
-            })
+        # Previous period of the same length, for comparisons
+        period_length = end_date - start_date
+        prev_start = start_date - period_length
+        prev_end = start_date
+        
+        public_in_period = {
+            'visibility': 'public',
+            'start_date': {'$gte': start_date, '$lte': end_date}
+        }
+        public_in_prev_period = {
+            'visibility': 'public',
+            'start_date': {'$gte': prev_start, '$lte': prev_end}
         }
         
-        # Quality score statistics
-        quality_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'avg_quality': {'$avg': '$data_quality_score'},
-                    'min_quality': {'$min': '$data_quality_score'},
-                    'max_quality': {'$max': '$data_quality_score'},
-                    'high_quality_count': {
-                        '$sum': {
-                            '$cond': [{'$gte': ['$data_quality_score', 0.8]}, 1, 0]
-                        }
-                    }
-                }
+        # Independent queries run concurrently; latency is roughly the slowest one
+        results = None
+        if use_rollups():
+            analytics_rollups = get_analytics_rollups()
+            tasks = {
+                'totals': (lambda: analytics_rollups.totals(start_date, end_date), None),
+                'verification_breakdown': (lambda: analytics_rollups.breakdown('verification', start_date, end_date), []),
+                'status_breakdown': (lambda: analytics_rollups.breakdown('status', start_date, end_date), []),
+                'source_breakdown': (lambda: analytics_rollups.breakdown('source', start_date, end_date), [])
             }
-        ]
-        
-        quality_stats = aggregate_with_fallback(
-            protest_model.collection, 
-            quality_pipeline, 
-            [{'_id': None, 'avg_quality': 0, 'min_quality': 0, 'max_quality': 0, 'high_quality_count': 0}]
-        )
-        
-        quality_data = quality_stats[0] if quality_stats else {}
-        
-        # Verification status breakdown
-        verification_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$verification_status',
-                    'count': {'$sum': 1}
-                }
+            if include_comparisons:
+                tasks['prev_totals'] = (lambda: analytics_rollups.totals(prev_start, prev_end - timedelta(days=1)), None)
+            
+            results, query_info = run_concurrently(tasks)
+            if results['totals'] is None:
+                # A failed or timed-out rollup read is answered from the live collections instead
+                logger.warning("Analytics rollup totals unavailable, using live aggregations")
+                results = None
+        
+        if results is not None:
+            totals = results['totals']
+            current_stats = {
+                'total_protests': totals['protest_count'],
+                'active_protests': totals['active_count'],
+                'verified_protests': totals['verified_count'],
+                'featured_protests': totals['featured_count']
             }
-        ]
-        
-        verification_breakdown = aggregate_with_fallback(
-            protest_model.collection, 
-            verification_pipeline, 
-            []
-        )
-        
-        # Status breakdown
-        status_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$status',
-                    'count': {'$sum': 1}
-                }
+            quality_data = {
+                'avg_quality': totals['avg_quality_score'],
+                'min_quality': totals['min_quality'],
+                'max_quality': totals['max_quality'],
+                'high_quality_count': totals['high_quality_count']
             }
-        ]
-        
-        status_breakdown = aggregate_with_fallback(
-            protest_model.collection, 
-            status_pipeline, 
-            []
-        )
-        
-        # Data source statistics
-        source_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
+            verification_breakdown, status_breakdown, source_breakdown = [
+                [{'_id': item['_id'], 'count': item['protest_count']} for item in results[name]]
+                for name in ('verification_breakdown', 'status_breakdown', 'source_breakdown')
+            ]
+            engagement_data = totals
+            
+            prev_totals = results.get('prev_totals') or {}
+            prev_stats = {
+                'total_protests': prev_totals.get('protest_count', 0),
+                'verified_protests': prev_totals.get('verified_count', 0)
+            }
+            query_info['source'] = 'rollups'
+        else:
+            # Quality score statistics
+            quality_pipeline = [
+                {'$match': public_in_period},
+                {
+                    '$group': {
+                        '_id': None,
+                        'avg_quality': {'$avg': '$data_quality_score'},
+                        'min_quality': {'$min': '$data_quality_score'},
+                        'max_quality': {'$max': '$data_quality_score'},
+                        'high_quality_count': {
+                            '$sum': {
+                                '$cond': [{'$gte': ['$data_quality_score', 0.8]}, 1, 0]
+                            }
+                        }
+                    }
                 }
-            },
-            {'$unwind': '$data_sources'},
-            {
-                '$group': {
-                    '_id': '$data_sources',
-                    'count': {'$sum': 1}
+            ]
+            
+            # Verification status breakdown
+            verification_pipeline = [
+                {'$match': public_in_period},
+                {
+                    '$group': {
+                        '_id': '$verification_status',
+                        'count': {'$sum': 1}
+                    }
                 }
-            },
-            {'$sort': {'count': -1}}
-        ]
-        
-        source_breakdown = aggregate_with_fallback(
-            protest_model.collection, 
-            source_pipeline, 
-            []
-        )
-        
-        # Engagement statistics
-        engagement_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
+            ]
+            
+            # Status breakdown
+            status_pipeline = [
+                {'$match': public_in_period},
+                {
+                    '$group': {
+                        '_id': '$status',
+                        'count': {'$sum': 1}
+                    }
                 }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total_views': {'$sum': '$engagement_metrics.views'},
-                    'total_shares': {'$sum': '$engagement_metrics.shares'},
-                    'total_bookmarks': {'$sum': '$engagement_metrics.bookmarks'},
-                    'avg_views': {'$avg': '$engagement_metrics.views'},
-                    'avg_shares': {'$avg': '$engagement_metrics.shares'},
-                    'avg_bookmarks': {'$avg': '$engagement_metrics.bookmarks'}
+            ]
+            
+            # Data source statistics
+            source_pipeline = [
+                {'$match': public_in_period},
+                {'$unwind': '$data_sources'},
+                {
+                    '$group': {
+                        '_id': '$data_sources',
+                        'count': {'$sum': 1}
+                    }
+                },
+                {'$sort': {'count': -1}}
+            ]
+            
+            # Engagement statistics
+            engagement_pipeline = [
+                {'$match': public_in_period},
+                {
+                    '$group': {
+                        '_id': None,
+                        'total_views': {'$sum': '$engagement_metrics.views'},
+                        'total_shares': {'$sum': '$engagement_metrics.shares'},
+                        'total_bookmarks': {'$sum': '$engagement_metrics.bookmarks'},
+                        'avg_views': {'$avg': '$engagement_metrics.views'},
+                        'avg_shares': {'$avg': '$engagement_metrics.shares'},
+                        'avg_bookmarks': {'$avg': '$engagement_metrics.bookmarks'}
+                    }
                 }
+            ]
+            
+            tasks = {
+                'total_protests': (count_task(protest_model, public_in_period), 0),
+                'active_protests': (count_task(protest_model, {
+                    **public_in_period, 'status': {'$in': ['active', 'ongoing']}
+                }), 0),
+                'verified_protests': (count_task(protest_model, {
+                    **public_in_period, 'verification_status': 'verified'
+                }), 0),
+                'featured_protests': (count_task(protest_model, {**public_in_period, 'featured': True}), 0),
+                'quality': (aggregation_task(protest_model, quality_pipeline), []),
+                'verification_breakdown': (aggregation_task(protest_model, verification_pipeline), []),
+                'status_breakdown': (aggregation_task(protest_model, status_pipeline), []),
+                'source_breakdown': (aggregation_task(protest_model, source_pipeline), []),
+                'engagement': (aggregation_task(protest_model, engagement_pipeline), [])
             }
-        ]
-        
-        engagement_stats = aggregate_with_fallback(
-            protest_model.collection, 
-            engagement_pipeline, 
-            [{'_id': None, 'total_views': 0, 'total_shares': 0, 'total_bookmarks': 0, 
-              'avg_views': 0, 'avg_shares': 0, 'avg_bookmarks': 0}]
-        )
-        
-        engagement_data = engagement_stats[0] if engagement_stats else {}
+            if include_comparisons:
+                tasks['prev_total_protests'] = (count_task(protest_model, public_in_prev_period), 0)
+                tasks['prev_verified_protests'] = (count_task(protest_model, {
+                    **public_in_prev_period, 'verification_status': 'verified'
+                }), 0)
+            
+            results, query_info = run_concurrently(tasks)
+            
+            current_stats = {
+                name: results[name]
+                for name in ('total_protests', 'active_protests', 'verified_protests', 'featured_protests')
+            }
+            quality_data = results['quality'][0] if results['quality'] else {}
+            verification_breakdown = results['verification_breakdown']
+            status_breakdown = results['status_breakdown']
+            source_breakdown = results['source_breakdown']
+            engagement_data = results['engagement'][0] if results['engagement'] else {}
+            
+            prev_stats = {
+                'total_protests': results.get('prev_total_protests', 0),
+                'verified_protests': results.get('prev_verified_protests', 0)
+            }
+            query_info['source'] = 'live'
         
         # Comparison with previous period (if requested)
         comparison_data = None
         if include_comparisons:
-            period_length = end_date - start_date
-            prev_start = start_date - period_length
-            prev_end = start_date
-            
-            prev_stats = {
-                'total_protests': protest_model.count({
-                    'visibility': 'public',
-                    'start_date': {'$gte': prev_start, '$lte': prev_end}
-                }),
-                'verified_protests': protest_model.count({
-                    'visibility': 'public',
-                    'verification_status': 'verified',
-                    'start_date': {'$gte': prev_start, '$lte': prev_end}
-                })
-            }
-            
             comparison_data = {
                 'previous_period': {
                     'start_date': prev_start.isoformat(),
@@ -807,6 +1017,7 @@ def get_protest_statistics():
                 }
             }
         
+        
         # Calculate derived metrics
         verification_rate = safe_divide(current_stats['verified_protests'], current_stats['total_protests'])
         activity_rate = safe_divide(current_stats['active_protests'], current_stats['total_protests'])
@@ -857,7 +1068,8 @@ def get_protest_statistics():
                     'start_date': start_date.isoformat(),
                     'end_date': end_date.isoformat(),
                     'days': (end_date - start_date).days
-                }
+                },
+                'query_info': query_info
             }
         }), 200
         
@@ -875,50 +1087,58 @@ def get_protest_statistics():
 # =====================================================
 
 @bp.route('/analytics/geographic', methods=['GET'])
+@cached_analytics('geographic')
 def get_geographic_analytics():
     """Get geographic analysis and mapping data"""
     try:
         period = request.args.get('period', '90d')
-        granularity = request.args.get('granularity', 'country')  # country, region, city
-        
-        start_date, end_date = get_date_range(period)
-        
-        # Country-level analysis
-        country_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$source_metadata.country',
-                    'protest_count': {'$sum': 1},
-                    'avg_quality_score': {'$avg': '$data_quality_score'},
-                    'verified_count': {
-                        '$sum': {
-                            '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
-                        }
-                    },
-                    'avg_trending_score': {'$avg': '$trending_score'},
-                    'active_protests': {
-                        '$sum': {
-                            '$cond': [{'$in': ['$status', ['active', 'ongoing']]}, 1, 0]
+        granularity = request.args.get('granularity', 'country')  # country, region, city
+        
+        start_date, end_date = get_date_range(period)
+        
+        # Country-level analysis
+        if use_rollups():
+            country_data = [
+                {**item, 'active_protests': item['active_count']}
+                for item in get_analytics_rollups().breakdown('country', start_date, end_date)
+                if item['_id'] not in (None, '')
+            ][:50]
+        else:
+            country_pipeline = [
+                {
+                    '$match': {
+                        'visibility': 'public',
+                        'start_date': {'$gte': start_date, '$lte': end_date}
+                    }
+                },
+                {
+                    '$group': {
+                        '_id': '$source_metadata.country',
+                        'protest_count': {'$sum': 1},
+                        'avg_quality_score': {'$avg': '$data_quality_score'},
+                        'verified_count': {
+                            '$sum': {
+                                '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
+                            }
+                        },
+                        'avg_trending_score': {'$avg': '$trending_score'},
+                        'active_protests': {
+                            '$sum': {
+                                '$cond': [{'$in': ['$status', ['active', 'ongoing']]}, 1, 0]
+                            }
                         }
                     }
-                }
-            },
-            {'$match': {'_id': {'$ne': None, '$ne': ''}}},
-            {'$sort': {'protest_count': -1}},
-            {'$limit': 50}
-        ]
+                },
+                {'$match': {'_id': {'$ne': None, '$ne': ''}}},
+                {'$sort': {'protest_count': -1}},
+                {'$limit': 50}
+            ]
         
-        country_data = aggregate_with_fallback(
-            protest_model.collection, 
-            country_pipeline, 
-            []
-        )
+            country_data = aggregate_with_fallback(
+                protest_model.collection, 
+                country_pipeline, 
+                []
+            )
         
         # Region-based analysis (using location description)
         region_pipeline = [
@@ -1094,6 +1314,7 @@ def get_geographic_analytics():
 # =====================================================
 
 @bp.route('/analytics/categories', methods=['GET'])
+@cached_analytics('categories', default_granularity='monthly')
 def get_category_analytics():
     """Get category-based analytics and insights"""
     try:
@@ -1103,48 +1324,10 @@ def get_category_analytics():
         start_date, end_date = get_date_range(period)
         
         # Category distribution and statistics
-        category_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date}
-                }
-            },
-            {'$unwind': '$categories'},
-            {
-                '$group': {
-                    '_id': '$categories',
-                    'protest_count': {'$sum': 1},
-                    'avg_quality_score': {'$avg': '$data_quality_score'},
-                    'avg_trending_score': {'$avg': '$trending_score'},
-                    'verified_count': {
-                        '$sum': {
-                            '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
-                        }
-                    },
-                    'active_count': {
-                        '$sum': {
-                            '$cond': [{'$in': ['$status', ['active', 'ongoing']]}, 1, 0]
-                        }
-                    },
-                    'total_views': {'$sum': '$engagement_metrics.views'},
-                    'total_bookmarks': {'$sum': '$engagement_metrics.bookmarks'}
-                }
-            },
-            {'$sort': {'protest_count': -1}},
-            {'$limit': 20}
-        ]
-        
-        category_data = aggregate_with_fallback(
-            protest_model.collection, 
-            category_pipeline, 
-            []
-        )
-        
-        # Category trends over time (if requested)
-        category_trends = {}
-        if include_trends:
-            trends_pipeline = [
+        if use_rollups():
+            category_data = get_analytics_rollups().breakdown('category', start_date, end_date)[:20]
+        else:
+            category_pipeline = [
                 {
                     '$match': {
                         'visibility': 'public',
@@ -1154,26 +1337,76 @@ def get_category_analytics():
                 {'$unwind': '$categories'},
                 {
                     '$group': {
-                        '_id': {
-                            'category': '$categories',
-                            'month': {
-                                '$dateToString': {
-                                    'format': '%Y-%m',
-                                    'date': '$start_date'
-                                }
+                        '_id': '$categories',
+                        'protest_count': {'$sum': 1},
+                        'avg_quality_score': {'$avg': '$data_quality_score'},
+                        'avg_trending_score': {'$avg': '$trending_score'},
+                        'verified_count': {
+                            '$sum': {
+                                '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
                             }
                         },
-                        'count': {'$sum': 1}
+                        'active_count': {
+                            '$sum': {
+                                '$cond': [{'$in': ['$status', ['active', 'ongoing']]}, 1, 0]
+                            }
+                        },
+                        'total_views': {'$sum': '$engagement_metrics.views'},
+                        'total_bookmarks': {'$sum': '$engagement_metrics.bookmarks'}
                     }
                 },
-                {'$sort': {'_id.month': 1}}
+                {'$sort': {'protest_count': -1}},
+                {'$limit': 20}
             ]
-            
-            trends_data = aggregate_with_fallback(
+        
+            category_data = aggregate_with_fallback(
                 protest_model.collection, 
-                trends_pipeline, 
+                category_pipeline, 
                 []
             )
+        
+        # Category trends over time (if requested)
+        category_trends = {}
+        if include_trends:
+            if use_rollups():
+                trends_data = [
+                    {
+                        '_id': {'category': item['_id']['key'], 'month': item['_id']['period']},
+                        'count': item['protest_count']
+                    }
+                    for item in get_analytics_rollups().time_series(start_date, end_date, '%Y-%m', dimension='category')
+                ]
+            else:
+                trends_pipeline = [
+                    {
+                        '$match': {
+                            'visibility': 'public',
+                            'start_date': {'$gte': start_date, '$lte': end_date}
+                        }
+                    },
+                    {'$unwind': '$categories'},
+                    {
+                        '$group': {
+                            '_id': {
+                                'category': '$categories',
+                                'month': {
+                                    '$dateToString': {
+                                        'format': '%Y-%m',
+                                        'date': '$start_date'
+                                    }
+                                }
+                            },
+                            'count': {'$sum': 1}
+                        }
+                    },
+                    {'$sort': {'_id.month': 1}}
+                ]
+            
+                trends_data = aggregate_with_fallback(
+                    protest_model.collection, 
+                    trends_pipeline, 
+                    []
+                )
             
             # Format trends data
             for item in trends_data:
@@ -1189,54 +1422,60 @@ def get_category_analytics():
                 })
         
         # Category co-occurrence analysis
-        cooccurrence_pipeline = [
-            {
-                '$match': {
-                    'visibility': 'public',
-                    'start_date': {'$gte': start_date, '$lte': end_date},
-                    'categories': {'$size': {'$gte': 2}}  # Only protests with multiple categories
-                }
-            },
-            {
-                '$project': {
-                    'category_pairs': {
-                        '$map': {
-                            'input': {'$range': [0, {'$size': '$categories'}]},
-                            'as': 'i',
-                            'in': {
-                                '$map': {
-                                    'input': {'$range': [{'$add': ['$i', 1]}, {'$size': '$categories'}]},
-                                    'as': 'j',
-                                    'in': {
-                                        'cat1': {'$arrayElemAt': ['$categories', '$i']},
-                                        'cat2': {'$arrayElemAt': ['$categories', '$j']}
+        if use_category_index():
+            cooccurrence_data = [
+                {'_id': {'cat1': pair['cat1'], 'cat2': pair['cat2']}, 'cooccurrence_count': pair['count']}
+                for pair in get_category_index().top_pairs(start_date, end_date, limit=15)
+            ]
+        else:
+            cooccurrence_pipeline = [
+                {
+                    '$match': {
+                        'visibility': 'public',
+                        'start_date': {'$gte': start_date, '$lte': end_date},
+                        'categories': {'$size': {'$gte': 2}}  # Only protests with multiple categories
+                    }
+                },
+                {
+                    '$project': {
+                        'category_pairs': {
+                            '$map': {
+                                'input': {'$range': [0, {'$size': '$categories'}]},
+                                'as': 'i',
+                                'in': {
+                                    '$map': {
+                                        'input': {'$range': [{'$add': ['$i', 1]}, {'$size': '$categories'}]},
+                                        'as': 'j',
+                                        'in': {
+                                            'cat1': {'$arrayElemAt': ['$categories', '$i']},
+                                            'cat2': {'$arrayElemAt': ['$categories', '$j']}
+                                        }
                                     }
                                 }
                             }
                         }
                     }
-                }
-            },
-            {'$unwind': '$category_pairs'},
-            {'$unwind': '$category_pairs'},
-            {
-                '$group': {
-                    '_id': {
-                        'cat1': '$category_pairs.cat1',
-                        'cat2': '$category_pairs.cat2'
-                    },
-                    'cooccurrence_count': {'$sum': 1}
-                }
-            },
-            {'$sort': {'cooccurrence_count': -1}},
-            {'$limit': 15}
-        ]
+                },
+                {'$unwind': '$category_pairs'},
+                {'$unwind': '$category_pairs'},
+                {
+                    '$group': {
+                        '_id': {
+                            'cat1': '$category_pairs.cat1',
+                            'cat2': '$category_pairs.cat2'
+                        },
+                        'cooccurrence_count': {'$sum': 1}
+                    }
+                },
+                {'$sort': {'cooccurrence_count': -1}},
+                {'$limit': 15}
+            ]
         
-        cooccurrence_data = aggregate_with_fallback(
-            protest_model.collection, 
-            cooccurrence_pipeline, 
-            []
-        )
+            cooccurrence_data = aggregate_with_fallback(
+                protest_model.collection, 
+                cooccurrence_pipeline, 
+                []
+            )
         
         # Format category data
         formatted_categories = []
@@ -1338,11 +1577,12 @@ def get_category_analytics():
 
 @bp.route('/analytics/advanced/correlations', methods=['GET'])
 @auth_required(allowed_roles=['researcher', 'journalist', 'admin'])
+@cached_analytics('advanced_correlations')
 def get_advanced_correlations():
     """Get advanced correlation analysis (for researchers and journalists)"""
     try:
         period = request.args.get('period', '180d')
-        correlation_type = request.args.get('type', 'quality_engagement')  # quality_engagement, category_location, temporal_patterns
+        correlation_type = request.args.get('type', 'quality_engagement')  # quality_engagement, category_location, temporal_patterns, category_cooccurrence
         
         start_date, end_date = get_date_range(period)
         
@@ -1410,33 +1650,39 @@ def get_advanced_correlations():
         
         elif correlation_type == 'category_location':
             # Analyze category distribution by location
-            category_location_pipeline = [
-                {
-                    '$match': {
-                        'visibility': 'public',
-                        'start_date': {'$gte': start_date, '$lte': end_date},
-                        'source_metadata.country': {'$ne': None, '$ne': ''}
-                    }
-                },
-                {'$unwind': '$categories'},
-                {
-                    '$group': {
-                        '_id': {
-                            'category': '$categories',
-                            'country': '$source_metadata.country'
-                        },
-                        'count': {'$sum': 1}
-                    }
-                },
-                {'$sort': {'count': -1}},
-                {'$limit': 50}
-            ]
+            if use_category_index():
+                correlation_data = [
+                    {'_id': {'category': item['category'], 'country': item['country']}, 'count': item['count']}
+                    for item in get_category_index().category_country(start_date, end_date, limit=50)
+                ]
+            else:
+                category_location_pipeline = [
+                    {
+                        '$match': {
+                            'visibility': 'public',
+                            'start_date': {'$gte': start_date, '$lte': end_date},
+                            'source_metadata.country': {'$ne': None, '$ne': ''}
+                        }
+                    },
+                    {'$unwind': '$categories'},
+                    {
+                        '$group': {
+                            '_id': {
+                                'category': '$categories',
+                                'country': '$source_metadata.country'
+                            },
+                            'count': {'$sum': 1}
+                        }
+                    },
+                    {'$sort': {'count': -1}},
+                    {'$limit': 50}
+                ]
             
-            correlation_data = aggregate_with_fallback(
-                protest_model.collection, 
-                category_location_pipeline, 
-                []
-            )
+                correlation_data = aggregate_with_fallback(
+                    protest_model.collection, 
+                    category_location_pipeline, 
+                    []
+                )
             
             analysis_results = {
                 'correlation_type': 'category_location',
@@ -1499,11 +1745,30 @@ def get_advanced_correlations():
                 ]
             }
         
+        elif correlation_type == 'category_cooccurrence':
+            # Pairwise category correlation from the co-occurrence matrix
+            if not use_category_index():
+                return jsonify({
+                    'success': False,
+                    'error': 'Category index unavailable',
+                    'message': 'Category co-occurrence data is still being built, try again later'
+                }), 503
+            
+            min_support = max(1, request.args.get('min_support', 3, type=int))
+            correlation_data = get_category_index().correlations(start_date, end_date, min_support=min_support)
+            
+            analysis_results = {
+                'correlation_type': 'category_cooccurrence',
+                'total_protests': correlation_data['total_protests'],
+                'categories': correlation_data['categories'],
+                'data': correlation_data['pairs']
+            }
+        
         else:
             return jsonify({
                 'success': False,
                 'error': 'Invalid correlation type',
-                'message': 'Supported types: quality_engagement, category_location, temporal_patterns'
+                'message': 'Supported types: quality_engagement, category_location, temporal_patterns, category_cooccurrence'
             }), 400
         
         return jsonify({
@@ -1557,6 +1822,9 @@ def custom_analytics_query():
                 'message': 'query_type is required'
             }), 400
         
+        # Research queries run against the in-memory snapshot when it is available
+        snapshot = get_analytics_snapshot()
+        
         # Predefined safe query types
         if query_type == 'engagement_by_quality':
             # Custom query for engagement analysis by quality score ranges
@@ -1566,27 +1834,39 @@ def custom_analytics_query():
             
             start_date = datetime.utcnow() - timedelta(days=period_days)
             
-            pipeline = [
-                {
-                    '$match': {
-                        'visibility': 'public',
-                        'data_quality_score': {'$gte': min_quality, '$lte': max_quality},
-                        'start_date': {'$gte': start_date}
+            if snapshot is not None:
+                results = snapshot.query(
+                    filters={'min_quality': min_quality, 'max_quality': max_quality, 'period_days': period_days},
+                    metrics={
+                        'total_protests': 'count',
+                        'avg_views': 'avg:views',
+                        'avg_shares': 'avg:shares',
+                        'avg_bookmarks': 'avg:bookmarks',
+                        'avg_quality': 'avg:quality'
                     }
-                },
-                {
-                    '$group': {
-                        '_id': None,
-                        'total_protests': {'$sum': 1},
-                        'avg_views': {'$avg': '$engagement_metrics.views'},
-                        'avg_shares': {'$avg': '$engagement_metrics.shares'},
-                        'avg_bookmarks': {'$avg': '$engagement_metrics.bookmarks'},
-                        'avg_quality': {'$avg': '$data_quality_score'}
+                )
+            else:
+                pipeline = [
+                    {
+                        '$match': {
+                            'visibility': 'public',
+                            'data_quality_score': {'$gte': min_quality, '$lte': max_quality},
+                            'start_date': {'$gte': start_date}
+                        }
+                    },
+                    {
+                        '$group': {
+                            '_id': None,
+                            'total_protests': {'$sum': 1},
+                            'avg_views': {'$avg': '$engagement_metrics.views'},
+                            'avg_shares': {'$avg': '$engagement_metrics.shares'},
+                            'avg_bookmarks': {'$avg': '$engagement_metrics.bookmarks'},
+                            'avg_quality': {'$avg': '$data_quality_score'}
+                        }
                     }
-                }
-            ]
-            
-            results = aggregate_with_fallback(protest_model.collection, pipeline, [])
+                ]
+                
+                results = aggregate_with_fallback(protest_model.collection, pipeline, [])
             
         elif query_type == 'category_growth_analysis':
             # Custom query for category growth over time
@@ -1602,65 +1882,99 @@ def custom_analytics_query():
             
             start_date = datetime.utcnow() - timedelta(days=months_back * 30)
             
-            pipeline = [
-                {
-                    '$match': {
-                        'visibility': 'public',
-                        'categories': category,
-                        'start_date': {'$gte': start_date}
+            if snapshot is not None:
+                results = snapshot.query(
+                    filters={'categories': [category], 'period_days': months_back * 30},
+                    group_by='month',
+                    metrics={
+                        'protest_count': 'count',
+                        'avg_trending_score': 'avg:trending',
+                        'verified_count': 'verified_count'
                     }
-                },
-                {
-                    '$group': {
-                        '_id': {
-                            '$dateToString': {
-                                'format': '%Y-%m',
-                                'date': '$start_date'
-                            }
-                        },
-                        'protest_count': {'$sum': 1},
-                        'avg_trending_score': {'$avg': '$trending_score'},
-                        'verified_count': {
-                            '$sum': {
-                                '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
+                )
+            else:
+                pipeline = [
+                    {
+                        '$match': {
+                            'visibility': 'public',
+                            'categories': category,
+                            'start_date': {'$gte': start_date}
+                        }
+                    },
+                    {
+                        '$group': {
+                            '_id': {
+                                '$dateToString': {
+                                    'format': '%Y-%m',
+                                    'date': '$start_date'
+                                }
+                            },
+                            'protest_count': {'$sum': 1},
+                            'avg_trending_score': {'$avg': '$trending_score'},
+                            'verified_count': {
+                                '$sum': {
+                                    '$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]
+                                }
                             }
                         }
-                    }
-                },
-                {'$sort': {'_id': 1}}
-            ]
+                    },
+                    {'$sort': {'_id': 1}}
+                ]
             
-            results = aggregate_with_fallback(protest_model.collection, pipeline, [])
+                results = aggregate_with_fallback(protest_model.collection, pipeline, [])
             
         elif query_type == 'geographic_clustering':
             # Custom query for geographic clustering analysis
             country = parameters.get('country')
             radius_km = min(1000, int(parameters.get('radius_km', 100)))
             
-            pipeline = [
-                {
-                    '$match': {
-                        'visibility': 'public',
-                        'location.coordinates': {'$ne': [0, 0]}
+            if snapshot is not None:
+                filters = {'has_coordinates': True}
+                if country:
+                    filters['countries'] = [country]
+                results = snapshot.rows(filters, limit=500)
+            else:
+                pipeline = [
+                    {
+                        '$match': {
+                            'visibility': 'public',
+                            'location.coordinates': {'$ne': [0, 0]}
+                        }
                     }
-                }
-            ]
+                ]
             
-            if country:
-                pipeline[0]['$match']['source_metadata.country'] = country
+                if country:
+                    pipeline[0]['$match']['source_metadata.country'] = country
             
-            pipeline.extend([
-                {
-                    '$project': {
-                        'coordinates': '$location.coordinates',
-                        'data_quality_score': 1,
-                        'categories': 1
-                    }
-                },
-                {'$limit': 500}  # Limit for performance
-            ])
+                pipeline.extend([
+                    {
+                        '$project': {
+                            'coordinates': '$location.coordinates',
+                            'data_quality_score': 1,
+                            'categories': 1
+                        }
+                    },
+                    {'$limit': 500}  # Limit for performance
+                ])
+            
+                results = aggregate_with_fallback(protest_model.collection, pipeline, [])
             
-            results = aggregate_with_fallback(protest_model.collection, pipeline, [])
+        elif query_type == 'snapshot_query':
+            # Arbitrary filter/group-by/metric query against the columnar snapshot
+            if snapshot is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Snapshot unavailable',
+                    'message': 'The analytics snapshot is not available right now'
+                }), 503
+            
+            results = snapshot.query(
+                filters=parameters.get('filters') or {},
+                group_by=parameters.get('group_by'),
+                metrics=parameters.get('metrics'),
+                sort=parameters.get('sort'),
+                limit=int(parameters.get('limit', 100))
+            )
             
         else:
             return jsonify({
@@ -1681,10 +1995,19 @@ def custom_analytics_query():
                 'results': results,
                 'result_count': len(results),
                 'executed_at': datetime.utcnow().isoformat(),
-                'executed_by': request.current_user['username']
+                'executed_by': request.current_user['username'],
+                'engine': 'snapshot' if snapshot is not None else 'live',
+                'snapshot': snapshot.get_info() if snapshot is not None else None
             }
         }), 200
         
+    except SnapshotQueryError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid query',
+            'message': str(e)
+        }), 400
+        
     except Exception as e:
         logger.error(f"Custom analytics query error: {e}")
         error_log_model.log_error(
@@ -1746,8 +2069,13 @@ def analytics_health_check():
                     'geographic_analytics': True,
                     'category_analytics': True,
                     'advanced_correlations': True,
-                    'custom_queries': True
+                    'custom_queries': True,
+                    'materialized_rollups': use_rollups(),
+                    'concurrent_pipelines': get_pipeline_executor() is not None,
+                    'response_cache': analytics_cache is not None,
+                    'category_cooccurrence_index': use_category_index()
                 },
+                'response_cache': analytics_cache.get_stats() if analytics_cache is not None else None,
                 'analytics_types': [
                     'time_series', 'geographic', 'categorical', 'correlation', 
                     'engagement', 'quality', 'verification', 'trend'
@@ -66,6 +66,49 @@ user_types_model = UserTypes()
 user_sessions_model = UserSessions()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Decoded-token and user principal caches for auth_required
+try:
+    from services.auth_cache import get_auth_cache as build_auth_cache
+except ImportError as e:
+    logger.warning(f"Auth cache unavailable: {e}")
+    build_auth_cache = None
+get_auth_cache = lazy_service('Auth cache', build_auth_cache)
+
+# bcrypt runs in a bounded process pool so login bursts cannot occupy every request thread
+try:
+    from services.password_hasher import get_password_hasher as build_password_hasher, PasswordHasherBusy
+except ImportError as e:
+    logger.warning(f"Password hashing pool unavailable: {e}")
+    build_password_hasher = None
+    
+    class PasswordHasherBusy(Exception):
+        pass
+get_password_hasher = lazy_service('Password hashing pool', build_password_hasher, blocking=True)
+
+# Cached session lookups and buffered last-activity writes; requests wait for it
+# rather than skip the revoked-session check
+try:
+    from services.session_store import get_session_store as build_session_store
+except ImportError as e:
+    logger.warning(f"Session store unavailable: {e}")
+    build_session_store = None
+get_session_store = lazy_service('Session store', build_session_store, blocking=True)
+
+# Lifetime of tokens that open an event stream (EventSource cannot send an Authorization header)
+STREAM_TOKEN_SECONDS = int(os.getenv('STREAM_TOKEN_SECONDS', 60))
+
+# Denormalized per-user statistics; logins wait for it rather than drop an increment
+# (login counts are never recounted)
+try:
+    from services.user_stats import get_user_stats_service as build_user_stats_service
+except ImportError as e:
+    logger.warning(f"User statistics service unavailable: {e}")
+    build_user_stats_service = None
+get_user_stats_service = lazy_service('User statistics service', build_user_stats_service, blocking=True)
+
 
 # =====================================================
 # HELPER FUNCTIONS & DECORATORS
@@ -90,11 +133,30 @@ def generate_jwt_token(user_id, user_type='citizen', expires_hours=24):
         logger.error(f"Failed to generate JWT token: {e}")
         return None
 
-def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+def generate_stream_token(user_id):
+    """Short-lived token for opening an event stream, passed as ?stream_token= because EventSource cannot set headers"""
+    try:
+        payload = {
+            'user_id': str(user_id),
+            'exp': datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_SECONDS),
+            'iat': datetime.utcnow(),
+            'type': 'stream_token'
+        }
+        
+        secret_key = current_app.config.get('SECRET_KEY', 'fallback-secret-key')
+        return jwt.encode(payload, secret_key, algorithm='HS256')
+    except Exception as e:
+        logger.error(f"Failed to generate stream token: {e}")
+        return None
+
+def verify_jwt_token(token, token_type='access_token'):
+    """Verify and decode JWT token of the given type"""
     try:
         secret_key = current_app.config.get('SECRET_KEY', 'fallback-secret-key')
         payload = jwt.decode(token, secret_key, algorithms=['HS256'])
+        # A stream token in a URL must not work as an access token, nor the reverse
+        if payload.get('type') != token_type:
+            return {'error': 'Invalid token'}
         return payload
     except jwt.ExpiredSignatureError:
         return {'error': 'Token has expired'}
@@ -104,24 +166,88 @@ def verify_jwt_token(token):
         logger.error(f"Token verification error: {e}")
         return {'error': 'Token verification failed'}
 
-def auth_required(allowed_roles=None):
-    """Decorator to require authentication and optionally specific roles"""
+def verify_jwt_token_cached(token):
+    """verify_jwt_token, reusing payloads of recently verified tokens"""
+    auth_cache = get_auth_cache()
+    if auth_cache is None:
+        return verify_jwt_token(token)
+    
+    payload = auth_cache.get_token(token)
+    if payload is None:
+        payload = verify_jwt_token(token)
+        if 'error' not in payload:
+            auth_cache.store_token(token, payload)
+    return payload
+
+def load_user_principal(user_id):
+    """Status, role and identity fields of a user, from the principal cache or the database"""
+    auth_cache = get_auth_cache()
+    principal = auth_cache.get_principal(user_id) if auth_cache is not None else None
+    if principal is not None:
+        return principal
+    
+    user = users_model.find_one({'_id': ObjectId(user_id)})
+    if not user:
+        return None
+    return auth_cache.store_principal(user) if auth_cache is not None else user
+
+def create_session_record(session_data):
+    """Persist a new login session and return its id"""
+    session_data.setdefault('last_activity', session_data['created_at'])
+    session_store = get_session_store()
+    if session_store is not None:
+        return session_store.create_session(session_data)
+    return user_sessions_model.create(session_data)
+
+def revoke_user_sessions(user_id, except_token=None, reason=None):
+    """Deactivate a user's sessions (optionally keeping one) and return how many were revoked"""
+    session_store = get_session_store()
+    if session_store is not None:
+        return session_store.revoke_user_sessions(user_id, except_token, reason)
+    
+    query = {'user_id': ObjectId(user_id), 'active': True}
+    if except_token:
+        query['session_token'] = {'$ne': except_token}
+    update_data = {'active': False, 'logged_out_at': datetime.utcnow()}
+    if reason:
+        update_data['revoked_by'] = reason
+    result = user_sessions_model.update_many(query, update_data)
+    return result if isinstance(result, int) else result.modified_count
+
+def invalidate_user_auth_cache(user_id, keep_token=None):
+    """Forget cached tokens and principal for a user after a status, role, password or session change"""
+    auth_cache = get_auth_cache()
+    if auth_cache is not None:
+        auth_cache.invalidate_user(user_id, keep_token=keep_token)
+
+def auth_required(allowed_roles=None, allow_stream_token=False):
+    """
+    Decorator to require authentication and optionally specific roles.
+    With allow_stream_token, a short-lived ?stream_token= from
+    generate_stream_token is accepted when there is no Authorization header.
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # Get token from Authorization header
             auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
+            stream_token = request.args.get('stream_token') if allow_stream_token else None
+            if auth_header and auth_header.startswith('Bearer '):
+                token = auth_header.split(' ')[1]
+                
+                # Verify token (cached by token hash)
+                payload = verify_jwt_token_cached(token)
+            elif stream_token:
+                # Stream tokens have no login session of their own
+                token = None
+                payload = verify_jwt_token(stream_token, token_type='stream_token')
+            else:
                 return jsonify({
                     'success': False,
                     'error': 'Authentication required',
                     'message': 'Please provide a valid authentication token'
                 }), 401
             
-            token = auth_header.split(' ')[1]
-            
-            # Verify token
-            payload = verify_jwt_token(token)
             if 'error' in payload:
                 return jsonify({
                     'success': False,
@@ -129,9 +255,19 @@ def auth_required(allowed_roles=None):
                     'message': payload['error']
                 }), 401
             
-            # Get user details
+            # Get user details (short-lived principal cache)
             try:
-                user = users_model.find_one({'_id': ObjectId(payload['user_id'])})
+                # Tokens whose session was logged out or revoked stop working
+                session_store = get_session_store()
+                session = session_store.lookup(token) if session_store is not None and token else None
+                if session is not None and not session.get('active', True):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Session revoked',
+                        'message': 'This session has been signed out'
+                    }), 401
+                
+                user = load_user_principal(payload['user_id'])
                 if not user:
                     return jsonify({
                         'success': False,
@@ -164,6 +300,10 @@ def auth_required(allowed_roles=None):
                     'verified': user.get('verified', True)  # Always true for simplified version
                 }
                 
+                # Last activity is buffered and bulk-written, not updated per request
+                if session is not None:
+                    session_store.touch(token)
+                
                 return f(*args, **kwargs)
                 
             except Exception as e:
@@ -190,15 +330,30 @@ def validate_password(password):
     return True, "Password is valid"
 
 def hash_password(password):
-    """Hash password using bcrypt"""
+    """Hash password using bcrypt (raises PasswordHasherBusy when the hashing pool is saturated)"""
+    password_hasher = get_password_hasher()
+    if password_hasher is not None:
+        return password_hasher.hash(password)
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def verify_password(password, hashed_password):
-    """Verify password against hash"""
+    """Verify password against hash (raises PasswordHasherBusy when the hashing pool is saturated)"""
+    password_hasher = get_password_hasher()
+    if password_hasher is not None:
+        return password_hasher.verify(password, hashed_password)
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_hashing_busy_response():
+    """503 returned when the password hashing queue is full"""
+    response = jsonify({
+        'success': False,
+        'error': 'Service busy',
+        'message': 'Too many sign-in requests are being processed. Please try again shortly.'
+    })
+    return response, 503, {'Retry-After': '2'}
+
 
 # =====================================================
 # CORE AUTHENTICATION ENDPOINTS
@@ -308,6 +463,8 @@ def register():
                 'reports_submitted': 0,
                 'reports_verified': 0,
                 'posts_created': 0,
+                'bookmarks': 0,
+                'follows': 0,
                 'last_active': None
             }
         }
@@ -330,7 +487,7 @@ def register():
             'login_method': 'registration'
         }
         
-        session_id = user_sessions_model.create(session_data)
+        session_id = create_session_record(session_data)
         
         logger.info(f"User registered successfully: {username} ({email})")
         
@@ -349,6 +506,10 @@ def register():
             }
         }), 201
         
+    except PasswordHasherBusy:
+        logger.warning("Registration rejected: password hashing queue full")
+        return password_hashing_busy_response()
+        
     except Exception as e:
         logger.error(f"Registration error: {e}")
         error_log_model.log_error(
@@ -437,13 +598,23 @@ def login():
         login_update = {
             'last_login': datetime.utcnow(),
             'failed_login_attempts': 0,
-            'account_locked_until': None,
-            'statistics.login_count': user.get('statistics', {}).get('login_count', 0) + 1,
-            'statistics.last_active': datetime.utcnow()
+            'account_locked_until': None
         }
         
+        # Upgrade hashes made with a different cost while the plaintext is at hand
+        password_hasher = get_password_hasher()
+        if password_hasher is not None:
+            new_hash = password_hasher.rehash(password, user['password_hash'])
+            if new_hash:
+                login_update['password_hash'] = new_hash
+        
         users_model.update_by_id(user['_id'], login_update)
         
+        # Login count and last activity are atomic increments, not read-modify-write
+        user_stats_service = get_user_stats_service()
+        if user_stats_service is not None:
+            user_stats_service.record(user['_id'], login_count=1)
+        
         # Create session record
         session_data = {
             'user_id': user['_id'],
@@ -457,7 +628,7 @@ def login():
             'remember_me': remember_me
         }
         
-        session_id = user_sessions_model.create(session_data)
+        session_id = create_session_record(session_data)
         
         logger.info(f"User logged in successfully: {user['username']} ({user['email']})")
         
@@ -481,6 +652,10 @@ def login():
             }
         }), 200
         
+    except PasswordHasherBusy:
+        logger.warning("Login rejected: password hashing queue full")
+        return password_hashing_busy_response()
+        
     except Exception as e:
         logger.error(f"Login error: {e}")
         error_log_model.log_error(
@@ -511,10 +686,18 @@ def logout():
         
         if token:
             # Deactivate the session
-            user_sessions_model.update_many(
-                {'user_id': ObjectId(user_id), 'session_token': token},
-                {'active': False, 'logged_out_at': datetime.utcnow()}
-            )
+            session_store = get_session_store()
+            if session_store is not None:
+                session_store.revoke(token, reason='logout')
+            else:
+                user_sessions_model.update_many(
+                    {'user_id': ObjectId(user_id), 'session_token': token},
+                    {'active': False, 'logged_out_at': datetime.utcnow()}
+                )
+            
+            auth_cache = get_auth_cache()
+            if auth_cache is not None:
+                auth_cache.drop_token(token)
         
         logger.info(f"User logged out: {request.current_user['username']}")
         
@@ -578,7 +761,7 @@ def refresh_token():
             'login_method': 'token_refresh'
         }
         
-        session_id = user_sessions_model.create(session_data)
+        session_id = create_session_record(session_data)
         
         return jsonify({
             'success': True,
@@ -793,12 +976,16 @@ def get_user_sessions():
     try:
         user_id = request.current_user['id']
         
-        # Get active sessions for user
-        sessions = list(user_sessions_model.find_many({
-            'user_id': ObjectId(user_id),
-            'active': True,
-            'expires_at': {'$gt': datetime.utcnow()}
-        }))
+        # Get active sessions for user (with activity not yet flushed)
+        session_store = get_session_store()
+        if session_store is not None:
+            sessions = session_store.list_user_sessions(user_id)
+        else:
+            sessions = list(user_sessions_model.find_many({
+                'user_id': ObjectId(user_id),
+                'active': True,
+                'expires_at': {'$gt': datetime.utcnow()}
+            }))
         
         # Format session data (remove sensitive info)
         formatted_sessions = []
@@ -812,6 +999,7 @@ def get_user_sessions():
                 'user_agent': session.get('user_agent', ''),
                 'ip_address': session.get('ip_address', ''),
                 'login_method': session.get('login_method', ''),
+                'last_activity': session['last_activity'].isoformat() if session.get('last_activity') else None,
                 'is_current': session['session_token'] == current_token
             })
         
@@ -844,24 +1032,16 @@ def revoke_all_sessions():
         current_token = request.headers.get('Authorization', '').split(' ')[1]
         
         # Deactivate all sessions except current one
-        result = user_sessions_model.update_many(
-            {
-                'user_id': ObjectId(user_id),
-                'active': True,
-                'session_token': {'$ne': current_token}
-            },
-            {
-                'active': False,
-                'logged_out_at': datetime.utcnow(),
-                'revoked_by': 'user_revoke_all'
-            }
-        )
+        revoked_count = revoke_user_sessions(user_id, except_token=current_token, reason='user_revoke_all')
+        
+        # Revoked tokens must not keep authenticating from the cache
+        invalidate_user_auth_cache(user_id, keep_token=current_token)
         
         return jsonify({
             'success': True,
-            'message': f'Revoked {result.modified_count} sessions successfully',
+            'message': f'Revoked {revoked_count} sessions successfully',
             'data': {
-                'revoked_count': result.modified_count
+                'revoked_count': revoked_count
             }
         }), 200
         
@@ -925,6 +1105,43 @@ def get_user_stats():
         }), 500
 
 
+@bp.route('/auth/admin/password-hashing', methods=['GET'])
+@auth_required(allowed_roles=['admin'])
+def get_password_hashing_info():
+    """Password hashing pool state, with ?benchmark=true timing each bcrypt cost (admin only)"""
+    try:
+        password_hasher = get_password_hasher()
+        if password_hasher is None:
+            return jsonify({
+                'success': False,
+                'error': 'Hashing pool unavailable',
+                'message': 'Passwords are hashed on request threads'
+            }), 503
+        
+        data = {'pool': password_hasher.get_stats()}
+        
+        if request.args.get('benchmark', 'false').lower() == 'true':
+            target_ms = request.args.get('target_ms', type=float)
+            data['benchmark'] = password_hasher.benchmark(target_ms=target_ms)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Password hashing information retrieved successfully',
+            'data': data
+        }), 200
+        
+    except PasswordHasherBusy:
+        return password_hashing_busy_response()
+        
+    except Exception as e:
+        logger.error(f"Password hashing info error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve password hashing information',
+            'message': 'An error occurred while retrieving password hashing information'
+        }), 500
+
+
 # =====================================================
 # PLACEHOLDERS FOR FUTURE EMAIL FEATURES
 # =====================================================
@@ -969,6 +1186,9 @@ def auth_health_check():
     try:
         # Test database connectivity
         test_count = users_model.count()
+        auth_cache = get_auth_cache()
+        password_hasher = get_password_hasher()
+        session_store = get_session_store()
         
         return jsonify({
             'success': True,
@@ -985,8 +1205,14 @@ def auth_health_check():
                     'password_reset': False,      # Disabled for development
                     'jwt_tokens': True,
                     'session_management': True,
-                    'role_based_access': True
+                    'role_based_access': True,
+                    'auth_cache': auth_cache is not None,
+                    'password_hashing_pool': password_hasher is not None,
+                    'session_store': session_store is not None
                 },
+                'session_store': session_store.get_stats() if session_store is not None else None,
+                'auth_cache': auth_cache.get_stats() if auth_cache is not None else None,
+                'password_hashing': password_hasher.get_stats() if password_hasher is not None else None,
                 'development_mode': True,
                 'notes': [
                     'Email verification is disabled - all accounts are auto-verified',
@@ -1,26 +1,40 @@
 # blueprints/export.py
 """
 Export Blueprint - Data Export & Downloads
-- CSV and JSON export for protests and user data
+- CSV, JSON and NDJSON export for protests and user data
+- Columnar Parquet export with typed columns (requires pyarrow)
+- Streaming file writer with optional gzip compression
 - Async export processing for large datasets
 - Export request management and status tracking
-- Download links with expiration
+- Download links with expiration, range requests, strong ETags and gzip negotiation
+- Optional X-Accel-Redirect / X-Sendfile handoff of downloads to the front proxy
 - Export history and limits
 - User-specific export permissions
 """
 
 import os
 import csv
+import gzip
 import json
-import uuid
+import hashlib
+from contextlib import ExitStack
+from functools import wraps
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from bson import ObjectId
 import logging
-import threading
+from urllib.parse import quote
 from io import StringIO, BytesIO
 import zipfile
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 # Initialize blueprint
 bp = Blueprint('export', __name__)
 logger = logging.getLogger(__name__)
@@ -57,6 +71,7 @@ except ImportError as e:
     class Protest:
         def __init__(self): pass
         def find_many(self, query, **kwargs): return []
+        def find_by_ids(self, ids, projection=None, chunk_size=1000): return {}
         def count(self, query=None): return 0
     
     class UserReports:
@@ -95,90 +110,184 @@ error_log_model = ErrorLog()
 
 
 # =====================================================
-# EXPORT REQUEST TRACKING (Simplified - In Memory)
+# EXPORT JOB QUEUE
 # =====================================================
 
-# In production, you'd use a database table for this
-export_requests = {}
-
-class ExportRequest:
-    def __init__(self, request_id, user_id, export_type, filters, format_type):
-        self.request_id = request_id
-        self.user_id = user_id
-        self.export_type = export_type
-        self.filters = filters
-        self.format_type = format_type
-        self.status = 'queued'
-        self.created_at = datetime.utcnow()
-        self.started_at = None
-        self.completed_at = None
-        self.file_path = None
-        self.file_size = 0
-        self.record_count = 0
-        self.error_message = None
-        self.download_count = 0
-        self.expires_at = datetime.utcnow() + timedelta(days=7)
+# Export jobs are persisted so every process sees them and they survive restarts
+try:
+    from models.web_app_models import ExportRequest
+except ImportError as e:
+    logger.error(f"Failed to import export request model: {e}")
+    
+    class ExportRequest:
+        def __init__(self): pass
+        def create_export_request(self, *args, **kwargs): return None
+        def find_by_id(self, doc_id): return None
+        def find_many(self, query, **kwargs): return []
+        def count(self, query=None): return 0
+        def count_user_exports_since(self, user_id, since): return 0
+        def reserve_daily_export(self, user_id, day, limit): return True
+        def release_daily_export(self, user_id, day): pass
+        def get_daily_export_count(self, user_id, day): return 0
+        def get_user_exports(self, user_id, limit=20, skip=0): return []
+        def get_status_counts(self, user_id=None): return {}
+        def get_expired(self, now=None, limit=1000): return []
+        def cancel_job(self, export_id, user_id): return None
+        def complete_job(self, *args, **kwargs): return False
+        def record_download(self, export_id): pass
+        def delete_by_id(self, doc_id): return False
+
+# The job queue model connects on construction, so it is built on first use
+from services.lazy_service import lazy_service
+
+get_export_jobs = lazy_service('Export job queue', ExportRequest, blocking=True)
+
+def export_queue_required(f):
+    """Answer 503 while the export job queue cannot reach the database"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if get_export_jobs() is None:
+            return jsonify({
+                'success': False,
+                'error': 'Export queue unavailable',
+                'message': 'Exports are temporarily unavailable, please retry shortly'
+            }), 503
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+class ExportCancelled(Exception):
+    """Raised inside a running export once its job has been cancelled"""
+    pass
 
 
 # =====================================================
 # UTILITY FUNCTIONS
 # =====================================================
 
+SUPPORTED_FORMATS = ['csv', 'json', 'ndjson', 'parquet']
+SUPPORTED_COMPRESSION = ['gzip']
+
+# Formats whose file is written by a library that may not be installed
+COLUMNAR_FORMATS = ['parquet']
+
+# Documents are pulled from the database in batches of this size while the file is written
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+# Rows buffered per Parquet row group; larger groups compress better but hold more rows in memory
+PARQUET_ROW_GROUP_SIZE = int(os.getenv('EXPORT_PARQUET_ROW_GROUP_SIZE', 10000))
+
+# Parquet compresses each column chunk itself; gzip requests use its gzip codec instead
+PARQUET_COMPRESSION = os.getenv('EXPORT_PARQUET_COMPRESSION', 'zstd')
+
+# Uncompressed exports also get a gzip copy, served to clients that send Accept-Encoding: gzip
+EXPORT_PRECOMPRESS = os.getenv('EXPORT_PRECOMPRESS', 'true').lower() == 'true'
+
+# Who sends download bodies: '' (the app, via wsgi.file_wrapper/sendfile),
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+EXPORT_DOWNLOAD_HANDOFF = os.getenv('EXPORT_DOWNLOAD_HANDOFF', '').lower()
+
+# nginx internal location that aliases the exports directory
+EXPORT_ACCEL_REDIRECT_PREFIX = os.getenv('EXPORT_ACCEL_REDIRECT_PREFIX', '/protected-exports/')
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Only the fields the export formatters read
+PROTEST_EXPORT_PROJECTION = {
+    'title': 1, 'description': 1, 'location_description': 1, 'location': 1,
+    'start_date': 1, 'end_date': 1, 'categories': 1, 'organizers': 1,
+    'status': 1, 'verification_status': 1, 'data_quality_score': 1, 'trending_score': 1,
+    'data_sources': 1, 'external_links': 1, 'created_at': 1, 'updated_at': 1,
+    'engagement_metrics': 1
+}
+
+USER_REPORT_EXPORT_PROJECTION = {
+    'content.title': 1, 'content.description': 1, 'content.location': 1, 'location': 1,
+    'tags': 1, 'verification_status': 1, 'priority_level': 1, 'credibility_score': 1,
+    'created_at': 1, 'updated_at': 1
+}
+
+BOOKMARK_EXPORT_PROJECTION = {
+    'protest_id': 1, 'created_at': 1, 'notes': 1, 'tags': 1, 'is_favorite': 1
+}
+
 def get_export_limits(user_type: str) -> dict:
     """Get export limits based on user type"""
     limits = {
         'citizen': {
             'max_records': 1000,
             'max_exports_per_day': 3,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'activist': {
             'max_records': 5000,
             'max_exports_per_day': 10,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'journalist': {
             'max_records': 50000,
             'max_exports_per_day': 50,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'researcher': {
             'max_records': 100000,
             'max_exports_per_day': 100,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'ngo_worker': {
             'max_records': 30000,
             'max_exports_per_day': 30,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'moderator': {
             'max_records': 200000,
             'max_exports_per_day': 200,
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         },
         'admin': {
             'max_records': -1,  # Unlimited
             'max_exports_per_day': -1,  # Unlimited
-            'formats': ['csv', 'json']
+            'formats': ['csv', 'json', 'ndjson', 'parquet']
         }
     }
     
     return limits.get(user_type, limits['citizen'])
 
+def is_format_available(format_type: str) -> bool:
+    """Whether this process can write a format (Parquet needs pyarrow)"""
+    return format_type not in COLUMNAR_FORMATS or pa is not None
+
+def get_available_formats(formats: list) -> list:
+    """Formats from a list that this process can write"""
+    return [format_type for format_type in formats if is_format_available(format_type)]
+
+def to_object_id(value):
+    """Convert an id string to ObjectId, leaving non-ObjectId values unchanged"""
+    return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else value
+
+def export_day() -> str:
+    """Key of the day export limits are counted against"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+def count_exports_today(user_id: str) -> int:
+    """Number of export requests a user made today"""
+    return get_export_jobs().get_daily_export_count(to_object_id(user_id), export_day())
+
 def check_export_limits(user_id: str, user_type: str) -> tuple:
-    """Check if user can perform export"""
+    """
+    Reserve one of the user's exports for today.
+    The per-day counter is incremented only while it is below the limit, in a
+    single atomic update, so concurrent requests cannot both pass the check.
+    """
     limits = get_export_limits(user_type)
     
-    # Count exports today
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_requests = [
-        req for req in export_requests.values()
-        if req.user_id == user_id and req.created_at >= today
-    ]
-    
     daily_limit = limits['max_exports_per_day']
-    if daily_limit != -1 and len(today_requests) >= daily_limit:
+    if daily_limit != -1 and not get_export_jobs().reserve_daily_export(to_object_id(user_id), export_day(), daily_limit):
         return False, f"Daily export limit of {daily_limit} exceeded"
     
     return True, None
@@ -322,195 +431,609 @@ def format_user_report_for_export(report: dict) -> dict:
         logger.error(f"Error formatting user report for export: {e}")
         return {}
 
-def export_to_csv(data: list, filename: str) -> str:
-    """Export data to CSV file"""
+# =====================================================
+# COLUMNAR (PARQUET) EXPORT
+# =====================================================
+
+def as_datetime(value):
+    """Datetime column value (None for missing or non-datetime values)"""
+    return value if isinstance(value, datetime) else None
+
+def as_float(value):
+    """Float column value (None when missing or not numeric)"""
     try:
-        if not data:
-            return None
-        
-        # Create exports directory if it doesn't exist
-        exports_dir = os.path.join(current_app.root_path, 'exports')
-        os.makedirs(exports_dir, exist_ok=True)
-        
-        file_path = os.path.join(exports_dir, filename)
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
-        
-        return file_path
-        
-    except Exception as e:
-        logger.error(f"CSV export error: {e}")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
         return None
 
-def export_to_json(data: list, filename: str) -> str:
-    """Export data to JSON file"""
+def as_string_list(value) -> list:
+    """List-of-strings column value"""
+    return [str(item) for item in value or [] if item is not None]
+
+def point_coordinates(document: dict) -> tuple:
+    """(latitude, longitude) of a GeoJSON point, or (None, None) when absent"""
+    coordinates = (document.get('location') or {}).get('coordinates') or []
+    if len(coordinates) < 2:
+        return None, None
+    return as_float(coordinates[1]), as_float(coordinates[0])
+
+def format_protest_columns(protest: dict) -> dict:
+    """Format protest data with native types for columnar export"""
     try:
-        # Create exports directory if it doesn't exist
-        exports_dir = os.path.join(current_app.root_path, 'exports')
-        os.makedirs(exports_dir, exist_ok=True)
-        
-        file_path = os.path.join(exports_dir, filename)
-        
-        with open(file_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump({
-                'export_metadata': {
+        latitude, longitude = point_coordinates(protest)
+        engagement = protest.get('engagement_metrics') or {}
+        return {
+            'id': str(protest['_id']),
+            'title': protest.get('title'),
+            'description': protest.get('description'),
+            'location_description': protest.get('location_description'),
+            'coordinates_latitude': latitude,
+            'coordinates_longitude': longitude,
+            'start_date': as_datetime(protest.get('start_date')),
+            'end_date': as_datetime(protest.get('end_date')),
+            'categories': as_string_list(protest.get('categories')),
+            'organizers': as_string_list(protest.get('organizers')),
+            'status': protest.get('status'),
+            'verification_status': protest.get('verification_status'),
+            'data_quality_score': as_float(protest.get('data_quality_score')),
+            'trending_score': as_float(protest.get('trending_score')),
+            'data_sources': as_string_list(protest.get('data_sources')),
+            'external_links': as_string_list(protest.get('external_links')),
+            'created_at': as_datetime(protest.get('created_at')),
+            'updated_at': as_datetime(protest.get('updated_at')),
+            'views': int(engagement.get('views') or 0),
+            'shares': int(engagement.get('shares') or 0),
+            'bookmarks': int(engagement.get('bookmarks') or 0)
+        }
+    except Exception as e:
+        logger.error(f"Error formatting protest for columnar export: {e}")
+        return {}
+
+def format_user_report_columns(report: dict) -> dict:
+    """Format user report with native types for columnar export"""
+    try:
+        latitude, longitude = point_coordinates(report)
+        content = report.get('content') or {}
+        return {
+            'id': str(report['_id']),
+            'title': content.get('title'),
+            'description': content.get('description'),
+            'location': content.get('location'),
+            'coordinates_latitude': latitude,
+            'coordinates_longitude': longitude,
+            'tags': as_string_list(report.get('tags')),
+            'verification_status': report.get('verification_status'),
+            'priority_level': report.get('priority_level'),
+            'credibility_score': as_float(report.get('credibility_score')),
+            'created_at': as_datetime(report.get('created_at')),
+            'updated_at': as_datetime(report.get('updated_at'))
+        }
+    except Exception as e:
+        logger.error(f"Error formatting user report for columnar export: {e}")
+        return {}
+
+def get_parquet_schema(export_type: str):
+    """Arrow schema for an export type, matching its columnar formatter"""
+    timestamp = pa.timestamp('ms')
+    strings = pa.list_(pa.string())
+    
+    protest_fields = [
+        ('id', pa.string()),
+        ('title', pa.string()),
+        ('description', pa.string()),
+        ('location_description', pa.string()),
+        ('coordinates_latitude', pa.float64()),
+        ('coordinates_longitude', pa.float64()),
+        ('start_date', timestamp),
+        ('end_date', timestamp),
+        ('categories', strings),
+        ('organizers', strings),
+        ('status', pa.string()),
+        ('verification_status', pa.string()),
+        ('data_quality_score', pa.float64()),
+        ('trending_score', pa.float64()),
+        ('data_sources', strings),
+        ('external_links', strings),
+        ('created_at', timestamp),
+        ('updated_at', timestamp),
+        ('views', pa.int64()),
+        ('shares', pa.int64()),
+        ('bookmarks', pa.int64())
+    ]
+    
+    if export_type == 'protests':
+        return pa.schema(protest_fields)
+    
+    if export_type == 'user_reports':
+        return pa.schema([
+            ('id', pa.string()),
+            ('title', pa.string()),
+            ('description', pa.string()),
+            ('location', pa.string()),
+            ('coordinates_latitude', pa.float64()),
+            ('coordinates_longitude', pa.float64()),
+            ('tags', strings),
+            ('verification_status', pa.string()),
+            ('priority_level', pa.string()),
+            ('credibility_score', pa.float64()),
+            ('created_at', timestamp),
+            ('updated_at', timestamp)
+        ])
+    
+    if export_type == 'user_bookmarks':
+        return pa.schema([
+            ('bookmark_id', pa.string()),
+            ('bookmark_created_at', timestamp),
+            ('bookmark_notes', pa.string()),
+            ('bookmark_tags', strings),
+            ('is_favorite', pa.bool_())
+        ] + protest_fields)
+    
+    raise ValueError(f"Unknown export type: {export_type}")
+
+def stream_parquet_to_file(rows, filename: str, schema, compression: str = None) -> tuple:
+    """
+    Write typed rows to a Parquet file one row group at a time.
+    At most PARQUET_ROW_GROUP_SIZE rows are held in memory; like
+    stream_export_to_file the file is renamed into place once complete.
+    Returns (file_path, record_count); the file is removed when there are no rows.
+    """
+    if pq is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+    
+    file_path = os.path.join(get_exports_dir(), filename)
+    partial_path = f"{file_path}.part"
+    codec = 'gzip' if compression == 'gzip' else PARQUET_COMPRESSION
+    record_count = 0
+    
+    try:
+        with pq.ParquetWriter(partial_path, schema, compression=codec) as writer:
+            row_group = []
+            for row in rows:
+                if not row:
+                    continue
+                row_group.append(row)
+                if len(row_group) >= PARQUET_ROW_GROUP_SIZE:
+                    writer.write_table(pa.Table.from_pylist(row_group, schema=schema))
+                    record_count += len(row_group)
+                    row_group = []
+            
+            if row_group:
+                writer.write_table(pa.Table.from_pylist(row_group, schema=schema))
+                record_count += len(row_group)
+    
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    
+    if not record_count:
+        os.remove(partial_path)
+        return None, 0
+    
+    os.replace(partial_path, file_path)
+    return file_path, record_count
+
+def get_exports_dir() -> str:
+    """Directory export files are written to (usable outside an app context)"""
+    exports_dir = os.getenv('EXPORTS_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'exports'
+    )
+    os.makedirs(exports_dir, exist_ok=True)
+    return exports_dir
+
+def export_file_extension(format_type: str, compression: str = None) -> str:
+    """File extension for an export format, e.g. csv or ndjson.gz"""
+    if format_type in COLUMNAR_FORMATS:
+        # Compressed internally, so the file stays directly readable
+        return format_type
+    return f"{format_type}.gz" if compression == 'gzip' else format_type
+
+def open_export_file(file_path: str, compression: str = None):
+    """Open an export file for text writing, gzip-compressed if requested"""
+    if compression == 'gzip':
+        return gzip.open(file_path, 'wt', encoding='utf-8', newline='')
+    return open(file_path, 'w', encoding='utf-8', newline='')
+
+def track_export_progress(rows, progress, every: int = EXPORT_BATCH_SIZE):
+    """
+    Pass rows through, reporting the running count every `every` rows.
+    Raises ExportCancelled as soon as progress() returns False.
+    """
+    rows_written = 0
+    for row in rows:
+        if not row:
+            continue
+        yield row
+        rows_written += 1
+        if rows_written % every == 0 and not progress(rows_written):
+            raise ExportCancelled()
+
+def stream_export_to_file(rows, filename: str, format_type: str, compression: str = None) -> tuple:
+    """
+    Write formatted rows to an export file as they are produced.
+    Rows are consumed one at a time, so memory use does not grow with the export size.
+    The file is written under a temporary name and renamed once complete.
+    Returns (file_path, record_count); the file is removed when there are no rows.
+    """
+    file_path = os.path.join(get_exports_dir(), filename)
+    partial_path = f"{file_path}.part"
+    record_count = 0
+    
+    try:
+        with open_export_file(partial_path, compression) as export_file:
+            if format_type == 'csv':
+                writer = None
+                for row in rows:
+                    if not row:
+                        continue
+                    if writer is None:
+                        writer = csv.DictWriter(export_file, fieldnames=list(row.keys()), extrasaction='ignore')
+                        writer.writeheader()
+                    writer.writerow(row)
+                    record_count += 1
+            
+            elif format_type == 'ndjson':
+                for row in rows:
+                    if not row:
+                        continue
+                    export_file.write(json.dumps(row, ensure_ascii=False, default=str))
+                    export_file.write('\n')
+                    record_count += 1
+            
+            elif format_type == 'json':
+                # Same document as before, with export_metadata after data since the count is known last
+                export_file.write('{"data": [')
+                for row in rows:
+                    if not row:
+                        continue
+                    export_file.write(',\n' if record_count else '\n')
+                    export_file.write(json.dumps(row, ensure_ascii=False, default=str))
+                    record_count += 1
+                export_file.write('\n], "export_metadata": ')
+                export_file.write(json.dumps({
                     'exported_at': datetime.utcnow().isoformat(),
-                    'record_count': len(data),
+                    'record_count': record_count,
                     'format': 'json'
-                },
-                'data': data
-            }, jsonfile, indent=2, ensure_ascii=False)
-        
-        return file_path
-        
-    except Exception as e:
-        logger.error(f"JSON export error: {e}")
-        return None
+                }))
+                export_file.write('}\n')
+            
+            else:
+                raise ValueError(f"Unsupported format: {format_type}")
+    
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    
+    if not record_count:
+        os.remove(partial_path)
+        return None, 0
+    
+    os.replace(partial_path, file_path)
+    return file_path, record_count
 
-def process_export_request(request_id: str):
-    """Process export request in background"""
+def stream_protest_rows(query: dict, limit: int = 0, columnar: bool = False):
+    """Yield formatted protests from a batched, projected cursor"""
+    formatter = format_protest_columns if columnar else format_protest_for_export
+    cursor = protest_model.collection.find(query, PROTEST_EXPORT_PROJECTION).sort('created_at', -1)
+    for protest in cursor.limit(limit).batch_size(EXPORT_BATCH_SIZE):
+        yield formatter(protest)
+
+def stream_user_report_rows(query: dict, limit: int = 0, columnar: bool = False):
+    """Yield formatted user reports from a batched, projected cursor"""
+    formatter = format_user_report_columns if columnar else format_user_report_for_export
+    cursor = user_reports_model.collection.find(query, USER_REPORT_EXPORT_PROJECTION).sort('created_at', -1)
+    for report in cursor.limit(limit).batch_size(EXPORT_BATCH_SIZE):
+        yield formatter(report)
+
+def format_bookmark_rows(bookmarks: list, columnar: bool = False):
+    """Yield export rows for a chunk of bookmarks, fetching their protests in one batched query"""
+    protests = protest_model.find_by_ids(
+        [bookmark['protest_id'] for bookmark in bookmarks],
+        projection=PROTEST_EXPORT_PROJECTION
+    )
+    for bookmark in bookmarks:
+        protest = protests.get(bookmark['protest_id'])
+        if not protest:
+            continue
+        
+        if columnar:
+            yield {
+                'bookmark_id': str(bookmark['_id']),
+                'bookmark_created_at': as_datetime(bookmark.get('created_at')),
+                'bookmark_notes': bookmark.get('notes'),
+                'bookmark_tags': as_string_list(bookmark.get('tags')),
+                'is_favorite': bool(bookmark.get('is_favorite', False)),
+                **format_protest_columns(protest)
+            }
+        else:
+            yield {
+                'bookmark_id': str(bookmark['_id']),
+                'bookmark_created_at': bookmark.get('created_at').isoformat() if bookmark.get('created_at') else '',
+                'bookmark_notes': bookmark.get('notes', ''),
+                'bookmark_tags': ', '.join(bookmark.get('tags', [])),
+                'is_favorite': bookmark.get('is_favorite', False),
+                **format_protest_for_export(protest)
+            }
+
+def stream_bookmark_rows(query: dict, columnar: bool = False):
+    """Yield bookmarks joined with their protest details, one protest query per batch"""
+    cursor = bookmarks_model.collection.find(query, BOOKMARK_EXPORT_PROJECTION).sort('created_at', -1)
+    chunk = []
+    for bookmark in cursor.batch_size(EXPORT_BATCH_SIZE):
+        chunk.append(bookmark)
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield from format_bookmark_rows(chunk, columnar)
+            chunk = []
+    
+    if chunk:
+        yield from format_bookmark_rows(chunk, columnar)
+
+def finalize_export_file(file_path: str, precompress: bool = False) -> dict:
+    """
+    Hash a finished export file for its strong ETag, writing a gzip copy in the same pass.
+    The copy is kept next to the file as <name>.gz (where nginx gzip_static also looks)
+    only when it is smaller than the original.
+    """
+    digest = hashlib.sha256()
+    gzip_path = f"{file_path}.gz" if precompress else None
+    partial_path = f"{gzip_path}.part" if gzip_path else None
+    
     try:
-        export_req = export_requests.get(request_id)
-        if not export_req:
-            return
+        with ExitStack() as stack:
+            source = stack.enter_context(open(file_path, 'rb'))
+            compressed = stack.enter_context(gzip.open(partial_path, 'wb', compresslevel=6)) if partial_path else None
+            for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                digest.update(chunk)
+                if compressed is not None:
+                    compressed.write(chunk)
+    except Exception:
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    
+    file_info = {'etag': digest.hexdigest(), 'gzip_file_path': None, 'gzip_file_size': 0}
+    if partial_path:
+        gzip_size = os.path.getsize(partial_path)
+        if gzip_size < os.path.getsize(file_path):
+            os.replace(partial_path, gzip_path)
+            file_info.update(gzip_file_path=gzip_path, gzip_file_size=gzip_size)
+        else:
+            os.remove(partial_path)
+    
+    return file_info
+
+def remove_export_files(*paths):
+    """Remove export files (the file and its gzip copy), skipping missing ones"""
+    for path in paths:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+                logger.info(f"Removed export file: {path}")
+            except Exception as e:
+                logger.warning(f"Failed to remove export file {path}: {e}")
+
+def process_export_job(job: dict, worker_id: str):
+    """Run one claimed export job (called by the export worker pool)"""
+    job_id = job['_id']
+    format_type = job.get('format', 'csv')
+    compression = job.get('compression') if job.get('compression') != 'none' else None
+    
+    try:
+        # Limits were resolved when the job was requested
+        max_records = job.get('max_records', get_export_limits(job.get('user_type', 'citizen'))['max_records'])
         
-        # Update status
-        export_req.status = 'processing'
-        export_req.started_at = datetime.utcnow()
+        # Build query
+        query = build_export_query(job.get('filters', {}), job['export_type'])
         
-        # Get user limits
-        user = users_model.find_one({'_id': ObjectId(export_req.user_id)})
-        if not user:
-            export_req.status = 'failed'
-            export_req.error_message = 'User not found'
+        if format_type not in SUPPORTED_FORMATS:
+            get_export_jobs().fail_job(job_id, worker_id, f'Unsupported format: {format_type}')
             return
         
-        user_type = user.get('user_type_id', 'citizen')
-        limits = get_export_limits(user_type)
-        max_records = limits['max_records']
+        if not is_format_available(format_type):
+            get_export_jobs().fail_job(job_id, worker_id, f'{format_type.upper()} export is not available on this server')
+            return
         
-        # Build query
-        query = build_export_query(export_req.filters, export_req.export_type)
-        
-        # Get data based on export type
-        if export_req.export_type == 'protests':
-            # Get protests
-            limit = max_records if max_records != -1 else None
-            protests = list(protest_model.find_many(
-                query,
-                sort=[('created_at', -1)],
-                limit=limit
-            ))
-            
-            # Format for export
-            formatted_data = [format_protest_for_export(protest) for protest in protests]
+        # pymongo treats a limit of 0 as no limit
+        limit = max_records if max_records != -1 else 0
+        
+        # Columnar formats keep native types (datetimes, floats, lists) instead of strings
+        columnar = format_type in COLUMNAR_FORMATS
+        
+        # Rows are formatted lazily as the file is written
+        if job['export_type'] == 'protests':
+            rows = stream_protest_rows(query, limit, columnar)
             
-        elif export_req.export_type == 'user_reports':
+        elif job['export_type'] == 'user_reports':
             # Only export user's own reports
-            query['user_id'] = ObjectId(export_req.user_id)
-            
-            limit = max_records if max_records != -1 else None
-            reports = list(user_reports_model.find_many(
-                query,
-                sort=[('created_at', -1)],
-                limit=limit
-            ))
+            query['user_id'] = job['user_id']
+            rows = stream_user_report_rows(query, limit, columnar)
             
-            # Format for export
-            formatted_data = [format_user_report_for_export(report) for report in reports]
-            
-        elif export_req.export_type == 'user_bookmarks':
+        elif job['export_type'] == 'user_bookmarks':
             # Export user's bookmarks with protest details
-            query['user_id'] = ObjectId(export_req.user_id)
-            
-            bookmarks = list(bookmarks_model.find_many(query, sort=[('created_at', -1)]))
-            
-            # Get protest details for each bookmark
-            formatted_data = []
-            for bookmark in bookmarks:
-                protest = protest_model.find_one({'_id': bookmark['protest_id']})
-                if protest:
-                    bookmark_data = {
-                        'bookmark_id': str(bookmark['_id']),
-                        'bookmark_created_at': bookmark.get('created_at').isoformat() if bookmark.get('created_at') else '',
-                        'bookmark_notes': bookmark.get('notes', ''),
-                        'bookmark_tags': ', '.join(bookmark.get('tags', [])),
-                        'is_favorite': bookmark.get('is_favorite', False),
-                        **format_protest_for_export(protest)
-                    }
-                    formatted_data.append(bookmark_data)
+            query['user_id'] = job['user_id']
+            rows = stream_bookmark_rows(query, columnar)
         
         else:
-            export_req.status = 'failed'
-            export_req.error_message = f'Unknown export type: {export_req.export_type}'
+            get_export_jobs().fail_job(job_id, worker_id, f"Unknown export type: {job['export_type']}")
             return
         
-        if not formatted_data:
-            export_req.status = 'completed'
-            export_req.error_message = 'No data found matching the specified criteria'
-            export_req.completed_at = datetime.utcnow()
-            return
+        # Report rows written (and renew the job lease) as the file grows
+        export_workers = get_export_workers()
+        rows = track_export_progress(
+            rows, lambda rows_written: export_workers.report_progress(job, worker_id, rows_written)
+        )
         
         # Generate filename
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{export_req.export_type}_{export_req.user_id}_{timestamp}.{export_req.format_type}"
+        extension = export_file_extension(format_type, compression)
+        filename = f"{job['export_type']}_{job['user_id']}_{timestamp}_{job_id}.{extension}"
         
         # Export to file
-        if export_req.format_type == 'csv':
-            file_path = export_to_csv(formatted_data, filename)
-        elif export_req.format_type == 'json':
-            file_path = export_to_json(formatted_data, filename)
+        if columnar:
+            schema = get_parquet_schema(job['export_type'])
+            file_path, record_count = stream_parquet_to_file(rows, filename, schema, compression)
         else:
-            export_req.status = 'failed'
-            export_req.error_message = f'Unsupported format: {export_req.format_type}'
+            file_path, record_count = stream_export_to_file(rows, filename, format_type, compression)
+        
+        if not file_path:
+            get_export_jobs().complete_job(job_id, worker_id, message='No data found matching the specified criteria')
             return
         
-        if file_path:
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Update export request
-            export_req.status = 'completed'
-            export_req.completed_at = datetime.utcnow()
-            export_req.file_path = file_path
-            export_req.file_size = file_size
-            export_req.record_count = len(formatted_data)
-            
-            logger.info(f"Export completed: {request_id}, {len(formatted_data)} records, {file_size} bytes")
-        else:
-            export_req.status = 'failed'
-            export_req.error_message = 'Failed to create export file'
+        # Get file size
+        file_size = os.path.getsize(file_path)
+        
+        # Content hash for strong ETags, plus a gzip copy of files that are not already compressed
+        precompress = EXPORT_PRECOMPRESS and not compression and format_type not in COLUMNAR_FORMATS
+        file_info = finalize_export_file(file_path, precompress)
+        
+        if not get_export_jobs().complete_job(job_id, worker_id, file_path, file_size, record_count, **file_info):
+            # Cancelled (or reassigned) after the last progress update
+            remove_export_files(file_path, file_info['gzip_file_path'])
+            logger.info(f"Export {job_id} finished after cancellation, file discarded")
+            return
+        
+        logger.info(f"Export completed: {job_id}, {record_count} records, {file_size} bytes")
+        
+    except ExportCancelled:
+        logger.info(f"Export cancelled while processing: {job_id}")
         
     except Exception as e:
         logger.error(f"Export processing error: {e}")
-        export_req = export_requests.get(request_id)
-        if export_req:
-            export_req.status = 'failed'
-            export_req.error_message = str(e)
+        get_export_jobs().fail_job(job_id, worker_id, str(e))
         
         error_log_model.log_error(
             service_name="export_service",
             error_type="export_processing_error",
             error_message=str(e),
-            context={'request_id': request_id},
+            context={'request_id': str(job_id)},
             severity="medium"
         )
 
+def format_export_job(job: dict) -> dict:
+    """Public view of an export job"""
+    def iso(value):
+        return value.isoformat() if value else None
+    
+    return {
+        'request_id': str(job['_id']),
+        'export_type': job.get('export_type'),
+        'format': job.get('format'),
+        'compression': job.get('compression') if job.get('compression') != 'none' else None,
+        'status': job.get('status'),
+        'created_at': iso(job.get('requested_at')),
+        'started_at': iso(job.get('started_at')),
+        'completed_at': iso(job.get('completed_at')),
+        'expires_at': iso(job.get('expires_at')),
+        'record_count': job.get('record_count', 0),
+        'rows_written': (job.get('progress') or {}).get('rows_written', 0),
+        'file_size_bytes': job.get('file_size_bytes', 0),
+        'download_count': job.get('download_count', 0),
+        'error_message': job.get('error_message')
+    }
+
+def is_export_downloadable(job: dict) -> bool:
+    """Whether a job's file can still be downloaded"""
+    return bool(
+        job.get('status') == 'completed' and
+        job.get('file_path') and
+        os.path.exists(job['file_path']) and
+        datetime.now() <= job.get('expires_at', datetime.min)
+    )
+
+def get_owned_export_job(request_id: str, user_id: str, action: str) -> tuple:
+    """Load an export job for its owner; returns (job, error_response)"""
+    job = get_export_jobs().find_by_id(request_id) if ObjectId.is_valid(request_id) else None
+    if not job:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Export request not found',
+            'message': 'The specified export request could not be found'
+        }), 404)
+    
+    # Check if user owns this export request
+    if str(job['user_id']) != str(user_id):
+        return None, (jsonify({
+            'success': False,
+            'error': 'Access denied',
+            'message': f'You can only {action} your own export requests'
+        }), 403)
+    
+    return job, None
+
+def export_mimetype(job: dict) -> str:
+    """Content type of an export file as stored"""
+    if job.get('compression') == 'gzip' and job.get('format') not in COLUMNAR_FORMATS:
+        return 'application/gzip'
+    return EXPORT_MIMETYPES.get(job.get('format'), 'application/octet-stream')
+
+def select_download_variant(job: dict) -> tuple:
+    """
+    (path, content_encoding, etag) of the representation to send.
+    The gzip copy is a separate representation, so it gets its own strong ETag.
+    """
+    gzip_path = job.get('gzip_file_path')
+    if gzip_path and request.accept_encodings['gzip'] and os.path.exists(gzip_path):
+        return gzip_path, 'gzip', f"{job['etag']}-gzip" if job.get('etag') else True
+    # Jobs completed before content hashing fall back to Werkzeug's mtime/size ETag
+    return job['file_path'], None, job.get('etag') or True
+
+def is_download_start() -> bool:
+    """Whether a request starts a download rather than resuming one with a Range request"""
+    if request.method != 'GET':
+        return False
+    return request.range is None or request.range.ranges[0][0] == 0
+
+def build_handoff_response(job: dict, path: str, content_encoding: str, etag, mimetype: str, download_name: str):
+    """
+    Empty response telling the front proxy to send the file itself.
+    The proxy handles ranges and conditional requests with sendfile,
+    so the app worker is free as soon as the headers are written.
+    """
+    response = current_app.response_class(mimetype=mimetype)
+    
+    if EXPORT_DOWNLOAD_HANDOFF == 'x-accel-redirect':
+        # nginx picks the gzip copy itself when gzip_static is enabled on the internal location
+        relative_path = os.path.relpath(job['file_path'], get_exports_dir())
+        response.headers['X-Accel-Redirect'] = f"{EXPORT_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(relative_path)}"
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+        if isinstance(etag, str):
+            response.set_etag(etag)
+    
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return response
+
+
+# Export workers run in every process and claim jobs from the shared queue;
+# they are built on first use, not at import
+try:
+    from services.export_worker import get_export_worker_pool
+    
+    def build_export_workers():
+        return get_export_worker_pool(process_export_job)
+except ImportError as e:
+    logger.warning(f"Export workers unavailable: {e}")
+    build_export_workers = None
+get_export_workers = lazy_service('Export workers', build_export_workers)
+
+@bp.before_app_request
+def start_export_workers():
+    """Start this process's export workers (after any fork by the app server)"""
+    export_workers = get_export_workers()
+    if export_workers is not None:
+        export_workers.start()
+
 
 # =====================================================
 # EXPORT ENDPOINTS
 # =====================================================
 
-@bp.route('/export/csv', methods=['POST'])
-@auth_required()
-def export_csv():
-    """Export data as CSV"""
+def queue_export_request(format_type: str):
+    """Validate an export request body and start processing it in the background"""
     try:
         user_id = request.current_user['id']
         user_type = request.current_user['user_type']
@@ -539,15 +1062,6 @@ def export_csv():
                 'message': f'export_type must be one of: {", ".join(valid_types)}'
             }), 400
         
-        # Check export limits
-        can_export, limit_error = check_export_limits(user_id, user_type)
-        if not can_export:
-            return jsonify({
-                'success': False,
-                'error': 'Export limit exceeded',
-                'message': limit_error
-            }), 429
-        
         # Validate filters
         filters = data.get('filters', {})
         valid_filters, filter_errors = validate_export_filters(filters, export_type)
@@ -561,95 +1075,32 @@ def export_csv():
         
         # Check format support
         limits = get_export_limits(user_type)
-        if 'csv' not in limits['formats']:
+        if format_type not in limits['formats']:
             return jsonify({
                 'success': False,
                 'error': 'Format not supported',
-                'message': 'CSV export is not available for your account type'
+                'message': f'{format_type.upper()} export is not available for your account type'
             }), 403
         
-        # Create export request
-        request_id = str(uuid.uuid4())
-        export_req = ExportRequest(
-            request_id=request_id,
-            user_id=user_id,
-            export_type=export_type,
-            filters=filters,
-            format_type='csv'
-        )
-        
-        export_requests[request_id] = export_req
-        
-        # Start background processing
-        thread = threading.Thread(target=process_export_request, args=(request_id,))
-        thread.daemon = True
-        thread.start()
-        
-        logger.info(f"CSV export requested by user {request.current_user['username']}: {export_type}")
-        
-        return jsonify({
-            'success': True,
-            'message': 'Export request created successfully',
-            'data': {
-                'request_id': request_id,
-                'export_type': export_type,
-                'format': 'csv',
-                'status': 'queued',
-                'estimated_completion': (datetime.utcnow() + timedelta(minutes=5)).isoformat(),
-                'max_records': limits['max_records'] if limits['max_records'] != -1 else 'unlimited'
-            }
-        }), 202
-        
-    except Exception as e:
-        logger.error(f"CSV export error: {e}")
-        error_log_model.log_error(
-            service_name="export_service",
-            error_type="csv_export_error",
-            error_message=str(e),
-            user_id=request.current_user.get('id'),
-            severity="medium"
-        )
-        
-        return jsonify({
-            'success': False,
-            'error': 'Export failed',
-            'message': 'An error occurred while creating the export'
-        }), 500
-
-
-@bp.route('/export/json', methods=['POST'])
-@auth_required()
-def export_json():
-    """Export data as JSON"""
-    try:
-        user_id = request.current_user['id']
-        user_type = request.current_user['user_type']
-        data = request.get_json()
-        
-        if not data:
+        if not is_format_available(format_type):
             return jsonify({
                 'success': False,
-                'error': 'Missing data',
-                'message': 'Request body is required'
-            }), 400
-        
-        export_type = data.get('export_type')
-        if not export_type:
+                'error': 'Format unavailable',
+                'message': f'{format_type.upper()} export is not available on this server'
+            }), 503
+        
+        # Optional compression of the export file
+        compression = data.get('compression')
+        if compression in ('', 'none'):
+            compression = None
+        if compression is not None and compression not in SUPPORTED_COMPRESSION:
             return jsonify({
                 'success': False,
-                'error': 'Missing export type',
-                'message': 'export_type is required'
+                'error': 'Invalid compression',
+                'message': f'compression must be one of: {", ".join(SUPPORTED_COMPRESSION)}'
             }), 400
         
-        valid_types = ['protests', 'user_reports', 'user_bookmarks']
-        if export_type not in valid_types:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid export type',
-                'message': f'export_type must be one of: {", ".join(valid_types)}'
-            }), 400
-        
-        # Check export limits
+        # Check export limits (reserves today's export only once the request is valid)
         can_export, limit_error = check_export_limits(user_id, user_type)
         if not can_export:
             return jsonify({
@@ -658,44 +1109,28 @@ def export_json():
                 'message': limit_error
             }), 429
         
-        # Validate filters
-        filters = data.get('filters', {})
-        valid_filters, filter_errors = validate_export_filters(filters, export_type)
-        if not valid_filters:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid filters',
-                'message': 'Filter validation failed',
-                'details': filter_errors
-            }), 400
-        
-        # Check format support
-        limits = get_export_limits(user_type)
-        if 'json' not in limits['formats']:
-            return jsonify({
-                'success': False,
-                'error': 'Format not supported',
-                'message': 'JSON export is not available for your account type'
-            }), 403
-        
-        # Create export request
-        request_id = str(uuid.uuid4())
-        export_req = ExportRequest(
-            request_id=request_id,
-            user_id=user_id,
-            export_type=export_type,
-            filters=filters,
-            format_type='json'
-        )
-        
-        export_requests[request_id] = export_req
-        
-        # Start background processing
-        thread = threading.Thread(target=process_export_request, args=(request_id,))
-        thread.daemon = True
-        thread.start()
-        
-        logger.info(f"JSON export requested by user {request.current_user['username']}: {export_type}")
+        # Queue the export job; any process's export workers may claim it
+        try:
+            job_id = get_export_jobs().create_export_request(
+                to_object_id(user_id),
+                export_type,
+                filters,
+                format=format_type,
+                compression=compression or 'none',
+                user_type=user_type,
+                max_records=limits['max_records']
+            )
+        except Exception:
+            if limits['max_exports_per_day'] != -1:
+                get_export_jobs().release_daily_export(to_object_id(user_id), export_day())
+            raise
+        request_id = str(job_id)
+        
+        export_workers = get_export_workers()
+        if export_workers is not None:
+            export_workers.notify()
+        
+        logger.info(f"{format_type.upper()} export requested by user {request.current_user['username']}: {export_type}")
         
         return jsonify({
             'success': True,
@@ -703,7 +1138,8 @@ def export_json():
             'data': {
                 'request_id': request_id,
                 'export_type': export_type,
-                'format': 'json',
+                'format': format_type,
+                'compression': compression,
                 'status': 'queued',
                 'estimated_completion': (datetime.utcnow() + timedelta(minutes=5)).isoformat(),
                 'max_records': limits['max_records'] if limits['max_records'] != -1 else 'unlimited'
@@ -711,10 +1147,10 @@ def export_json():
         }), 202
         
     except Exception as e:
-        logger.error(f"JSON export error: {e}")
+        logger.error(f"{format_type.upper()} export error: {e}")
         error_log_model.log_error(
             service_name="export_service",
-            error_type="json_export_error",
+            error_type=f"{format_type}_export_error",
             error_message=str(e),
             user_id=request.current_user.get('id'),
             severity="medium"
@@ -727,55 +1163,63 @@ def export_json():
         }), 500
 
 
+@bp.route('/export/csv', methods=['POST'])
+@auth_required()
+@export_queue_required
+def export_csv():
+    """Export data as CSV"""
+    return queue_export_request('csv')
+
+
+@bp.route('/export/json', methods=['POST'])
+@auth_required()
+@export_queue_required
+def export_json():
+    """Export data as JSON"""
+    return queue_export_request('json')
+
+
+@bp.route('/export/ndjson', methods=['POST'])
+@auth_required()
+@export_queue_required
+def export_ndjson():
+    """Export data as newline-delimited JSON (one record per line)"""
+    return queue_export_request('ndjson')
+
+
+@bp.route('/export/parquet', methods=['POST'])
+@auth_required()
+@export_queue_required
+def export_parquet():
+    """Export data as Parquet with typed columns (lists, datetimes, floats)"""
+    return queue_export_request('parquet')
+
+
 @bp.route('/export/status/<request_id>', methods=['GET'])
 @auth_required()
+@export_queue_required
 def get_export_status(request_id):
     """Get export request status"""
     try:
         user_id = request.current_user['id']
         
-        export_req = export_requests.get(request_id)
-        if not export_req:
-            return jsonify({
-                'success': False,
-                'error': 'Export request not found',
-                'message': 'The specified export request could not be found'
-            }), 404
-        
-        # Check if user owns this export request
-        if export_req.user_id != user_id:
-            return jsonify({
-                'success': False,
-                'error': 'Access denied',
-                'message': 'You can only view your own export requests'
-            }), 403
+        job, error_response = get_owned_export_job(request_id, user_id, 'view')
+        if error_response:
+            return error_response
         
         # Build status response
-        status_data = {
-            'request_id': request_id,
-            'export_type': export_req.export_type,
-            'format': export_req.format_type,
-            'status': export_req.status,
-            'created_at': export_req.created_at.isoformat(),
-            'started_at': export_req.started_at.isoformat() if export_req.started_at else None,
-            'completed_at': export_req.completed_at.isoformat() if export_req.completed_at else None,
-            'expires_at': export_req.expires_at.isoformat(),
-            'record_count': export_req.record_count,
-            'file_size_bytes': export_req.file_size,
-            'download_count': export_req.download_count,
-            'error_message': export_req.error_message
-        }
+        status_data = format_export_job(job)
         
         # Add download URL if completed
-        if export_req.status == 'completed' and export_req.file_path:
+        if job['status'] == 'completed' and job.get('file_path'):
             status_data['download_url'] = f'/api/export/download/{request_id}'
         
-        # Add progress estimation for processing requests
-        if export_req.status == 'processing' and export_req.started_at:
-            elapsed = (datetime.utcnow() - export_req.started_at).total_seconds()
-            estimated_total = 300  # 5 minutes estimated
-            progress = min(90, (elapsed / estimated_total) * 100)  # Cap at 90% until actually complete
-            status_data['progress_percentage'] = round(progress, 1)
+        # Progress for processing requests: actual rows written against the expected total
+        if job['status'] == 'processing':
+            max_records = job.get('max_records', -1)
+            if max_records and max_records > 0:
+                progress = min(99, status_data['rows_written'] / max_records * 100)
+                status_data['progress_percentage'] = round(progress, 1)
         
         return jsonify({
             'success': True,
@@ -794,37 +1238,26 @@ def get_export_status(request_id):
 
 @bp.route('/export/download/<request_id>', methods=['GET'])
 @auth_required()
+@export_queue_required
 def download_export(request_id):
     """Download completed export file"""
     try:
         user_id = request.current_user['id']
         
-        export_req = export_requests.get(request_id)
-        if not export_req:
-            return jsonify({
-                'success': False,
-                'error': 'Export request not found',
-                'message': 'The specified export request could not be found'
-            }), 404
-        
-        # Check if user owns this export request
-        if export_req.user_id != user_id:
-            return jsonify({
-                'success': False,
-                'error': 'Access denied',
-                'message': 'You can only download your own exports'
-            }), 403
+        job, error_response = get_owned_export_job(request_id, user_id, 'download')
+        if error_response:
+            return error_response
         
         # Check if export is completed
-        if export_req.status != 'completed':
+        if job['status'] != 'completed':
             return jsonify({
                 'success': False,
                 'error': 'Export not ready',
-                'message': f'Export status is "{export_req.status}". Download is only available for completed exports.'
+                'message': f'Export status is "{job["status"]}". Download is only available for completed exports.'
             }), 400
         
         # Check if file exists
-        if not export_req.file_path or not os.path.exists(export_req.file_path):
+        if not job.get('file_path') or not os.path.exists(job['file_path']):
             return jsonify({
                 'success': False,
                 'error': 'File not found',
@@ -832,29 +1265,48 @@ def download_export(request_id):
             }), 404
         
         # Check if expired
-        if datetime.utcnow() > export_req.expires_at:
+        if datetime.now() > job['expires_at']:
             return jsonify({
                 'success': False,
                 'error': 'Export expired',
                 'message': 'This export has expired and is no longer available for download'
             }), 410
         
-        # Increment download count
-        export_req.download_count += 1
-        
-        # Get filename for download
-        filename = os.path.basename(export_req.file_path)
-        
-        logger.info(f"Export downloaded by user {request.current_user['username']}: {request_id}")
-        
-        # Send file
-        return send_file(
-            export_req.file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/octet-stream'
-        )
+        # Get filename for download (unchanged when the gzip copy is sent with Content-Encoding)
+        filename = os.path.basename(job['file_path'])
+        path, content_encoding, etag = select_download_variant(job)
+        mimetype = export_mimetype(job)
         
+        if EXPORT_DOWNLOAD_HANDOFF in ('x-accel-redirect', 'x-sendfile'):
+            response = build_handoff_response(job, path, content_encoding, etag, mimetype, filename)
+        else:
+            # Conditional responses cover Range/If-Range (206, 416) and If-None-Match (304);
+            # full bodies go through wsgi.file_wrapper, which servers like gunicorn send with sendfile
+            response = send_file(
+                path,
+                as_attachment=True,
+                download_name=filename,
+                mimetype=mimetype,
+                conditional=True,
+                etag=etag
+            )
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+        
+        if job.get('gzip_file_path'):
+            response.vary.add('Accept-Encoding')
+        response.cache_control.private = True
+        
+        # Count downloads once, not for resumed ranges or 304 revalidations
+        if is_download_start() and response.status_code in (200, 206):
+            get_export_jobs().record_download(job['_id'])
+            logger.info(f"Export downloaded by user {request.current_user['username']}: {request_id}")
+        
+        return response
+        
+    except RequestedRangeNotSatisfiable:
+        # send_file raises this for ranges past the end of the file; Flask answers it with 416
+        raise
     except Exception as e:
         logger.error(f"Download export error: {e}")
         return jsonify({
@@ -866,6 +1318,7 @@ def download_export(request_id):
 
 @bp.route('/export/history', methods=['GET'])
 @auth_required()
+@export_queue_required
 def get_export_history():
     """Get user's export history"""
     try:
@@ -876,59 +1329,41 @@ def get_export_history():
         limit = min(50, max(1, int(request.args.get('limit', 20))))
         offset = (page - 1) * limit
         
-        # Get user's export requests
-        user_exports = [
-            req for req in export_requests.values()
-            if req.user_id == user_id
-        ]
-        
-        # Sort by creation date (newest first)
-        user_exports.sort(key=lambda x: x.created_at, reverse=True)
-        
-        # Apply pagination
-        paginated_exports = user_exports[offset:offset + limit]
+        # Get user's export requests (newest first)
+        owner_id = to_object_id(user_id)
+        paginated_exports = get_export_jobs().get_user_exports(owner_id, limit=limit, skip=offset)
         
         # Format export history
         export_history = []
-        for export_req in paginated_exports:
+        for job in paginated_exports:
             history_item = {
-                'request_id': export_req.request_id,
-                'export_type': export_req.export_type,
-                'format': export_req.format_type,
-                'status': export_req.status,
-                'created_at': export_req.created_at.isoformat(),
-                'completed_at': export_req.completed_at.isoformat() if export_req.completed_at else None,
-                'expires_at': export_req.expires_at.isoformat(),
-                'record_count': export_req.record_count,
-                'file_size_bytes': export_req.file_size,
-                'download_count': export_req.download_count,
-                'filters_applied': export_req.filters,
-                'is_expired': datetime.utcnow() > export_req.expires_at,
-                'is_downloadable': (
-                    export_req.status == 'completed' and 
-                    export_req.file_path and 
-                    os.path.exists(export_req.file_path) and
-                    datetime.utcnow() <= export_req.expires_at
-                )
+                **format_export_job(job),
+                'filters_applied': job.get('filters', {}),
+                'is_expired': datetime.now() > job.get('expires_at', datetime.max),
+                'is_downloadable': is_export_downloadable(job)
             }
             
             # Add download URL if available
             if history_item['is_downloadable']:
-                history_item['download_url'] = f'/api/export/download/{export_req.request_id}'
+                history_item['download_url'] = f"/api/export/download/{history_item['request_id']}"
             
             export_history.append(history_item)
         
+        # Per-status totals computed in the database
+        status_counts = get_export_jobs().get_status_counts(owner_id)
+        completed = status_counts.get('completed', {})
+        
         # Calculate pagination info
-        total_count = len(user_exports)
+        total_count = sum(item['count'] for item in status_counts.values())
         total_pages = (total_count + limit - 1) // limit
         
         # Calculate summary statistics
         summary = {
             'total_exports': total_count,
-            'completed_exports': len([req for req in user_exports if req.status == 'completed']),
-            'failed_exports': len([req for req in user_exports if req.status == 'failed']),
-            'total_records_exported': sum(req.record_count for req in user_exports if req.status == 'completed'),
-            'total_file_size_bytes': sum(req.file_size for req in user_exports if req.status == 'completed')
+            'completed_exports': completed.get('count', 0),
+            'failed_exports': status_counts.get('failed', {}).get('count', 0),
+            'total_records_exported': completed.get('records', 0),
+            'total_file_size_bytes': completed.get('bytes', 0)
         }
         
         return jsonify({
@@ -959,6 +1394,7 @@ def get_export_history():
 
 @bp.route('/export/limits', methods=['GET'])
 @auth_required()
+@export_queue_required
 def get_export_limits_info():
     """Get user's export limits and usage"""
     try:
@@ -968,15 +1404,8 @@ def get_export_limits_info():
         # Get limits for user type
         limits = get_export_limits(user_type)
         
-        # Count today's exports
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_exports = [
-            req for req in export_requests.values()
-            if req.user_id == user_id and req.created_at >= today
-        ]
-        
         # Calculate usage
-        daily_usage = len(today_exports)
+        daily_usage = count_exports_today(user_id)
         daily_limit = limits['max_exports_per_day']
         
         usage_info = {
@@ -984,7 +1413,7 @@ def get_export_limits_info():
             'limits': {
                 'max_records_per_export': limits['max_records'],
                 'max_exports_per_day': daily_limit,
-                'supported_formats': limits['formats']
+                'supported_formats': get_available_formats(limits['formats'])
             },
             'current_usage': {
                 'exports_today': daily_usage,
@@ -1010,47 +1439,26 @@ def get_export_limits_info():
 
 @bp.route('/export/cancel/<request_id>', methods=['DELETE'])
 @auth_required()
+@export_queue_required
 def cancel_export(request_id):
     """Cancel a queued or processing export request"""
     try:
         user_id = request.current_user['id']
         
-        export_req = export_requests.get(request_id)
-        if not export_req:
-            return jsonify({
-                'success': False,
-                'error': 'Export request not found',
-                'message': 'The specified export request could not be found'
-            }), 404
+        job, error_response = get_owned_export_job(request_id, user_id, 'cancel')
+        if error_response:
+            return error_response
         
-        # Check if user owns this export request
-        if export_req.user_id != user_id:
-            return jsonify({
-                'success': False,
-                'error': 'Access denied',
-                'message': 'You can only cancel your own export requests'
-            }), 403
-        
-        # Check if export can be cancelled
-        if export_req.status in ['completed', 'failed', 'cancelled']:
+        # Cancel atomically; a worker processing it stops at its next progress update
+        cancelled = get_export_jobs().cancel_job(job['_id'], job['user_id'])
+        if not cancelled:
+            current = get_export_jobs().find_by_id(job['_id']) or job
             return jsonify({
                 'success': False,
                 'error': 'Cannot cancel export',
-                'message': f'Export with status "{export_req.status}" cannot be cancelled'
+                'message': f'Export with status "{current["status"]}" cannot be cancelled'
             }), 400
         
-        # Cancel the export
-        export_req.status = 'cancelled'
-        export_req.completed_at = datetime.utcnow()
-        export_req.error_message = 'Cancelled by user'
-        
-        # Clean up any partial files
-        if export_req.file_path and os.path.exists(export_req.file_path):
-            try:
-                os.remove(export_req.file_path)
-            except Exception as e:
-                logger.warning(f"Failed to remove cancelled export file: {e}")
-        
         logger.info(f"Export cancelled by user {request.current_user['username']}: {request_id}")
         
         return jsonify({
@@ -1074,24 +1482,13 @@ def cancel_export(request_id):
 def cleanup_expired_exports():
     """Clean up expired export files and requests"""
     try:
-        current_time = datetime.utcnow()
-        expired_requests = []
-        
-        for request_id, export_req in export_requests.items():
-            if current_time > export_req.expires_at:
-                # Remove file if it exists
-                if export_req.file_path and os.path.exists(export_req.file_path):
-                    try:
-                        os.remove(export_req.file_path)
-                        logger.info(f"Removed expired export file: {export_req.file_path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to remove expired file: {e}")
-                
-                expired_requests.append(request_id)
+        expired_requests = get_export_jobs().get_expired(datetime.now())
         
-        # Remove expired requests from memory
-        for request_id in expired_requests:
-            del export_requests[request_id]
+        for job in expired_requests:
+            # Remove the file and its gzip copy if they exist
+            remove_export_files(job.get('file_path'), job.get('gzip_file_path'))
+            
+            get_export_jobs().delete_by_id(job['_id'])
         
         logger.info(f"Cleaned up {len(expired_requests)} expired export requests")
         
@@ -1101,6 +1498,7 @@ def cleanup_expired_exports():
 
 @bp.route('/export/cleanup', methods=['POST'])
 @auth_required(allowed_roles=['admin', 'moderator'])
+@export_queue_required
 def manual_cleanup():
     """Manually trigger cleanup of expired exports (admin only)"""
     try:
@@ -1124,11 +1522,11 @@ def manual_cleanup():
 # PLACEHOLDER FOR EMAIL NOTIFICATIONS
 # =====================================================
 
-def send_export_notification(user_email: str, export_req: ExportRequest):
+def send_export_notification(user_email: str, job: dict):
     """Send email notification when export is ready (placeholder)"""
     try:
         # TODO: Implement email notification when email service is configured
-        logger.info(f"Email notification placeholder: Export {export_req.request_id} ready for {user_email}")
+        logger.info(f"Email notification placeholder: Export {job['_id']} ready for {user_email}")
         
         # In production, you would:
         # 1. Use an email service (SendGrid, SES, etc.)
@@ -1150,13 +1548,16 @@ def export_health_check():
     """Export service health check"""
     try:
         # Check export directory
-        exports_dir = os.path.join(current_app.root_path, 'exports')
+        exports_dir = get_exports_dir()
         exports_dir_exists = os.path.exists(exports_dir)
         
-        # Count active requests
-        active_requests = len([req for req in export_requests.values() if req.status in ['queued', 'processing']])
-        completed_requests = len([req for req in export_requests.values() if req.status == 'completed'])
-        failed_requests = len([req for req in export_requests.values() if req.status == 'failed'])
+        # Count requests by status across all processes
+        export_jobs = get_export_jobs()
+        status_counts = export_jobs.get_status_counts() if export_jobs is not None else {}
+        active_requests = sum(status_counts.get(status, {}).get('count', 0) for status in ['queued', 'processing'])
+        completed_requests = status_counts.get('completed', {}).get('count', 0)
+        failed_requests = status_counts.get('failed', {}).get('count', 0)
+        export_workers = get_export_workers()
         
         # Check disk space (simplified)
         import shutil
@@ -1173,16 +1574,27 @@ def export_health_check():
                 'service': 'export_service',
                 'status': 'healthy',
                 'exports_directory_exists': exports_dir_exists,
+                'job_queue_available': export_jobs is not None,
                 'active_requests': active_requests,
                 'completed_requests': completed_requests,
                 'failed_requests': failed_requests,
-                'total_requests': len(export_requests),
+                'total_requests': sum(item['count'] for item in status_counts.values()),
+                'queued_requests': status_counts.get('queued', {}).get('count', 0),
+                'export_workers': export_workers.get_stats() if export_workers is not None else None,
                 'disk_usage_percent': round(disk_usage_percent, 1),
                 'features': {
                     'csv_export': True,
                     'json_export': True,
+                    'ndjson_export': True,
+                    'parquet_export': is_format_available('parquet'),
+                    'gzip_compression': True,
+                    'streaming_writer': True,
                     'background_processing': True,
+                    'durable_job_queue': True,
                     'download_links': True,
+                    'range_requests': True,
+                    'strong_etags': True,
+                    'gzip_precompression': EXPORT_PRECOMPRESS,
                     'export_history': True,
                     'user_limits': True,
                     'automatic_cleanup': True,
@@ -1191,7 +1603,9 @@ def export_health_check():
                 'supported_export_types': [
                     'protests', 'user_reports', 'user_bookmarks'
                 ],
-                'supported_formats': ['csv', 'json']
+                'supported_formats': get_available_formats(SUPPORTED_FORMATS),
+                'supported_compression': SUPPORTED_COMPRESSION,
+                'download_handoff': EXPORT_DOWNLOAD_HANDOFF or None
             }
         }), 200
         
@@ -11,6 +11,8 @@ Enhanced Protests Blueprint - Core Protest Data & Discovery
 
 import os
 import json
+import math
+import hashlib
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app
 from bson import ObjectId
@@ -41,6 +43,7 @@ try:
     from models.web_app_models import UserBookmarks, UserFollows
     from models.system_monitoring_models import ErrorLog
     from services.data_collector import get_enhanced_data_collector
+    from services.map_tiles import get_map_tile_index
 except ImportError as e:
     logger.error(f"Failed to import models: {e}")
     # Mock models for development
@@ -54,6 +57,8 @@ except ImportError as e:
         def get_featured_protests(self, **kwargs): return []
         def get_protests_by_category(self, **kwargs): return []
         def get_protests_near_location(self, **kwargs): return []
+        def search_by_location(self, *args, **kwargs): return []
+        def update_engagement_metrics(self, protest_id, metric, increment=1): pass
     
     class ProtestAnalytics:
         def __init__(self): pass
@@ -78,6 +83,12 @@ except ImportError as e:
             def get_comprehensive_status(self): 
                 return {'status': 'mock', 'total_protests': 0}
         return MockCollector()
+    
+    def get_map_tile_index():
+        class MockTileIndex:
+            def get_tile(self, zoom, x, y):
+                return {'zoom': zoom, 'x': x, 'y': y, 'clusters': [], 'markers': []}
+        return MockTileIndex()
 
 # Initialize models
 protest_model = Protest()
@@ -86,6 +97,33 @@ bookmarks_model = UserBookmarks()
 follows_model = UserFollows()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Shared result cache for hot listing queries
+try:
+    from services.query_cache import get_query_cache, normalize_request_args
+    query_cache = get_query_cache()
+except ImportError as e:
+    logger.warning(f"Query cache unavailable: {e}")
+    query_cache = None
+
+# Buffered engagement counters
+try:
+    from services.engagement_buffer import get_engagement_buffer as build_engagement_buffer
+except ImportError as e:
+    logger.warning(f"Engagement buffer unavailable: {e}")
+    build_engagement_buffer = None
+get_engagement_buffer = lazy_service('Engagement buffer', build_engagement_buffer)
+
+# In-memory nearest-neighbour index (needs numpy)
+try:
+    from services.spatial_index import get_spatial_index as build_spatial_index
+except ImportError as e:
+    logger.warning(f"Spatial index unavailable, nearby search will query MongoDB: {e}")
+    build_spatial_index = None
+get_spatial_index = lazy_service('Spatial index', build_spatial_index)
+
 
 # =====================================================
 # UTILITY FUNCTIONS
@@ -154,6 +192,12 @@ def format_protest_data(protest, include_sensitive=False, user_context=None):
         logger.error(f"Error formatting protest data: {e}")
         return None
 
+def calculate_distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points (haversine)"""
+    lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))  # Earth radius in km
+
 def parse_query_filters(args):
     """Parse query parameters into database filters"""
     filters = {}
@@ -275,6 +319,20 @@ def get_protests():
             # Add text search to filters
             filters['$text'] = {'$search': search_query}
         
+        # Serve identical listings from the result cache
+        cache_key = None
+        if query_cache:
+            cache_key = query_cache.make_key('protests', {
+                'q': search_query,
+                'args': normalize_request_args(request.args, exclude=('q', 'page', 'limit')),
+                'page': pagination['page'],
+                'limit': pagination['limit']
+            })
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached), 200
+            cache_generation = query_cache.get_generation()
+        
         # Get protests from database
         protests = list(protest_model.find_many(
             filters,
@@ -298,7 +356,7 @@ def get_protests():
         has_next = pagination['page'] < total_pages
         has_prev = pagination['page'] > 1
         
-        return jsonify({
+        response_data = {
             'success': True,
             'message': f'Retrieved {len(formatted_protests)} protests',
             'data': {
@@ -321,7 +379,12 @@ def get_protests():
                     }
                 }
             }
-        }), 200
+        }
+        
+        if cache_key:
+            query_cache.set(cache_key, response_data, generation=cache_generation)
+        
+        return jsonify(response_data), 200
         
     except Exception as e:
         logger.error(f"Get protests error: {e}")
@@ -374,12 +437,18 @@ def get_protest_details(protest_id):
                 'message': 'An error occurred while formatting protest data'
             }), 500
         
-        # Increment view count (basic analytics)
+        # Increment view count (basic analytics), buffered and flushed in bulk
         try:
-            protest_model.update_by_id(protest['_id'], {
-                '$inc': {'engagement_metrics.views': 1},
-                '$set': {'last_viewed_at': datetime.utcnow()}
-            })
+            engagement_buffer = get_engagement_buffer()
+            if engagement_buffer:
+                engagement_buffer.increment(protest['_id'], 'views')
+                
+                # Include counts that haven't been flushed yet
+                for metric, amount in engagement_buffer.get_pending(protest['_id']).items():
+                    if metric in formatted_protest['engagement_metrics']:
+                        formatted_protest['engagement_metrics'][metric] += amount
+            else:
+                protest_model.update_engagement_metrics(protest['_id'], 'views')
         except Exception as e:
             logger.warning(f"Failed to update view count: {e}")
         
@@ -442,6 +511,7 @@ def get_map_data():
         
         # Format for map display
         map_markers = []
+        bounds = None
         for protest in protests:
             if protest.get('location', {}).get('coordinates', [0, 0]) != [0, 0]:
                 marker = {
@@ -457,6 +527,16 @@ def get_map_data():
                     'start_date': protest.get('start_date').isoformat() if protest.get('start_date') else None
                 }
                 map_markers.append(marker)
+                
+                # Track marker bounds
+                lng, lat = marker['coordinates']
+                if bounds is None:
+                    bounds = {'west': lng, 'south': lat, 'east': lng, 'north': lat}
+                else:
+                    bounds['west'] = min(bounds['west'], lng)
+                    bounds['south'] = min(bounds['south'], lat)
+                    bounds['east'] = max(bounds['east'], lng)
+                    bounds['north'] = max(bounds['north'], lat)
         
         return jsonify({
             'success': True,
@@ -464,12 +544,11 @@ def get_map_data():
             'data': {
                 'markers': map_markers,
                 'total_markers': len(map_markers),
-                'bounds': {
-                    'note': 'Calculate bounds on frontend for better performance'
-                },
+                'bounds': bounds,
                 'clustering': {
                     'recommended': len(map_markers) > 100,
-                    'zoom_threshold': 10
+                    'zoom_threshold': 10,
+                    'tiles_endpoint': '/api/protests/map-tiles/{z}/{x}/{y}'
                 }
             }
         }), 200
@@ -483,6 +562,48 @@ def get_map_data():
         }), 500
 
 
+@bp.route('/protests/map-tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def get_map_tile(z, x, y):
+    """Get server-side clustered protest markers for a map tile"""
+    try:
+        # Validate tile coordinates
+        if not (0 <= z <= 22) or not (0 <= x < (1 << z)) or not (0 <= y < (1 << z)):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid tile',
+                'message': 'Tile coordinates are out of range for the zoom level'
+            }), 400
+        
+        tile_index = get_map_tile_index()
+        if query_cache:
+            tile = query_cache.get_or_compute('map_tiles', [z, x, y], lambda: tile_index.get_tile(z, x, y))
+        else:
+            tile = tile_index.get_tile(z, x, y)
+        
+        payload = {
+            'success': True,
+            'message': f"Retrieved {len(tile['clusters'])} clusters and {len(tile['markers'])} markers",
+            'data': tile
+        }
+        
+        # Strong ETag over the tile content so unchanged tiles revalidate with a 304
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        logger.error(f"Get map tile error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve map tile',
+            'message': 'An error occurred while retrieving the map tile'
+        }), 500
+
+
 @bp.route('/protests/trending', methods=['GET'])
 def get_trending_protests():
     """Get trending protests"""
@@ -656,8 +777,11 @@ def get_nearby_protests():
         # Get location parameters
         lat = request.args.get('lat', type=float)
         lng = request.args.get('lng', type=float)
-        radius_km = min(500, int(request.args.get('radius', 50)))  # Max 500km
-        limit = min(100, int(request.args.get('limit', 20)))
+        radius_km = request.args.get('radius', type=float)  # Omit for a pure k-nearest lookup
+        if radius_km is not None:
+            radius_km = min(500, max(0.1, radius_km))  # Max 500km
+        k = min(100, max(1, int(request.args.get('k', request.args.get('limit', 20)))))
+        categories = request.args.getlist('categories')
         
         if lat is None or lng is None:
             return jsonify({
@@ -674,60 +798,40 @@ def get_nearby_protests():
                 'message': 'Latitude must be between -90 and 90, longitude between -180 and 180'
             }), 400
         
-        # Build geo query
-        geo_query = {
-            'location': {
-                '$geoWithin': {
-                    '$centerSphere': [[lng, lat], radius_km / 6371]  # Earth radius in km
-                }
-            },
-            'visibility': 'public'
-        }
-        
-        # Get nearby protests
-        nearby_protests = list(protest_model.find_many(
-            geo_query,
-            sort=[('trending_score', -1)],
-            limit=limit
-        ))
-        
-        # Format protests with distance calculation
+        # Nearest first from the in-memory index, or from a $near query if it isn't available
+        spatial_index = get_spatial_index()
+        if spatial_index:
+            nearby = spatial_index.nearest(lat, lng, k=k, radius_km=radius_km, categories=categories or None)
+            source = 'spatial_index'
+        else:
+            nearby = []
+            # Same statuses as the index, so results don't depend on which path served them
+            for protest in protest_model.search_by_location(lng, lat, radius_km or 500, limit=k,
+                                                            categories=categories or None, active_only=True):
+                protest_lng, protest_lat = protest.get('location', {}).get('coordinates', [0, 0])
+                distance = calculate_distance_km(lat, lng, protest_lat, protest_lng)
+                nearby.append({'protest': protest, 'distance_km': round(distance, 2)})
+            source = 'database'
+        
+        # Format protests with distance
         formatted_protests = []
-        for protest in nearby_protests:
-            formatted_protest = format_protest_data(protest)
+        for match in nearby:
+            formatted_protest = format_protest_data(match['protest'])
             if formatted_protest:
-                # Calculate approximate distance (simple haversine)
-                protest_coords = protest.get('location', {}).get('coordinates', [0, 0])
-                if protest_coords != [0, 0]:
-                    # Simple distance calculation (not perfectly accurate but good enough)
-                    from math import radians, cos, sin, asin, sqrt
-                    
-                    def haversine(lon1, lat1, lon2, lat2):
-                        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-                        dlon = lon2 - lon1
-                        dlat = lat2 - lat1
-                        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                        c = 2 * asin(sqrt(a))
-                        r = 6371  # Radius of earth in kilometers
-                        return c * r
-                    
-                    distance = haversine(lng, lat, protest_coords[0], protest_coords[1])
-                    formatted_protest['distance_km'] = round(distance, 2)
-                
+                formatted_protest['distance_km'] = match['distance_km']
                 formatted_protests.append(formatted_protest)
         
-        # Sort by distance if calculated
-        if formatted_protests and 'distance_km' in formatted_protests[0]:
-            formatted_protests.sort(key=lambda x: x.get('distance_km', float('inf')))
-        
         return jsonify({
             'success': True,
-            'message': f'Found {len(formatted_protests)} protests within {radius_km}km',
+            'message': f'Found {len(formatted_protests)} nearby protests',
             'data': {
                 'protests': formatted_protests,
                 'search_center': {'lat': lat, 'lng': lng},
                 'search_radius_km': radius_km,
-                'total_found': len(formatted_protests)
+                'k': k,
+                'categories': categories,
+                'total_found': len(formatted_protests),
+                'source': source
             }
         }), 200
         
@@ -858,6 +962,8 @@ def protests_health_check():
             collector_healthy = False
             collector_status = {}
         
+        engagement_buffer = get_engagement_buffer()
+        
         return jsonify({
             'success': True,
             'message': 'Protests service is healthy',
@@ -871,6 +977,7 @@ def protests_health_check():
                     'public_protests': True,
                     'search_filtering': True,
                     'map_data': True,
+                    'map_tiles': True,
                     'trending_protests': True,
                     'featured_protests': True,
                     'categories': True,
@@ -880,7 +987,8 @@ def protests_health_check():
                 'collector_status': {
                     'available': collector_healthy,
                     'last_collection': collector_status.get('health_status', {}).get('last_check')
-                }
+                },
+                'engagement_buffer': engagement_buffer.get_stats() if engagement_buffer else None
             }
         }), 200
         
@@ -84,6 +84,14 @@ posts_model = Posts()
 users_model = Users()
 error_log_model = ErrorLog()
 
+# Shared result cache for hot search queries
+try:
+    from services.query_cache import get_query_cache, normalize_request_args, normalize_parsed_query
+    query_cache = get_query_cache()
+except ImportError as e:
+    logger.warning(f"Query cache unavailable: {e}")
+    query_cache = None
+
 
 # =====================================================
 # UTILITY FUNCTIONS
@@ -324,6 +332,51 @@ def format_search_result(item, item_type, relevance_score=0):
         logger.error(f"Error formatting search result: {e}")
         return None
 
+def compute_search_facets(filters, bucket_limit=20):
+    """Count matching protests per category, status, verification status and country in one pass"""
+    try:
+        pipeline = [
+            {'$match': filters},
+            {'$facet': {
+                'categories': [
+                    {'$unwind': '$categories'},
+                    {'$group': {'_id': '$categories', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}},
+                    {'$limit': bucket_limit}
+                ],
+                'statuses': [
+                    {'$group': {'_id': '$status', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ],
+                'verification_statuses': [
+                    {'$group': {'_id': '$verification_status', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ],
+                'countries': [
+                    {'$group': {'_id': '$source_metadata.country', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}},
+                    {'$limit': bucket_limit}
+                ]
+            }}
+        ]
+        
+        results = list(protest_model.collection.aggregate(pipeline))
+        facet_results = results[0] if results else {}
+        
+        facets = {}
+        for facet_name in ['categories', 'statuses', 'verification_statuses', 'countries']:
+            facets[facet_name] = [
+                {'value': bucket['_id'], 'count': bucket['count']}
+                for bucket in facet_results.get(facet_name, [])
+                if bucket['_id'] not in (None, '')  # Skip missing values
+            ]
+        
+        return facets
+        
+    except Exception as e:
+        logger.error(f"Error computing search facets: {e}")
+        return None
+
 
 # =====================================================
 # MAIN SEARCH ENDPOINTS
@@ -513,12 +566,29 @@ def search_protests():
         
         # Build base filters
         filters = {'visibility': 'public'}
+        parsed_query = None
         
         # Add search query if provided
         if query:
             parsed_query = parse_search_query(query)
             filters = build_search_filters(parsed_query, filters)
         
+        # Serve identical queries from the result cache
+        cache_key = None
+        if query_cache:
+            cache_key = query_cache.make_key('search_protests', {
+                'query': normalize_parsed_query(parsed_query),
+                'args': normalize_request_args(request.args, exclude=('q', 'page', 'limit')),
+                'page': page,
+                'limit': limit
+            })
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                # Echo this request's raw query string, not the one that filled the cache
+                search_info = dict(cached['data']['search_info'], query=query)
+                return jsonify(dict(cached, data=dict(cached['data'], search_info=search_info))), 200
+            cache_generation = query_cache.get_generation()
+        
         # Add additional filters
         
         # Date range filtering
@@ -620,11 +690,27 @@ def search_protests():
         # Get total count
         total_count = protest_model.count(filters)
         
+        # Facet counts don't depend on page or sort order, so common queries share them
+        facets = None
+        if request.args.get('facets', 'true').lower() == 'true':
+            if query_cache:
+                facets = query_cache.get_or_compute(
+                    'search_facets',
+                    {
+                        'query': normalize_parsed_query(parsed_query),
+                        'args': normalize_request_args(
+                            request.args, exclude=('q', 'page', 'limit', 'sort', 'order', 'facets')
+                        )
+                    },
+                    lambda: compute_search_facets(filters)
+                )
+            else:
+                facets = compute_search_facets(filters)
+        
         # Format results
         formatted_results = []
         for protest in protests:
-            if query:
-                parsed_query = parse_search_query(query)
+            if parsed_query:
                 relevance = calculate_relevance_score(protest, parsed_query)
             else:
                 relevance = protest.get('trending_score', 0)
@@ -636,7 +722,7 @@ def search_protests():
         # Pagination info
         total_pages = (total_count + limit - 1) // limit
         
-        return jsonify({
+        response_data = {
             'success': True,
             'message': f'Found {total_count} protests',
             'data': {
@@ -649,6 +735,7 @@ def search_protests():
                     'has_next': page < total_pages,
                     'has_prev': page > 1
                 },
+                'facets': facets,
                 'search_info': {
                     'query': query,
                     'filters_applied': {
@@ -673,7 +760,12 @@ def search_protests():
                     }
                 }
             }
-        }), 200
+        }
+        
+        if cache_key:
+            query_cache.set(cache_key, response_data, generation=cache_generation)
+        
+        return jsonify(response_data), 200
         
     except Exception as e:
         logger.error(f"Protest search error: {e}")
@@ -1084,7 +1176,15 @@ def get_trending_searches():
 def get_popular_categories():
     """Get popular search categories and their frequency"""
     try:
+        if query_cache:
+            cache_key = query_cache.make_key('popular_categories', 'all')
+            cached = query_cache.get(cache_key)
+            if cached is not None:
+                return jsonify(cached), 200
+            cache_generation = query_cache.get_generation()
+        
         # Get category statistics from protests
+        category_aggregation_ok = True
         try:
             category_pipeline = [
                 {'$match': {'visibility': 'public'}},
@@ -1120,6 +1220,7 @@ def get_popular_categories():
                 
         except Exception as e:
             logger.warning(f"Category aggregation failed: {e}")
+            category_aggregation_ok = False
             # Fallback to static data
             popular_categories = [
                 {'category': 'Human Rights', 'protest_count': 45, 'avg_quality_score': 0.75},
@@ -1129,14 +1230,20 @@ def get_popular_categories():
                 {'category': 'Social Justice', 'protest_count': 26, 'avg_quality_score': 0.77}
             ]
         
-        return jsonify({
+        response_data = {
             'success': True,
             'message': f'Retrieved {len(popular_categories)} popular categories',
             'data': {
                 'popular_categories': popular_categories,
                 'generated_at': datetime.utcnow().isoformat()
             }
-        }), 200
+        }
+        
+        # Don't cache the static fallback
+        if query_cache and category_aggregation_ok:
+            query_cache.set(cache_key, response_data, ttl=300, generation=cache_generation)
+        
+        return jsonify(response_data), 200
         
     except Exception as e:
         logger.error(f"Get popular categories error: {e}")
@@ -1281,7 +1388,9 @@ def search_health_check():
                 'filter_types_supported': [
                     'date_range', 'categories', 'countries', 'verification_status',
                     'quality_score', 'bounding_box', 'radius_search'
-                ]
+                ],
+                'facets_supported': ['categories', 'statuses', 'verification_statuses', 'countries'],
+                'query_cache': query_cache.get_stats() if query_cache else None
             }
         }), 200
         
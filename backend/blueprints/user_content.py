@@ -88,11 +88,28 @@ users_model = Users()
 protest_model = Protest()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Denormalized per-user statistics; writers wait for it rather than drop an increment
+try:
+    from services.user_stats import get_user_stats_service as build_user_stats_service
+except ImportError as e:
+    logger.warning(f"User statistics service unavailable: {e}")
+    build_user_stats_service = None
+get_user_stats_service = lazy_service('User statistics service', build_user_stats_service, blocking=True)
+
 
 # =====================================================
 # UTILITY FUNCTIONS
 # =====================================================
 
+def record_user_statistics(user_id, at=None, active=True, **increments):
+    """Apply atomic deltas to a user's statistics (reconciliation repairs any missed update)"""
+    user_stats_service = get_user_stats_service()
+    if user_stats_service is not None:
+        user_stats_service.record(user_id, at=at, active=active, **increments)
+
 def validate_content_data(data, content_type='report'):
     """Validate user content data"""
     errors = []
@@ -367,10 +384,7 @@ def submit_protest_report():
         report_id = user_reports_model.create(report_data)
         
         # Update user statistics
-        users_model.update_by_id(ObjectId(user_id), {
-            'statistics.reports_submitted': user.get('statistics', {}).get('reports_submitted', 0) + 1,
-            'statistics.last_active': datetime.utcnow()
-        })
+        record_user_statistics(user_id, at=report_data['created_at'], reports_submitted=1)
         
         # Format response
         created_report = user_reports_model.find_one({'_id': report_id})
@@ -715,12 +729,7 @@ def delete_user_report(report_id):
             }), 500
         
         # Update user statistics
-        user = users_model.find_one({'_id': ObjectId(user_id)})
-        if user:
-            current_count = user.get('statistics', {}).get('reports_submitted', 0)
-            users_model.update_by_id(ObjectId(user_id), {
-                'statistics.reports_submitted': max(0, current_count - 1)
-            })
+        record_user_statistics(user_id, at=report.get('created_at'), active=False, reports_submitted=-1)
         
         logger.info(f"Report deleted by user {request.current_user['username']}: {report_id}")
         
@@ -829,12 +838,7 @@ def create_user_post():
         post_id = posts_model.create(post_data)
         
         # Update user statistics
-        user = users_model.find_one({'_id': ObjectId(user_id)})
-        if user:
-            users_model.update_by_id(ObjectId(user_id), {
-                'statistics.posts_created': user.get('statistics', {}).get('posts_created', 0) + 1,
-                'statistics.last_active': datetime.utcnow()
-            })
+        record_user_statistics(user_id, at=post_data['created_at'], posts_created=1)
         
         # Format response
         created_post = posts_model.find_one({'_id': post_id})
@@ -1175,14 +1179,8 @@ def delete_user_post(post_id):
                 'message': 'Failed to delete post from database'
             }), 500
         
-        # Update user statistics if user deleted their own post
-        if str(post['user_id']) == str(user_id):
-            user = users_model.find_one({'_id': ObjectId(user_id)})
-            if user:
-                current_count = user.get('statistics', {}).get('posts_created', 0)
-                users_model.update_by_id(ObjectId(user_id), {
-                    'statistics.posts_created': max(0, current_count - 1)
-                })
+        # Update the author's statistics (moderator deletions count against the author too)
+        record_user_statistics(post['user_id'], at=post.get('created_at'), active=False, posts_created=-1)
         
         logger.info(f"Post deleted by user {request.current_user['username']}: {post_id}")
         
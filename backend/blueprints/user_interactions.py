@@ -74,7 +74,9 @@ except ImportError as e:
         def __init__(self): pass
         def find_one(self, query): return None
         def find_many(self, query, **kwargs): return []
+        def find_by_ids(self, ids, projection=None, chunk_size=1000): return {}
         def update_by_id(self, id, data): return True
+        def update_engagement_metrics(self, protest_id, metric, increment=1): pass
     
     class ErrorLog:
         def __init__(self): pass
@@ -87,6 +89,34 @@ users_model = Users()
 protest_model = Protest()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Buffered engagement counters
+try:
+    from services.engagement_buffer import get_engagement_buffer as build_engagement_buffer
+except ImportError as e:
+    logger.warning(f"Engagement buffer unavailable: {e}")
+    build_engagement_buffer = None
+get_engagement_buffer = lazy_service('Engagement buffer', build_engagement_buffer)
+
+# Cached per-user sets of bookmarked and followed protests; mutations wait for
+# it rather than skip publishing a change
+try:
+    from services.interaction_cache import get_interaction_cache as build_interaction_cache
+except ImportError as e:
+    logger.warning(f"Interaction cache unavailable: {e}")
+    build_interaction_cache = None
+get_interaction_cache = lazy_service('Interaction cache', build_interaction_cache, blocking=True)
+
+# Denormalized per-user statistics; writers wait for it rather than drop an increment
+try:
+    from services.user_stats import get_user_stats_service as build_user_stats_service
+except ImportError as e:
+    logger.warning(f"User statistics service unavailable: {e}")
+    build_user_stats_service = None
+get_user_stats_service = lazy_service('User statistics service', build_user_stats_service, blocking=True)
+
 
 # =====================================================
 # UTILITY FUNCTIONS
@@ -160,6 +190,24 @@ def format_follow(follow, include_protest_details=True):
         logger.error(f"Error formatting follow: {e}")
         return None
 
+# Protest fields shown alongside bookmarks and follows
+PROTEST_SUMMARY_PROJECTION = {
+    'title': 1, 'location_description': 1, 'categories': 1, 'status': 1,
+    'start_date': 1, 'verification_status': 1, 'updated_at': 1
+}
+
+def attach_protest_details(items):
+    """Add protest_details to bookmarks or follows with one batched protest query"""
+    protests = protest_model.find_by_ids(
+        [item['protest_id'] for item in items],
+        projection=PROTEST_SUMMARY_PROJECTION
+    )
+    for item in items:
+        protest = protests.get(item['protest_id'])
+        if protest:
+            item['protest_details'] = protest
+    return items
+
 def validate_protest_exists(protest_id):
     """Validate that a protest exists and is accessible"""
     try:
@@ -180,6 +228,59 @@ def validate_protest_exists(protest_id):
         logger.error(f"Error validating protest: {e}")
         return False, 'Error validating protest'
 
+def record_engagement(protest_id, metric, amount=1):
+    """Record a protest engagement counter change (buffered when available)"""
+    engagement_buffer = get_engagement_buffer()
+    if engagement_buffer:
+        engagement_buffer.increment(protest_id, metric, amount)
+    else:
+        protest_model.update_engagement_metrics(ObjectId(protest_id), metric, amount)
+
+def record_interaction(user_id, kind, protest_ids, added, created_at=None, count=None):
+    """Keep the user's cached interaction set and statistics in step with a bookmark or follow change"""
+    user_stats_service = get_user_stats_service()
+    if user_stats_service is not None:
+        changed = count if count is not None else len(protest_ids)
+        user_stats_service.record(user_id, active=added, **{kind: changed if added else -changed})
+    
+    interaction_cache = get_interaction_cache()
+    if interaction_cache is not None:
+        try:
+            interaction_cache.record(user_id, kind, protest_ids, added, created_at)
+        except Exception as e:
+            logger.warning(f"Failed to update interaction cache: {e}")
+            interaction_cache.invalidate(user_id)
+
+def get_interaction_statuses(user_id, protest_ids):
+    """Bookmark/follow status per protest ID string, from the cached set when available"""
+    interaction_cache = get_interaction_cache()
+    if interaction_cache is not None:
+        try:
+            return interaction_cache.get_status(user_id, protest_ids)
+        except Exception as e:
+            logger.warning(f"Interaction cache lookup failed: {e}")
+    
+    object_ids = [ObjectId(protest_id) for protest_id in protest_ids]
+    bookmarks = {str(b['protest_id']): b for b in bookmarks_model.find_many({
+        'user_id': ObjectId(user_id),
+        'protest_id': {'$in': object_ids}
+    })}
+    follows = {str(f['protest_id']): f for f in follows_model.find_many({
+        'user_id': ObjectId(user_id),
+        'protest_id': {'$in': object_ids},
+        'active': True
+    })}
+    
+    return {
+        protest_id: {
+            'is_bookmarked': protest_id in bookmarks,
+            'is_following': protest_id in follows,
+            'bookmark_created_at': bookmarks[protest_id].get('created_at').isoformat() if protest_id in bookmarks else None,
+            'follow_created_at': follows[protest_id].get('created_at').isoformat() if protest_id in follows else None
+        }
+        for protest_id in protest_ids
+    }
+
 
 # =====================================================
 # BOOKMARK ENDPOINTS
@@ -240,11 +341,10 @@ def bookmark_protest():
         }
         
         bookmark_id = bookmarks_model.create(bookmark_data)
+        record_interaction(user_id, 'bookmarks', [protest_id], True, bookmark_data['created_at'])
         
         try:
-            protest_model.update_by_id(ObjectId(protest_id), {
-                '$inc': {'engagement_metrics.bookmarks': 1}
-            })
+            record_engagement(ObjectId(protest_id), 'bookmarks', 1)
         except Exception as e:
             logger.warning(f"Failed to update protest engagement metrics: {e}")
         
@@ -304,33 +404,14 @@ def get_user_bookmarks():
         if request.args.get('favorites_only') == 'true':
             filters['is_favorite'] = True
         
-        # Get bookmarks with protest details using aggregation
-        pipeline = [
-            {'$match': filters},
-            {
-                '$lookup': {
-                    'from': 'protests',
-                    'localField': 'protest_id',
-                    'foreignField': '_id',
-                    'as': 'protest_details'
-                }
-            },
-            {'$unwind': '$protest_details'},
-            {'$sort': {'created_at': -1}},
-            {'$skip': offset},
-            {'$limit': limit}
-        ]
-        
-        try:
-            bookmarks = list(bookmarks_model.collection.aggregate(pipeline))
-        except Exception:
-            # Fallback: get bookmarks without protest details
-            bookmarks = list(bookmarks_model.find_many(
-                filters,
-                sort=[('created_at', -1)],
-                limit=limit,
-                skip=offset
-            ))
+        # Get the page of bookmarks, then their protests in one batched query
+        # (protests live in the data collection database, so $lookup cannot join them)
+        bookmarks = attach_protest_details(list(bookmarks_model.find_many(
+            filters,
+            sort=[('created_at', -1)],
+            limit=limit,
+            skip=offset
+        )))
         
         # Get total count
         total_count = bookmarks_model.count(filters)
@@ -415,11 +496,11 @@ def remove_bookmark(protest_id):
                 'message': 'Failed to remove bookmark'
             }), 500
         
+        record_interaction(user_id, 'bookmarks', [protest_id], False)
+        
         # Update protest engagement metrics
         try:
-            protest_model.update_by_id(ObjectId(protest_id), {
-                '$inc': {'engagement_metrics.bookmarks': -1}
-            })
+            record_engagement(ObjectId(protest_id), 'bookmarks', -1)
         except Exception as e:
             logger.warning(f"Failed to update protest engagement metrics: {e}")
         
@@ -589,12 +670,11 @@ def follow_protest():
         }
         
         follow_id = follows_model.create(follow_data)
+        record_interaction(user_id, 'follows', [protest_id], True, follow_data['created_at'])
         
         # Update protest engagement metrics
         try:
-            protest_model.update_by_id(ObjectId(protest_id), {
-                '$inc': {'engagement_metrics.followers': 1}
-            })
+            record_engagement(ObjectId(protest_id), 'followers', 1)
         except Exception as e:
             logger.warning(f"Failed to update protest engagement metrics: {e}")
         
@@ -654,33 +734,13 @@ def get_user_follows():
         elif request.args.get('notifications_enabled') == 'false':
             filters['notification_enabled'] = False
         
-        # Get follows with protest details using aggregation
-        pipeline = [
-            {'$match': filters},
-            {
-                '$lookup': {
-                    'from': 'protests',
-                    'localField': 'protest_id',
-                    'foreignField': '_id',
-                    'as': 'protest_details'
-                }
-            },
-            {'$unwind': '$protest_details'},
-            {'$sort': {'created_at': -1}},
-            {'$skip': offset},
-            {'$limit': limit}
-        ]
-        
-        try:
-            follows = list(follows_model.collection.aggregate(pipeline))
-        except Exception:
-            # Fallback: get follows without protest details
-            follows = list(follows_model.find_many(
-                filters,
-                sort=[('created_at', -1)],
-                limit=limit,
-                skip=offset
-            ))
+        # Get the page of follows, then their protests in one batched query
+        follows = attach_protest_details(list(follows_model.find_many(
+            filters,
+            sort=[('created_at', -1)],
+            limit=limit,
+            skip=offset
+        )))
         
         # Get total count
         total_count = follows_model.count(filters)
@@ -765,11 +825,11 @@ def unfollow_protest(protest_id):
                 'message': 'Failed to unfollow protest'
             }), 500
         
+        record_interaction(user_id, 'follows', [protest_id], False)
+        
         # Update protest engagement metrics
         try:
-            protest_model.update_by_id(ObjectId(protest_id), {
-                '$inc': {'engagement_metrics.followers': -1}
-            })
+            record_engagement(ObjectId(protest_id), 'followers', -1)
         except Exception as e:
             logger.warning(f"Failed to update protest engagement metrics: {e}")
         
@@ -894,26 +954,28 @@ def get_interaction_status(protest_id):
         
         user_id = request.current_user['id']
         
-        # Check bookmark status
+        # Bookmark and follow status from the user's interaction set
+        status = get_interaction_statuses(user_id, [protest_id])[protest_id]
+        
+        # Full records are only read for interactions that exist
         bookmark = bookmarks_model.find_one({
             'user_id': ObjectId(user_id),
             'protest_id': ObjectId(protest_id)
-        })
+        }) if status['is_bookmarked'] else None
         
-        # Check follow status
         follow = follows_model.find_one({
             'user_id': ObjectId(user_id),
             'protest_id': ObjectId(protest_id),
             'active': True
-        })
+        }) if status['is_following'] else None
         
         # Get protest details for context
         protest = protest_model.find_one({'_id': ObjectId(protest_id)})
         
         interaction_status = {
             'protest_id': protest_id,
-            'is_bookmarked': bookmark is not None,
-            'is_following': follow is not None,
+            'is_bookmarked': status['is_bookmarked'],
+            'is_following': status['is_following'],
             'bookmark_details': format_bookmark(bookmark) if bookmark else None,
             'follow_details': format_follow(follow) if follow else None,
             'protest_engagement': {
@@ -956,10 +1018,10 @@ def get_bulk_interaction_status():
         protest_ids = data['protest_ids']
         
         # Validate protest IDs
-        valid_ids = []
-        for protest_id in protest_ids:
-            if ObjectId.is_valid(protest_id):
-                valid_ids.append(ObjectId(protest_id))
+        valid_ids = list(dict.fromkeys(
+            protest_id for protest_id in protest_ids
+            if isinstance(protest_id, str) and ObjectId.is_valid(protest_id)
+        ))
         
         if not valid_ids:
             return jsonify({
@@ -968,33 +1030,8 @@ def get_bulk_interaction_status():
                 'message': 'No valid protest IDs were provided'
             }), 400
         
-        # Get bookmarks for these protests
-        bookmarks = list(bookmarks_model.find_many({
-            'user_id': ObjectId(user_id),
-            'protest_id': {'$in': valid_ids}
-        }))
-        
-        # Get follows for these protests
-        follows = list(follows_model.find_many({
-            'user_id': ObjectId(user_id),
-            'protest_id': {'$in': valid_ids},
-            'active': True
-        }))
-        
-        # Create lookup dictionaries
-        bookmark_lookup = {str(b['protest_id']): b for b in bookmarks}
-        follow_lookup = {str(f['protest_id']): f for f in follows}
-        
-        # Build response
-        interaction_statuses = {}
-        for protest_id in protest_ids:
-            if ObjectId.is_valid(protest_id):
-                interaction_statuses[protest_id] = {
-                    'is_bookmarked': protest_id in bookmark_lookup,
-                    'is_following': protest_id in follow_lookup,
-                    'bookmark_created_at': bookmark_lookup[protest_id].get('created_at').isoformat() if protest_id in bookmark_lookup else None,
-                    'follow_created_at': follow_lookup[protest_id].get('created_at').isoformat() if protest_id in follow_lookup else None
-                }
+        # One cached set lookup regardless of how many protest cards are shown
+        interaction_statuses = get_interaction_statuses(user_id, valid_ids)
         
         return jsonify({
             'success': True,
@@ -1003,8 +1040,8 @@ def get_bulk_interaction_status():
                 'interaction_statuses': interaction_statuses,
                 'summary': {
                     'total_requested': len(protest_ids),
-                    'total_bookmarked': len(bookmarks),
-                    'total_following': len(follows)
+                    'total_bookmarked': sum(1 for status in interaction_statuses.values() if status['is_bookmarked']),
+                    'total_following': sum(1 for status in interaction_statuses.values() if status['is_following'])
                 }
             }
         }), 200
@@ -1270,13 +1307,12 @@ def bulk_remove_bookmarks():
             'user_id': ObjectId(user_id),
             'protest_id': {'$in': valid_ids}
         })
+        record_interaction(user_id, 'bookmarks', valid_ids, False, count=result)
         
         # Update protest engagement metrics for each removed bookmark
         for protest_id in valid_ids:
             try:
-                protest_model.update_by_id(protest_id, {
-                    '$inc': {'engagement_metrics.bookmarks': -1}
-                })
+                record_engagement(protest_id, 'bookmarks', -1)
             except Exception as e:
                 logger.warning(f"Failed to update engagement metrics for {protest_id}: {e}")
         
@@ -1471,6 +1507,7 @@ def user_interactions_health_check():
         # Test database connectivity
         bookmarks_count = bookmarks_model.count()
         follows_count = follows_model.count()
+        interaction_cache = get_interaction_cache()
         
         return jsonify({
             'success': True,
@@ -1495,7 +1532,8 @@ def user_interactions_health_check():
                     'basic_engagement_metrics': True,
                     'simple_recommendations': True,
                     'tag_based_organization': True
-                }
+                },
+                'interaction_cache': interaction_cache.get_stats() if interaction_cache is not None else None
             }
         }), 200
         
@@ -23,7 +23,9 @@ logger = logging.getLogger(__name__)
 
 # Import auth decorator
 try:
-    from blueprints.auth import auth_required, validate_password, hash_password, verify_password
+    from blueprints.auth import (auth_required, validate_password, hash_password, verify_password,
+                                 invalidate_user_auth_cache, revoke_user_sessions,
+                                 PasswordHasherBusy, password_hashing_busy_response)
 except ImportError:
     # Mock for development
     def auth_required(allowed_roles=None):
@@ -47,6 +49,18 @@ except ImportError:
     
     def verify_password(password, hashed):
         return hashed == "hashed_" + password
+    
+    def invalidate_user_auth_cache(user_id, keep_token=None):
+        pass
+    
+    def revoke_user_sessions(user_id, except_token=None, reason=None):
+        return 0
+    
+    class PasswordHasherBusy(Exception):
+        pass
+    
+    def password_hashing_busy_response():
+        return jsonify({'success': False, 'error': 'Service busy'}), 503
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -96,11 +110,32 @@ user_reports_model = UserReports()
 posts_model = Posts()
 error_log_model = ErrorLog()
 
+# Services that need the database are built on first use, not at import
+from services.lazy_service import lazy_service
+
+# Denormalized per-user statistics
+try:
+    from services.user_stats import get_user_stats_service as build_user_stats_service
+except ImportError as e:
+    logger.warning(f"User statistics service unavailable: {e}")
+    build_user_stats_service = None
+get_user_stats_service = lazy_service('User statistics service', build_user_stats_service, blocking=True)
+
 
 # =====================================================
 # UTILITY FUNCTIONS
 # =====================================================
 
+def sum_recent_statistics(stats, days):
+    """Sum a user's daily statistics buckets (keyed YYYY-MM-DD, UTC) over the last `days` days"""
+    since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+    totals = {'reports': 0, 'posts': 0, 'logins': 0}
+    for day, counts in (stats.get('daily') or {}).items():
+        if day >= since:
+            for field in totals:
+                totals[field] += counts.get(field, 0)
+    return {field: max(0, count) for field, count in totals.items()}
+
 def format_user_profile(user, include_private=False, include_statistics=False):
     """Format user profile data for API response"""
     try:
@@ -135,12 +170,14 @@ def format_user_profile(user, include_private=False, include_statistics=False):
         
         # Include statistics if requested
         if include_statistics:
-            stats = user.get('statistics', {})
+            stats = user.get('statistics') or {}
             profile['statistics'] = {
-                'login_count': stats.get('login_count', 0),
-                'reports_submitted': stats.get('reports_submitted', 0),
-                'reports_verified': stats.get('reports_verified', 0),
-                'posts_created': stats.get('posts_created', 0),
+                'login_count': max(0, stats.get('login_count', 0)),
+                'reports_submitted': max(0, stats.get('reports_submitted', 0)),
+                'reports_verified': max(0, stats.get('reports_verified', 0)),
+                'posts_created': max(0, stats.get('posts_created', 0)),
+                'bookmarks': max(0, stats.get('bookmarks', 0)),
+                'follows': max(0, stats.get('follows', 0)),
                 'last_active': stats.get('last_active').isoformat() if stats.get('last_active') else None
             }
         
@@ -626,6 +663,10 @@ def change_password():
                 'message': 'Failed to update password in database'
             }), 500
         
+        # Cached tokens and principal predate the new password
+        current_token = request.headers.get('Authorization', '').replace('Bearer ', '', 1) or None
+        invalidate_user_auth_cache(user_id, keep_token=current_token)
+        
         logger.info(f"Password changed for user: {request.current_user['username']}")
         
         return jsonify({
@@ -633,6 +674,10 @@ def change_password():
             'message': 'Password changed successfully'
         }), 200
         
+    except PasswordHasherBusy:
+        logger.warning("Password change rejected: password hashing queue full")
+        return password_hashing_busy_response()
+        
     except Exception as e:
         logger.error(f"Change password error: {e}")
         error_log_model.log_error(
@@ -677,11 +722,10 @@ def get_user_activity():
             'created_at': {'$gte': start_date}
         }, sort=[('created_at', -1)], limit=10))
         
-        # Get activity counts
-        total_reports = user_reports_model.count({'user_id': ObjectId(user_id)})
-        total_posts = posts_model.count({'user_id': ObjectId(user_id)})
-        recent_reports = len(user_reports)
-        recent_posts = len(user_posts)
+        # Activity counts come from the user's denormalized statistics
+        user = users_model.find_one({'_id': ObjectId(user_id)}) or {}
+        stats = user.get('statistics') or {}
+        recent_counts = sum_recent_statistics(stats, days)
         
         # Get login sessions
         recent_sessions = list(user_sessions_model.find_many({
@@ -692,11 +736,13 @@ def get_user_activity():
         # Format activity data
         activity = {
             'summary': {
-                'total_reports': total_reports,
-                'total_posts': total_posts,
-                'recent_reports': recent_reports,
-                'recent_posts': recent_posts,
-                'recent_logins': len(recent_sessions),
+                'total_reports': max(0, stats.get('reports_submitted', 0)),
+                'total_posts': max(0, stats.get('posts_created', 0)),
+                'total_bookmarks': max(0, stats.get('bookmarks', 0)),
+                'total_follows': max(0, stats.get('follows', 0)),
+                'recent_reports': recent_counts['reports'],
+                'recent_posts': recent_counts['posts'],
+                'recent_logins': recent_counts['logins'],
                 'time_period_days': days
             },
             'recent_reports': [
@@ -799,10 +845,10 @@ def delete_user_account():
             }), 500
         
         # Deactivate all sessions
-        user_sessions_model.update_many(
-            {'user_id': ObjectId(user_id)},
-            {'active': False, 'logged_out_at': datetime.utcnow()}
-        )
+        revoke_user_sessions(user_id, reason='account_deleted')
+        
+        # The cached principal still says active
+        invalidate_user_auth_cache(user_id)
         
         logger.info(f"Account deleted for user: {request.current_user['username']}")
         
@@ -814,6 +860,10 @@ def delete_user_account():
             }
         }), 200
         
+    except PasswordHasherBusy:
+        logger.warning("Account deletion rejected: password hashing queue full")
+        return password_hashing_busy_response()
+        
     except Exception as e:
         logger.error(f"Delete user account error: {e}")
         error_log_model.log_error(
@@ -1003,7 +1053,9 @@ def get_user_statistics():
                 'message': 'Your user account could not be found'
             }), 404
         
-        # Calculate statistics
+        # Calculate statistics from the user's denormalized counters
+        stats = user.get('statistics') or {}
+        recent_counts = sum_recent_statistics(stats, 30)
         statistics = {
             'account_info': {
                 'member_since': user.get('created_at').isoformat() if user.get('created_at') else None,
@@ -1013,11 +1065,13 @@ def get_user_statistics():
                 'status': user.get('status', 'active')
             },
             'activity_stats': {
-                'total_logins': user.get('statistics', {}).get('login_count', 0),
+                'total_logins': max(0, stats.get('login_count', 0)),
                 'last_login': user.get('last_login').isoformat() if user.get('last_login') else None,
-                'total_reports': user.get('statistics', {}).get('reports_submitted', 0),
-                'verified_reports': user.get('statistics', {}).get('reports_verified', 0),
-                'total_posts': user.get('statistics', {}).get('posts_created', 0)
+                'total_reports': max(0, stats.get('reports_submitted', 0)),
+                'verified_reports': max(0, stats.get('reports_verified', 0)),
+                'total_posts': max(0, stats.get('posts_created', 0)),
+                'total_bookmarks': max(0, stats.get('bookmarks', 0)),
+                'total_follows': max(0, stats.get('follows', 0))
             },
             'engagement': {
                 'reports_verification_rate': 0,
@@ -1025,18 +1079,9 @@ def get_user_statistics():
                 'community_contribution_score': 0
             },
             'recent_activity': {
-                'reports_last_30_days': user_reports_model.count({
-                    'user_id': ObjectId(user_id),
-                    'created_at': {'$gte': datetime.utcnow() - timedelta(days=30)}
-                }),
-                'posts_last_30_days': posts_model.count({
-                    'user_id': ObjectId(user_id),
-                    'created_at': {'$gte': datetime.utcnow() - timedelta(days=30)}
-                }),
-                'logins_last_30_days': user_sessions_model.count({
-                    'user_id': ObjectId(user_id),
-                    'created_at': {'$gte': datetime.utcnow() - timedelta(days=30)}
-                })
+                'reports_last_30_days': recent_counts['reports'],
+                'posts_last_30_days': recent_counts['posts'],
+                'logins_last_30_days': recent_counts['logins']
             }
         }
         
@@ -1152,6 +1197,7 @@ def user_profile_health_check():
     try:
         # Test database connectivity
         test_count = users_model.count()
+        user_stats_service = get_user_stats_service()
         
         return jsonify({
             'success': True,
@@ -1170,6 +1216,7 @@ def user_profile_health_check():
                     'statistics': True,
                     'account_deletion': True
                 },
+                'user_statistics': user_stats_service.get_stats() if user_stats_service is not None else None,
                 'simplified_features': {
                     'email_verification_disabled': True,
                     'password_reset_disabled': True,
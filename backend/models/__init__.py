@@ -37,7 +37,10 @@ from .data_collection_models import (
     RawProtestData, 
     Protest,
     ScrapingJob,
-    ProtestAnalytics
+    ProtestAnalytics,
+    ProtestMapTile,
+    ProtestAnalyticsRollup,
+    ProtestCategoryCooccurrence
 )
 
 # Data Processing Models
@@ -85,6 +88,7 @@ from .web_app_models import (
     UserAnalytics,
     NotificationQueue,
     NotificationHistory,
+    NotificationCounter,
     ExportRequest,
     FeatureFlag,
     SystemHealth
@@ -92,7 +96,8 @@ from .web_app_models import (
 
 # Model categories for easy reference
 DATA_COLLECTION_MODELS = [
-    'DataSource', 'RawProtestData', 'Protest', 'ScrapingJob', 'ProtestAnalytics',
+    'DataSource', 'RawProtestData', 'Protest', 'ScrapingJob', 'ProtestAnalytics', 'ProtestMapTile',
+    'ProtestAnalyticsRollup', 'ProtestCategoryCooccurrence',
     'ProcessingRule', 'ProcessingQueue', 'ProcessingResult', 'DataValidationRule', 'DataLineage',
     'ApiRateLimit', 'ServiceHealth', 'CollectionMetrics',
     'ServiceConfig', 'GeocodingCache', 'CategoryMapping',
@@ -102,7 +107,7 @@ DATA_COLLECTION_MODELS = [
 WEB_APP_MODELS = [
     'UserType', 'User', 'UserBookmark', 'UserFollow', 'UserReport', 'Post',
     'ContentFlag', 'ModerationQueue', 'UserAlert', 'UserSession', 'SystemSettings',
-    'UserAnalytics', 'NotificationQueue', 'NotificationHistory', 'ExportRequest',
+    'UserAnalytics', 'NotificationQueue', 'NotificationHistory', 'NotificationCounter', 'ExportRequest',
     'FeatureFlag', 'SystemHealth'
 ]
 
@@ -131,7 +136,8 @@ __all__ = [
     'DatabaseManager', 'BaseModel',
     
     # Data Collection Models
-    'DataSource', 'RawProtestData', 'Protest', 'ScrapingJob', 'ProtestAnalytics',
+    'DataSource', 'RawProtestData', 'Protest', 'ScrapingJob', 'ProtestAnalytics', 'ProtestMapTile',
+    'ProtestAnalyticsRollup', 'ProtestCategoryCooccurrence',
     'ProcessingRule', 'ProcessingQueue', 'ProcessingResult', 'DataValidationRule', 'DataLineage',
     'ApiRateLimit', 'ServiceHealth', 'CollectionMetrics',
     'ServiceConfig', 'GeocodingCache', 'CategoryMapping',
@@ -140,7 +146,7 @@ __all__ = [
     # Web App Models  
     'UserType', 'User', 'UserBookmark', 'UserFollow', 'UserReport', 'Post',
     'ContentFlag', 'ModerationQueue', 'UserAlert', 'UserSession', 'SystemSettings',
-    'UserAnalytics', 'NotificationQueue', 'NotificationHistory', 'ExportRequest',
+    'UserAnalytics', 'NotificationQueue', 'NotificationHistory', 'NotificationCounter', 'ExportRequest',
     'FeatureFlag', 'SystemHealth',
     
     # Utility functions
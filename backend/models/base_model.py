@@ -76,11 +76,12 @@ class BaseModel(ABC):
             logging.error(f"Error finding one {self.collection_name}: {e}")
             return None
 
-    def find_many(self, query: Dict = None, limit: int = 100, sort: List = None, skip: int = 0) -> List[Dict]:
+    def find_many(self, query: Dict = None, limit: int = 100, sort: List = None, skip: int = 0,
+                  projection: Dict = None) -> List[Dict]:
         """Find multiple documents with pagination"""
         try:
             query = query or {}
-            cursor = self.collection.find(query)  # Find documents
+            cursor = self.collection.find(query, projection)  # Find documents
 
             if sort:
                 cursor = cursor.sort(sort)  # Apply sorting
@@ -94,6 +95,32 @@ class BaseModel(ABC):
             logging.error(f"Error finding {self.collection_name}: {e}")
             return []
     
+    def find_by_ids(self, ids: List[Union[ObjectId, str]], projection: Dict = None,
+                    chunk_size: int = 1000) -> Dict[ObjectId, Dict]:
+        """Batch-fetch documents by ID with chunked $in queries, keyed by _id (invalid IDs are skipped)"""
+        valid_ids = []
+        for doc_id in ids:
+            if isinstance(doc_id, str):
+                if not ObjectId.is_valid(doc_id):
+                    logging.warning(f"Skipping invalid {self.collection_name} ID: {doc_id!r}")
+                    continue
+                doc_id = ObjectId(doc_id)
+            if doc_id is not None:
+                valid_ids.append(doc_id)
+        unique_ids = list(dict.fromkeys(valid_ids))
+
+        try:
+            found = {}
+            for start in range(0, len(unique_ids), chunk_size):
+                chunk = unique_ids[start:start + chunk_size]
+                for doc in self.collection.find({'_id': {'$in': chunk}}, projection):
+                    found[doc['_id']] = doc
+            return found
+
+        except Exception as e:
+            logging.error(f"Error finding {self.collection_name} by IDs: {e}")
+            return {}
+
     def update_by_id(self, doc_id: Union[ObjectId, str], update_data: Dict, use_set: bool = True) -> bool:
         """Update document by ID"""
         try:
@@ -1,8 +1,9 @@
 from .base_model import BaseModel
 from .database import DatabaseManager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
 import hashlib
 
 class DataSource(BaseModel):
@@ -177,6 +178,9 @@ class RawProtestData(BaseModel):
 class Protest(BaseModel):
     """Enhanced model for processed protest data"""
     
+    # Statuses left out of nearby searches
+    INACTIVE_STATUSES = ['cancelled', 'completed', 'archived']
+    
     def __init__(self):
         super().__init__(DatabaseManager(), 'protests')
     
@@ -242,9 +246,11 @@ class Protest(BaseModel):
             sort=[("start_date", -1)]
         )
     
-    def search_by_location(self, longitude: float, latitude: float, radius_km: float = 50) -> List[Dict]:
-        """Search protests by geographic location"""
-        return list(self.collection.find({
+    def search_by_location(self, longitude: float, latitude: float, radius_km: float = 50,
+                           limit: int = 100, categories: List[str] = None,
+                           active_only: bool = False) -> List[Dict]:
+        """Search protests by geographic location, nearest first"""
+        query = {
             "location": {
                 "$near": {
                     "$geometry": {"type": "Point", "coordinates": [longitude, latitude]},
@@ -252,7 +258,13 @@ class Protest(BaseModel):
                 }
             },
             "visibility": "public"
-        }))
+        }
+        if categories:
+            query["categories"] = {"$in": categories}
+        if active_only:
+            query["status"] = {"$nin": self.INACTIVE_STATUSES}
+        
+        return list(self.collection.find(query).limit(limit))
     
     def search_by_text(self, query: str, limit: int = 50) -> List[Dict]:
         """Full text search across protests"""
@@ -274,12 +286,44 @@ class Protest(BaseModel):
     
     def update_engagement_metrics(self, protest_id: ObjectId, metric: str, increment: int = 1):
         """Update engagement metrics for a protest"""
+        # Stamp engagement_updated_at as the buffered path does, so incremental trending picks it up
+        now = datetime.now()
+        set_fields = {"engagement_updated_at": now}
+        if metric == 'views':
+            set_fields["last_viewed_at"] = now
+        
         update_operation = {
-            "$inc": {f"engagement_metrics.{metric}": increment}
+            "$inc": {f"engagement_metrics.{metric}": increment},
+            "$set": set_fields
         }
         
         self.collection.update_one({"_id": protest_id}, update_operation)
     
+    def bulk_increment_engagement(self, increments: Dict[ObjectId, Dict[str, int]]) -> int:
+        """Apply buffered engagement counter deltas in one unordered bulk write"""
+        if not increments:
+            return 0
+        
+        now = datetime.now()
+        operations = []
+        for protest_id, metrics in increments.items():
+            inc = {f"engagement_metrics.{metric}": amount for metric, amount in metrics.items() if amount}
+            if not inc:
+                continue
+            
+            # Leave updated_at alone so counters don't look like content edits
+            set_fields = {"engagement_updated_at": now}
+            if metrics.get('views'):
+                set_fields["last_viewed_at"] = now
+            
+            operations.append(UpdateOne({"_id": protest_id}, {"$inc": inc, "$set": set_fields}))
+        
+        if not operations:
+            return 0
+        
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
     def calculate_trending_score(self, protest_id: ObjectId) -> float:
         """Calculate and update trending score for a protest"""
         protest = self.find_by_id(protest_id)
@@ -290,7 +334,7 @@ class Protest(BaseModel):
         engagement = protest.get('engagement_metrics', {})
         views = engagement.get('views', 0)
         bookmarks = engagement.get('bookmarks', 0)
-        follows = engagement.get('follows', 0)
+        follows = engagement.get('followers', 0)
         
         # Time decay factor (more recent = higher score)
         start_date = protest.get('start_date', datetime.now())
@@ -479,4 +523,196 @@ class ProtestAnalytics(BaseModel):
             }
         ]
         
-        return self.aggregate(pipeline)
\ No newline at end of file
+        return self.aggregate(pipeline)
+
+class ProtestMapTile(BaseModel):
+    """Model for precomputed protest counts per map quadkey cell"""
+    
+    def __init__(self):
+        super().__init__(DatabaseManager(), 'protest_map_tiles')
+    
+    @property
+    def collection(self):
+        return self.db_manager.data_collection_db.protest_map_tiles
+    
+    def ensure_indexes(self):
+        """Create the zoom/quadkey prefix index used by tile lookups"""
+        self.collection.create_index([('zoom', 1), ('quadkey', 1)])
+    
+    def apply_deltas(self, deltas: Dict[str, List[float]]) -> int:
+        """Apply [count, lng_sum, lat_sum] deltas keyed by quadkey in one bulk write"""
+        if not deltas:
+            return 0
+        
+        now = datetime.now()
+        operations = [
+            UpdateOne(
+                {'_id': f"{len(quadkey)}:{quadkey}"},
+                {
+                    '$inc': {'count': delta[0], 'lng_sum': delta[1], 'lat_sum': delta[2]},
+                    '$set': {'updated_at': now},
+                    '$setOnInsert': {'zoom': len(quadkey), 'quadkey': quadkey}
+                },
+                upsert=True
+            )
+            for quadkey, delta in deltas.items()
+        ]
+        
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count + len(result.upserted_ids)
+    
+    def get_cells(self, zoom: int, prefix: str, limit: int = 1024) -> List[Dict]:
+        """Get non-empty cells at a zoom level under a quadkey prefix"""
+        return list(self.collection.find(
+            {
+                'zoom': zoom,
+                'quadkey': {'$regex': f'^{prefix}'},  # Anchored prefix uses the index
+                'count': {'$gt': 0}
+            },
+            {'quadkey': 1, 'count': 1, 'lng_sum': 1, 'lat_sum': 1}
+        ).limit(limit))
+    
+    def replace_all(self, cells: Dict[str, List[float]], batch_size: int = 5000) -> int:
+        """Replace every cell with freshly computed values (readers never see a partial set)"""
+        now = datetime.now()
+        build_id = ObjectId()
+        
+        batch = []
+        written = 0
+        for quadkey, (count, lng_sum, lat_sum) in cells.items():
+            cell_id = f"{len(quadkey)}:{quadkey}"
+            batch.append(ReplaceOne({'_id': cell_id}, {
+                '_id': cell_id,
+                'zoom': len(quadkey),
+                'quadkey': quadkey,
+                'count': count,
+                'lng_sum': lng_sum,
+                'lat_sum': lat_sum,
+                'build_id': build_id,
+                'updated_at': now
+            }, upsert=True))
+            if len(batch) >= batch_size:
+                self.collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        
+        if batch:
+            self.collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+        
+        # Drop cells this build did not write, keeping any an incremental update touched meanwhile
+        self.collection.delete_many({'build_id': {'$ne': build_id}, 'updated_at': {'$lt': now}})
+        return written
+
+
+class ProtestAnalyticsRollup(BaseModel):
+    """Model for materialized per-day protest analytics rollups"""
+    
+    def __init__(self):
+        super().__init__(DatabaseManager(), 'protest_analytics_rollups')
+    
+    @property
+    def collection(self):
+        return self.db_manager.data_collection_db.protest_analytics_rollups
+    
+    def ensure_indexes(self):
+        """Create the dimension/day index used by analytics reads and refreshes"""
+        self.collection.create_index([('dimension', 1), ('day', 1)])
+        self.collection.create_index([('day', 1), ('refreshed_at', 1)])
+    
+    def get_rows(self, dimension: str, start_day: str, end_day: str) -> List[Dict]:
+        """Get rollup rows for one dimension between two YYYY-MM-DD days (inclusive)"""
+        return list(self.collection.find(
+            {'dimension': dimension, 'day': {'$gte': start_day, '$lte': end_day}},
+            {'refreshed_at': 0}
+        ))
+    
+    def replace_rows(self, rows: List[Dict], batch_size: int = 5000) -> int:
+        """Upsert fully computed rows by _id"""
+        written = 0
+        for i in range(0, len(rows), batch_size):
+            operations = [ReplaceOne({'_id': row['_id']}, row, upsert=True) for row in rows[i:i + batch_size]]
+            result = self.collection.bulk_write(operations, ordered=False)
+            written += result.modified_count + len(result.upserted_ids)
+        return written
+    
+    def delete_stale(self, refreshed_before: datetime, days: List[str] = None) -> int:
+        """Delete rows not rewritten by the latest refresh, optionally only for some days"""
+        query = {'refreshed_at': {'$lt': refreshed_before}}
+        if days is not None:
+            query['day'] = {'$in': days}
+        return self.collection.delete_many(query).deleted_count
+
+
+class ProtestCategoryCooccurrence(BaseModel):
+    """Model for per-day category co-occurrence and category/country counts"""
+    
+    def __init__(self):
+        super().__init__(DatabaseManager(), 'protest_category_cooccurrence')
+    
+    @property
+    def collection(self):
+        return self.db_manager.data_collection_db.protest_category_cooccurrence
+    
+    def ensure_indexes(self):
+        """Create the updated_at index used by incremental in-memory syncs"""
+        self.collection.create_index([('updated_at', 1)])
+    
+    def apply_deltas(self, deltas: Dict[Tuple[str, str, str, str], int]) -> int:
+        """Apply count deltas keyed by (day, kind, a, b) in one bulk write"""
+        if not deltas:
+            return 0
+        
+        now = datetime.now()
+        operations = [
+            UpdateOne(
+                {'_id': f"{day}|{kind}|{a}|{b}"},
+                {
+                    '$inc': {'count': delta},
+                    '$set': {'updated_at': now},
+                    '$setOnInsert': {'day': day, 'kind': kind, 'a': a, 'b': b}
+                },
+                upsert=True
+            )
+            for (day, kind, a, b), delta in deltas.items()
+        ]
+        
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count + len(result.upserted_ids)
+    
+    def get_cells(self, updated_since: datetime = None) -> List[Dict]:
+        """Get all cells, or only those changed since a time"""
+        query = {'updated_at': {'$gte': updated_since}} if updated_since else {}
+        return list(self.collection.find(query, {'day': 1, 'kind': 1, 'a': 1, 'b': 1, 'count': 1}))
+    
+    def replace_all(self, cells: Dict[Tuple[str, str, str, str], int], batch_size: int = 5000) -> int:
+        """Replace every cell with freshly computed counts (readers never see a partial set)"""
+        now = datetime.now()
+        build_id = ObjectId()
+        
+        batch = []
+        written = 0
+        for (day, kind, a, b), count in cells.items():
+            cell_id = f"{day}|{kind}|{a}|{b}"
+            batch.append(ReplaceOne({'_id': cell_id}, {
+                '_id': cell_id,
+                'day': day,
+                'kind': kind,
+                'a': a,
+                'b': b,
+                'count': count,
+                'build_id': build_id,
+                'updated_at': now
+            }, upsert=True))
+            if len(batch) >= batch_size:
+                self.collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        
+        if batch:
+            self.collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+        
+        # Drop cells this build did not write, keeping any an incremental update touched meanwhile
+        self.collection.delete_many({'build_id': {'$ne': build_id}, 'updated_at': {'$lt': now}})
+        return written
@@ -4,6 +4,8 @@ from .database import DatabaseManager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import bcrypt
 import secrets
 
@@ -84,6 +86,8 @@ class User(BaseModel):
             'reports_submitted': 0,
             'reports_verified': 0,
             'posts_created': 0,
+            'bookmarks': 0,
+            'follows': 0,
             'last_active': None
         })
         
@@ -119,15 +123,11 @@ class User(BaseModel):
             self.update_by_id(user['_id'], {
                 'last_login': datetime.now(),
                 'failed_login_attempts': 0,
-                'account_locked_until': None,
-                'statistics.last_active': datetime.now()
+                'account_locked_until': None
             }, use_set=False)
             
             # Increment login count
-            self.collection.update_one(
-                {"_id": user['_id']},
-                {"$inc": {"statistics.login_count": 1}}
-            )
+            self.increment_statistics(user['_id'], {'login_count': 1}, last_active=datetime.utcnow())
             
             return user
         else:
@@ -187,6 +187,39 @@ class User(BaseModel):
         }
         
         return self.find_many(search_query, limit=limit)
+    
+    def increment_statistics(self, user_id: ObjectId, increments: Dict[str, int],
+                             last_active: datetime = None) -> bool:
+        """Atomically add to statistics counters (paths relative to statistics) and bump their version"""
+        update = {"$inc": {f"statistics.{field}": amount for field, amount in increments.items() if amount}}
+        if not update["$inc"] and last_active is None:
+            return False
+        
+        update["$inc"]["statistics.version"] = 1
+        if last_active is not None:
+            update["$set"] = {"statistics.last_active": last_active}
+        
+        result = self.collection.update_one({"_id": user_id}, update)
+        return result.matched_count > 0
+    
+    def get_statistics_page(self, after_id: ObjectId = None, limit: int = 500) -> List[Dict]:
+        """Users' statistics subdocuments in _id order, for batched reconciliation"""
+        query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+        return list(self.collection.find(query, {"statistics": 1}).sort("_id", 1).limit(limit))
+    
+    def set_statistics(self, user_id: ObjectId, expected_version: Optional[int], values: Dict,
+                       unset: List[str] = None) -> bool:
+        """Overwrite statistics fields only if no increment landed since expected_version was read"""
+        update = {
+            "$set": {**{f"statistics.{field}": value for field, value in values.items()},
+                     "statistics.reconciled_at": datetime.utcnow()},
+            "$inc": {"statistics.version": 1}
+        }
+        if unset:
+            update["$unset"] = {f"statistics.{field}": "" for field in unset}
+        
+        result = self.collection.update_one({"_id": user_id, "statistics.version": expected_version}, update)
+        return result.modified_count > 0
 
 class UserBookmark(BaseModel):
     """Model for user bookmarks"""
@@ -198,6 +231,32 @@ class UserBookmark(BaseModel):
     def collection(self):
         return self.db_manager.web_app_db.user_bookmarks
     
+    def ensure_indexes(self):
+        """Compound index covering per-user bookmark lookups and the interaction set query"""
+        self.collection.create_index([('user_id', 1), ('protest_id', 1), ('created_at', 1)])
+    
+    def get_interaction_set(self, user_id: ObjectId) -> List[Dict]:
+        """A user's bookmarks and active follows in one query, as {kind, protest_id, created_at} rows"""
+        projection = {'_id': 0, 'protest_id': 1, 'created_at': 1}
+        follow_match = {'user_id': user_id, 'active': True}
+        try:
+            return list(self.collection.aggregate([
+                {'$match': {'user_id': user_id}},
+                {'$project': {**projection, 'kind': {'$literal': 'bookmark'}}},
+                {'$unionWith': {
+                    'coll': 'user_follows',
+                    'pipeline': [
+                        {'$match': follow_match},
+                        {'$project': {**projection, 'kind': {'$literal': 'follow'}}}
+                    ]
+                }}
+            ]))
+        except OperationFailure:
+            # $unionWith needs MongoDB 4.4+
+            rows = [{**row, 'kind': 'bookmark'} for row in self.collection.find({'user_id': user_id}, projection)]
+            follows = self.db_manager.web_app_db.user_follows.find(follow_match, projection)
+            return rows + [{**row, 'kind': 'follow'} for row in follows]
+    
     def validate_create_data(self, data: Dict) -> Dict:
         """Validate bookmark data"""
         required_fields = ['user_id', 'protest_id']
@@ -312,6 +371,23 @@ class UserFollow(BaseModel):
             query["active"] = True
         
         return self.find_many(query, sort=[("created_at", -1)])
+    
+    def ensure_indexes(self):
+        """Indexes for listing a protest's followers and a user's active follows"""
+        self.collection.create_index([('protest_id', 1), ('active', 1), ('user_id', 1)])
+        self.collection.create_index([('user_id', 1), ('active', 1), ('protest_id', 1), ('created_at', 1)])
+    
+    def iter_follower_ids(self, protest_id: ObjectId, after_user_id: ObjectId = None, batch_size: int = 5000):
+        """Cursor over the user IDs following a protest with notifications enabled, in user ID order"""
+        query = {
+            "protest_id": protest_id,
+            "active": True,
+            "notification_enabled": {"$ne": False}
+        }
+        if after_user_id is not None:
+            query["user_id"] = {"$gt": after_user_id}  # Resume after the last user already notified
+        cursor = self.collection.find(query, {"user_id": 1, "_id": 0}).sort("user_id", 1).batch_size(batch_size)
+        return (follow['user_id'] for follow in cursor)
 
 class UserReport(BaseModel):
     """Enhanced model for user-submitted protest reports"""
@@ -353,6 +429,11 @@ class UserReport(BaseModel):
         
         return self.find_many(query, limit=limit, sort=sort_order)
     
+    def ensure_indexes(self):
+        """Create the indexes used by per-user report listings and statistics recounts"""
+        self.collection.create_index([('user_id', 1), ('created_at', -1)])
+        self.collection.create_index([('user_id', 1), ('verification_status', 1)])
+    
     def get_reports_by_user(self, user_id: ObjectId, limit: int = 20) -> List[Dict]:
         """Get reports submitted by a specific user"""
         return self.find_many(
@@ -365,21 +446,22 @@ class UserReport(BaseModel):
         """Verify/reject a user report"""
         status = "verified" if verified else "rejected"
         
-        self.update_by_id(report_id, {
-            'verification_status': status,
-            'verified_by': moderator_id,
-            'verification_date': datetime.now(),
-            'verification_notes': notes
-        })
+        previous = self.collection.find_one_and_update(
+            {'_id': report_id},
+            {'$set': {
+                'verification_status': status,
+                'verified_by': moderator_id,
+                'verification_date': datetime.now(),
+                'verification_notes': notes,
+                'updated_at': datetime.now()
+            }},
+            return_document=ReturnDocument.BEFORE
+        )
         
-        # Update user statistics
-        report = self.find_by_id(report_id)
-        if report and verified:
-            user_model = User()
-            user_model.collection.update_one(
-                {"_id": report['user_id']},
-                {"$inc": {"statistics.reports_verified": 1}}
-            )
+        # Only a change into or out of verified moves the count, so a repeated review does not double it
+        was_verified = previous is not None and previous.get('verification_status') == 'verified'
+        if previous is not None and verified != was_verified:
+            User().increment_statistics(previous['user_id'], {'reports_verified': 1 if verified else -1})
     
     def escalate_report(self, report_id: ObjectId, escalated_by: ObjectId, reason: str = ""):
         """Escalate a report for higher-level review"""
@@ -435,6 +517,10 @@ class Post(BaseModel):
             sort=[("created_at", -1)]
         )
     
+    def ensure_indexes(self):
+        """Create the index used by per-user post listings and statistics recounts"""
+        self.collection.create_index([('user_id', 1), ('created_at', -1)])
+    
     def get_posts_by_user(self, user_id: ObjectId, limit: int = 20) -> List[Dict]:
         """Get posts by a specific user"""
         return self.find_many(
@@ -613,6 +699,39 @@ class UserAlert(BaseModel):
         
         return self.find_many(query, sort=[("created_at", -1)])
     
+    def ensure_indexes(self):
+        """Indexes for per-user listings and incremental sync of the alert matching engine"""
+        self.collection.create_index([('user_id', 1), ('active', 1)])
+        self.collection.create_index('updated_at')
+    
+    def iter_alerts(self, updated_since: datetime = None, projection: Dict = None, batch_size: int = 5000):
+        """Cursor over active alerts, or over every alert changed since a time (to catch deactivations)"""
+        query = {'updated_at': {'$gte': updated_since}} if updated_since else {'active': True}
+        return self.collection.find(query, projection).batch_size(batch_size)
+    
+    def get_active_ids(self, alert_ids: List[ObjectId]) -> set:
+        """The subset of alert_ids that still exist and are active (database errors propagate)"""
+        if not alert_ids:
+            return set()
+        return {doc['_id'] for doc in self.collection.find(
+            {'_id': {'$in': list(alert_ids)}, 'active': True}, {'_id': 1}
+        )}
+    
+    def record_triggers(self, alert_ids: List[ObjectId], trigger_data: Dict = None) -> int:
+        """Update trigger statistics for many alerts at once"""
+        if not alert_ids:
+            return 0
+        
+        update_data = {'last_triggered': datetime.now()}
+        if trigger_data:
+            update_data['last_trigger_data'] = trigger_data
+        
+        result = self.collection.update_many(
+            {"_id": {"$in": list(alert_ids)}},
+            {"$inc": {"trigger_count": 1}, "$set": update_data}
+        )
+        return result.modified_count
+    
     def trigger_alert(self, alert_id: ObjectId, trigger_data: Dict = None):
         """Trigger an alert and update statistics"""
         update_data = {
@@ -640,17 +759,23 @@ class UserSession(BaseModel):
     def collection(self):
         return self.db_manager.web_app_db.user_sessions
     
+    def ensure_indexes(self):
+        """Token lookups, per-user listings, and TTL expiry of sessions once expires_at passes"""
+        self.collection.create_index('session_token')
+        self.collection.create_index([('user_id', 1), ('active', 1), ('expires_at', -1)])
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+    
     def create_session(self, user_id: ObjectId, expires_hours: int = 24, device_info: Dict = None) -> str:
         """Create a new user session with device tracking"""
         session_token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=expires_hours)
+        expires_at = datetime.utcnow() + timedelta(hours=expires_hours)
         
         session_data = {
             'user_id': user_id,
             'session_token': session_token,
             'expires_at': expires_at,
-            'created_at': datetime.now(),
-            'last_activity': datetime.now(),
+            'created_at': datetime.utcnow(),
+            'last_activity': datetime.utcnow(),
             'device_info': device_info or {},
             'active': True
         }
@@ -662,13 +787,13 @@ class UserSession(BaseModel):
         """Get active session by token"""
         return self.collection.find_one({
             "session_token": session_token,
-            "expires_at": {"$gt": datetime.now()},
+            "expires_at": {"$gt": datetime.utcnow()},
             "active": True
         })
     
     def update_activity(self, session_token: str, activity_data: Dict = None):
         """Update last activity for session"""
-        update_data = {"last_activity": datetime.now()}
+        update_data = {"last_activity": datetime.utcnow()}
         
         if activity_data:
             update_data['last_activity_data'] = activity_data
@@ -678,28 +803,55 @@ class UserSession(BaseModel):
             {"$set": update_data}
         )
     
-    def revoke_session(self, session_token: str) -> bool:
+    def bulk_update_activity(self, activity: Dict[str, Dict]) -> int:
+        """Write buffered last-activity times (token -> {last_activity, data}) in one unordered bulk write"""
+        operations = []
+        for session_token, entry in activity.items():
+            update = {"$max": {"last_activity": entry['last_activity']}}
+            if entry.get('data'):
+                update["$set"] = {"last_activity_data": entry['data']}
+            operations.append(UpdateOne({"session_token": session_token, "active": True}, update))
+        
+        if not operations:
+            return 0
+        
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
+    def revoke_session(self, session_token: str, reason: str = None) -> bool:
         """Revoke a session"""
+        # UTC, like the created_at and expires_at written at login
+        now = datetime.utcnow()
+        update_data = {"active": False, "revoked_at": now, "logged_out_at": now}
+        if reason:
+            update_data["revoked_by"] = reason
+        
         result = self.collection.update_one(
             {"session_token": session_token},
-            {"$set": {"active": False, "revoked_at": datetime.now()}}
+            {"$set": update_data}
         )
         
         return result.modified_count > 0
     
-    def revoke_all_user_sessions(self, user_id: ObjectId) -> int:
-        """Revoke all sessions for a user"""
-        result = self.collection.update_many(
-            {"user_id": user_id, "active": True},
-            {"$set": {"active": False, "revoked_at": datetime.now()}}
-        )
+    def revoke_all_user_sessions(self, user_id: ObjectId, except_token: str = None, reason: str = None) -> int:
+        """Revoke all sessions for a user, optionally keeping one"""
+        query = {"user_id": user_id, "active": True}
+        if except_token:
+            query["session_token"] = {"$ne": except_token}
+        
+        now = datetime.utcnow()
+        update_data = {"active": False, "revoked_at": now, "logged_out_at": now}
+        if reason:
+            update_data["revoked_by"] = reason
+        
+        result = self.collection.update_many(query, {"$set": update_data})
         
         return result.modified_count
     
     def cleanup_expired_sessions(self) -> int:
-        """Remove expired sessions"""
+        """Remove expired sessions (normally done by the expires_at TTL index)"""
         result = self.collection.delete_many({
-            "expires_at": {"$lt": datetime.now()}
+            "expires_at": {"$lt": datetime.utcnow()}
         })
         return result.deleted_count
     
@@ -708,7 +860,7 @@ class UserSession(BaseModel):
         query = {"user_id": user_id}
         if active_only:
             query["active"] = True
-            query["expires_at"] = {"$gt": datetime.now()}
+            query["expires_at"] = {"$gt": datetime.utcnow()}
         
         return self.find_many(query, sort=[("last_activity", -1)])
 
@@ -823,6 +975,12 @@ class NotificationQueue(BaseModel):
     def collection(self):
         return self.db_manager.web_app_db.notification_queue
     
+    def insert_deliveries(self, deliveries: List[Dict]) -> List[ObjectId]:
+        """Insert prepared delivery records in one unordered write"""
+        if not deliveries:
+            return []
+        return self.collection.insert_many(deliveries, ordered=False).inserted_ids
+    
     def validate_create_data(self, data: Dict) -> Dict:
         """Validate notification data"""
         required_fields = ['user_id', 'notification_type', 'content']
@@ -920,6 +1078,45 @@ class NotificationHistory(BaseModel):
     def collection(self):
         return self.db_manager.web_app_db.notification_history
     
+    def ensure_indexes(self):
+        """Indexes for per-user listings and unread counts"""
+        self.collection.create_index([('user_id', 1), ('read', 1)])
+        self.collection.create_index([('user_id', 1), ('created_at', -1)])
+    
+    def insert_notifications(self, notifications: List[Dict]) -> List[ObjectId]:
+        """Insert prepared in-app notifications in one unordered write"""
+        if not notifications:
+            return []
+        return self.collection.insert_many(notifications, ordered=False).inserted_ids
+    
+    def mark_read(self, user_id: ObjectId, notification_id: ObjectId) -> bool:
+        """Mark one of a user's notifications read; True only if it was unread before"""
+        result = self.collection.update_one(
+            {"_id": notification_id, "user_id": user_id, "read": False},
+            {"$set": {"read": True, "read_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+    
+    def mark_all_read(self, user_id: ObjectId) -> int:
+        """Mark all of a user's unread notifications read and return how many changed"""
+        result = self.collection.update_many(
+            {"user_id": user_id, "read": False},
+            {"$set": {"read": True, "read_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+    
+    def count_unread_by_user(self, user_ids: List[ObjectId] = None) -> Dict[ObjectId, int]:
+        """Unread notification counts keyed by user (every user with unread notifications by default)"""
+        match = {"read": False}
+        if user_ids is not None:
+            match["user_id"] = {"$in": list(user_ids)}
+        
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+        ]
+        return {result['_id']: result['count'] for result in self.aggregate(pipeline)}
+    
     def log_notification(self, user_id: ObjectId, notification_type: str, delivery_method: str,
                         delivery_status: str, content: Dict = None, delivery_details: Dict = None) -> ObjectId:
         """Log a sent notification"""
@@ -982,8 +1179,231 @@ class NotificationHistory(BaseModel):
         
         return stats
 
+class NotificationCounter(BaseModel):
+    """Model for per-user unread notification counters (_id is the user ID)"""
+    
+    def __init__(self):
+        super().__init__(DatabaseManager(), 'notification_counters')
+    
+    @property
+    def collection(self):
+        return self.db_manager.web_app_db.notification_counters
+    
+    def get_unread(self, user_id: ObjectId) -> Optional[int]:
+        """Stored unread count, or None if the user has no counter yet"""
+        counter = self.collection.find_one({"_id": user_id}, {"unread": 1})
+        return max(0, counter.get('unread', 0)) if counter else None
+    
+    @property
+    def leases(self):
+        """Leases letting one process at a time run counter maintenance"""
+        return self.db_manager.web_app_db.notification_counter_leases
+    
+    def get_counters(self, user_ids: List[ObjectId] = None) -> Dict[ObjectId, tuple]:
+        """Stored (unread, version) keyed by user (every counter by default)"""
+        query = {"_id": {"$in": list(user_ids)}} if user_ids is not None else {}
+        return {counter['_id']: (counter.get('unread', 0), counter.get('version'))
+                for counter in self.collection.find(query, {"unread": 1, "version": 1})}
+    
+    def initialize(self, user_id: ObjectId, unread: int) -> int:
+        """Create a user's counter from a full count unless another writer created it first"""
+        counter = self.collection.find_one_and_update(
+            {"_id": user_id},
+            {"$setOnInsert": {"unread": unread, "version": 0, "updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return max(0, counter.get('unread', 0))
+    
+    def apply_deltas(self, deltas: Dict[ObjectId, int]) -> int:
+        """Atomically add to many users' counters in one unordered bulk write"""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({"_id": user_id}, {"$inc": {"unread": delta, "version": 1}, "$set": {"updated_at": now}},
+                      upsert=True)
+            for user_id, delta in deltas.items() if delta
+        ]
+        if not operations:
+            return 0
+        
+        self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+    
+    def compare_and_set(self, user_id: ObjectId, expected: Optional[int], unread: int,
+                        version: Optional[int] = None) -> bool:
+        """
+        Set a counter only if it is unchanged since a reconciliation read it
+        (expected None: still missing). Every write bumps the version, so a
+        counter that moved and came back to the same value does not match.
+        """
+        now = datetime.utcnow()
+        if expected is None:
+            result = self.collection.update_one(
+                {"_id": user_id},
+                {"$setOnInsert": {"unread": unread, "version": 0, "updated_at": now}},
+                upsert=True
+            )
+            return result.upserted_id is not None
+        
+        result = self.collection.update_one(
+            {"_id": user_id, "unread": expected, "version": version},
+            {"$set": {"unread": unread, "updated_at": now, "reconciled_at": now}, "$inc": {"version": 1}}
+        )
+        return result.modified_count > 0
+    
+    def acquire_lease(self, name: str, owner: str, lease_seconds: float) -> bool:
+        """Take or renew a named lease; False while another owner holds it"""
+        now = datetime.utcnow()
+        try:
+            self.leases.update_one(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held by someone else
+            return False
+        return True
+
+class NotificationFanoutJob(BaseModel):
+    """Model for background notification fan-outs, also used as their durable job queue"""
+    
+    # Statuses of jobs that still have notifications to write
+    ACTIVE_STATUSES = ['queued', 'running']
+    
+    def __init__(self):
+        super().__init__(DatabaseManager(), 'notification_fanout_jobs')
+    
+    @property
+    def collection(self):
+        return self.db_manager.web_app_db.notification_fanout_jobs
+    
+    def ensure_indexes(self):
+        """Create the indexes used by job claiming, lease recovery and history expiry"""
+        self.collection.create_index([('status', 1), ('submitted_at', 1)])
+        self.collection.create_index([('status', 1), ('lease_expires_at', 1)])
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+    
+    def create_job(self, audience: str, title: str, message: str, template: Dict, description: str = '',
+                   user_ids: List[ObjectId] = None, protest_id: ObjectId = None, total: int = None,
+                   history_days: int = 7) -> ObjectId:
+        """Queue a fan-out to a list of users or to the followers of a protest"""
+        now = datetime.utcnow()
+        return self.collection.insert_one({
+            'audience': audience,
+            'user_ids': user_ids,
+            'protest_id': protest_id,
+            'title': title,
+            'message': message,
+            'template': template,
+            'description': description,
+            'status': 'queued',
+            'total': total,
+            'notified': 0,
+            'failed': 0,
+            'chunks': 0,
+            'cursor': None,
+            'attempts': 0,
+            'submitted_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'updated_at': now,
+            'expires_at': now + timedelta(days=history_days)
+        }).inserted_id
+    
+    def get_job(self, job_id: Union[ObjectId, str]) -> Optional[Dict]:
+        """A job's progress (without its recipient list)"""
+        if isinstance(job_id, str):
+            if not ObjectId.is_valid(job_id):
+                return None
+            job_id = ObjectId(job_id)
+        return self.collection.find_one({'_id': job_id}, {'user_ids': 0})
+    
+    def get_recent_jobs(self, limit: int = 20) -> List[Dict]:
+        """Most recently submitted jobs (without their recipient lists)"""
+        return list(self.collection.find({}, {'user_ids': 0}).sort('submitted_at', -1).limit(limit))
+    
+    def count_active(self) -> int:
+        """Jobs queued or running in any process"""
+        return self.collection.count_documents({'status': {'$in': self.ACTIVE_STATUSES}})
+    
+    def claim_next(self, worker_id: str, lease_seconds: int) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running for one worker (progress carries over a retry)"""
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {'status': 'queued'},
+            {
+                '$set': {
+                    'status': 'running',
+                    'worker_id': worker_id,
+                    'started_at': now,
+                    'lease_expires_at': now + timedelta(seconds=lease_seconds),
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('submitted_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def requeue_expired(self, max_attempts: int = 3) -> int:
+        """Recover jobs whose worker stopped renewing its lease; give up after max_attempts"""
+        now = datetime.utcnow()
+        expired = {'status': 'running', 'lease_expires_at': {'$lt': now}}
+        
+        failed = self.collection.update_many(
+            {**expired, 'attempts': {'$gte': max_attempts}},
+            {
+                '$set': {'status': 'failed', 'error': 'Fan-out worker stopped responding',
+                         'finished_at': now, 'updated_at': now},
+                '$unset': {'worker_id': '', 'lease_expires_at': ''}
+            }
+        )
+        requeued = self.collection.update_many(
+            expired,
+            {
+                '$set': {'status': 'queued', 'updated_at': now},
+                '$unset': {'worker_id': '', 'lease_expires_at': ''}
+            }
+        )
+        return failed.modified_count + requeued.modified_count
+    
+    def update_progress(self, job_id: ObjectId, worker_id: str, cursor, notified: int, failed: int,
+                        lease_seconds: int) -> bool:
+        """Record a written chunk and renew the lease; False once the job was reassigned"""
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id},
+            {
+                '$set': {
+                    'cursor': cursor,
+                    'notified': notified,
+                    'failed': failed,
+                    'lease_expires_at': now + timedelta(seconds=lease_seconds),
+                    'updated_at': now
+                },
+                '$inc': {'chunks': 1}
+            }
+        )
+        return result.matched_count > 0
+    
+    def finish_job(self, job_id: ObjectId, worker_id: str, status: str, error: str = None) -> bool:
+        """Mark a job completed or failed if this worker still owns it"""
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'worker_id': worker_id},
+            {
+                '$set': {'status': status, 'error': error, 'finished_at': now, 'updated_at': now},
+                '$unset': {'lease_expires_at': ''}
+            }
+        )
+        return result.matched_count > 0
+
 class ExportRequest(BaseModel):
-    """Model for export requests"""
+    """Model for export requests, also used as the durable export job queue"""
+    
+    # Statuses a job can still be cancelled from
+    ACTIVE_STATUSES = ['queued', 'processing']
     
     def __init__(self):
         super().__init__(DatabaseManager(), 'export_requests')
@@ -992,6 +1412,19 @@ class ExportRequest(BaseModel):
     def collection(self):
         return self.db_manager.web_app_db.export_requests
     
+    def ensure_indexes(self):
+        """Create the indexes used by job claiming, lease recovery and per-user limits"""
+        self.collection.create_index([('status', 1), ('requested_at', 1)])
+        self.collection.create_index([('status', 1), ('lease_expires_at', 1)])
+        self.collection.create_index([('user_id', 1), ('requested_at', -1)])
+        self.daily_counts.create_index([('user_id', 1), ('day', 1)], unique=True)
+        self.daily_counts.create_index('expires_at', expireAfterSeconds=0)
+    
+    @property
+    def daily_counts(self):
+        """Per-user, per-day export counters enforcing the daily limit"""
+        return self.db_manager.web_app_db.export_daily_counts
+    
     def validate_create_data(self, data: Dict) -> Dict:
         """Validate export request data"""
         required_fields = ['user_id', 'export_type', 'filters']
@@ -1001,23 +1434,29 @@ class ExportRequest(BaseModel):
                 raise ValueError(f"Missing required field: {field}")
         
         # Set defaults
-        data.setdefault('status', 'pending')
+        data.setdefault('status', 'queued')
         data.setdefault('format', 'csv')
         data.setdefault('compression', 'none')
         data.setdefault('priority', 'normal')
+        data.setdefault('attempts', 0)
+        data.setdefault('progress', {'rows_written': 0})
+        data.setdefault('download_count', 0)
         
         return data
     
     def create_export_request(self, user_id: ObjectId, export_type: str, filters: Dict,
-                             format: str = 'csv', compression: str = 'none') -> ObjectId:
-        """Create a new export request"""
+                             format: str = 'csv', compression: str = 'none', **options) -> ObjectId:
+        """Create a new export request (queued for the export workers)"""
+        now = datetime.now()
         data = {
             'user_id': user_id,
             'export_type': export_type,
             'filters': filters,
             'format': format,
             'compression': compression,
-            'requested_at': datetime.now()
+            'requested_at': now,
+            'expires_at': now + timedelta(days=7),
+            **options
         }
         
         return self.create(data)
@@ -1025,19 +1464,201 @@ class ExportRequest(BaseModel):
     def get_pending_exports(self, limit: int = 50) -> List[Dict]:
         """Get pending export requests"""
         return self.find_many(
-            {'status': 'pending'},
+            {'status': 'queued'},
             limit=limit,
             sort=[('priority', -1), ('requested_at', 1)]
         )
     
-    def get_user_exports(self, user_id: ObjectId, limit: int = 20) -> List[Dict]:
+    def get_user_exports(self, user_id: ObjectId, limit: int = 20, skip: int = 0) -> List[Dict]:
         """Get export requests for a user"""
         return self.find_many(
             {'user_id': user_id},
             limit=limit,
+            skip=skip,
             sort=[('requested_at', -1)]
         )
     
+    def reserve_daily_export(self, user_id: ObjectId, day: str, limit: int) -> bool:
+        """Atomically take one of a user's exports for a day; False once the limit is reached"""
+        try:
+            counter = self.daily_counts.find_one_and_update(
+                {'user_id': user_id, 'day': day, 'count': {'$lt': limit}},
+                {
+                    '$inc': {'count': 1},
+                    '$setOnInsert': {'expires_at': datetime.now() + timedelta(days=2)}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The filter missed because the day's counter is already at the limit
+            return False
+        return counter is not None
+    
+    def release_daily_export(self, user_id: ObjectId, day: str):
+        """Give back a reserved export whose job could not be created"""
+        self.daily_counts.update_one({'user_id': user_id, 'day': day, 'count': {'$gt': 0}},
+                                     {'$inc': {'count': -1}})
+    
+    def get_daily_export_count(self, user_id: ObjectId, day: str) -> int:
+        """Exports a user has reserved for a day"""
+        counter = self.daily_counts.find_one({'user_id': user_id, 'day': day}, {'count': 1})
+        return counter['count'] if counter else 0
+    
+    def count_user_exports_since(self, user_id: ObjectId, since: datetime) -> int:
+        """Count a user's export requests since a time (served by the user_id/requested_at index)"""
+        return self.count({'user_id': user_id, 'requested_at': {'$gte': since}})
+    
+    def claim_next(self, worker_id: str, lease_seconds: int) -> Optional[Dict]:
+        """Atomically move the oldest queued job to processing for one worker"""
+        now = datetime.now()
+        return self.collection.find_one_and_update(
+            {'status': 'queued'},
+            {
+                '$set': {
+                    'status': 'processing',
+                    'worker_id': worker_id,
+                    'started_at': now,
+                    'heartbeat_at': now,
+                    'lease_expires_at': now + timedelta(seconds=lease_seconds),
+                    'progress.rows_written': 0,
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('requested_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def requeue_expired(self, max_attempts: int = 3) -> int:
+        """Recover jobs whose worker stopped renewing its lease; give up after max_attempts"""
+        now = datetime.now()
+        expired = {'status': 'processing', 'lease_expires_at': {'$lt': now}}
+        
+        failed = self.collection.update_many(
+            {**expired, 'attempts': {'$gte': max_attempts}},
+            {'$set': {
+                'status': 'failed',
+                'failed_at': now,
+                'error_message': 'Export worker stopped responding',
+                'updated_at': now
+            }}
+        )
+        requeued = self.collection.update_many(
+            expired,
+            {
+                '$set': {'status': 'queued', 'updated_at': now},
+                '$unset': {'worker_id': '', 'lease_expires_at': ''}
+            }
+        )
+        return failed.modified_count + requeued.modified_count
+    
+    def update_progress(self, export_id: ObjectId, worker_id: str, rows_written: int,
+                        lease_seconds: int) -> bool:
+        """Record progress and renew the lease; False once the job was cancelled or reassigned"""
+        now = datetime.now()
+        result = self.collection.update_one(
+            {'_id': export_id, 'status': 'processing', 'worker_id': worker_id},
+            {'$set': {
+                'progress.rows_written': rows_written,
+                'heartbeat_at': now,
+                'lease_expires_at': now + timedelta(seconds=lease_seconds),
+                'updated_at': now
+            }}
+        )
+        return result.matched_count > 0
+    
+    def complete_job(self, export_id: ObjectId, worker_id: str, file_path: str = None,
+                     file_size: int = 0, record_count: int = 0, message: str = None,
+                     etag: str = None, gzip_file_path: str = None, gzip_file_size: int = 0) -> bool:
+        """Mark a job completed if this worker still owns it"""
+        now = datetime.now()
+        result = self.collection.update_one(
+            {'_id': export_id, 'status': 'processing', 'worker_id': worker_id},
+            {
+                '$set': {
+                    'status': 'completed',
+                    'completed_at': now,
+                    'file_path': file_path,
+                    'file_size_bytes': file_size,
+                    'etag': etag,
+                    'gzip_file_path': gzip_file_path,
+                    'gzip_file_size_bytes': gzip_file_size,
+                    'record_count': record_count,
+                    'progress.rows_written': record_count,
+                    'error_message': message,
+                    'expires_at': now + timedelta(days=7),
+                    'updated_at': now
+                },
+                '$unset': {'lease_expires_at': ''}
+            }
+        )
+        return result.matched_count > 0
+    
+    def fail_job(self, export_id: ObjectId, worker_id: str, error_message: str) -> bool:
+        """Mark a job failed if this worker still owns it"""
+        now = datetime.now()
+        result = self.collection.update_one(
+            {'_id': export_id, 'status': 'processing', 'worker_id': worker_id},
+            {
+                '$set': {
+                    'status': 'failed',
+                    'failed_at': now,
+                    'completed_at': now,
+                    'error_message': error_message,
+                    'updated_at': now
+                },
+                '$unset': {'lease_expires_at': ''}
+            }
+        )
+        return result.matched_count > 0
+    
+    def cancel_job(self, export_id: ObjectId, user_id: ObjectId) -> Optional[Dict]:
+        """Cancel a queued or processing job; the owning worker stops at its next progress update"""
+        now = datetime.now()
+        return self.collection.find_one_and_update(
+            {'_id': export_id, 'user_id': user_id, 'status': {'$in': self.ACTIVE_STATUSES}},
+            {
+                '$set': {
+                    'status': 'cancelled',
+                    'completed_at': now,
+                    'error_message': 'Cancelled by user',
+                    'updated_at': now
+                },
+                '$unset': {'lease_expires_at': ''}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def record_download(self, export_id: ObjectId):
+        """Increment the download counter"""
+        self.collection.update_one({'_id': export_id}, {'$inc': {'download_count': 1}})
+    
+    def get_status_counts(self, user_id: ObjectId = None) -> Dict[str, Dict]:
+        """Job count, records and bytes per status, optionally for one user"""
+        pipeline = [
+            {'$match': {'user_id': user_id} if user_id is not None else {}},
+            {
+                '$group': {
+                    '_id': '$status',
+                    'count': {'$sum': 1},
+                    'records': {'$sum': {'$ifNull': ['$record_count', 0]}},
+                    'bytes': {'$sum': {'$ifNull': ['$file_size_bytes', 0]}}
+                }
+            }
+        ]
+        return {item['_id']: item for item in self.aggregate(pipeline)}
+    
+    def get_expired(self, now: datetime = None, limit: int = 1000) -> List[Dict]:
+        """Get finished jobs past their download window"""
+        return self.find_many(
+            {
+                'status': {'$nin': self.ACTIVE_STATUSES},
+                'expires_at': {'$lt': now or datetime.now()}
+            },
+            limit=limit
+        )
+    
     def update_export_status(self, export_id: ObjectId, status: str, file_path: str = None,
                             file_size: int = None, record_count: int = None, error_message: str = None):
         """Update export request status"""
@@ -1049,7 +1670,7 @@ class ExportRequest(BaseModel):
                 'file_path': file_path,
                 'file_size_bytes': file_size,
                 'record_count': record_count,
-                'download_expires': datetime.now() + timedelta(days=7)
+                'expires_at': datetime.now() + timedelta(days=7)
             })
         elif status == 'failed':
             update_data.update({
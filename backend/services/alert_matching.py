@@ -0,0 +1,408 @@
+import math
+import os
+import re
+import sys
+import time
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import UserAlert
+from services.spatial_index import EARTH_RADIUS_KM
+from services.notification_fanout import get_notification_fanout
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Grid cell sizes (degrees) for alert areas; an area is registered at the finest level where it spans few cells
+GEO_LEVELS = (0.25, 1.0, 4.0, 16.0)
+MAX_CELLS_PER_AREA = int(os.getenv('ALERT_GEO_MAX_CELLS', 16))
+
+KM_PER_DEGREE = 111.32
+
+# Changed alerts are re-read this far behind the previous sync so writes racing a sync are not missed
+SYNC_OVERLAP_SECONDS = 5
+
+# Only the fields matching needs
+ALERT_PROJECTION = {
+    'user_id': 1, 'alert_name': 1, 'alert_type': 1, 'frequency': 1, 'active': 1,
+    'keywords': 1, 'categories': 1, 'countries': 1, 'cities': 1,
+    'coordinates': 1, 'location_radius_km': 1
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-cased word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points"""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, max(0.0, a))))
+
+
+def point_cell(level: int, lat: float, lng: float) -> Tuple:
+    """Grid key of the cell containing a point at one level"""
+    size = GEO_LEVELS[level]
+    columns = int(math.ceil(360 / size))
+    return ('geo', level, int(math.floor((lat + 90) / size)), int(math.floor((lng + 180) / size)) % columns)
+
+
+def area_cells(lat: float, lng: float, radius_km: float) -> List[Tuple]:
+    """Grid keys covering a circle's bounding box, at the finest level with at most MAX_CELLS_PER_AREA cells"""
+    dlat = radius_km / KM_PER_DEGREE
+    widest = math.cos(math.radians(min(89.9, abs(lat) + dlat)))
+    dlng = min(180.0, radius_km / (KM_PER_DEGREE * max(widest, 0.01)))
+
+    for level, size in enumerate(GEO_LEVELS):
+        columns = int(math.ceil(360 / size))
+        rows = range(int(math.floor((max(-90.0, lat - dlat) + 90) / size)),
+                     int(math.floor((min(90.0, lat + dlat) + 90) / size)) + 1)
+        if dlng >= 180:
+            cols = range(columns)
+        else:
+            first = int(math.floor((lng - dlng + 180) / size))
+            last = int(math.floor((lng + dlng + 180) / size))
+            cols = sorted({col % columns for col in range(first, last + 1)})
+
+        if len(rows) * len(cols) <= MAX_CELLS_PER_AREA or level == len(GEO_LEVELS) - 1:
+            return [('geo', level, row, col) for row in rows for col in cols]
+    return []
+
+
+def compile_alert(alert: Dict) -> Optional[Dict]:
+    """Normalized matching criteria of an alert, or None if it cannot match anything"""
+    phrases = list(dict.fromkeys(
+        ' '.join(tokenize(keyword)) for keyword in alert.get('keywords') or [] if isinstance(keyword, str)
+    ))
+    phrases = [phrase for phrase in phrases if phrase]
+    categories = {category.strip().lower() for category in alert.get('categories') or [] if isinstance(category, str)}
+
+    area = None
+    coordinates = alert.get('coordinates') or []
+    try:
+        radius_km = float(alert.get('location_radius_km') or 0)
+        if len(coordinates) == 2 and radius_km > 0:
+            area = (float(coordinates[1]), float(coordinates[0]), radius_km)
+    except (TypeError, ValueError):
+        area = None
+
+    criteria = {'keywords': phrases, 'categories': categories, 'area': area}
+    alert_type = alert.get('alert_type', 'keyword')
+    if alert_type == 'combined':
+        requires = tuple(name for name in ('keywords', 'categories', 'area') if criteria[name])
+    else:
+        requires = ({'keyword': 'keywords', 'category': 'categories', 'location': 'area'}.get(alert_type, 'keywords'),)
+
+    if not requires or not all(criteria[name] for name in requires):
+        return None
+
+    return {
+        'id': alert['_id'],
+        'user_id': alert.get('user_id'),
+        'name': alert.get('alert_name', ''),
+        'frequency': alert.get('frequency', 'daily'),
+        'requires': requires,
+        'keywords': phrases,
+        'categories': categories,
+        'area': area,
+        'countries': {country.strip().lower() for country in alert.get('countries') or [] if isinstance(country, str)},
+        'cities': [city.strip().lower() for city in alert.get('cities') or [] if isinstance(city, str) and city.strip()]
+    }
+
+
+def index_keys(compiled: Dict) -> List[Tuple]:
+    """Posting keys for an alert: only its first required criterion, the others are verified per candidate"""
+    primary = compiled['requires'][0]
+    if primary == 'keywords':
+        # A phrase can only match protests containing its longest word
+        return list(dict.fromkeys(('kw', max(phrase.split(' '), key=len)) for phrase in compiled['keywords']))
+    if primary == 'categories':
+        return [('cat', category) for category in compiled['categories']]
+    lat, lng, radius_km = compiled['area']
+    return area_cells(lat, lng, radius_km)
+
+
+def protest_features(protest: Dict) -> Dict:
+    """Tokens, categories, point and place of a protest in the form alerts are matched against"""
+    tokens = tokenize(' '.join(
+        protest.get(field) or '' for field in ('title', 'description', 'location_description')
+    ))
+
+    point = None
+    coordinates = (protest.get('location') or {}).get('coordinates') or []
+    if len(coordinates) == 2:
+        try:
+            point = (float(coordinates[1]), float(coordinates[0]))
+        except (TypeError, ValueError):
+            point = None
+
+    return {
+        'tokens': set(tokens),
+        'text': f" {' '.join(tokens)} ",
+        'categories': {category.lower() for category in protest.get('categories') or [] if isinstance(category, str)},
+        'point': point,
+        'country': ((protest.get('source_metadata') or {}).get('country') or '').lower(),
+        'place': (protest.get('location_description') or '').lower()
+    }
+
+
+def match_alert(compiled: Dict, features: Dict) -> Optional[List[str]]:
+    """Criteria an alert matched on, or None if the protest does not satisfy it"""
+    matched_on = []
+
+    if 'keywords' in compiled['requires']:
+        hits = [phrase for phrase in compiled['keywords']
+                if (phrase in features['tokens'] if ' ' not in phrase else f' {phrase} ' in features['text'])]
+        if not hits:
+            return None
+        matched_on.extend(f'keyword:{phrase}' for phrase in hits)
+
+    if 'categories' in compiled['requires']:
+        hits = compiled['categories'] & features['categories']
+        if not hits:
+            return None
+        matched_on.extend(f'category:{category}' for category in sorted(hits))
+
+    if 'area' in compiled['requires']:
+        if features['point'] is None:
+            return None
+        lat, lng, radius_km = compiled['area']
+        if distance_km(lat, lng, *features['point']) > radius_km:
+            return None
+        matched_on.append('location')
+
+    # Country and city lists narrow any alert type
+    if compiled['countries'] and features['country'] not in compiled['countries']:
+        return None
+    if compiled['cities'] and not any(city in features['place'] for city in compiled['cities']):
+        return None
+
+    return matched_on
+
+
+class AlertMatchingEngine:
+    """
+    Matches newly collected protests against every active user alert.
+    Each alert is posted under one inverted index according to its first
+    required criterion: keyword alerts by the longest word of each phrase,
+    category alerts by category, location alerts by the cells of a
+    multi-level lat/lng grid covering their area. A protest only looks up
+    its own words, categories and grid cells, so the work per protest grows
+    with the number of candidate alerts rather than the number of alerts.
+    Candidates are verified against all of their criteria, rechecked as
+    still active, and notified through the bulk notification fan-out.
+    The index follows alert edits through an updated_at watermark and is
+    rebuilt periodically so deleted alerts drop out.
+    """
+
+    def __init__(self, sync_interval_seconds: int = None, rebuild_interval_seconds: int = None):
+        self.sync_interval_seconds = sync_interval_seconds or int(os.getenv('ALERT_INDEX_SYNC_SECONDS', 30))
+        self.rebuild_interval_seconds = rebuild_interval_seconds or int(os.getenv('ALERT_INDEX_REBUILD_SECONDS', 3600))
+
+        self.alerts = UserAlert()
+
+        self._postings = defaultdict(set)  # key -> alert ids
+        self._keys = {}  # alert id -> posting keys
+        self._compiled = {}  # alert id -> compiled alert
+        self._synced_until = None
+        self._last_sync = 0.0
+        self._last_rebuild = 0.0
+        self._lock = threading.RLock()
+
+        self.stats = {'protests_matched': 0, 'candidates_checked': 0, 'alerts_triggered': 0,
+                      'notifications_created': 0, 'rebuilds': 0}
+
+        try:
+            self.alerts.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure alert indexes: {e}")
+
+    # ---- Index maintenance ----
+
+    def _remove(self, alert_id: ObjectId):
+        for key in self._keys.pop(alert_id, ()):
+            alert_ids = self._postings.get(key)
+            if alert_ids is not None:
+                alert_ids.discard(alert_id)
+                if not alert_ids:
+                    del self._postings[key]
+        self._compiled.pop(alert_id, None)
+
+    def _upsert(self, alert: Dict):
+        """Index an alert's current state (removing it if it is inactive or cannot match)"""
+        self._remove(alert['_id'])
+        compiled = compile_alert(alert) if alert.get('active', True) else None
+        if compiled is None:
+            return
+
+        keys = index_keys(compiled)
+        for key in keys:
+            self._postings[key].add(alert['_id'])
+        self._keys[alert['_id']] = keys
+        self._compiled[alert['_id']] = compiled
+
+    def rebuild(self) -> Dict:
+        """Reload every active alert"""
+        started = datetime.now()
+        alerts = list(self.alerts.iter_alerts(projection=ALERT_PROJECTION))
+
+        with self._lock:
+            self._postings = defaultdict(set)
+            self._keys = {}
+            self._compiled = {}
+            for alert in alerts:
+                self._upsert(alert)
+            self._synced_until = started
+            self._last_sync = self._last_rebuild = time.time()
+            self.stats['rebuilds'] += 1
+
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(f"Alert index rebuilt: {len(self._compiled)} matchable alerts, "
+                    f"{len(self._postings)} keys in {elapsed:.1f}s")
+        return {'alerts': len(self._compiled), 'keys': len(self._postings), 'elapsed_seconds': round(elapsed, 2)}
+
+    def sync(self):
+        """Apply alerts changed since the last sync, or rebuild when due"""
+        now = time.time()
+        if self._synced_until is None or now - self._last_rebuild >= self.rebuild_interval_seconds:
+            self.rebuild()
+            return
+        if now - self._last_sync < self.sync_interval_seconds:
+            return
+
+        with self._lock:
+            if time.time() - self._last_sync < self.sync_interval_seconds:
+                return
+            self._last_sync = time.time()
+
+            sync_started = datetime.now()
+            since = self._synced_until - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            for alert in self.alerts.iter_alerts(updated_since=since, projection=ALERT_PROJECTION):
+                self._upsert(alert)
+            self._synced_until = sync_started
+
+    # ---- Matching ----
+
+    def match(self, protest: Dict) -> List[Tuple[Dict, List[str]]]:
+        """(compiled alert, matched criteria) for every alert a protest satisfies"""
+        self.sync()
+        features = protest_features(protest)
+
+        keys = [('kw', token) for token in features['tokens']]
+        keys.extend(('cat', category) for category in features['categories'])
+        if features['point'] is not None:
+            keys.extend(point_cell(level, *features['point']) for level in range(len(GEO_LEVELS)))
+
+        matches = []
+        with self._lock:
+            candidates = set()
+            for key in keys:
+                candidates.update(self._postings.get(key, ()))
+
+            for alert_id in candidates:
+                compiled = self._compiled.get(alert_id)
+                matched_on = match_alert(compiled, features) if compiled else None
+                if matched_on:
+                    matches.append((compiled, matched_on))
+
+        self.stats['candidates_checked'] += len(candidates)
+        return matches
+
+    def process_protest(self, protest_id: ObjectId, protest: Dict) -> Dict:
+        """Match a newly stored protest and create in-app notifications for the owners of matching alerts"""
+        if protest.get('visibility', 'public') != 'public':
+            return {'matched_alerts': 0, 'notifications': 0}
+
+        matches = self.match(protest)
+        self.stats['protests_matched'] += 1
+        if not matches:
+            return {'matched_alerts': 0, 'notifications': 0}
+
+        # Deletions only leave the index on rebuild, so confirm the matched alerts still exist.
+        # A failed lookup raises to the caller instead of reading as "nothing active"
+        active = self.alerts.get_active_ids([compiled['id'] for compiled, _ in matches])
+        matches = [(compiled, matched_on) for compiled, matched_on in matches if compiled['id'] in active]
+        if not matches:
+            return {'matched_alerts': 0, 'notifications': 0}
+
+        notifications = self.build_notifications(protest_id, protest, matches)
+        delivery = get_notification_fanout().deliver(notifications, f'alert matches for {protest_id}')
+
+        self.alerts.record_triggers(
+            [compiled['id'] for compiled, _ in matches],
+            {'protest_id': protest_id, 'protest_title': protest.get('title', '')}
+        )
+
+        self.stats['alerts_triggered'] += len(matches)
+        self.stats['notifications_created'] += len(notifications)
+        return {'matched_alerts': len(matches), 'notifications': len(notifications), **delivery}
+
+    def build_notifications(self, protest_id: ObjectId, protest: Dict,
+                            matches: List[Tuple[Dict, List[str]]]) -> List[Dict]:
+        """One notification per user, naming every alert of theirs the protest matched"""
+        by_user = defaultdict(list)
+        for compiled, matched_on in matches:
+            by_user[compiled['user_id']].append((compiled, matched_on))
+
+        now = datetime.utcnow()
+        title = protest.get('title', 'New protest')
+        location = protest.get('location_description', '')
+
+        notifications = []
+        for user_id, user_matches in by_user.items():
+            alerts = [compiled for compiled, _ in user_matches]
+            if len(alerts) == 1:
+                heading = f'New protest matches "{alerts[0]["name"]}"'
+            else:
+                heading = f'New protest matches {len(alerts)} of your alerts'
+
+            notifications.append({
+                'user_id': user_id,
+                'title': heading,
+                'message': f'{title} ({location})' if location else title,
+                'notification_type': 'alert_match',
+                'priority': 'high' if any(alert['frequency'] == 'immediate' for alert in alerts) else 'normal',
+                'read': False,
+                'created_at': now,
+                'related_protest_id': protest_id,
+                'related_alert_id': alerts[0]['id'],
+                'action_url': f'/protests/{protest_id}',
+                'metadata': {
+                    'alert_ids': [str(alert['id']) for alert in alerts],
+                    'alert_names': [alert['name'] for alert in alerts],
+                    'matched_on': sorted({criterion for _, matched_on in user_matches for criterion in matched_on})
+                }
+            })
+        return notifications
+
+    def get_info(self) -> Dict:
+        """Index size and counters for health endpoints"""
+        return {
+            **self.stats,
+            'alerts_indexed': len(self._compiled),
+            'index_keys': len(self._postings),
+            'synced_until': self._synced_until.isoformat() if self._synced_until else None
+        }
+
+
+# Global alert matching engine instance
+alert_matching_engine_instance = None
+
+def get_alert_matching_engine():
+    """Get or create alert matching engine instance"""
+    global alert_matching_engine_instance
+    if alert_matching_engine_instance is None:
+        alert_matching_engine_instance = AlertMatchingEngine()
+    return alert_matching_engine_instance
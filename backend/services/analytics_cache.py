@@ -0,0 +1,153 @@
+import json
+import hashlib
+import os
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.query_cache import normalize_request_args
+
+logger = logging.getLogger(__name__)
+
+# Fresh lifetime per granularity; coarser buckets change less between requests
+GRANULARITY_TTLS = {
+    'daily': int(os.getenv('ANALYTICS_CACHE_DAILY_TTL_SECONDS', 300)),
+    'weekly': int(os.getenv('ANALYTICS_CACHE_WEEKLY_TTL_SECONDS', 900)),
+    'monthly': int(os.getenv('ANALYTICS_CACHE_MONTHLY_TTL_SECONDS', 3600))
+}
+DEFAULT_TTL = int(os.getenv('ANALYTICS_CACHE_DEFAULT_TTL_SECONDS', 600))
+
+# Expired entries are still served (and refreshed in the background) for ttl * this
+STALE_MULTIPLIER = float(os.getenv('ANALYTICS_CACHE_STALE_MULTIPLIER', 6))
+
+
+class AnalyticsResponseCache:
+    """
+    Response cache for analytics endpoints with stale-while-revalidate.
+    Entries are fresh for a granularity-dependent TTL, then stale for a longer
+    window during which they are still served while one background refresh
+    recomputes them. Unlike the protest query cache, entries are not dropped
+    on every protest write: dashboard numbers may lag by up to one TTL.
+    Concurrent misses for the same key wait for a single computation.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv('ANALYTICS_CACHE_MAX_ENTRIES', 512))
+        self.enabled = os.getenv('ANALYTICS_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._entries = OrderedDict()  # key -> (fresh_until, stale_until, value)
+        self._refreshing = {}  # key -> Event set when the computation finishes
+        self._lock = threading.Lock()
+
+        self.stats = defaultdict(lambda: {'hits': 0, 'stale_hits': 0, 'misses': 0,
+                                          'refreshes': 0, 'refresh_failures': 0})
+
+    def ttl_for(self, granularity: Optional[str]) -> int:
+        """Fresh TTL in seconds for a granularity"""
+        return GRANULARITY_TTLS.get(granularity, DEFAULT_TTL)
+
+    def make_key(self, endpoint: str, args, role: str) -> str:
+        """Cache key for an endpoint, its normalized query args and the caller's role"""
+        raw = json.dumps({'args': normalize_request_args(args), 'role': role}, sort_keys=True)
+        return f"{endpoint}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def lookup(self, endpoint: str, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Get (value, 'fresh' | 'stale') or (None, None) on miss, recording metrics"""
+        if not self.enabled:
+            return None, None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                fresh_until, stale_until, value = entry
+                if now < fresh_until:
+                    self._entries.move_to_end(key)
+                    self.stats[endpoint]['hits'] += 1
+                    return value, 'fresh'
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    self.stats[endpoint]['stale_hits'] += 1
+                    return value, 'stale'
+                del self._entries[key]
+
+            self.stats[endpoint]['misses'] += 1
+            return None, None
+
+    def store(self, key: str, value: Any, ttl: int):
+        """Cache a JSON-serializable response body"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now + ttl, now + ttl * STALE_MULTIPLIER, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin_refresh(self, key: str) -> bool:
+        """Claim the right to recompute a key; False if another thread already is"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing[key] = threading.Event()
+            return True
+
+    def end_refresh(self, endpoint: str, key: str, success: bool, background: bool = False):
+        """Release a claimed key and wake any waiters"""
+        with self._lock:
+            event = self._refreshing.pop(key, None)
+            if background:
+                self.stats[endpoint]['refreshes' if success else 'refresh_failures'] += 1
+        if event:
+            event.set()
+
+    def wait_for_refresh(self, key: str, timeout: float = 30) -> bool:
+        """Wait for another thread's computation of a key to finish"""
+        with self._lock:
+            event = self._refreshing.get(key)
+        return event.wait(timeout) if event else True
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Per-endpoint hit/miss metrics for health endpoints"""
+        with self._lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self.stats.items()}
+            entries = len(self._entries)
+
+        totals = {'hits': 0, 'stale_hits': 0, 'misses': 0}
+        for counts in endpoints.values():
+            for name in totals:
+                totals[name] += counts[name]
+        lookups = sum(totals.values())
+
+        return {
+            **totals,
+            'hit_rate': round((totals['hits'] + totals['stale_hits']) / lookups, 3) if lookups else 0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': {**GRANULARITY_TTLS, 'default': DEFAULT_TTL},
+            'endpoints': endpoints
+        }
+
+
+# Global analytics cache instance
+analytics_cache_instance = None
+
+def get_analytics_cache():
+    """Get or create analytics response cache instance"""
+    global analytics_cache_instance
+    if analytics_cache_instance is None:
+        analytics_cache_instance = AnalyticsResponseCache()
+    return analytics_cache_instance
@@ -0,0 +1,334 @@
+import os
+import sys
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest, ProtestAnalyticsRollup
+from models.config_models import ServiceConfig
+
+logger = logging.getLogger(__name__)
+
+DAY_FORMAT = '%Y-%m-%d'
+
+# Rollup dimension -> (protest field, whether the field is an array)
+ROLLUP_DIMENSIONS = {
+    'total': (None, False),
+    'status': ('$status', False),
+    'verification': ('$verification_status', False),
+    'country': ('$source_metadata.country', False),
+    'category': ('$categories', True),
+    'source': ('$data_sources', True)
+}
+
+ACTIVE_STATUSES = ['active', 'ongoing']
+HIGH_QUALITY_THRESHOLD = 0.8
+
+# Additive measures stored on every rollup row
+SUM_MEASURES = [
+    'count', 'quality_sum', 'quality_count', 'high_quality_count', 'trending_sum', 'trending_count',
+    'verified_count', 'active_count', 'featured_count', 'views', 'shares', 'bookmarks'
+]
+
+# Days refreshed per aggregation so the $or of day ranges stays small
+REFRESH_DAY_BATCH = 100
+
+
+def _is_set(field: str) -> Dict:
+    """Aggregation expression that is 1 when a field holds a non-null value"""
+    return {'$cond': [{'$gt': [{'$ifNull': [field, None]}, None]}, 1, 0]}
+
+
+ROLLUP_GROUP_MEASURES = {
+    'count': {'$sum': 1},
+    'quality_sum': {'$sum': '$data_quality_score'},
+    'quality_count': {'$sum': _is_set('$data_quality_score')},
+    'quality_min': {'$min': '$data_quality_score'},
+    'quality_max': {'$max': '$data_quality_score'},
+    'high_quality_count': {
+        '$sum': {'$cond': [{'$gte': ['$data_quality_score', HIGH_QUALITY_THRESHOLD]}, 1, 0]}
+    },
+    'trending_sum': {'$sum': '$trending_score'},
+    'trending_count': {'$sum': _is_set('$trending_score')},
+    'verified_count': {'$sum': {'$cond': [{'$eq': ['$verification_status', 'verified']}, 1, 0]}},
+    'active_count': {'$sum': {'$cond': [{'$in': ['$status', ACTIVE_STATUSES]}, 1, 0]}},
+    'featured_count': {'$sum': {'$cond': [{'$eq': ['$featured', True]}, 1, 0]}},
+    'views': {'$sum': '$engagement_metrics.views'},
+    'shares': {'$sum': '$engagement_metrics.shares'},
+    'bookmarks': {'$sum': '$engagement_metrics.bookmarks'}
+}
+
+
+def day_key(value: Optional[datetime]) -> Optional[str]:
+    """Rollup day for a protest start date"""
+    return value.strftime(DAY_FORMAT) if isinstance(value, datetime) else None
+
+
+class AnalyticsRollups:
+    """
+    Materialized per-day analytics over public protests.
+    Each rollup row holds additive measures (counts, score sums, engagement totals)
+    for one day and one value of a dimension (status, verification, country,
+    category, data source, or the overall total), so dashboard endpoints read
+    O(days x values) rows instead of aggregating the protests collection.
+    Days touched by protest inserts and merges, or by engagement updates, are
+    recomputed with $group + $merge; a periodic full refresh picks up drift such
+    as trending score decay.
+    """
+
+    SERVICE_NAME = 'analytics_rollups'
+
+    def __init__(self):
+        self.protest = Protest()
+        self.rollups = ProtestAnalyticsRollup()
+        self.service_config = ServiceConfig()
+
+        self._dirty_days = set()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ready = False
+        self._merge_supported = True
+
+        try:
+            self.rollups.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure analytics rollup indexes: {e}")
+
+    # ---- Refresh ----
+
+    def mark_days_dirty(self, dates: Iterable[Optional[datetime]]):
+        """Queue the days of changed protests for the next refresh"""
+        days = {day_key(value) for value in dates} - {None}
+        if days:
+            with self._lock:
+                self._dirty_days.update(days)
+
+    def _dimension_pipeline(self, dimension: str, match: Dict, refreshed_at: datetime) -> List[Dict]:
+        field, is_array = ROLLUP_DIMENSIONS[dimension]
+
+        pipeline = [{'$match': match}]
+        if is_array:
+            pipeline.append({'$unwind': field})
+
+        pipeline.extend([
+            {
+                '$group': {
+                    '_id': {
+                        'day': {'$dateToString': {'format': DAY_FORMAT, 'date': '$start_date'}},
+                        'key': field
+                    },
+                    **ROLLUP_GROUP_MEASURES
+                }
+            },
+            {
+                '$project': {
+                    '_id': {'day': '$_id.day', 'dimension': {'$literal': dimension}, 'key': '$_id.key'},
+                    'day': '$_id.day',
+                    'dimension': {'$literal': dimension},
+                    'key': '$_id.key',
+                    'quality_min': 1,
+                    'quality_max': 1,
+                    'refreshed_at': {'$literal': refreshed_at},
+                    **{measure: 1 for measure in SUM_MEASURES}
+                }
+            }
+        ])
+        return pipeline
+
+    def _write_dimension(self, dimension: str, match: Dict, refreshed_at: datetime):
+        """Recompute one dimension for the matched protests and upsert the rows"""
+        pipeline = self._dimension_pipeline(dimension, match, refreshed_at)
+
+        if self._merge_supported:
+            try:
+                self.protest.collection.aggregate(pipeline + [{
+                    '$merge': {
+                        'into': self.rollups.collection_name,
+                        'on': '_id',
+                        'whenMatched': 'replace',
+                        'whenNotMatched': 'insert'
+                    }
+                }])
+                return
+            except Exception as e:
+                # $merge needs MongoDB 4.2+; fall back to writing the rows from the client
+                logger.warning(f"$merge unavailable for analytics rollups, using bulk upserts: {e}")
+                self._merge_supported = False
+
+        self.rollups.replace_rows(list(self.protest.collection.aggregate(pipeline)))
+
+    def _refresh_match(self, days: Optional[List[str]]) -> Dict:
+        match = {'visibility': 'public', 'start_date': {'$type': 'date'}}
+        if days is not None:
+            ranges = []
+            for day in days:
+                start = datetime.strptime(day, DAY_FORMAT)
+                ranges.append({'start_date': {'$gte': start, '$lt': start + timedelta(days=1)}})
+            match['$or'] = ranges
+        return match
+
+    def refresh_days(self, days: Optional[List[str]] = None) -> Optional[int]:
+        """Recompute the given days, or every day when days is None"""
+        refreshed_at = datetime.now()
+
+        if days is None:
+            for dimension in ROLLUP_DIMENSIONS:
+                self._write_dimension(dimension, self._refresh_match(None), refreshed_at)
+            self.rollups.delete_stale(refreshed_at)
+            return None
+
+        days = sorted(set(days))
+        for i in range(0, len(days), REFRESH_DAY_BATCH):
+            batch = days[i:i + REFRESH_DAY_BATCH]
+            for dimension in ROLLUP_DIMENSIONS:
+                self._write_dimension(dimension, self._refresh_match(batch), refreshed_at)
+            # Drop rows for values that no longer occur on these days
+            self.rollups.delete_stale(refreshed_at, batch)
+        return len(days)
+
+    def _changed_days_since(self, since: datetime) -> List[str]:
+        """Days of protests updated or engaged with since a point in time"""
+        pipeline = [
+            {
+                '$match': {
+                    'start_date': {'$type': 'date'},
+                    '$or': [
+                        {'updated_at': {'$gte': since}},
+                        {'engagement_updated_at': {'$gte': since}}
+                    ]
+                }
+            },
+            {'$group': {'_id': {'$dateToString': {'format': DAY_FORMAT, 'date': '$start_date'}}}}
+        ]
+        return [item['_id'] for item in self.protest.collection.aggregate(pipeline)]
+
+    def refresh(self, full: bool = False) -> Dict:
+        """Refresh changed days since the last run, or rebuild everything when full or never built"""
+        with self._refresh_lock:
+            started = datetime.now()
+            last_refresh = self.service_config.get_config(self.SERVICE_NAME, 'last_refresh_at')
+
+            with self._lock:
+                dirty_days = self._dirty_days
+                self._dirty_days = set()
+
+            try:
+                if full or not last_refresh:
+                    mode = 'full'
+                    days_refreshed = self.refresh_days(None)
+                else:
+                    mode = 'incremental'
+                    days = dirty_days.union(self._changed_days_since(datetime.fromisoformat(last_refresh)))
+                    days_refreshed = self.refresh_days(list(days)) if days else 0
+            except Exception:
+                # Keep the queued days for the next attempt
+                with self._lock:
+                    self._dirty_days.update(dirty_days)
+                raise
+
+            self.service_config.set_config(
+                self.SERVICE_NAME, 'last_refresh_at', started.isoformat(),
+                description='Start time of the last completed analytics rollup refresh'
+            )
+            self._ready = True
+
+            elapsed = (datetime.now() - started).total_seconds()
+            logger.info(f"Analytics rollups ({mode}) refreshed {days_refreshed if days_refreshed is not None else 'all'} days in {elapsed:.1f}s")
+
+            return {'mode': mode, 'days_refreshed': days_refreshed, 'elapsed_seconds': round(elapsed, 2)}
+
+    def is_ready(self) -> bool:
+        """Whether the rollups have been built at least once"""
+        if not self._ready:
+            try:
+                self._ready = bool(self.service_config.get_config(self.SERVICE_NAME, 'last_refresh_at'))
+            except Exception as e:
+                logger.warning(f"Could not check analytics rollup state: {e}")
+        return self._ready
+
+    # ---- Reads ----
+
+    def _rows(self, dimension: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+        return self.rollups.get_rows(dimension, day_key(start_date), day_key(end_date))
+
+    @staticmethod
+    def _combine(rows: Iterable[Dict]) -> Dict:
+        """Sum additive measures across rows and derive averages"""
+        combined = {measure: 0 for measure in SUM_MEASURES}
+        quality_min = None
+        quality_max = None
+
+        for row in rows:
+            for measure in SUM_MEASURES:
+                combined[measure] += row.get(measure) or 0
+            if row.get('quality_min') is not None:
+                quality_min = row['quality_min'] if quality_min is None else min(quality_min, row['quality_min'])
+            if row.get('quality_max') is not None:
+                quality_max = row['quality_max'] if quality_max is None else max(quality_max, row['quality_max'])
+
+        count = combined['count']
+        return {
+            'protest_count': count,
+            'avg_quality_score': combined['quality_sum'] / combined['quality_count'] if combined['quality_count'] else 0,
+            'min_quality': quality_min or 0,
+            'max_quality': quality_max or 0,
+            'high_quality_count': combined['high_quality_count'],
+            'avg_trending_score': combined['trending_sum'] / combined['trending_count'] if combined['trending_count'] else 0,
+            'verified_count': combined['verified_count'],
+            'active_count': combined['active_count'],
+            'featured_count': combined['featured_count'],
+            'total_views': combined['views'],
+            'total_shares': combined['shares'],
+            'total_bookmarks': combined['bookmarks'],
+            'avg_views': combined['views'] / count if count else 0,
+            'avg_shares': combined['shares'] / count if count else 0,
+            'avg_bookmarks': combined['bookmarks'] / count if count else 0
+        }
+
+    def _group_rows(self, rows: Iterable[Dict], key_func) -> Dict:
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(key_func(row), []).append(row)
+        return {key: self._combine(group) for key, group in grouped.items()}
+
+    def totals(self, start_date: datetime, end_date: datetime) -> Dict:
+        """Overall measures for a date range"""
+        return self._combine(self._rows('total', start_date, end_date))
+
+    def breakdown(self, dimension: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Measures per dimension value for a date range, largest first"""
+        grouped = self._group_rows(self._rows(dimension, start_date, end_date), lambda row: row.get('key'))
+        results = [{'_id': key, **measures} for key, measures in grouped.items()]
+        results.sort(key=lambda item: item['protest_count'], reverse=True)
+        return results
+
+    def time_series(self, start_date: datetime, end_date: datetime, date_format: str,
+                    dimension: str = 'total') -> List[Dict]:
+        """Measures per period (and per dimension value unless dimension is 'total'), oldest first"""
+        def period_of(row):
+            period = datetime.strptime(row['day'], DAY_FORMAT).strftime(date_format)
+            return period if dimension == 'total' else (row.get('key'), period)
+
+        grouped = self._group_rows(self._rows(dimension, start_date, end_date), period_of)
+        if dimension == 'total':
+            results = [{'_id': period, **measures} for period, measures in grouped.items()]
+            results.sort(key=lambda item: item['_id'])
+        else:
+            results = [{'_id': {'key': key, 'period': period}, **measures} for (key, period), measures in grouped.items()]
+            results.sort(key=lambda item: (item['_id']['period'], -item['protest_count']))
+        return results
+
+
+# Global analytics rollups instance
+analytics_rollups_instance = None
+
+def get_analytics_rollups():
+    """Get or create analytics rollups instance"""
+    global analytics_rollups_instance
+    if analytics_rollups_instance is None:
+        analytics_rollups_instance = AnalyticsRollups()
+    return analytics_rollups_instance
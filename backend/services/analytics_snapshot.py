@@ -0,0 +1,499 @@
+import os
+import sys
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ReadPreference
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest
+
+logger = logging.getLogger(__name__)
+
+# Rebuild the in-memory snapshot from MongoDB when it is older than this
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS', 900))
+
+# Optional .npz file written by the collector; web workers load it instead of querying MongoDB
+SNAPSHOT_PATH = os.getenv('ANALYTICS_SNAPSHOT_PATH')
+
+MAX_RESULT_GROUPS = 1000
+
+SNAPSHOT_PROJECTION = {
+    'start_date': 1, 'data_quality_score': 1, 'trending_score': 1,
+    'engagement_metrics.views': 1, 'engagement_metrics.shares': 1, 'engagement_metrics.bookmarks': 1,
+    'location.coordinates': 1, 'source_metadata.country': 1, 'categories': 1,
+    'status': 1, 'verification_status': 1
+}
+
+# Numeric columns that metrics can aggregate
+NUMERIC_COLUMNS = ['quality', 'trending', 'views', 'shares', 'bookmarks', 'lng', 'lat']
+
+# Dictionary-encoded columns that filters and group-bys can use
+DICTIONARY_COLUMNS = {'country': 'countries', 'status': 'statuses', 'verification_status': 'verification_statuses'}
+
+TIME_GROUPS = {'day': '%Y-%m-%d', 'week': '%Y-W%U', 'month': '%Y-%m', 'year': '%Y'}
+
+
+class SnapshotQueryError(ValueError):
+    """Raised for invalid snapshot filters, group-bys or metrics"""
+
+
+def _encode(values: List[Optional[str]]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode strings into int32 codes (-1 for missing)"""
+    dictionary = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        codes[i] = -1 if value in (None, '') else dictionary.setdefault(value, len(dictionary))
+    return codes, list(dictionary)
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+class ProtestSnapshot:
+    """
+    Immutable columnar copy of public protests for research queries.
+    Numeric fields are NumPy arrays (NaN when missing), start dates are
+    datetime64, and strings are dictionary-encoded as int32 codes. Categories
+    are multi-valued, so they are stored as a flat code array with per-row
+    offsets (CSR). Filters become boolean masks and group-bys become
+    np.unique + np.bincount, so queries never touch MongoDB.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, List[str]], built_at: datetime):
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.built_at = built_at
+        self.size = len(columns['ids'])
+
+        # Row number for every entry of the flat category array
+        self.category_rows = np.repeat(np.arange(self.size), np.diff(columns['category_offsets']))
+
+    # ---- Building, saving and loading ----
+
+    @classmethod
+    def from_cursor(cls, cursor) -> 'ProtestSnapshot':
+        ids, starts, quality, trending = [], [], [], []
+        views, shares, bookmarks, lngs, lats = [], [], [], [], []
+        countries, statuses, verifications = [], [], []
+        category_offsets, category_values = [0], []
+
+        for protest in cursor:
+            ids.append(str(protest['_id']))
+            start_date = protest.get('start_date')
+            starts.append(np.datetime64(start_date, 's') if isinstance(start_date, datetime) else np.datetime64('NaT'))
+            quality.append(_number(protest.get('data_quality_score')))
+            trending.append(_number(protest.get('trending_score')))
+
+            engagement = protest.get('engagement_metrics') or {}
+            views.append(_number(engagement.get('views')))
+            shares.append(_number(engagement.get('shares')))
+            bookmarks.append(_number(engagement.get('bookmarks')))
+
+            coordinates = (protest.get('location') or {}).get('coordinates') or []
+            if len(coordinates) == 2 and list(coordinates) != [0, 0]:
+                lngs.append(_number(coordinates[0]))
+                lats.append(_number(coordinates[1]))
+            else:
+                lngs.append(np.nan)
+                lats.append(np.nan)
+
+            countries.append((protest.get('source_metadata') or {}).get('country'))
+            statuses.append(protest.get('status'))
+            verifications.append(protest.get('verification_status'))
+
+            protest_categories = [category for category in protest.get('categories') or [] if category]
+            category_values.extend(protest_categories)
+            category_offsets.append(category_offsets[-1] + len(protest_categories))
+
+        country_codes, country_dictionary = _encode(countries)
+        status_codes, status_dictionary = _encode(statuses)
+        verification_codes, verification_dictionary = _encode(verifications)
+        category_codes, category_dictionary = _encode(category_values)
+
+        columns = {
+            'ids': np.array(ids, dtype=str),
+            'start_date': np.array(starts, dtype='datetime64[s]'),
+            'quality': np.array(quality, dtype=np.float64),
+            'trending': np.array(trending, dtype=np.float64),
+            'views': np.array(views, dtype=np.float64),
+            'shares': np.array(shares, dtype=np.float64),
+            'bookmarks': np.array(bookmarks, dtype=np.float64),
+            'lng': np.array(lngs, dtype=np.float64),
+            'lat': np.array(lats, dtype=np.float64),
+            'country': country_codes,
+            'status': status_codes,
+            'verification_status': verification_codes,
+            'category_offsets': np.array(category_offsets, dtype=np.int64),
+            'category_codes': category_codes
+        }
+        dictionaries = {
+            'countries': country_dictionary,
+            'statuses': status_dictionary,
+            'verification_statuses': verification_dictionary,
+            'categories': category_dictionary
+        }
+        return cls(columns, dictionaries, datetime.now())
+
+    def save(self, path: str):
+        """Write the snapshot as a compressed .npz (atomically replaced)"""
+        arrays = dict(self.columns)
+        for name, values in self.dictionaries.items():
+            arrays[f'dictionary_{name}'] = np.array(values, dtype=str)
+        arrays['built_at'] = np.array(self.built_at.isoformat())
+
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(temp_path, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ProtestSnapshot':
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files
+                       if not name.startswith('dictionary_') and name != 'built_at'}
+            dictionaries = {name[len('dictionary_'):]: data[name].tolist()
+                            for name in data.files if name.startswith('dictionary_')}
+            built_at = datetime.fromisoformat(str(data['built_at']))
+        return cls(columns, dictionaries, built_at)
+
+    # ---- Filtering ----
+
+    def _codes_for(self, dictionary_name: str, values) -> np.ndarray:
+        if isinstance(values, str):
+            values = [values]
+        lookup = {value: code for code, value in enumerate(self.dictionaries[dictionary_name])}
+        return np.array([lookup[value] for value in values if value in lookup], dtype=np.int32)
+
+    def _parse_date(self, value, name: str) -> np.datetime64:
+        try:
+            return np.datetime64(datetime.fromisoformat(str(value)), 's')
+        except ValueError:
+            raise SnapshotQueryError(f"{name} must be an ISO date")
+
+    def filter_mask(self, filters: Dict) -> np.ndarray:
+        """Boolean row mask for a filter spec"""
+        columns = self.columns
+        mask = np.ones(self.size, dtype=bool)
+
+        if 'period_days' in filters:
+            try:
+                period_days = int(filters['period_days'])
+            except (TypeError, ValueError):
+                raise SnapshotQueryError("period_days must be an integer")
+            mask &= columns['start_date'] >= np.datetime64(datetime.utcnow() - timedelta(days=period_days), 's')
+        if 'start_date_from' in filters:
+            mask &= columns['start_date'] >= self._parse_date(filters['start_date_from'], 'start_date_from')
+        if 'start_date_to' in filters:
+            mask &= columns['start_date'] <= self._parse_date(filters['start_date_to'], 'start_date_to')
+
+        for column, bound, compare in (('quality', 'min_quality', np.greater_equal),
+                                       ('quality', 'max_quality', np.less_equal)):
+            if bound in filters:
+                try:
+                    mask &= compare(columns[column], float(filters[bound]))
+                except (TypeError, ValueError):
+                    raise SnapshotQueryError(f"{bound} must be a number")
+
+        for column, dictionary_name in DICTIONARY_COLUMNS.items():
+            if dictionary_name in filters:
+                mask &= np.isin(columns[column], self._codes_for(dictionary_name, filters[dictionary_name]))
+
+        if 'categories' in filters:
+            wanted = np.isin(columns['category_codes'], self._codes_for('categories', filters['categories']))
+            category_mask = np.zeros(self.size, dtype=bool)
+            category_mask[self.category_rows[wanted]] = True
+            mask &= category_mask
+
+        if filters.get('has_coordinates'):
+            mask &= ~np.isnan(columns['lng'])
+
+        if 'bbox' in filters:
+            try:
+                west, south, east, north = (float(value) for value in filters['bbox'])
+            except (TypeError, ValueError):
+                raise SnapshotQueryError("bbox must be [west, south, east, north]")
+            # NaN coordinates compare False, so protests without a location drop out
+            mask &= (columns['lng'] >= west) & (columns['lng'] <= east)
+            mask &= (columns['lat'] >= south) & (columns['lat'] <= north)
+
+        return mask
+
+    # ---- Group-by ----
+
+    def _group_key(self, name: str, rows: np.ndarray, exploded_categories: Optional[np.ndarray]):
+        """Per-row int codes and their labels for one group-by key"""
+        if name == 'category':
+            return exploded_categories, self.dictionaries['categories']
+
+        if name in DICTIONARY_COLUMNS:
+            codes = self.columns[name][rows]
+            labels = self.dictionaries[DICTIONARY_COLUMNS[name]] + [None]
+            return np.where(codes < 0, len(labels) - 1, codes), labels
+
+        if name in TIME_GROUPS:
+            days = self.columns['start_date'][rows].astype('datetime64[D]')
+            unique_days, day_index = np.unique(days, return_inverse=True)
+            day_labels = np.array([
+                None if np.isnat(day) else day.astype(datetime).strftime(TIME_GROUPS[name])
+                for day in unique_days
+            ], dtype=object)
+            labels, label_index = np.unique(day_labels.astype(str), return_inverse=True)
+            labels = [None if label == 'None' else label for label in labels.tolist()]
+            return label_index[day_index], labels
+
+        if name == 'quality_bucket':
+            # Tenths of the quality score, e.g. "0.8-0.9"
+            buckets = np.floor(np.nan_to_num(self.columns['quality'][rows], nan=-0.1) * 10).astype(np.int64)
+            buckets = np.clip(buckets, -1, 9)
+            labels = [None] + [f"{i / 10:.1f}-{(i + 1) / 10:.1f}" for i in range(10)]
+            return buckets + 1, labels
+
+        raise SnapshotQueryError(f"Unsupported group_by '{name}'")
+
+    def _metric(self, spec: str, rows: np.ndarray, groups: np.ndarray, group_count: int) -> np.ndarray:
+        """Compute one metric per group; specs are count, verified_count, active_count or op:column"""
+        if spec == 'count':
+            return np.bincount(groups, minlength=group_count).astype(np.float64)
+        if spec in ('verified_count', 'active_count'):
+            if spec == 'verified_count':
+                flags = np.isin(self.columns['verification_status'][rows], self._codes_for('verification_statuses', ['verified']))
+            else:
+                flags = np.isin(self.columns['status'][rows], self._codes_for('statuses', ['active', 'ongoing']))
+            return np.bincount(groups, weights=flags, minlength=group_count)
+
+        operation, _, column = spec.partition(':')
+        if column not in NUMERIC_COLUMNS:
+            raise SnapshotQueryError(f"Unsupported metric '{spec}'")
+
+        values = self.columns[column][rows]
+        present = ~np.isnan(values)
+
+        if operation in ('sum', 'avg'):
+            sums = np.bincount(groups, weights=np.where(present, values, 0.0), minlength=group_count)
+            if operation == 'sum':
+                return sums
+            counts = np.bincount(groups, weights=present, minlength=group_count)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(counts > 0, sums / counts, np.nan)
+
+        if operation in ('min', 'max'):
+            result = np.full(group_count, np.nan)
+            (np.fmin if operation == 'min' else np.fmax).at(result, groups, values)
+            return result
+
+        raise SnapshotQueryError(f"Unsupported metric '{spec}'")
+
+    def query(self, filters: Dict = None, group_by: List[str] = None, metrics: Dict[str, str] = None,
+              sort: str = None, limit: int = MAX_RESULT_GROUPS) -> List[Dict]:
+        """
+        Filter, group and aggregate the snapshot.
+        metrics maps output names to specs (e.g. {'avg_views': 'avg:views'}); each
+        result has '_id' (the group label, a dict for several keys) plus one field
+        per metric. Groups are ordered by time key, or by count descending.
+        """
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        metrics = metrics or {'count': 'count'}
+        if not isinstance(metrics, dict) or not all(isinstance(spec, str) for spec in metrics.values()):
+            raise SnapshotQueryError("metrics must map output names to metric specs")
+        if not isinstance(filters or {}, dict):
+            raise SnapshotQueryError("filters must be an object")
+
+        mask = self.filter_mask(filters or {})
+
+        exploded_categories = None
+        if 'category' in group_by:
+            # One entry per (protest, category) pair
+            selected = mask[self.category_rows]
+            rows = self.category_rows[selected]
+            exploded_categories = self.columns['category_codes'][selected]
+        else:
+            rows = np.flatnonzero(mask)
+
+        if group_by:
+            keys = [self._group_key(name, rows, exploded_categories) for name in group_by]
+            if len(rows):
+                unique_keys, groups = np.unique(np.stack([codes for codes, _ in keys], axis=1), axis=0, return_inverse=True)
+                groups = groups.reshape(-1)
+            else:
+                unique_keys, groups = np.empty((0, len(keys)), dtype=np.int64), np.empty(0, dtype=np.int64)
+            group_count = len(unique_keys)
+        else:
+            if not len(rows):
+                return []
+            groups = np.zeros(len(rows), dtype=np.int64)
+            group_count = 1
+
+        values = {name: self._metric(spec, rows, groups, group_count) for name, spec in metrics.items()}
+        counts = np.bincount(groups, minlength=group_count)
+
+        results = []
+        for group in range(group_count):
+            if group_by:
+                labels = [keys[k][1][unique_keys[group][k]] for k in range(len(group_by))]
+                group_id = labels[0] if len(group_by) == 1 else dict(zip(group_by, labels))
+            else:
+                group_id = None
+
+            item = {'_id': group_id}
+            for name, column in values.items():
+                value = float(column[group])
+                if np.isnan(value):
+                    item[name] = None
+                elif metrics[name] in ('count', 'verified_count', 'active_count') or metrics[name].startswith('sum:'):
+                    item[name] = int(value) if value.is_integer() else value
+                else:
+                    item[name] = value
+            item['_count'] = int(counts[group])
+            results.append(item)
+
+        time_keys = [name for name in group_by if name in TIME_GROUPS]
+        if sort in values:
+            results.sort(key=lambda item: (item[sort] is None, -(item[sort] or 0)))
+        elif time_keys and len(group_by) == 1:
+            results.sort(key=lambda item: (item['_id'] is None, item['_id'] or ''))
+        else:
+            results.sort(key=lambda item: -item['_count'])
+
+        for item in results:
+            del item['_count']
+        return results[:min(limit or MAX_RESULT_GROUPS, MAX_RESULT_GROUPS)]
+
+    def rows(self, filters: Dict = None, limit: int = 500) -> List[Dict]:
+        """Individual protests matching a filter, with coordinates, quality and categories"""
+        matched = np.flatnonzero(self.filter_mask(filters or {}))[:limit]
+        columns = self.columns
+        offsets = columns['category_offsets']
+        categories = self.dictionaries['categories']
+
+        results = []
+        for row in matched:
+            quality = float(columns['quality'][row])
+            lng, lat = float(columns['lng'][row]), float(columns['lat'][row])
+            results.append({
+                '_id': str(columns['ids'][row]),
+                'coordinates': None if np.isnan(lng) else [lng, lat],
+                'data_quality_score': None if np.isnan(quality) else quality,
+                'categories': [categories[code] for code in columns['category_codes'][offsets[row]:offsets[row + 1]]]
+            })
+        return results
+
+    def get_info(self) -> Dict:
+        return {
+            'protests': self.size,
+            'built_at': self.built_at.isoformat(),
+            'categories': len(self.dictionaries['categories']),
+            'countries': len(self.dictionaries['countries']),
+            'memory_bytes': int(sum(array.nbytes for array in self.columns.values()))
+        }
+
+
+class AnalyticsSnapshotStore:
+    """
+    Holds the current ProtestSnapshot and replaces it in the background.
+    When ANALYTICS_SNAPSHOT_PATH is set the snapshot is loaded from the file
+    the collector exports; otherwise it is built from a secondary-preferred
+    read of the protests collection. A stale snapshot keeps serving queries
+    while its replacement is built.
+    """
+
+    def __init__(self, path: str = None, max_age_seconds: int = None):
+        self.path = path or SNAPSHOT_PATH
+        self.max_age_seconds = max_age_seconds or SNAPSHOT_MAX_AGE_SECONDS
+        self.protest = Protest()
+
+        self._snapshot = None
+        self._loaded_mtime = None
+        self._file_backed = False
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._last_check = 0.0
+
+    def build(self) -> ProtestSnapshot:
+        """Build a snapshot from MongoDB, reading from a secondary when one is available"""
+        started = time.time()
+        collection = self.protest.collection.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+        cursor = collection.find({'visibility': 'public'}, SNAPSHOT_PROJECTION).batch_size(10000)
+        snapshot = ProtestSnapshot.from_cursor(cursor)
+        logger.info(f"Built analytics snapshot of {snapshot.size} protests in {time.time() - started:.1f}s")
+        return snapshot
+
+    def export(self) -> Dict:
+        """Build a snapshot and write it to ANALYTICS_SNAPSHOT_PATH"""
+        if not self.path:
+            return {'skipped': 'ANALYTICS_SNAPSHOT_PATH is not set'}
+        snapshot = self.build()
+        snapshot.save(self.path)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot.get_info()
+
+    def _load_file_if_changed(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime != self._loaded_mtime:
+            snapshot = ProtestSnapshot.load(self.path)
+            with self._lock:
+                self._snapshot = snapshot
+                self._loaded_mtime = mtime
+        return True
+
+    def _rebuild_in_background(self):
+        def rebuild():
+            try:
+                snapshot = self.build()
+                with self._lock:
+                    self._snapshot = snapshot
+            except Exception as e:
+                logger.error(f"Analytics snapshot rebuild failed: {e}")
+            finally:
+                self._rebuilding = False
+
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=rebuild, daemon=True).start()
+
+    def get(self) -> ProtestSnapshot:
+        """Current snapshot, building the first one synchronously"""
+        now = time.time()
+        if self.path and now - self._last_check > 30:
+            self._last_check = now
+            try:
+                self._file_backed = self._load_file_if_changed()
+            except Exception as e:
+                logger.warning(f"Could not load analytics snapshot file {self.path}: {e}")
+                self._file_backed = False
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self.build()
+                return self._snapshot
+
+        # File-backed snapshots are refreshed by the collector's export instead
+        age = (datetime.now() - snapshot.built_at).total_seconds()
+        if age > self.max_age_seconds and not self._file_backed:
+            self._rebuild_in_background()
+        return snapshot
+
+
+# Global analytics snapshot store instance
+analytics_snapshot_store_instance = None
+
+def get_analytics_snapshot_store():
+    """Get or create analytics snapshot store instance"""
+    global analytics_snapshot_store_instance
+    if analytics_snapshot_store_instance is None:
+        analytics_snapshot_store_instance = AnalyticsSnapshotStore()
+    return analytics_snapshot_store_instance
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fields of a user document that auth_required needs
+PRINCIPAL_FIELDS = ('_id', 'status', 'user_type_id', 'username', 'email', 'verified')
+
+
+class AuthCache:
+    """
+    In-process caches for auth_required.
+    Decoded JWT payloads are kept by token hash for a bounded time (never past
+    the token's own exp), so repeated requests skip signature verification.
+    User principals (status, role and identity fields) are kept for a short TTL
+    so authenticated calls do not each pay a users lookup. Status, role and
+    password changes and session revocation invalidate a user's entries in the
+    process that makes them; other processes pick the change up within the
+    principal TTL.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+        self.token_ttl = int(os.getenv('AUTH_TOKEN_CACHE_TTL_SECONDS', 300))
+        self.principal_ttl = int(os.getenv('AUTH_PRINCIPAL_CACHE_TTL_SECONDS', 30))
+        self.enabled = os.getenv('AUTH_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._tokens = OrderedDict()  # token hash -> (expires_at, payload)
+        self._principals = OrderedDict()  # user id -> (expires_at, principal)
+        self._user_tokens = defaultdict(set)  # user id -> token hashes, for invalidation
+        self._lock = threading.Lock()
+
+        self.stats = {'token_hits': 0, 'token_misses': 0, 'principal_hits': 0,
+                      'principal_misses': 0, 'invalidations': 0}
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        """Cache key for a raw token (the token itself is never stored)"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def _evict(self, entries: OrderedDict):
+        while len(entries) > self.max_entries:
+            key, (_, value) = entries.popitem(last=False)
+            if entries is self._tokens:
+                self._forget_token(key, value)
+
+    def _forget_token(self, key: str, payload: Dict):
+        user_tokens = self._user_tokens.get(str(payload.get('user_id')))
+        if user_tokens is not None:
+            user_tokens.discard(key)
+            if not user_tokens:
+                del self._user_tokens[str(payload.get('user_id'))]
+
+    def get_token(self, token: str) -> Optional[Dict]:
+        """Cached decoded payload for a token, or None"""
+        if not self.enabled:
+            return None
+
+        key = self.token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry and now < entry[0]:
+                self._tokens.move_to_end(key)
+                self.stats['token_hits'] += 1
+                return entry[1]
+            if entry:
+                del self._tokens[key]
+                self._forget_token(key, entry[1])
+            self.stats['token_misses'] += 1
+            return None
+
+    def store_token(self, token: str, payload: Dict):
+        """Cache a successfully decoded payload until the TTL or the token's exp, whichever is first"""
+        if not self.enabled:
+            return
+
+        key = self.token_key(token)
+        expires_at = time.time() + self.token_ttl
+        if payload.get('exp'):
+            expires_at = min(expires_at, float(payload['exp']))
+
+        with self._lock:
+            self._tokens[key] = (expires_at, payload)
+            self._tokens.move_to_end(key)
+            self._user_tokens[str(payload.get('user_id'))].add(key)
+            self._evict(self._tokens)
+
+    def drop_token(self, token: str):
+        """Forget one token (e.g. on logout)"""
+        key = self.token_key(token)
+        with self._lock:
+            entry = self._tokens.pop(key, None)
+            if entry:
+                self._forget_token(key, entry[1])
+
+    def get_principal(self, user_id: str) -> Optional[Dict]:
+        """Cached principal for a user id, or None"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._principals.get(str(user_id))
+            if entry and now < entry[0]:
+                self.stats['principal_hits'] += 1
+                return entry[1]
+            if entry:
+                del self._principals[str(user_id)]
+            self.stats['principal_misses'] += 1
+            return None
+
+    def store_principal(self, user: Dict) -> Dict:
+        """Cache the auth fields of a user document and return them"""
+        principal = {field: user.get(field) for field in PRINCIPAL_FIELDS if field in user}
+        if not self.enabled:
+            return principal
+
+        with self._lock:
+            key = str(user['_id'])
+            self._principals[key] = (time.time() + self.principal_ttl, principal)
+            self._principals.move_to_end(key)
+            self._evict(self._principals)
+        return principal
+
+    def invalidate_user(self, user_id: str, keep_token: str = None):
+        """Drop a user's principal and cached tokens (optionally keeping the caller's own token)"""
+        keep_key = self.token_key(keep_token) if keep_token else None
+        with self._lock:
+            self._principals.pop(str(user_id), None)
+            for key in self._user_tokens.pop(str(user_id), set()):
+                if key == keep_key:
+                    continue
+                self._tokens.pop(key, None)
+            if keep_key and keep_key in self._tokens:
+                self._user_tokens[str(user_id)].add(keep_key)
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._tokens.clear()
+            self._principals.clear()
+            self._user_tokens.clear()
+
+    def get_stats(self) -> Dict:
+        """Hit/miss metrics for health endpoints"""
+        with self._lock:
+            stats = dict(self.stats)
+            tokens, principals = len(self._tokens), len(self._principals)
+
+        token_lookups = stats['token_hits'] + stats['token_misses']
+        principal_lookups = stats['principal_hits'] + stats['principal_misses']
+        return {
+            **stats,
+            'token_hit_rate': round(stats['token_hits'] / token_lookups, 3) if token_lookups else 0,
+            'principal_hit_rate': round(stats['principal_hits'] / principal_lookups, 3) if principal_lookups else 0,
+            'cached_tokens': tokens,
+            'cached_principals': principals,
+            'token_ttl_seconds': self.token_ttl,
+            'principal_ttl_seconds': self.principal_ttl,
+            'enabled': self.enabled
+        }
+
+
+# Global auth cache instance
+auth_cache_instance = None
+
+def get_auth_cache():
+    """Get or create auth cache instance"""
+    global auth_cache_instance
+    if auth_cache_instance is None:
+        auth_cache_instance = AuthCache()
+    return auth_cache_instance
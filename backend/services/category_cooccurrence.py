@@ -0,0 +1,327 @@
+import os
+import sys
+import time
+import threading
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest, ProtestCategoryCooccurrence
+from models.config_models import ServiceConfig
+from services.analytics_rollups import day_key
+
+logger = logging.getLogger(__name__)
+
+# Cell kinds: protest total per day, category pair (a <= b, a == b is the category count), category/country
+CELL_KINDS = ('total', 'category', 'country')
+
+# Changed cells are re-read this far behind the previous sync so writes racing a sync are not missed
+SYNC_OVERLAP_SECONDS = 5
+
+
+def protest_cells(protest: Optional[Dict]) -> Counter:
+    """Cells a public protest counts towards, as (day, kind, a, b) -> 1"""
+    cells = Counter()
+    if not protest or protest.get('visibility') != 'public':
+        return cells
+
+    day = day_key(protest.get('start_date'))
+    if day is None:
+        return cells
+
+    cells[(day, 'total', '', '')] += 1
+
+    categories = sorted({category for category in protest.get('categories') or [] if category})
+    for category in categories:
+        cells[(day, 'category', category, category)] += 1
+    for first, second in combinations(categories, 2):
+        cells[(day, 'category', first, second)] += 1
+
+    country = (protest.get('source_metadata') or {}).get('country')
+    if country:
+        for category in categories:
+            cells[(day, 'country', category, country)] += 1
+
+    return cells
+
+
+class CategoryCooccurrenceIndex:
+    """
+    Incrementally maintained category co-occurrence counts per day.
+    The collector applies +/-1 deltas to a sparse (day, category, category)
+    table as protests are created or merged, along with per-day category
+    vectors (the matrix diagonal), protest totals and category/country counts.
+    Web workers mirror the table in memory, pulling only changed cells, and
+    answer co-occurrence and correlation queries for any day range with NumPy.
+    A daily rebuild from the protests collection corrects drift from
+    visibility changes and edits made outside the collector.
+    """
+
+    SERVICE_NAME = 'category_cooccurrence'
+
+    def __init__(self, sync_interval_seconds: int = None):
+        self.sync_interval_seconds = sync_interval_seconds or int(os.getenv('CATEGORY_INDEX_SYNC_SECONDS', 30))
+        self.protest = Protest()
+        self.cells = ProtestCategoryCooccurrence()
+        self.service_config = ServiceConfig()
+
+        self._cells = {}  # (day, kind, a, b) -> count
+        self._arrays = None
+        self._rebuilt_at = None
+        self._synced_until = None
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+        try:
+            self.cells.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure category co-occurrence indexes: {e}")
+
+    def record_change(self, previous: Optional[Dict], current: Optional[Dict]) -> int:
+        """Move a protest's counts from its previous to its current state (either may be None)"""
+        deltas = protest_cells(current)
+        deltas.subtract(protest_cells(previous))
+        return self.cells.apply_deltas({cell: delta for cell, delta in deltas.items() if delta})
+
+    def rebuild(self, batch_size: int = 5000) -> Dict:
+        """Recompute every cell from the protests collection"""
+        started = datetime.now()
+        cells = Counter()
+        protest_count = 0
+
+        cursor = self.protest.collection.find(
+            {'visibility': 'public', 'start_date': {'$ne': None}},
+            {'visibility': 1, 'start_date': 1, 'categories': 1, 'source_metadata.country': 1}
+        ).batch_size(batch_size)
+
+        for protest in cursor:
+            cells.update(protest_cells(protest))
+            protest_count += 1
+
+        written = self.cells.replace_all(cells, batch_size=batch_size)
+        self.service_config.set_config(
+            self.SERVICE_NAME, 'rebuilt_at', started.isoformat(),
+            description='Start time of the last full category co-occurrence rebuild'
+        )
+
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(f"Category co-occurrence rebuilt: {protest_count} protests, {written} cells in {elapsed:.1f}s")
+        return {
+            'protests': protest_count,
+            'cells': written,
+            'elapsed_seconds': round(elapsed, 2)
+        }
+
+    def rebuild_if_missing(self) -> Optional[Dict]:
+        """Run the initial rebuild when the table has never been built"""
+        if self.service_config.get_config(self.SERVICE_NAME, 'rebuilt_at'):
+            return None
+        return self.rebuild()
+
+    def _sync(self):
+        """Pull changed cells into memory, or reload everything after a rebuild"""
+        if time.time() - self._last_sync < self.sync_interval_seconds:
+            return
+
+        with self._lock:
+            if time.time() - self._last_sync < self.sync_interval_seconds:
+                return
+            self._last_sync = time.time()
+
+            try:
+                rebuilt_at = self.service_config.get_config(self.SERVICE_NAME, 'rebuilt_at')
+                sync_started = datetime.now()
+
+                if rebuilt_at != self._rebuilt_at or self._synced_until is None:
+                    cells = {}
+                    rows = self.cells.get_cells()
+                else:
+                    cells = self._cells
+                    rows = self.cells.get_cells(self._synced_until - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+
+                for row in rows:
+                    cells[(row['day'], row['kind'], row['a'], row['b'])] = row.get('count', 0)
+
+                if rows or cells is not self._cells or self._arrays is None:
+                    self._arrays = self._build_arrays(cells)
+
+                self._cells = cells
+                self._rebuilt_at = rebuilt_at
+                self._synced_until = sync_started
+            except Exception as e:
+                logger.error(f"Category co-occurrence sync failed: {e}")
+
+    def _build_arrays(self, cells: Dict) -> Dict:
+        """Columnar copy of the cells for vectorized day-range queries"""
+        # Both ends of a pair are indexed, even if drift has removed one category's own cell
+        categories = sorted({a for (_, kind, a, _) in cells if kind != 'total'}
+                            | {b for (_, kind, _, b) in cells if kind == 'category'})
+        countries = sorted({b for (_, kind, _, b) in cells if kind == 'country'})
+        category_index = {category: i for i, category in enumerate(categories)}
+        country_index = {country: i for i, country in enumerate(countries)}
+
+        ordinals = {}
+        columns = {kind: ([], [], [], []) for kind in CELL_KINDS}
+        for (day, kind, a, b), count in cells.items():
+            if not count or kind not in columns:
+                continue
+            if day not in ordinals:
+                ordinals[day] = date.fromisoformat(day).toordinal()
+
+            days, rows, cols, counts = columns[kind]
+            days.append(ordinals[day])
+            counts.append(count)
+            if kind == 'total':
+                rows.append(0)  # Totals only use days and counts
+                cols.append(0)
+                continue
+            rows.append(category_index[a])
+            cols.append(country_index[b] if kind == 'country' else category_index[b])
+
+        arrays = {'categories': categories, 'countries': countries}
+        for kind, (days, rows, cols, counts) in columns.items():
+            arrays[kind] = (
+                np.array(days, dtype=np.int32),
+                np.array(rows, dtype=np.int64),
+                np.array(cols, dtype=np.int64),
+                np.array(counts, dtype=np.float64)
+            )
+        return arrays
+
+    def is_ready(self) -> bool:
+        """Whether a full rebuild has been loaded (incremental counts alone miss older protests)"""
+        self._sync()
+        return self._rebuilt_at is not None and self._arrays is not None
+
+    def _select(self, kind: str, start_date: datetime, end_date: datetime):
+        """(arrays, rows, cols, counts) for cells of one kind within a day range"""
+        arrays = self._arrays
+        days, rows, cols, counts = arrays[kind]
+        mask = (days >= start_date.date().toordinal()) & (days <= end_date.date().toordinal())
+        return arrays, rows[mask], cols[mask], counts[mask]
+
+    def matrix(self, start_date: datetime, end_date: datetime) -> Tuple[List[str], np.ndarray, int]:
+        """
+        Symmetric co-occurrence matrix for protests starting in a day range.
+        The diagonal holds per-category protest counts; also returns the protest total.
+        """
+        self._sync()
+        if self._arrays is None:
+            return [], np.zeros((0, 0)), 0
+
+        _, _, _, totals = self._select('total', start_date, end_date)
+        arrays, rows, cols, counts = self._select('category', start_date, end_date)
+
+        size = len(arrays['categories'])
+        upper = np.bincount(rows * size + cols, weights=counts, minlength=size * size).reshape(size, size)
+        matrix = upper + upper.T - np.diag(np.diag(upper))
+
+        present = np.flatnonzero(np.diag(matrix) > 0)
+        return [arrays['categories'][i] for i in present], matrix[np.ix_(present, present)], int(totals.sum())
+
+    def top_pairs(self, start_date: datetime, end_date: datetime, limit: int = 15) -> List[Dict]:
+        """Most frequent category pairs in a day range"""
+        categories, matrix, _ = self.matrix(start_date, end_date)
+        first, second = np.triu_indices(len(categories), k=1)
+        counts = matrix[first, second]
+
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [
+            {'cat1': categories[first[i]], 'cat2': categories[second[i]], 'count': int(counts[i])}
+            for i in order if counts[i] > 0
+        ]
+
+    def correlations(self, start_date: datetime, end_date: datetime,
+                     min_support: int = 1, limit: int = 50) -> Dict:
+        """
+        Pairwise category association for a day range.
+        phi is the Pearson correlation of the two categories' protest indicators;
+        lift and Jaccard are included for sparse categories where phi is small.
+        """
+        categories, matrix, total = self.matrix(start_date, end_date)
+        counts = np.diag(matrix)
+        first, second = np.triu_indices(len(categories), k=1)
+        both = matrix[first, second]
+        n_first, n_second = counts[first], counts[second]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            phi = (total * both - n_first * n_second) / np.sqrt(
+                n_first * (total - n_first) * n_second * (total - n_second)
+            )
+            lift = total * both / (n_first * n_second)
+            jaccard = both / (n_first + n_second - both)
+
+        candidates = np.flatnonzero((both >= max(1, min_support)) & np.isfinite(phi))
+        order = candidates[np.argsort(-np.abs(phi[candidates]), kind='stable')][:limit]
+
+        return {
+            'total_protests': total,
+            'categories': [
+                {
+                    'category': category,
+                    'protest_count': int(counts[i]),
+                    'share': round(float(counts[i]) / total, 4) if total else 0
+                }
+                for i, category in enumerate(categories)
+            ],
+            'pairs': [
+                {
+                    'category_1': categories[first[i]],
+                    'category_2': categories[second[i]],
+                    'cooccurrence_count': int(both[i]),
+                    'phi': round(float(phi[i]), 4),
+                    'lift': round(float(lift[i]), 3),
+                    'jaccard': round(float(jaccard[i]), 4)
+                }
+                for i in order
+            ]
+        }
+
+    def category_country(self, start_date: datetime, end_date: datetime, limit: int = 50) -> List[Dict]:
+        """Most frequent category/country combinations in a day range"""
+        self._sync()
+        if self._arrays is None:
+            return []
+
+        arrays, rows, cols, counts = self._select('country', start_date, end_date)
+        width = len(arrays['countries'])
+        flat = np.bincount(rows * width + cols, weights=counts, minlength=len(arrays['categories']) * width)
+
+        order = np.argsort(-flat, kind='stable')[:limit]
+        return [
+            {
+                'category': arrays['categories'][i // width],
+                'country': arrays['countries'][i % width],
+                'count': int(flat[i])
+            }
+            for i in order if flat[i] > 0
+        ]
+
+    def get_info(self) -> Dict:
+        """Sync state for health endpoints"""
+        arrays = self._arrays
+        return {
+            'ready': self._rebuilt_at is not None and arrays is not None,
+            'rebuilt_at': self._rebuilt_at,
+            'synced_until': self._synced_until.isoformat() if self._synced_until else None,
+            'cells': len(self._cells),
+            'categories': len(arrays['categories']) if arrays else 0
+        }
+
+
+# Global category co-occurrence index instance
+category_cooccurrence_index_instance = None
+
+def get_category_cooccurrence_index():
+    """Get or create category co-occurrence index instance"""
+    global category_cooccurrence_index_instance
+    if category_cooccurrence_index_instance is None:
+        category_cooccurrence_index_instance = CategoryCooccurrenceIndex()
+    return category_cooccurrence_index_instance
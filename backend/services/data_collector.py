@@ -29,6 +29,9 @@ from models.api_health_models import (
     ApiRateLimit, ServiceHealth, CollectionMetrics
 )
 from models.config_models import ServiceConfig, GeocodingCache, CategoryMapping
+from services.query_cache import get_query_cache
+from services.map_tiles import get_map_tile_index
+from services.analytics_rollups import get_analytics_rollups
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -1646,6 +1649,7 @@ class EnhancedDataCollector:
                 # Merge data
                 merge_result = self._merge_protest_data(existing_by_hash, protest_data)
                 self.protest.update_by_id(existing_by_hash['_id'], merge_result)
+                self._on_protest_stored("merged", existing_by_hash['_id'], existing_by_hash, merge_result)
                 
                 return {
                     "action": "merged",
@@ -1660,6 +1664,7 @@ class EnhancedDataCollector:
                 # Merge with similar protest
                 merge_result = self._merge_protest_data(similar_protest, protest_data)
                 self.protest.update_by_id(similar_protest['_id'], merge_result)
+                self._on_protest_stored("merged", similar_protest['_id'], similar_protest, merge_result)
                 
                 return {
                     "action": "merged",
@@ -1684,6 +1689,8 @@ class EnhancedDataCollector:
             })
             
             protest_id = self.protest.create(protest_data)
+            if protest_id:
+                self._on_protest_stored("created", protest_id, None, protest_data)
             
             return {
                 "action": "created",
@@ -1696,6 +1703,44 @@ class EnhancedDataCollector:
                 "error": str(e)
             }
     
+    def _on_protest_stored(self, action: str, protest_id: ObjectId,
+                           previous: Optional[Dict], changes: Dict):
+        """Propagate a protest create/merge to derived read paths"""
+        try:
+            get_query_cache().bump_generation(reason=f"protest {action}: {protest_id}")
+        except Exception as e:
+            logger.error(f"Failed to invalidate query cache: {e}")
+        
+        current = {**previous, **changes} if previous else changes
+        
+        # Keep map tile cells in sync when a protest gains, moves or changes visibility
+        try:
+            get_map_tile_index().record_change(previous, current)
+        except Exception as e:
+            logger.error(f"Failed to update map tiles for {protest_id}: {e}")
+        
+        # Queue the old and new start days for the analytics rollup refresh
+        try:
+            previous_start = previous.get('start_date') if previous else None
+            get_analytics_rollups().mark_days_dirty([previous_start, changes.get('start_date', previous_start)])
+        except Exception as e:
+            logger.error(f"Failed to queue analytics rollup refresh for {protest_id}: {e}")
+        
+        # Move the protest's category pair counts from its old to its merged categories
+        try:
+            from services.category_cooccurrence import get_category_cooccurrence_index
+            get_category_cooccurrence_index().record_change(previous, current)
+        except Exception as e:
+            logger.error(f"Failed to update category co-occurrence for {protest_id}: {e}")
+        
+        # Notify users whose alerts match a newly collected protest
+        if action == "created":
+            try:
+                from services.alert_matching import get_alert_matching_engine
+                get_alert_matching_engine().process_protest(protest_id, changes)
+            except Exception as e:
+                logger.error(f"Failed to match alerts for {protest_id}: {e}")
+    
     def _find_similar_protest(self, protest_data: Dict) -> Optional[Dict]:
         """Find similar protests using advanced similarity detection"""
         try:
@@ -2254,6 +2299,62 @@ class EnhancedDataCollector:
                 "error": str(e)
             }
     
+    def _rebuild_map_tiles(self) -> Dict:
+        """Rebuild precomputed map tile cells from the protests collection"""
+        try:
+            return get_map_tile_index().rebuild()
+        except Exception as e:
+            logger.error(f"Map tile rebuild failed: {e}")
+            return {"error": str(e)}
+    
+    def _recalculate_trending_scores(self, incremental: bool = True) -> Dict:
+        """Run the batch trending score job"""
+        try:
+            from services.trending_scores import get_trending_score_job
+            return get_trending_score_job().run(incremental=incremental)
+        except Exception as e:
+            logger.error(f"Trending score job failed: {e}")
+            self.error_log.log_error(
+                service_name=self.service_name,
+                error_type="trending_score_error",
+                error_message=str(e),
+                severity="medium"
+            )
+            return {"error": str(e)}
+    
+    def _refresh_analytics_rollups(self, full: bool = False) -> Dict:
+        """Refresh materialized analytics rollups for changed days (or all days)"""
+        try:
+            return get_analytics_rollups().refresh(full=full)
+        except Exception as e:
+            logger.error(f"Analytics rollup refresh failed: {e}")
+            self.error_log.log_error(
+                service_name=self.service_name,
+                error_type="analytics_rollup_error",
+                error_message=str(e),
+                severity="medium"
+            )
+            return {"error": str(e)}
+    
+    def _export_analytics_snapshot(self) -> Dict:
+        """Write the columnar research snapshot for web workers to load"""
+        try:
+            from services.analytics_snapshot import get_analytics_snapshot_store
+            return get_analytics_snapshot_store().export()
+        except Exception as e:
+            logger.error(f"Analytics snapshot export failed: {e}")
+            return {"error": str(e)}
+    
+    def _rebuild_category_cooccurrence(self, only_if_missing: bool = False) -> Dict:
+        """Rebuild category co-occurrence counts from the protests collection"""
+        try:
+            from services.category_cooccurrence import get_category_cooccurrence_index
+            index = get_category_cooccurrence_index()
+            return (index.rebuild_if_missing() if only_if_missing else index.rebuild()) or {"skipped": True}
+        except Exception as e:
+            logger.error(f"Category co-occurrence rebuild failed: {e}")
+            return {"error": str(e)}
+    
     def start_enhanced_scheduler(self):
         """Start enhanced scheduler with better error handling"""
         if self.scheduler_running:
@@ -2268,6 +2369,30 @@ class EnhancedDataCollector:
             # Health check every 15 minutes
             schedule.every(15).minutes.do(self._run_enhanced_health_checks)
             
+            # Rebuild map tile cells daily to correct any drift
+            schedule.every(24).hours.do(self._rebuild_map_tiles)
+            
+            # Rescore protests with new engagement often, and everything (for time decay) less often
+            schedule.every(15).minutes.do(self._recalculate_trending_scores, incremental=True)
+            schedule.every(6).hours.do(self._recalculate_trending_scores, incremental=False)
+            
+            # Keep analytics rollups current, with a daily full rebuild for trending score drift
+            schedule.every(5).minutes.do(self._refresh_analytics_rollups)
+            schedule.every(24).hours.do(self._refresh_analytics_rollups, full=True)
+            
+            # Export the research query snapshot (no-op unless ANALYTICS_SNAPSHOT_PATH is set)
+            schedule.every(15).minutes.do(self._export_analytics_snapshot)
+            
+            # Rebuild category co-occurrence counts daily to correct drift from edits outside the collector
+            schedule.every(24).hours.do(self._rebuild_category_cooccurrence)
+            
+            # Build them once soon after startup if no rebuild exists yet, without holding up the scheduler
+            def build_missing_category_cooccurrence():
+                self._rebuild_category_cooccurrence(only_if_missing=True)
+                return schedule.CancelJob
+            
+            schedule.every(1).minutes.do(build_missing_category_cooccurrence)
+            
             self.scheduler_running = True
             logger.info(f" Enhanced scheduler started - collection every {self.collection_interval_hours} hours")
             
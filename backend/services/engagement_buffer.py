@@ -0,0 +1,155 @@
+import os
+import sys
+import atexit
+import threading
+import logging
+from collections import defaultdict
+from typing import Dict, Union
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest
+
+logger = logging.getLogger(__name__)
+
+
+class EngagementCounterBuffer:
+    """
+    In-process buffer for protest engagement counters (views, shares, bookmarks, ...).
+    Increments are summed per protest in memory and flushed periodically as a
+    single unordered bulk write of $inc operations, so a viral protest costs one
+    write per flush instead of one per request. At most FLUSH_INTERVAL seconds
+    (or MAX_PENDING_PROTESTS protests) of counts can be lost on a crash. Failed
+    writes are retried only when they are known not to have been applied, so
+    a counter is never incremented twice.
+    """
+
+    def __init__(self, flush_interval: float = None, max_pending_protests: int = None):
+        self.flush_interval = flush_interval or float(os.getenv('ENGAGEMENT_FLUSH_INTERVAL_SECONDS', 5))
+        self.max_pending_protests = max_pending_protests or int(os.getenv('ENGAGEMENT_MAX_PENDING_PROTESTS', 5000))
+
+        self.protest = Protest()
+        self._pending = defaultdict(lambda: defaultdict(int))  # protest_id -> metric -> delta
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._running = False
+        self._thread = None
+
+        self.stats = {'increments': 0, 'flushes': 0, 'documents_written': 0, 'flush_failures': 0,
+                      'dropped_updates': 0}
+
+    def increment(self, protest_id: Union[ObjectId, str], metric: str, amount: int = 1):
+        """Record a counter change to be written on the next flush"""
+        if isinstance(protest_id, str):
+            protest_id = ObjectId(protest_id)
+
+        with self._lock:
+            self._pending[protest_id][metric] += amount
+            self.stats['increments'] += 1
+            pending_protests = len(self._pending)
+
+        self._ensure_started()
+        if pending_protests >= self.max_pending_protests:
+            self._flush_requested.set()
+
+    def get_pending(self, protest_id: Union[ObjectId, str]) -> Dict[str, int]:
+        """Unflushed deltas for a protest, for overlaying on freshly read documents"""
+        if isinstance(protest_id, str):
+            protest_id = ObjectId(protest_id)
+
+        with self._lock:
+            return dict(self._pending.get(protest_id, {}))
+
+    def _requeue(self, items):
+        """Put unwritten counts back so they are retried with the next batch"""
+        with self._lock:
+            for protest_id, metrics in items:
+                for metric, amount in metrics.items():
+                    if amount:
+                        self._pending[protest_id][metric] += amount
+
+    def flush(self) -> int:
+        """Write all pending counters in one bulk write"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = defaultdict(lambda: defaultdict(int))
+
+            # One operation per item, in order, so bulk write error indexes map back to protests
+            items = [(protest_id, dict(metrics)) for protest_id, metrics in batch.items() if any(metrics.values())]
+            try:
+                written = self.protest.bulk_increment_engagement(dict(items))
+            except BulkWriteError as e:
+                # Unordered: every operation not reported as failed has already been applied
+                failed = [items[error['index']] for error in e.details.get('writeErrors', [])]
+                logger.error(f"{len(failed)} of {len(items)} engagement counter updates failed, retrying next cycle")
+                self.stats['flush_failures'] += 1
+                self._requeue(failed)
+                written = e.details.get('nModified', 0)
+            except ServerSelectionTimeoutError as e:
+                # Nothing was sent, so the whole batch can be retried
+                logger.error(f"Engagement counter flush failed, retrying next cycle: {e}")
+                self.stats['flush_failures'] += 1
+                self._requeue(items)
+                return 0
+            except Exception as e:
+                # Some operations may have been applied; retrying them would count them twice
+                logger.error(f"Engagement counter flush failed, {len(items)} counter updates dropped: {e}")
+                self.stats['flush_failures'] += 1
+                self.stats['dropped_updates'] += len(items)
+                return 0
+
+            self.stats['flushes'] += 1
+            self.stats['documents_written'] += written
+            return written
+
+    def _ensure_started(self):
+        """Start the background flusher on first use"""
+        if self._running:
+            return
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        while self._running:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        self._running = False
+        self._flush_requested.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        """Buffer statistics for health endpoints"""
+        with self._lock:
+            pending_protests = len(self._pending)
+        return {**self.stats, 'pending_protests': pending_protests, 'flush_interval_seconds': self.flush_interval}
+
+
+# Global engagement buffer instance
+engagement_buffer_instance = None
+
+def get_engagement_buffer():
+    """Get or create engagement counter buffer instance"""
+    global engagement_buffer_instance
+    if engagement_buffer_instance is None:
+        engagement_buffer_instance = EngagementCounterBuffer()
+    return engagement_buffer_instance
@@ -0,0 +1,134 @@
+import os
+import sys
+import socket
+import threading
+import logging
+from typing import Callable, Dict, Optional
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import ExportRequest
+
+logger = logging.getLogger(__name__)
+
+
+class ExportWorkerPool:
+    """
+    Background threads that run export jobs from the export_requests collection.
+    Every process running a pool competes for queued jobs through an atomic
+    findOneAndUpdate, so export throughput scales with the number of processes
+    and queued jobs survive restarts and deploys. Workers renew a lease while
+    writing; jobs held by a worker that died are requeued once the lease lapses.
+    """
+
+    def __init__(self, handler: Callable[[Dict, str], None], workers: int = None):
+        self.handler = handler
+        self.workers = workers if workers is not None else int(os.getenv('EXPORT_WORKERS', 2))
+        self.poll_interval = float(os.getenv('EXPORT_WORKER_POLL_SECONDS', 2))
+        self.lease_seconds = int(os.getenv('EXPORT_JOB_LEASE_SECONDS', 300))
+        self.max_attempts = int(os.getenv('EXPORT_JOB_MAX_ATTEMPTS', 3))
+
+        self.jobs = ExportRequest()
+        self.worker_prefix = None
+        self._pid = None
+
+        self._threads = []
+        self._active = {}  # worker id -> job id being processed
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        try:
+            self.jobs.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure export job indexes: {e}")
+
+    def start(self):
+        """Start the worker threads once per process (a no-op when EXPORT_WORKERS=0)"""
+        # Threads do not survive a fork, so a pool inherited from a preloading parent restarts
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.worker_prefix = f"{socket.gethostname()}:{self._pid}"
+            self._threads = []
+            self._active = {}
+
+            self._stop.clear()
+            for index in range(self.workers):
+                worker_id = f"{self.worker_prefix}:{index}"
+                thread = threading.Thread(target=self._run, args=(worker_id,),
+                                          name=f"export-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+            logger.info(f"Started {self.workers} export workers ({self.worker_prefix})")
+
+    def stop(self):
+        """Signal the worker threads to exit after their current job"""
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        """Wake idle workers in this process after a job is queued"""
+        self._wake.set()
+
+    def _claim(self, worker_id: str) -> Optional[Dict]:
+        self.jobs.requeue_expired(self.max_attempts)
+        return self.jobs.claim_next(worker_id, self.lease_seconds)
+
+    def _run(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                job = self._claim(worker_id)
+            except Exception as e:
+                logger.error(f"Export worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            self._active[worker_id] = str(job['_id'])
+            try:
+                self.handler(job, worker_id)
+            except Exception as e:
+                logger.error(f"Export job {job['_id']} failed: {e}")
+                try:
+                    self.jobs.fail_job(job['_id'], worker_id, str(e))
+                except Exception as fail_error:
+                    logger.error(f"Could not mark export job {job['_id']} failed: {fail_error}")
+            finally:
+                self._active.pop(worker_id, None)
+
+    def report_progress(self, job: Dict, worker_id: str, rows_written: int) -> bool:
+        """Record rows written and renew the lease; False if the job should stop"""
+        return self.jobs.update_progress(job['_id'], worker_id, rows_written, self.lease_seconds)
+
+    def get_stats(self) -> Dict:
+        """Worker state for health endpoints"""
+        return {
+            'process': self.worker_prefix,
+            'workers': self.workers,
+            'running': sum(1 for thread in self._threads if thread.is_alive()),
+            'busy': len(self._active),
+            'lease_seconds': self.lease_seconds
+        }
+
+
+# Global export worker pool instance
+export_worker_pool_instance = None
+
+def get_export_worker_pool(handler: Callable[[Dict, str], None] = None):
+    """Get or create export worker pool instance (the first caller provides the job handler)"""
+    global export_worker_pool_instance
+    if export_worker_pool_instance is None:
+        if handler is None:
+            raise ValueError("An export job handler is required to create the worker pool")
+        export_worker_pool_instance = ExportWorkerPool(handler)
+    return export_worker_pool_instance
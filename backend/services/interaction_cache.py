@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Union
+
+from bson import ObjectId
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import UserBookmark, UserFollow
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_KINDS = ('bookmarks', 'follows')
+
+
+def to_object_id(value: Union[ObjectId, str]) -> ObjectId:
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+class InteractionCache:
+    """
+    Per-user sets of bookmarked and followed protest ids.
+    A user's set is loaded with one aggregation over bookmarks and active
+    follows and kept in an LRU cache, so interaction status for any number
+    of protest cards is answered from memory. Bookmark and follow mutations
+    update the cached set in place. When INTERACTION_CACHE_REDIS_URL (or
+    QUERY_CACHE_REDIS_URL) is set, mutations also bump a per-user version in
+    redis and readers reload sets whose version moved, so every worker sees
+    a change immediately and sets live INTERACTION_CACHE_TTL_SECONDS; without
+    it sets live only INTERACTION_CACHE_LOCAL_TTL_SECONDS, which bounds how
+    stale another worker's view can be. A set loaded while a mutation for the
+    same user happened is returned but not cached.
+    """
+
+    VERSION_KEY = 'interaction_cache:version:{}'
+
+    def __init__(self, ttl: int = None, max_entries: int = None, redis_url: str = None):
+        self.ttl = ttl or int(os.getenv('INTERACTION_CACHE_TTL_SECONDS', 300))
+        self.max_entries = max_entries or int(os.getenv('INTERACTION_CACHE_MAX_ENTRIES', 10000))
+        self.local_ttl = int(os.getenv('INTERACTION_CACHE_LOCAL_TTL_SECONDS', 15))
+
+        self.bookmarks = UserBookmark()
+        self.follows = UserFollow()
+
+        self._entries = OrderedDict()  # user id -> {'expires_at', 'version', 'bookmarks', 'follows'}
+        self._loading = {}  # user id -> token of the load that may still fill the cache
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'misses': 0, 'stale_reloads': 0, 'discarded_fills': 0, 'mutations': 0}
+
+        for model in (self.bookmarks, self.follows):
+            try:
+                model.ensure_indexes()
+            except Exception as e:
+                logger.warning(f"Could not ensure interaction indexes: {e}")
+
+        self._shared = None
+        redis_url = redis_url or os.getenv('INTERACTION_CACHE_REDIS_URL') or os.getenv('QUERY_CACHE_REDIS_URL')
+        if redis_url:
+            if redis is None:
+                logger.warning("Interaction cache redis URL is set but redis is not installed, using local cache only")
+            else:
+                try:
+                    self._shared = redis.Redis.from_url(redis_url, socket_timeout=0.25)
+                    self._shared.ping()
+                except Exception as e:
+                    logger.warning(f"Shared interaction versions unavailable, using local cache only: {e}")
+                    self._shared = None
+
+        # Other workers' changes are only seen on expiry without shared versions
+        if self._shared is None:
+            self.ttl = min(self.ttl, self.local_ttl)
+
+    def _shared_version(self, user_key: str) -> Optional[int]:
+        if self._shared is None:
+            return None
+        try:
+            return int(self._shared.get(self.VERSION_KEY.format(user_key)) or 0)
+        except Exception as e:
+            logger.warning(f"Failed to read interaction version: {e}")
+            return None
+
+    def _load(self, user_id: ObjectId) -> Dict:
+        """Read a user's bookmarks and follows with one query"""
+        entry = {kind: {} for kind in INTERACTION_KINDS}
+        for row in self.bookmarks.get_interaction_set(user_id):
+            kind = 'bookmarks' if row['kind'] == 'bookmark' else 'follows'
+            entry[kind][str(row['protest_id'])] = row.get('created_at')
+        return entry
+
+    def get(self, user_id: Union[ObjectId, str]) -> Dict:
+        """{'bookmarks': {protest id: created_at}, 'follows': {...}} for a user"""
+        user_key = str(user_id)
+        version = self._shared_version(user_key)
+
+        with self._lock:
+            entry = self._entries.get(user_key)
+            if entry and time.time() < entry['expires_at']:
+                if version is None or version == entry['version']:
+                    self._entries.move_to_end(user_key)
+                    self.stats['hits'] += 1
+                    return entry
+                self.stats['stale_reloads'] += 1
+            self.stats['misses'] += 1
+            token = self._loading[user_key] = object()
+
+        try:
+            entry = self._load(to_object_id(user_id))
+            entry.update(expires_at=time.time() + self.ttl, version=version)
+            # A set read while this user's interactions changed may miss the change
+            changed = self._shared is not None and self._shared_version(user_key) != version
+            with self._lock:
+                if changed or self._loading.get(user_key) is not token:
+                    self.stats['discarded_fills'] += 1
+                    return entry
+                self._entries[user_key] = entry
+                self._entries.move_to_end(user_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry
+        finally:
+            with self._lock:
+                if self._loading.get(user_key) is token:
+                    del self._loading[user_key]
+
+    def get_status(self, user_id: Union[ObjectId, str], protest_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Bookmark and follow status for each protest id, from the user's cached set"""
+        entry = self.get(user_id)
+        statuses = {}
+        for protest_id in protest_ids:
+            bookmarked_at = entry['bookmarks'].get(protest_id)
+            followed_at = entry['follows'].get(protest_id)
+            statuses[protest_id] = {
+                'is_bookmarked': protest_id in entry['bookmarks'],
+                'is_following': protest_id in entry['follows'],
+                'bookmark_created_at': bookmarked_at.isoformat() if isinstance(bookmarked_at, datetime) else None,
+                'follow_created_at': followed_at.isoformat() if isinstance(followed_at, datetime) else None
+            }
+        return statuses
+
+    def record(self, user_id: Union[ObjectId, str], kind: str, protest_ids: Iterable[Union[ObjectId, str]],
+               added: bool, created_at: datetime = None):
+        """Apply a bookmark/follow add or removal to the cached set and publish the change"""
+        user_key = str(user_id)
+        protest_keys = [str(protest_id) for protest_id in protest_ids]
+
+        with self._lock:
+            # A load already in flight may predate this change
+            self._loading.pop(user_key, None)
+            entry = self._entries.get(user_key)
+            if entry:
+                for protest_key in protest_keys:
+                    if added:
+                        entry[kind][protest_key] = created_at or datetime.utcnow()
+                    else:
+                        entry[kind].pop(protest_key, None)
+            self.stats['mutations'] += 1
+
+        if self._shared is None:
+            return
+        try:
+            version = int(self._shared.incr(self.VERSION_KEY.format(user_key)))
+            self._shared.expire(self.VERSION_KEY.format(user_key), self.ttl * 2)
+        except Exception as e:
+            logger.warning(f"Failed to bump interaction version: {e}")
+            self.invalidate(user_id)
+            return
+
+        with self._lock:
+            entry = self._entries.get(user_key)
+            if entry is None:
+                return
+            if entry['version'] is not None and version == entry['version'] + 1:
+                entry['version'] = version
+            else:
+                # Another worker changed this user's set too; reload on next read
+                self._entries.pop(user_key, None)
+
+    def invalidate(self, user_id: Union[ObjectId, str]):
+        """Drop a user's cached set"""
+        with self._lock:
+            self._loading.pop(str(user_id), None)
+            self._entries.pop(str(user_id), None)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics for health endpoints"""
+        with self._lock:
+            cached = len(self._entries)
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'cached_users': cached,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0,
+            'ttl_seconds': self.ttl,
+            'shared_versions': self._shared is not None
+        }
+
+
+# Global interaction cache instance
+interaction_cache_instance = None
+
+def get_interaction_cache():
+    """Get or create interaction cache instance"""
+    global interaction_cache_instance
+    if interaction_cache_instance is None:
+        interaction_cache_instance = InteractionCache()
+    return interaction_cache_instance
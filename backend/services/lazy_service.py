@@ -0,0 +1,39 @@
+import time
+import threading
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def lazy_service(name: str, factory: Optional[Callable], retry_seconds: float = 30, blocking: bool = False):
+    """
+    Accessor for a service that is built on first use rather than at import.
+    Most services connect to MongoDB when constructed, so building them while
+    a blueprint is imported would make the import fail whenever the database
+    is unreachable. The accessor returns None while the service cannot be
+    built, logging the failure and trying again at most every retry_seconds;
+    a request that arrives while another one is building it also gets None
+    instead of waiting on the connection, unless blocking is set for services
+    a request must not silently skip (it then waits for that build).
+    """
+    state = {'instance': None, 'retry_at': 0.0}
+    lock = threading.Lock()
+
+    def get():
+        if state['instance'] is not None or factory is None:
+            return state['instance']
+        if time.monotonic() < state['retry_at'] or not lock.acquire(blocking=blocking):
+            return None
+
+        try:
+            if state['instance'] is None:
+                state['instance'] = factory()
+        except Exception as e:
+            state['retry_at'] = time.monotonic() + retry_seconds
+            logger.warning(f"{name} unavailable, retrying in {retry_seconds:.0f}s: {e}")
+        finally:
+            lock.release()
+        return state['instance']
+
+    return get
@@ -0,0 +1,216 @@
+import math
+import os
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest, ProtestMapTile
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator latitude limit
+MAX_LATITUDE = 85.05112878
+
+# Deepest zoom with precomputed clusters; tiles at or beyond it return raw markers
+MAX_CLUSTER_ZOOM = int(os.getenv('MAP_TILE_MAX_CLUSTER_ZOOM', 14))
+
+# Each tile is split into a (2^depth x 2^depth) cluster grid
+CLUSTER_DEPTH = int(os.getenv('MAP_TILE_CLUSTER_DEPTH', 3))
+
+MAX_TILE_MARKERS = int(os.getenv('MAP_TILE_MAX_MARKERS', 200))
+
+
+def lng_lat_to_tile(lng: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Convert a coordinate into Web Mercator tile x/y at a zoom level"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    n = 1 << zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_to_quadkey(x: int, y: int, zoom: int) -> str:
+    """Convert tile x/y/zoom into a quadkey string"""
+    digits = []
+    for i in range(zoom, 0, -1):
+        digit = 0
+        mask = 1 << (i - 1)
+        if x & mask:
+            digit += 1
+        if y & mask:
+            digit += 2
+        digits.append(str(digit))
+    return ''.join(digits)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
+    """Get (west, south, east, north) for a tile"""
+    n = 1 << zoom
+
+    def tile_lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    return west, tile_lat(y + 1), east, tile_lat(y)
+
+
+def location_quadkey(location: Optional[Dict]) -> Optional[str]:
+    """Quadkey at MAX_CLUSTER_ZOOM for a GeoJSON point, or None if it has no usable coordinates"""
+    if not location:
+        return None
+
+    coordinates = location.get('coordinates') or []
+    if len(coordinates) != 2 or list(coordinates) == [0, 0]:
+        return None
+
+    try:
+        lng, lat = float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError):
+        return None
+
+    x, y = lng_lat_to_tile(lng, lat, MAX_CLUSTER_ZOOM)
+    return tile_to_quadkey(x, y, MAX_CLUSTER_ZOOM)
+
+
+class MapTileIndex:
+    """
+    Precomputed quadkey aggregation behind the map tile endpoint.
+    Every public protest with coordinates is counted in one cell per zoom level
+    (0..MAX_CLUSTER_ZOOM), along with coordinate sums for cluster centroids.
+    Cells are updated incrementally as protests are stored (moving a protest
+    in or out when its location or visibility changes) and can be rebuilt
+    from the protests collection to correct drift.
+    """
+
+    def __init__(self):
+        self.protest = Protest()
+        self.tiles = ProtestMapTile()
+
+        try:
+            self.tiles.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure map tile indexes: {e}")
+
+    def _add_point(self, deltas: Dict[str, List[float]], location: Dict, sign: int):
+        """Accumulate a point into every zoom-level cell above it"""
+        quadkey = location_quadkey(location)
+        if quadkey is None:
+            return
+
+        lng, lat = float(location['coordinates'][0]), float(location['coordinates'][1])
+        for zoom in range(MAX_CLUSTER_ZOOM + 1):
+            delta = deltas.setdefault(quadkey[:zoom], [0, 0.0, 0.0])
+            delta[0] += sign
+            delta[1] += sign * lng
+            delta[2] += sign * lat
+
+    def record_location_change(self, previous_location: Optional[Dict], new_location: Optional[Dict]) -> int:
+        """Move a protest between cells (either side may be None for inserts and removals)"""
+        deltas = {}
+        if previous_location:
+            self._add_point(deltas, previous_location, -1)
+        if new_location:
+            self._add_point(deltas, new_location, 1)
+
+        # Drop cells where the move cancels out
+        deltas = {quadkey: delta for quadkey, delta in deltas.items() if delta[0] != 0 or delta[1] or delta[2]}
+        return self.tiles.apply_deltas(deltas)
+
+    def record_change(self, previous: Optional[Dict], current: Optional[Dict]) -> int:
+        """Move a protest from its previous to its current state; only public protests are counted, as in rebuild"""
+        def public_location(protest):
+            return protest.get('location') if protest and protest.get('visibility') == 'public' else None
+
+        previous_location, current_location = public_location(previous), public_location(current)
+        if previous_location == current_location:
+            return 0
+        return self.record_location_change(previous_location, current_location)
+
+    def rebuild(self, batch_size: int = 5000) -> Dict:
+        """Recompute every cell from the protests collection"""
+        started = datetime.now()
+        cells = {}
+        protest_count = 0
+
+        cursor = self.protest.collection.find(
+            {'visibility': 'public', 'location.coordinates': {'$exists': True}},
+            {'location': 1}
+        ).batch_size(batch_size)
+
+        for protest in cursor:
+            self._add_point(cells, protest.get('location'), 1)
+            protest_count += 1
+
+        written = self.tiles.replace_all(cells)
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(f"Rebuilt {written} map tile cells from {protest_count} protests in {elapsed:.1f}s")
+
+        return {'protests': protest_count, 'cells': written, 'elapsed_seconds': round(elapsed, 2)}
+
+    def get_tile(self, zoom: int, x: int, y: int) -> Dict:
+        """Get clustered (or, at high zoom, raw) markers for a tile"""
+        if zoom >= MAX_CLUSTER_ZOOM:
+            return {'zoom': zoom, 'x': x, 'y': y, 'clusters': [], 'markers': self._get_tile_markers(zoom, x, y)}
+
+        prefix = tile_to_quadkey(x, y, zoom)
+        cluster_zoom = min(zoom + CLUSTER_DEPTH, MAX_CLUSTER_ZOOM)
+
+        clusters = []
+        for cell in self.tiles.get_cells(cluster_zoom, prefix):
+            count = cell.get('count', 0)
+            if count <= 0:
+                continue
+            clusters.append({
+                'quadkey': cell['quadkey'],
+                'count': count,
+                'coordinates': [
+                    round(cell.get('lng_sum', 0) / count, 5),
+                    round(cell.get('lat_sum', 0) / count, 5)
+                ]
+            })
+
+        clusters.sort(key=lambda cluster: cluster['quadkey'])
+        return {'zoom': zoom, 'x': x, 'y': y, 'clusters': clusters, 'markers': []}
+
+    def _get_tile_markers(self, zoom: int, x: int, y: int) -> List[Dict]:
+        """Raw markers inside a tile, capped at MAX_TILE_MARKERS"""
+        west, south, east, north = tile_bounds(x, y, zoom)
+
+        protests = self.protest.find_many(
+            {
+                'visibility': 'public',
+                'location': {'$geoWithin': {'$box': [[west, south], [east, north]]}}
+            },
+            projection={'title': 1, 'location': 1, 'status': 1, 'categories': 1, 'trending_score': 1},
+            sort=[('trending_score', -1)],
+            limit=MAX_TILE_MARKERS
+        )
+
+        markers = []
+        for protest in protests:
+            coordinates = protest.get('location', {}).get('coordinates', [0, 0])
+            markers.append({
+                'id': str(protest['_id']),
+                'title': protest.get('title', ''),
+                'coordinates': [round(coordinates[0], 5), round(coordinates[1], 5)],
+                'status': protest.get('status', 'active'),
+                'categories': protest.get('categories', [])
+            })
+        return markers
+
+
+# Global map tile index instance
+map_tile_index_instance = None
+
+def get_map_tile_index():
+    """Get or create map tile index instance"""
+    global map_tile_index_instance
+    if map_tile_index_instance is None:
+        map_tile_index_instance = MapTileIndex()
+    return map_tile_index_instance
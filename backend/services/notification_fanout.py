@@ -0,0 +1,358 @@
+import os
+import sys
+import time
+import socket
+import threading
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Union
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import NotificationHistory, NotificationQueue, NotificationFanoutJob, UserFollow
+from services.unread_counter import get_unread_counter
+
+logger = logging.getLogger(__name__)
+
+
+def to_object_id(value: Union[ObjectId, str, None]) -> Optional[ObjectId]:
+    """ObjectId from a string or ObjectId (None stays None)"""
+    if value is None or isinstance(value, ObjectId):
+        return value
+    return ObjectId(value)
+
+
+def chunked(items: Iterable, size: int):
+    """Yield lists of up to size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class NotificationFanout:
+    """
+    Writes in-app notifications for many users at once.
+    Notification and delivery documents are built per chunk of
+    NOTIFICATION_FANOUT_CHUNK_SIZE users and written with one unordered
+    insert_many per collection, so a fan-out to 50k users costs about a
+    hundred round trips instead of 100k. Writes from all fan-outs in the
+    process share a budget of NOTIFICATION_FANOUT_DOCS_PER_SECOND so large
+    events do not starve API writes. Broadcasts run as jobs in the
+    notification_fanout_jobs collection: every process that starts the
+    fan-out runs NOTIFICATION_FANOUT_WORKERS threads competing for queued
+    jobs, progress is readable from any process, and each written chunk
+    records a cursor (the position in the user list, or the last follower id)
+    and renews the job's lease. A job whose worker died is requeued once the
+    lease lapses and resumes from its cursor, so at most the chunk that was
+    being written is delivered twice.
+    """
+
+    def __init__(self, chunk_size: int = None, docs_per_second: float = None, workers: int = None):
+        self.chunk_size = chunk_size or int(os.getenv('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000))
+        self.docs_per_second = (docs_per_second if docs_per_second is not None
+                                else float(os.getenv('NOTIFICATION_FANOUT_DOCS_PER_SECOND', 20000)))
+        self.workers = workers if workers is not None else int(os.getenv('NOTIFICATION_FANOUT_WORKERS', 1))
+        self.poll_interval = float(os.getenv('NOTIFICATION_FANOUT_POLL_SECONDS', 2))
+        self.lease_seconds = int(os.getenv('NOTIFICATION_FANOUT_JOB_LEASE_SECONDS', 300))
+        self.max_attempts = int(os.getenv('NOTIFICATION_FANOUT_JOB_MAX_ATTEMPTS', 3))
+
+        self.notifications = NotificationHistory()
+        self.deliveries = NotificationQueue()
+        self.follows = UserFollow()
+        self.jobs = NotificationFanoutJob()
+
+        self.worker_prefix = None
+        self._pid = None
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._next_write_at = 0.0
+        self._lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+
+        self.stats = {'jobs_submitted': 0, 'jobs_run': 0, 'notifications_written': 0, 'notifications_failed': 0,
+                      'chunks_written': 0, 'throttled_seconds': 0.0}
+
+        for model in (self.follows, self.jobs):
+            try:
+                model.ensure_indexes()
+            except Exception as e:
+                logger.warning(f"Could not ensure notification fan-out indexes: {e}")
+
+    # ---- Writing ----
+
+    def _throttle(self, docs: int):
+        """Wait for this chunk's share of the write budget"""
+        if self.docs_per_second <= 0:
+            return
+
+        with self._throttle_lock:
+            now = time.monotonic()
+            start = max(now, self._next_write_at)
+            self._next_write_at = start + docs / self.docs_per_second
+
+        delay = start - now
+        if delay > 0:
+            self.stats['throttled_seconds'] += delay
+            time.sleep(delay)
+
+    def _write_chunk(self, notifications: List[Dict]) -> int:
+        """Insert one chunk of notifications and their delivery records; returns how many were written"""
+        now = datetime.utcnow()
+        for notification in notifications:
+            notification.setdefault('_id', ObjectId())
+            notification.setdefault('created_at', now)
+
+        self._throttle(len(notifications) * 2)
+
+        failed = set()
+        try:
+            self.notifications.insert_notifications(notifications)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported documents was written
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            logger.warning(f"{len(failed)} of {len(notifications)} notifications failed to insert")
+
+        written = [notification for index, notification in enumerate(notifications) if index not in failed]
+        try:
+            get_unread_counter().record_created(notification['user_id'] for notification in written)
+        except Exception as e:
+            logger.error(f"Failed to update unread counters: {e}")
+
+        try:
+            self.deliveries.insert_deliveries([
+                {
+                    'user_id': notification['user_id'],
+                    'notification_id': notification['_id'],
+                    'status': 'delivered',  # In-app only
+                    'delivery_method': 'in_app',
+                    'created_at': now,
+                    'delivered_at': now
+                }
+                for notification in written
+            ])
+        except BulkWriteError as e:
+            # The notifications themselves are visible; only delivery bookkeeping is incomplete
+            logger.warning(f"{len(e.details.get('writeErrors', []))} delivery records failed to insert")
+
+        self.stats['chunks_written'] += 1
+        self.stats['notifications_written'] += len(written)
+        self.stats['notifications_failed'] += len(failed)
+        return len(written)
+
+    def write_notifications(self, notifications: Iterable[Dict]) -> Dict:
+        """Write prepared notification documents in chunks"""
+        written = failed = 0
+        for chunk in chunked(notifications, self.chunk_size):
+            chunk_written = self._write_chunk(chunk)
+            written += chunk_written
+            failed += len(chunk) - chunk_written
+        return {'notified': written, 'failed': failed}
+
+    def build_notifications(self, user_ids: Iterable[Union[ObjectId, str]], title: str, message: str,
+                            notification_type: str = 'general', priority: str = 'normal',
+                            related_protest_id=None, related_alert_id=None,
+                            action_url: str = '', metadata: Dict = None):
+        """Lazily build one notification per distinct user from a shared template"""
+        related_protest_id = to_object_id(related_protest_id)
+        related_alert_id = to_object_id(related_alert_id)
+        seen = set()
+        for user_id in user_ids:
+            user_id = to_object_id(user_id)
+            if user_id is None or user_id in seen:
+                continue
+            seen.add(user_id)
+            yield {
+                'user_id': user_id,
+                'title': title,
+                'message': message,
+                'notification_type': notification_type,
+                'priority': priority,
+                'read': False,
+                'related_protest_id': related_protest_id,
+                'related_alert_id': related_alert_id,
+                'action_url': action_url,
+                'metadata': dict(metadata or {})
+            }
+
+    def notify_users(self, user_ids: Iterable[Union[ObjectId, str]], title: str, message: str, **template) -> Dict:
+        """Notify a set of users now, in the calling thread"""
+        return self.write_notifications(self.build_notifications(user_ids, title, message, **template))
+
+    def deliver(self, notifications: List[Dict], description: str = '') -> Dict:
+        """Write individually prepared notifications (e.g. alert matches) in the calling thread"""
+        result = self.write_notifications(notifications)
+        logger.debug(f"Delivered {result['notified']} notifications ({description})")
+        return result
+
+    # ---- Background jobs ----
+
+    def start(self):
+        """Start this process's job workers once (a no-op when NOTIFICATION_FANOUT_WORKERS=0)"""
+        # Threads do not survive a fork, so workers inherited from a preloading parent restart
+        if self._pid == os.getpid() or self.workers <= 0:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.worker_prefix = f"{socket.gethostname()}:{self._pid}"
+            self._threads = []
+
+            self._stop.clear()
+            for index in range(self.workers):
+                worker_id = f"{self.worker_prefix}:{index}"
+                thread = threading.Thread(target=self._run, args=(worker_id,),
+                                          name=f"notification-fanout-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Signal the job workers to exit after their current chunk"""
+        self._stop.set()
+        self._wake.set()
+
+    def _claim(self, worker_id: str) -> Optional[Dict]:
+        self.jobs.requeue_expired(self.max_attempts)
+        return self.jobs.claim_next(worker_id, self.lease_seconds)
+
+    def _run(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                job = self._claim(worker_id)
+            except Exception as e:
+                logger.error(f"Notification fan-out worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.run_job(job, worker_id)
+
+    def _recipients(self, job: Dict) -> Iterable[ObjectId]:
+        """User ids a job still has to notify, starting after its cursor"""
+        if job['audience'] == 'followers':
+            return self.follows.iter_follower_ids(job['protest_id'], after_user_id=job.get('cursor'))
+        return iter(job['user_ids'][job.get('cursor') or 0:])
+
+    def run_job(self, job: Dict, worker_id: str) -> str:
+        """Write a claimed job chunk by chunk, recording its cursor after each; returns the final status"""
+        notified, failed = job.get('notified', 0), job.get('failed', 0)
+        cursor = job.get('cursor')
+        started = time.time()
+        self.stats['jobs_run'] += 1
+
+        try:
+            for user_ids in chunked(self._recipients(job), self.chunk_size):
+                if self._stop.is_set():
+                    return 'running'  # The lease lapses and another worker resumes from the cursor
+
+                chunk = list(self.build_notifications(user_ids, job['title'], job['message'], **job['template']))
+                chunk_written = self._write_chunk(chunk)
+                notified += chunk_written
+                failed += len(chunk) - chunk_written
+                cursor = user_ids[-1] if job['audience'] == 'followers' else (cursor or 0) + len(user_ids)
+
+                if not self.jobs.update_progress(job['_id'], worker_id, cursor, notified, failed,
+                                                 self.lease_seconds):
+                    logger.warning(f"Notification fan-out {job['_id']} was reassigned, stopping")
+                    return 'reassigned'
+
+            status, error = 'completed', None
+        except Exception as e:
+            logger.error(f"Notification fan-out {job['_id']} failed: {e}")
+            status, error = 'failed', str(e)
+
+        try:
+            self.jobs.finish_job(job['_id'], worker_id, status, error)
+        except Exception as e:
+            logger.error(f"Could not record the end of notification fan-out {job['_id']}: {e}")
+        logger.info(f"Notification fan-out {job['_id']} {status}: {notified} notified "
+                    f"in {time.time() - started:.1f}s")
+        return status
+
+    def _submit(self, audience: str, title: str, message: str, template: Dict, description: str,
+                **job_fields) -> str:
+        job_id = self.jobs.create_job(audience, title, message, template, description, **job_fields)
+        self.stats['jobs_submitted'] += 1
+        self._wake.set()
+        return str(job_id)
+
+    def submit_user_fanout(self, user_ids: List[Union[ObjectId, str]], title: str, message: str,
+                           description: str = '', **template) -> str:
+        """Queue one templated notification per user and return the job id"""
+        user_ids = list(dict.fromkeys(to_object_id(user_id) for user_id in user_ids))
+        return self._submit('users', title, message, template, description,
+                            user_ids=user_ids, total=len(user_ids))
+
+    def submit_follower_fanout(self, protest_id: Union[ObjectId, str], title: str, message: str,
+                               **template) -> str:
+        """Queue a notification to everyone following a protest (followers are streamed when the job runs)"""
+        protest_id = to_object_id(protest_id)
+        template.setdefault('related_protest_id', protest_id)
+        template.setdefault('action_url', f'/protests/{protest_id}')
+        return self._submit('followers', title, message, template, f'followers of {protest_id}',
+                            protest_id=protest_id)
+
+    def _format_job(self, job: Dict) -> Dict:
+        return {
+            'job_id': str(job['_id']),
+            'description': job.get('description', ''),
+            'status': job['status'],
+            'total': job.get('total'),
+            'notified': job.get('notified', 0),
+            'failed': job.get('failed', 0),
+            'chunks': job.get('chunks', 0),
+            'attempts': job.get('attempts', 0),
+            'error': job.get('error'),
+            'submitted_at': job.get('submitted_at'),
+            'started_at': job.get('started_at'),
+            'finished_at': job.get('finished_at')
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Progress of a background job, from whichever process runs it"""
+        job = self.jobs.get_job(job_id)
+        return self._format_job(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """Recent background jobs, newest first"""
+        return [self._format_job(job) for job in self.jobs.get_recent_jobs(limit)]
+
+    def get_stats(self) -> Dict:
+        """Throughput counters and configuration for health endpoints"""
+        try:
+            active = self.jobs.count_active()
+        except Exception as e:
+            logger.warning(f"Could not count active notification fan-outs: {e}")
+            active = None
+        return {
+            **self.stats,
+            'throttled_seconds': round(self.stats['throttled_seconds'], 2),
+            'active_jobs': active,
+            'chunk_size': self.chunk_size,
+            'docs_per_second': self.docs_per_second,
+            'workers': self.workers,
+            'running_workers': sum(1 for thread in self._threads if thread.is_alive())
+        }
+
+
+# Global notification fan-out instance
+notification_fanout_instance = None
+
+def get_notification_fanout():
+    """Get or create notification fan-out instance"""
+    global notification_fanout_instance
+    if notification_fanout_instance is None:
+        notification_fanout_instance = NotificationFanout()
+    return notification_fanout_instance
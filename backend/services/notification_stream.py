@@ -0,0 +1,361 @@
+import os
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import NotificationHistory, UserFollow
+from models.data_collection_models import Protest
+
+logger = logging.getLogger(__name__)
+
+# Protest fields pushed to followers when a protest changes
+PROTEST_UPDATE_FIELDS = ('title', 'status', 'location_description', 'start_date',
+                         'end_date', 'updated_at', 'merge_count')
+
+# Changes to these fields notify followers (updated_at moves with every write, e.g. engagement counters)
+PROTEST_NOTIFY_FIELDS = tuple(field for field in PROTEST_UPDATE_FIELDS if field != 'updated_at')
+
+# Re-read this far behind the previous poll so writes committed out of order are not missed
+POLL_OVERLAP_SECONDS = 5
+
+# $in lists are split into chunks of this size when polling
+POLL_CHUNK_SIZE = 1000
+
+
+class StreamFull(Exception):
+    """Raised when a process already holds its maximum number of stream connections"""
+    pass
+
+
+class Subscription:
+    """One connected client: a bounded event buffer and the protests its user follows"""
+
+    def __init__(self, user_id: ObjectId, max_events: int):
+        self.user_id = user_id
+        self.protest_ids = set()
+        self.follows_loaded_at = 0.0
+        self.events = deque(maxlen=max_events)
+        self.ready = threading.Event()
+        self.dropped = 0
+
+    def push(self, event: Dict):
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        self.ready.set()
+
+    def wait(self, timeout: float) -> List[Dict]:
+        """Events received since the last call, waiting up to timeout for the first one"""
+        if not self.events:
+            self.ready.wait(timeout)
+        self.ready.clear()
+
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+
+class NotificationStreamBroker:
+    """
+    In-process pub/sub behind the notification event stream.
+    Connected clients subscribe by user id and by the protests that user
+    follows. One source thread per process feeds the broker: MongoDB change
+    streams on notification_history inserts and protest updates when the
+    deployment supports them, otherwise a tailing poll every
+    NOTIFICATION_STREAM_POLL_SECONDS that only asks about users and protests
+    with a connected subscriber. Idle subscribers cost a buffer and an event
+    wait rather than a query, but each open stream still occupies one
+    request thread of the threaded server, so at most
+    NOTIFICATION_STREAM_MAX_CONNECTIONS (default 50) are accepted per process
+    and the rest are turned away with 503 before they pin a thread.
+    """
+
+    def __init__(self, max_connections: int = None, poll_interval: float = None):
+        self.max_connections = max_connections or int(os.getenv('NOTIFICATION_STREAM_MAX_CONNECTIONS', 50))
+        self.poll_interval = poll_interval or float(os.getenv('NOTIFICATION_STREAM_POLL_SECONDS', 2))
+        self.source = os.getenv('NOTIFICATION_STREAM_SOURCE', 'auto')  # auto | change_stream | poll
+        self.follow_refresh_seconds = float(os.getenv('NOTIFICATION_STREAM_FOLLOW_REFRESH_SECONDS', 60))
+        self.max_buffered_events = int(os.getenv('NOTIFICATION_STREAM_BUFFER_SIZE', 100))
+
+        self.notifications = NotificationHistory()
+        self.follows = UserFollow()
+        self.protests = Protest()
+
+        self._by_user = defaultdict(set)  # user id -> subscriptions
+        self._by_protest = defaultdict(set)  # protest id -> subscriptions
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._active_source = None
+
+        self.stats = {'connections_opened': 0, 'connections_rejected': 0, 'notifications_published': 0,
+                      'protest_updates_published': 0, 'polls': 0, 'source_errors': 0}
+
+    # ---- Subscriptions ----
+
+    def subscribe(self, user_id: ObjectId) -> Subscription:
+        """Register a connected client (raises StreamFull at the connection limit)"""
+        self._ensure_started()
+        subscription = Subscription(user_id, self.max_buffered_events)
+
+        with self._lock:
+            if self._count >= self.max_connections:
+                self.stats['connections_rejected'] += 1
+                raise StreamFull("Too many notification stream connections")
+            self._by_user[user_id].add(subscription)
+            self._count += 1
+            self.stats['connections_opened'] += 1
+
+        try:
+            self.refresh_follows(subscription)
+        except Exception:
+            self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a disconnected client"""
+        with self._lock:
+            subscriptions = self._by_user.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_user[subscription.user_id]
+            self._set_protests(subscription, set())
+            self._count -= 1
+
+    def _set_protests(self, subscription: Subscription, protest_ids: Set[ObjectId]):
+        """Move a subscription between protest channels (caller holds the lock)"""
+        for protest_id in subscription.protest_ids - protest_ids:
+            subscribers = self._by_protest.get(protest_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_protest[protest_id]
+        for protest_id in protest_ids - subscription.protest_ids:
+            self._by_protest[protest_id].add(subscription)
+        subscription.protest_ids = protest_ids
+
+    def refresh_follows(self, subscription: Subscription, force: bool = True):
+        """Reload the protests a subscriber follows (follows may change on any worker)"""
+        if not force and time.time() - subscription.follows_loaded_at < self.follow_refresh_seconds:
+            return
+
+        protest_ids = {follow['protest_id'] for follow in self.follows.find_many(
+            {'user_id': subscription.user_id, 'active': True, 'notification_enabled': {'$ne': False}},
+            limit=0, projection={'protest_id': 1}
+        )}
+        subscription.follows_loaded_at = time.time()
+        with self._lock:
+            if subscription in self._by_user.get(subscription.user_id, ()):
+                self._set_protests(subscription, protest_ids)
+
+    # ---- Publishing ----
+
+    def publish_notification(self, notification: Dict):
+        """Deliver a new notification to its user's connections"""
+        with self._lock:
+            subscriptions = list(self._by_user.get(notification.get('user_id'), ()))
+        for subscription in subscriptions:
+            subscription.push({'event': 'notification', 'id': str(notification['_id']), 'data': notification})
+        self.stats['notifications_published'] += 1
+
+    def publish_protest_update(self, protest: Dict, updated_fields: List[str] = None):
+        """Deliver a protest change to everyone connected who follows it"""
+        with self._lock:
+            subscriptions = list(self._by_protest.get(protest['_id'], ()))
+        if not subscriptions:
+            return
+
+        data = {
+            'protest_id': str(protest['_id']),
+            **{field: protest.get(field) for field in PROTEST_UPDATE_FIELDS if field in protest},
+            'updated_fields': updated_fields
+        }
+        for subscription in subscriptions:
+            subscription.push({'event': 'protest_update', 'data': data})
+        self.stats['protest_updates_published'] += 1
+
+    def _subscribed_ids(self):
+        with self._lock:
+            return list(self._by_user), list(self._by_protest)
+
+    # ---- Sources ----
+
+    def _ensure_started(self):
+        """Start the source threads once per process"""
+        # Threads do not survive a fork, so a broker inherited from a preloading parent restarts them
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+
+            if self.source in ('auto', 'change_stream') and self._change_streams_supported():
+                self._active_source = 'change_stream'
+                targets = [self._watch_notifications, self._watch_protests]
+            else:
+                self._active_source = 'poll'
+                targets = [self._poll]
+
+            self._threads = [threading.Thread(target=target, name=f'notification-stream-{index}', daemon=True)
+                             for index, target in enumerate(targets)]
+            for thread in self._threads:
+                thread.start()
+            logger.info(f"Notification stream source: {self._active_source}")
+
+    def _change_streams_supported(self) -> bool:
+        """Change streams need a replica set or sharded cluster"""
+        try:
+            with self.notifications.collection.watch(max_await_time_ms=1) as stream:
+                stream.try_next()
+            return True
+        except Exception as e:
+            if self.source == 'change_stream':
+                logger.warning(f"Change streams unavailable, polling instead: {e}")
+            return False
+
+    def _watch(self, collection, pipeline: List[Dict], handle, **kwargs):
+        """Follow a change stream, resuming after errors from the last seen token"""
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with collection.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000, **kwargs) as stream:
+                    while not self._stop.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            handle(change)
+                        resume_token = stream.resume_token
+            except PyMongoError as e:
+                self.stats['source_errors'] += 1
+                logger.error(f"Notification change stream error, resuming: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _watch_notifications(self):
+        self._watch(
+            self.notifications.collection,
+            [{'$match': {'operationType': 'insert'}}],
+            lambda change: self.publish_notification(change['fullDocument'])
+        )
+
+    def _watch_protests(self):
+        def handle(change):
+            protest_id = change['documentKey']['_id']
+            if protest_id not in self._by_protest:
+                return
+            if change['operationType'] == 'replace':
+                self.publish_protest_update({**change.get('fullDocument', {}), '_id': protest_id})
+            else:
+                # Updates carry only the changed fields; followers get those, without a lookup
+                updated = change['updateDescription']['updatedFields']
+                self.publish_protest_update({'_id': protest_id, **updated}, list(updated))
+
+        # Only user-facing changes reach this process, projected to the fields that are sent
+        pipeline = [
+            {'$match': {'$or': [
+                {'operationType': 'replace'},
+                {'operationType': 'update',
+                 '$or': [{f'updateDescription.updatedFields.{field}': {'$exists': True}}
+                         for field in PROTEST_NOTIFY_FIELDS]}
+            ]}},
+            {'$project': {
+                'operationType': 1,
+                'documentKey': 1,
+                **{f'updateDescription.updatedFields.{field}': 1 for field in PROTEST_UPDATE_FIELDS},
+                **{f'fullDocument.{field}': 1 for field in PROTEST_UPDATE_FIELDS}
+            }}
+        ]
+        self._watch(self.protests.collection, pipeline, handle)
+
+    def _poll(self):
+        """Tail new notifications and protest edits for connected users only"""
+        # Notifications are stamped with utcnow, protests with local time
+        notifications_since = notifications_floor = datetime.utcnow()
+        protests_since = protests_floor = datetime.now()
+        overlap = timedelta(seconds=POLL_OVERLAP_SECONDS)
+        seen = OrderedDict()  # recently published keys, for the overlap window
+
+        while not self._stop.wait(self.poll_interval):
+            user_ids, protest_ids = self._subscribed_ids()
+            if not user_ids:
+                # Nobody was listening, so nothing before now needs delivering
+                notifications_since = notifications_floor = datetime.utcnow()
+                protests_since = protests_floor = datetime.now()
+                continue
+
+            try:
+                notifications_started, protests_started = datetime.utcnow(), datetime.now()
+                self.stats['polls'] += 1
+
+                for start in range(0, len(user_ids), POLL_CHUNK_SIZE):
+                    for notification in self.notifications.collection.find({
+                        'user_id': {'$in': user_ids[start:start + POLL_CHUNK_SIZE]},
+                        'created_at': {'$gt': max(notifications_floor, notifications_since - overlap)}
+                    }).sort('created_at', 1):
+                        if notification['_id'] not in seen:
+                            seen[notification['_id']] = True
+                            self.publish_notification(notification)
+
+                for start in range(0, len(protest_ids), POLL_CHUNK_SIZE):
+                    for protest in self.protests.collection.find({
+                        '_id': {'$in': protest_ids[start:start + POLL_CHUNK_SIZE]},
+                        'updated_at': {'$gt': max(protests_floor, protests_since - overlap)}
+                    }, {field: 1 for field in PROTEST_UPDATE_FIELDS}):
+                        key = (protest['_id'], protest.get('updated_at'))
+                        if key not in seen:
+                            seen[key] = True
+                            self.publish_protest_update(protest)
+
+                while len(seen) > 10000:
+                    seen.popitem(last=False)
+                notifications_since, protests_since = notifications_started, protests_started
+
+            except PyMongoError as e:
+                self.stats['source_errors'] += 1
+                logger.error(f"Notification stream poll failed: {e}")
+
+    def stop(self):
+        """Stop the source threads"""
+        self._stop.set()
+        self._pid = None
+
+    def get_stats(self) -> Dict:
+        """Connection and delivery counters for health endpoints"""
+        with self._lock:
+            connections, users, protests = self._count, len(self._by_user), len(self._by_protest)
+        return {
+            **self.stats,
+            'connections': connections,
+            'connected_users': users,
+            'followed_protests': protests,
+            'max_connections': self.max_connections,
+            'source': self._active_source
+        }
+
+
+# Global notification stream broker instance
+notification_stream_broker_instance = None
+
+def get_notification_stream_broker():
+    """Get or create notification stream broker instance"""
+    global notification_stream_broker_instance
+    if notification_stream_broker_instance is None:
+        notification_stream_broker_instance = NotificationStreamBroker()
+    return notification_stream_broker_instance
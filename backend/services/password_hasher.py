@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Optional
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# bcrypt's valid cost range
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a hash did not finish in time"""
+    pass
+
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ($2b$12$... -> 12)"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small process pool instead of on request threads.
+    At most BCRYPT_MAX_PENDING hashes may be queued or running; further
+    calls fail immediately with PasswordHasherBusy so a login burst is
+    turned away quickly instead of occupying every web worker, and bcrypt
+    never uses more than BCRYPT_WORKERS cores per process. Hashes whose cost
+    differs from BCRYPT_ROUNDS are reported by needs_rehash so logins can
+    upgrade them transparently.
+    """
+
+    def __init__(self, workers: int = None, rounds: int = None):
+        self.workers = workers if workers is not None else int(os.getenv('BCRYPT_WORKERS', min(2, os.cpu_count() or 1)))
+        self.rounds = min(MAX_ROUNDS, max(MIN_ROUNDS, rounds or int(os.getenv('BCRYPT_ROUNDS', 12))))
+        self.max_pending = int(os.getenv('BCRYPT_MAX_PENDING', max(1, self.workers) * 8))
+        self.timeout = float(os.getenv('BCRYPT_TIMEOUT_SECONDS', 10))
+
+        self._pool = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+        self.stats = {'hashes': 0, 'verifications': 0, 'rehashes': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """The process pool, created lazily once per process (None when BCRYPT_WORKERS=0)"""
+        if self.workers <= 0:
+            return None
+        # A pool inherited across a fork has no live workers in the child
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        """Run a bcrypt call in the pool, rejecting at once when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        submitted = False
+        try:
+            pool = self._get_pool()
+            if pool is None:
+                return fn(*args)
+
+            future = pool.submit(fn, *args)
+            # The slot is freed when bcrypt finishes, not when a timed-out caller gives up on it
+            future.add_done_callback(lambda _: self._slots.release())
+            submitted = True
+        finally:
+            if not submitted:
+                self._slots.release()
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.stats['timeouts'] += 1
+            raise PasswordHasherBusy("Password hashing timed out")
+
+    def hash(self, password: str, rounds: int = None) -> str:
+        """bcrypt hash of a password at the configured cost"""
+        hashed = self._run(_hash_password, password.encode('utf-8'), rounds or self.rounds)
+        self.stats['hashes'] += 1
+        return hashed.decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Check a password against a bcrypt hash"""
+        result = self._run(_check_password, password.encode('utf-8'), hashed.encode('utf-8'))
+        self.stats['verifications'] += 1
+        return result
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether a stored hash uses a different cost than the configured one"""
+        return hash_rounds(hashed) != self.rounds
+
+    def rehash(self, password: str, hashed: str) -> Optional[str]:
+        """New hash for a just-verified password if its cost is outdated and there is spare capacity"""
+        if not self.needs_rehash(hashed):
+            return None
+        try:
+            new_hash = self.hash(password)
+        except PasswordHasherBusy:
+            # The upgrade can wait for a quieter login
+            return None
+        self.stats['rehashes'] += 1
+        return new_hash
+
+    def benchmark(self, costs: Iterable[int] = None, target_ms: float = None) -> Dict:
+        """Time one hash per cost factor in the pool and recommend the highest cost within target_ms"""
+        costs = list(costs or range(10, self.rounds + 3))
+        target_ms = target_ms or float(os.getenv('BCRYPT_TARGET_MS', 250))
+
+        timings = []
+        for cost in costs:
+            if not MIN_ROUNDS <= cost <= MAX_ROUNDS:
+                continue
+            started = time.perf_counter()
+            self._run(_hash_password, b'benchmark-password', cost)
+            timings.append({'rounds': cost, 'milliseconds': round((time.perf_counter() - started) * 1000, 1)})
+
+        within_target = [timing['rounds'] for timing in timings if timing['milliseconds'] <= target_ms]
+        return {
+            'configured_rounds': self.rounds,
+            'target_ms': target_ms,
+            'recommended_rounds': max(within_target) if within_target else None,
+            'timings': timings
+        }
+
+    def get_stats(self) -> Dict:
+        """Pool configuration and counters for health endpoints"""
+        return {
+            **self.stats,
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'max_pending': self.max_pending,
+            'timeout_seconds': self.timeout
+        }
+
+
+# Global password hasher instance
+password_hasher_instance = None
+
+def get_password_hasher():
+    """Get or create password hasher instance"""
+    global password_hasher_instance
+    if password_hasher_instance is None:
+        password_hasher_instance = PasswordHasher()
+    return password_hasher_instance
@@ -0,0 +1,99 @@
+import os
+import time
+import atexit
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting request checks whether its queued tasks have started
+QUEUE_POLL_SECONDS = 0.05
+
+
+class PipelineExecutor:
+    """
+    Runs independent analytics queries for one request concurrently.
+    Tasks share a bounded thread pool so a burst of dashboard requests cannot
+    open unbounded database connections. Callers send queries with maxTimeMS
+    set to max_time_ms so the server abandons slow pipelines, and any task that
+    fails or overruns yields its fallback value instead of failing the request.
+    A task's deadline runs from when it starts executing, so time spent queued
+    behind other requests' tasks is not reported as a query timeout; a task
+    still queued after the same budget is cancelled.
+    """
+
+    def __init__(self, max_workers: int = None, max_time_ms: int = None):
+        self.max_workers = max_workers or int(os.getenv('ANALYTICS_PIPELINE_WORKERS', 8))
+        self.max_time_ms = max_time_ms or int(os.getenv('ANALYTICS_PIPELINE_MAX_TIME_MS', 10000))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analytics-pipeline')
+        atexit.register(self._pool.shutdown, wait=False)
+
+    def _timed(self, name: str, task: Callable[[], Any], started_at: Dict[str, float]) -> Tuple[Any, float]:
+        started_at[name] = time.perf_counter()
+        result = task()
+        return result, (time.perf_counter() - started_at[name]) * 1000
+
+    def _wait(self, name: str, future: Future, started_at: Dict[str, float], submitted: float) -> Tuple[Any, float]:
+        """Wait for a task, raising FutureTimeoutError once it overruns its own deadline"""
+        # Client-side deadline slightly past maxTimeMS, for tasks stuck before reaching the server
+        budget = self.max_time_ms / 1000 + 1
+        while True:
+            began = started_at.get(name)
+            if began is None:
+                # Still queued, so its clock has not started; give up only if it never gets a worker
+                if time.perf_counter() - submitted > budget and future.cancel():
+                    raise FutureTimeoutError()
+                timeout = QUEUE_POLL_SECONDS
+            else:
+                timeout = max(0, began + budget - time.perf_counter())
+
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                if began is not None:
+                    raise
+
+    def run(self, tasks: Dict[str, Tuple[Callable[[], Any], Any]]) -> Tuple[Dict[str, Any], Dict]:
+        """
+        Run {name: (task, fallback)} concurrently.
+        Returns the results keyed by name and execution metadata with per-task timings.
+        """
+        started = time.perf_counter()
+        started_at = {}
+        futures = {name: self._pool.submit(self._timed, name, task, started_at) for name, (task, _) in tasks.items()}
+
+        results = {}
+        timings = {}
+        for name, future in futures.items():
+            fallback = tasks[name][1]
+            try:
+                result, elapsed_ms = self._wait(name, future, started_at, started)
+                results[name] = result
+                timings[name] = {'time_ms': round(elapsed_ms, 1), 'status': 'ok'}
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"Analytics pipeline '{name}' exceeded {self.max_time_ms}ms, using fallback")
+                results[name] = fallback
+                timings[name] = {'time_ms': round((time.perf_counter() - started) * 1000, 1), 'status': 'timeout'}
+            except Exception as e:
+                logger.warning(f"Analytics pipeline '{name}' failed, using fallback: {e}")
+                results[name] = fallback
+                timings[name] = {'time_ms': round((time.perf_counter() - started) * 1000, 1), 'status': 'failed'}
+
+        return results, {
+            'execution': 'concurrent',
+            'total_time_ms': round((time.perf_counter() - started) * 1000, 1),
+            'pipelines': timings
+        }
+
+
+# Global pipeline executor instance
+pipeline_executor_instance = None
+
+def get_pipeline_executor():
+    """Get or create pipeline executor instance"""
+    global pipeline_executor_instance
+    if pipeline_executor_instance is None:
+        pipeline_executor_instance = PipelineExecutor()
+    return pipeline_executor_instance
@@ -0,0 +1,224 @@
+import json
+import hashlib
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_request_args(args, exclude=()) -> list:
+    """Turn request args into a stable, order-independent list for cache keys"""
+    normalized = []
+    for key in sorted(args.keys()):
+        if key in exclude:
+            continue
+        values = [value.strip() for value in args.getlist(key) if value.strip()]
+        if values:
+            normalized.append([key, sorted(values)])
+    return normalized
+
+
+def normalize_parsed_query(parsed_query: Optional[Dict]) -> Optional[Dict]:
+    """Drop presentation-only fields from parse_search_query output"""
+    if not parsed_query:
+        return None
+    return {
+        'keywords': parsed_query.get('keywords', []),
+        'quoted_phrases': sorted(parsed_query.get('quoted_phrases', [])),
+        'hashtags': sorted(parsed_query.get('hashtags', [])),
+        'location_terms': sorted(parsed_query.get('location_terms', [])),
+        'category_terms': sorted(parsed_query.get('category_terms', []))
+    }
+
+
+class QueryCache:
+    """
+    Result cache for read-heavy protest queries.
+    Entries are bounded by an LRU size limit and a TTL, and are keyed on a
+    data generation that is bumped whenever protests are created or merged.
+    When QUERY_CACHE_REDIS_URL is set, entries and the generation counter are
+    shared across processes, so API workers stop serving results from before
+    a write within QUERY_CACHE_GENERATION_REFRESH_SECONDS. Without redis the
+    generation is per process: a bump only reaches the process that made it
+    (the collector), and web workers can serve results from before a write
+    for up to the entry TTL (QUERY_CACHE_TTL_SECONDS).
+    """
+
+    GENERATION_KEY = 'query_cache:generation'
+
+    def __init__(self, max_entries: int = None, default_ttl: int = None, redis_url: str = None):
+        self.max_entries = max_entries or int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 1024))
+        self.default_ttl = default_ttl or int(os.getenv('QUERY_CACHE_TTL_SECONDS', 60))
+        self.enabled = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._entries = OrderedDict()  # full_key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._generation_checked_at = 0.0
+        self._generation_refresh_seconds = float(os.getenv('QUERY_CACHE_GENERATION_REFRESH_SECONDS', 1))
+
+        self.stats = {'hits': 0, 'misses': 0, 'shared_hits': 0, 'evictions': 0, 'invalidations': 0}
+
+        self._shared = None
+        redis_url = redis_url or os.getenv('QUERY_CACHE_REDIS_URL')
+        if redis_url:
+            if redis is None:
+                logger.warning("QUERY_CACHE_REDIS_URL is set but redis is not installed, using local cache only")
+            else:
+                try:
+                    self._shared = redis.Redis.from_url(redis_url, socket_timeout=0.25)
+                    self._shared.ping()
+                    logger.info("Query cache using shared redis backend")
+                except Exception as e:
+                    logger.warning(f"Shared query cache unavailable, using local cache only: {e}")
+                    self._shared = None
+
+    def make_key(self, namespace: str, key_parts: Any) -> str:
+        """Build a cache key from a namespace and JSON-serializable key parts"""
+        raw = json.dumps(key_parts, sort_keys=True, default=str)
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def get_generation(self) -> int:
+        """Current data generation (refreshed from the shared backend when configured)"""
+        if self._shared is None:
+            return self._generation
+
+        now = time.time()
+        if now - self._generation_checked_at >= self._generation_refresh_seconds:
+            try:
+                shared_generation = int(self._shared.get(self.GENERATION_KEY) or 0)
+                if shared_generation != self._generation:
+                    with self._lock:
+                        self._entries.clear()
+                    self._generation = shared_generation
+                self._generation_checked_at = now
+            except Exception as e:
+                logger.warning(f"Failed to read shared cache generation: {e}")
+        return self._generation
+
+    def bump_generation(self, reason: str = None) -> int:
+        """Invalidate every cached result after a data change"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.stats['invalidations'] += 1
+
+        if self._shared is not None:
+            try:
+                self._generation = int(self._shared.incr(self.GENERATION_KEY))
+                self._generation_checked_at = time.time()
+            except Exception as e:
+                logger.warning(f"Failed to bump shared cache generation: {e}")
+
+        if reason:
+            logger.debug(f"Query cache invalidated: {reason}")
+        return self._generation
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on miss"""
+        if not self.enabled:
+            return None
+
+        full_key = f"{self.get_generation()}:{key}"
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(full_key)
+                    self.stats['hits'] += 1
+                    return value
+                del self._entries[full_key]
+
+        if self._shared is not None:
+            try:
+                raw = self._shared.get(f"query_cache:{full_key}")
+                if raw is not None:
+                    value = json.loads(raw)
+                    self._store_local(full_key, value, self.default_ttl)
+                    self.stats['shared_hits'] += 1
+                    return value
+            except Exception as e:
+                logger.warning(f"Shared cache read failed: {e}")
+
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: int = None, generation: int = None):
+        """Cache a JSON-serializable value under the given (or current) generation"""
+        if not self.enabled:
+            return
+
+        ttl = ttl or self.default_ttl
+        if generation is None:
+            generation = self.get_generation()
+        full_key = f"{generation}:{key}"
+        self._store_local(full_key, value, ttl)
+
+        if self._shared is not None:
+            try:
+                self._shared.setex(f"query_cache:{full_key}", ttl, json.dumps(value, default=str))
+            except Exception as e:
+                logger.warning(f"Shared cache write failed: {e}")
+
+    def get_or_compute(self, namespace: str, key_parts: Any, compute: Callable[[], Any], ttl: int = None) -> Any:
+        """Return the cached result for key_parts, computing and storing it on miss"""
+        key = self.make_key(namespace, key_parts)
+        generation = self.get_generation()  # Results computed across a bump are stored under the old generation
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        if value is not None:
+            self.set(key, value, ttl, generation=generation)
+        return value
+
+    def clear(self):
+        """Drop all local entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Cache statistics for health endpoints"""
+        lookups = self.stats['hits'] + self.stats['shared_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'generation': self._generation,
+            'hit_rate': round((self.stats['hits'] + self.stats['shared_hits']) / lookups, 3) if lookups else 0,
+            'shared_backend': self._shared is not None
+        }
+
+    def _store_local(self, full_key: str, value: Any, ttl: int):
+        """Insert into the local LRU, evicting the oldest entries over the bound"""
+        with self._lock:
+            self._entries[full_key] = (time.time() + ttl, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+
+# Global query cache instance
+query_cache_instance = None
+
+def get_query_cache():
+    """Get or create query cache instance"""
+    global query_cache_instance
+    if query_cache_instance is None:
+        query_cache_instance = QueryCache()
+    return query_cache_instance
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import atexit
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from bson import ObjectId
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import UserSession
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Session bookkeeping for authenticated requests.
+    Session documents are cached in process by token (including the fact that
+    a token has no session), so auth checks do not read MongoDB per request.
+    Last-activity times are buffered in memory and written every
+    SESSION_ACTIVITY_FLUSH_SECONDS as one unordered bulk write, and expired
+    sessions are removed by a TTL index on expires_at rather than by sweeps.
+    Revocations write through immediately and evict the cached sessions;
+    other processes see them once their cached entry expires.
+    """
+
+    def __init__(self, cache_ttl: float = None, flush_interval: float = None):
+        self.cache_ttl = cache_ttl or float(os.getenv('SESSION_CACHE_TTL_SECONDS', 30))
+        self.flush_interval = flush_interval or float(os.getenv('SESSION_ACTIVITY_FLUSH_SECONDS', 30))
+        self.max_entries = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 10000))
+
+        self.sessions = UserSession()
+        self._cache = OrderedDict()  # token -> (cached_until, session or None)
+        self._pending = {}  # token -> {'last_activity': datetime, 'data': dict}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._running = False
+        self._thread = None
+
+        self.stats = {'hits': 0, 'misses': 0, 'touches': 0, 'flushes': 0,
+                      'sessions_written': 0, 'flush_failures': 0, 'revocations': 0}
+
+        try:
+            self.sessions.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure session indexes: {e}")
+
+    def _cache_put(self, session_token: str, session: Optional[Dict]):
+        with self._lock:
+            self._cache[session_token] = (time.time() + self.cache_ttl, session)
+            self._cache.move_to_end(session_token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def create_session(self, session_data: Dict) -> ObjectId:
+        """Insert a session and cache it for the requests that follow"""
+        session_data.setdefault('last_activity', session_data.get('created_at') or datetime.utcnow())
+        session_id = self.sessions.create(session_data)
+        self._cache_put(session_data['session_token'], session_data)
+        return session_id
+
+    def lookup(self, session_token: str) -> Optional[Dict]:
+        """Session document for a token in any state, or None if there is none"""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(session_token)
+            if entry and now < entry[0]:
+                self._cache.move_to_end(session_token)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        session = self.sessions.find_one({'session_token': session_token})
+        self._cache_put(session_token, session)
+        return session
+
+    def get_session(self, session_token: str) -> Optional[Dict]:
+        """Active, unexpired session for a token"""
+        session = self.lookup(session_token)
+        if not session or not session.get('active'):
+            return None
+        if session.get('expires_at') and session['expires_at'] <= datetime.utcnow():
+            return None
+        return session
+
+    def touch(self, session_token: str, activity_data: Dict = None):
+        """Record activity on a session, written with the next flush"""
+        with self._lock:
+            self._pending[session_token] = {'last_activity': datetime.utcnow(), 'data': activity_data}
+            self.stats['touches'] += 1
+            pending = len(self._pending)
+
+        self._ensure_started()
+        if pending >= self.max_entries:
+            self._flush_requested.set()
+
+    def get_pending_activity(self, session_token: str) -> Optional[datetime]:
+        """Unflushed last-activity time for a session"""
+        with self._lock:
+            entry = self._pending.get(session_token)
+            return entry['last_activity'] if entry else None
+
+    def list_user_sessions(self, user_id: Union[ObjectId, str], limit: int = 100) -> List[Dict]:
+        """A user's active sessions, newest activity first, including unflushed activity"""
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        sessions = self.sessions.find_many({
+            'user_id': user_id,
+            'active': True,
+            'expires_at': {'$gt': datetime.utcnow()}
+        }, limit=limit)
+
+        for session in sessions:
+            pending = self.get_pending_activity(session['session_token'])
+            if pending and (not session.get('last_activity') or pending > session['last_activity']):
+                session['last_activity'] = pending
+
+        sessions.sort(key=lambda session: session.get('last_activity') or session.get('created_at') or datetime.min,
+                      reverse=True)
+        return sessions
+
+    def _forget(self, session_tokens):
+        with self._lock:
+            for session_token in session_tokens:
+                self._cache.pop(session_token, None)
+                self._pending.pop(session_token, None)
+
+    def revoke(self, session_token: str, reason: str = None) -> bool:
+        """Revoke one session (e.g. on logout)"""
+        revoked = self.sessions.revoke_session(session_token, reason)
+        self._forget([session_token])
+        self.stats['revocations'] += int(revoked)
+        return revoked
+
+    def revoke_user_sessions(self, user_id: Union[ObjectId, str], except_token: str = None,
+                             reason: str = None) -> int:
+        """Revoke a user's sessions (optionally keeping one) and evict them from the cache"""
+        if isinstance(user_id, str):
+            user_id = ObjectId(user_id)
+
+        revoked = self.sessions.revoke_all_user_sessions(user_id, except_token, reason)
+
+        with self._lock:
+            cached_tokens = [
+                session_token for session_token, (_, session) in self._cache.items()
+                if session and session.get('user_id') == user_id and session_token != except_token
+            ]
+        self._forget(cached_tokens)
+        self.stats['revocations'] += revoked
+        return revoked
+
+    def flush(self) -> int:
+        """Write all buffered activity in one bulk write"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+
+            try:
+                written = self.sessions.bulk_update_activity(batch)
+                self.stats['flushes'] += 1
+                self.stats['sessions_written'] += written
+                return written
+            except Exception as e:
+                logger.error(f"Session activity flush failed, retrying next cycle: {e}")
+                self.stats['flush_failures'] += 1
+
+                # Keep newer activity recorded since the batch was taken
+                with self._lock:
+                    for session_token, entry in batch.items():
+                        self._pending.setdefault(session_token, entry)
+                return 0
+
+    def _ensure_started(self):
+        """Start the background flusher on first use"""
+        if self._running:
+            return
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        while self._running:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        self._running = False
+        self._flush_requested.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        """Cache and buffer statistics for health endpoints"""
+        with self._lock:
+            cached, pending = len(self._cache), len(self._pending)
+        return {
+            **self.stats,
+            'cached_sessions': cached,
+            'pending_activity': pending,
+            'cache_ttl_seconds': self.cache_ttl,
+            'flush_interval_seconds': self.flush_interval
+        }
+
+
+# Global session store instance
+session_store_instance = None
+
+def get_session_store():
+    """Get or create session store instance"""
+    global session_store_instance
+    if session_store_instance is None:
+        session_store_instance = SessionStore()
+    return session_store_instance
@@ -0,0 +1,279 @@
+import math
+import os
+import sys
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+MAX_SEARCH_RADIUS_KM = math.pi * EARTH_RADIUS_KM  # Half the circumference covers the globe
+
+# Grid cell size in degrees for candidate lookup
+GRID_CELL_DEGREES = float(os.getenv('SPATIAL_INDEX_CELL_DEGREES', 1.0))
+
+# How often queries pull changed protests from MongoDB
+REFRESH_INTERVAL_SECONDS = int(os.getenv('SPATIAL_INDEX_REFRESH_SECONDS', 60))
+
+# Re-read this far behind the watermark so writes committed out of order are not missed
+SYNC_OVERLAP_SECONDS = 5
+
+INACTIVE_STATUSES = Protest.INACTIVE_STATUSES
+
+# Fields needed to render protest cards without going back to the database
+INDEX_PROJECTION = {
+    'title': 1, 'description': 1, 'location': 1, 'location_description': 1,
+    'source_metadata.country': 1, 'geocoding_confidence': 1,
+    'start_date': 1, 'end_date': 1, 'created_at': 1, 'updated_at': 1,
+    'categories': 1, 'organizers': 1, 'status': 1, 'verification_status': 1,
+    'data_quality_score': 1, 'trending_score': 1, 'featured': 1, 'visibility': 1,
+    'data_sources': 1, 'external_links': 1, 'engagement_metrics': 1
+}
+
+
+def haversine_km(lat: float, lng: float, lats_rad: np.ndarray, lngs_rad: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distance from one point to many (target arrays in radians)"""
+    lat1 = math.radians(lat)
+    lng1 = math.radians(lng)
+    dlat = lats_rad - lat1
+    dlng = lngs_rad - lng1
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats_rad) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ProtestSpatialIndex:
+    """
+    In-memory nearest-neighbour index over active public protests.
+    Points live in NumPy coordinate arrays bucketed into a lat/lng grid, so
+    a query only computes distances for protests in grid cells that overlap
+    the search radius. Changed protests are pulled incrementally using an
+    updated_at watermark and replaced rows are tombstoned until the next compaction.
+    """
+
+    def __init__(self):
+        self.protest = Protest()
+        self._lock = threading.RLock()
+
+        self._docs = []  # Row -> protest document
+        self._row_by_id = {}  # Protest id -> row
+        self._lats = np.empty(0)
+        self._lngs = np.empty(0)
+        self._alive = np.empty(0, dtype=bool)
+        self._grid = {}  # (lat_cell, lng_cell) -> [rows]
+
+        self._pending = []  # Rows appended since the arrays were last rebuilt
+        self._tombstones = 0
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._loaded = False
+
+    # ---- Loading and refresh ----
+
+    def _cell(self, lat: float, lng: float):
+        return (int(math.floor(lat / GRID_CELL_DEGREES)), int(math.floor(lng / GRID_CELL_DEGREES)))
+
+    def _is_indexable(self, protest: Dict) -> bool:
+        if protest.get('visibility', 'public') != 'public':
+            return False
+        if protest.get('status') in INACTIVE_STATUSES:
+            return False
+        coordinates = protest.get('location', {}).get('coordinates') or []
+        return len(coordinates) == 2 and list(coordinates) != [0, 0]
+
+    def _remove_row(self, protest_id):
+        row = self._row_by_id.pop(protest_id, None)
+        if row is None:
+            return
+        if row < len(self._alive):
+            self._alive[row] = False
+        self._docs[row] = None  # Pending rows are masked out when materialized
+        self._tombstones += 1
+
+    def upsert(self, protest: Dict):
+        """Add, move or drop a single protest"""
+        with self._lock:
+            protest_id = protest['_id']
+            self._remove_row(protest_id)
+            if not self._is_indexable(protest):
+                return
+
+            row = len(self._docs)
+            self._docs.append(protest)
+            self._row_by_id[protest_id] = row
+            self._pending.append(row)
+
+            lng, lat = protest['location']['coordinates']
+            self._grid.setdefault(self._cell(lat, lng), []).append(row)
+
+    def _materialize(self):
+        """Fold pending rows into the coordinate arrays, compacting tombstones when they pile up"""
+        if self._tombstones > max(1000, len(self._docs) // 4):
+            live = [doc for doc in self._docs if doc is not None]
+            self._docs, self._row_by_id, self._grid = [], {}, {}
+            self._lats, self._lngs, self._alive = np.empty(0), np.empty(0), np.empty(0, dtype=bool)
+            self._pending, self._tombstones = [], 0
+            for doc in live:
+                self.upsert(doc)
+
+        if not self._pending:
+            return
+
+        # Pending rows are always the tail of _docs, so arrays stay aligned with row numbers
+        docs = [self._docs[row] for row in self._pending]
+        coordinates = np.array(
+            [doc['location']['coordinates'] if doc is not None else [0, 0] for doc in docs], dtype=float
+        ).reshape(-1, 2)
+        self._lngs = np.concatenate([self._lngs, np.radians(coordinates[:, 0])])
+        self._lats = np.concatenate([self._lats, np.radians(coordinates[:, 1])])
+        self._alive = np.concatenate([self._alive, np.array([doc is not None for doc in docs], dtype=bool)])
+        self._pending = []
+
+    def refresh(self, force: bool = False) -> int:
+        """Load the index, then pull protests changed since the last refresh"""
+        now = time.time()
+        if not force and self._loaded and now - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+            return 0
+
+        with self._lock:
+            if not force and self._loaded and now - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return 0
+
+            query = {'location.coordinates': {'$exists': True}}
+            if self._watermark:
+                query['updated_at'] = {'$gte': self._watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS)}
+            else:
+                query['visibility'] = 'public'
+                query['status'] = {'$nin': INACTIVE_STATUSES}
+
+            started = datetime.now()
+            changed = 0
+            for protest in self.protest.collection.find(query, INDEX_PROJECTION).batch_size(5000):
+                updated_at = protest.get('updated_at')
+                # The overlap re-reads recent protests; skip versions that are already indexed
+                row = self._row_by_id.get(protest['_id'])
+                if row is not None and updated_at is not None and self._docs[row].get('updated_at') == updated_at:
+                    continue
+
+                self.upsert(protest)
+                changed += 1
+                if updated_at and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+
+            if self._watermark is None:
+                self._watermark = started
+
+            self._materialize()
+            self._loaded = True
+            self._last_refresh = now
+
+            if changed:
+                logger.info(f"Spatial index refreshed with {changed} protests ({len(self._row_by_id)} indexed)")
+            return changed
+
+    # ---- Queries ----
+
+    def _candidate_rows(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Rows in grid cells overlapping the search radius"""
+        total_rows = len(self._alive)
+        lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+        if lat_span >= 90:
+            return np.arange(total_rows)
+
+        min_lat, max_lat = lat - lat_span, lat + lat_span
+        cos_lat = math.cos(math.radians(min(89.0, max(abs(min_lat), abs(max_lat)))))
+        lng_span = lat_span / cos_lat if cos_lat > 0 else 360
+
+        lat_cells = range(self._cell(max(-90, min_lat), 0)[0], self._cell(min(90, max_lat), 0)[0] + 1)
+        if lng_span >= 180 or max_lat >= 90 or min_lat <= -90:
+            lng_cells = None  # Wraps every longitude
+        else:
+            first = int(math.floor((lng - lng_span) / GRID_CELL_DEGREES))
+            last = int(math.floor((lng + lng_span) / GRID_CELL_DEGREES))
+            wrap = int(round(360 / GRID_CELL_DEGREES))
+            lng_cells = {((cell + wrap // 2) % wrap) - wrap // 2 for cell in range(first, last + 1)}
+
+        if lng_cells is not None and len(lat_cells) * len(lng_cells) > len(self._grid):
+            lng_cells = None
+
+        rows = []
+        if lng_cells is None:
+            lat_set = set(lat_cells)
+            for (lat_cell, _), cell_rows in self._grid.items():
+                if lat_cell in lat_set:
+                    rows.extend(cell_rows)
+        else:
+            for lat_cell in lat_cells:
+                for lng_cell in lng_cells:
+                    rows.extend(self._grid.get((lat_cell, lng_cell), ()))
+
+        return np.fromiter((row for row in rows if row < total_rows), dtype=np.int64)
+
+    def nearest(self, lat: float, lng: float, k: int = 20, radius_km: float = None,
+                categories: List[str] = None) -> List[Dict]:
+        """Get the k nearest protests sorted by distance, optionally within a radius and category filter"""
+        self.refresh()
+
+        with self._lock:
+            if not len(self._alive):
+                return []
+
+            category_filter = set(categories) if categories else None
+            max_radius = min(radius_km or MAX_SEARCH_RADIUS_KM, MAX_SEARCH_RADIUS_KM)
+            search_radius = min(max_radius, 50.0) if radius_km is None else max_radius
+
+            # Grow the radius until k matches are found; everything inside it has been checked, so the result is exact
+            while True:
+                rows = self._candidate_rows(lat, lng, search_radius)
+                rows = rows[self._alive[rows]]
+
+                if category_filter is not None and len(rows):
+                    keep = [bool(category_filter.intersection(self._docs[row].get('categories', []))) for row in rows]
+                    rows = rows[np.array(keep, dtype=bool)]
+
+                distances = haversine_km(lat, lng, self._lats[rows], self._lngs[rows])
+                within = distances <= search_radius
+                rows, distances = rows[within], distances[within]
+
+                if len(rows) >= k or search_radius >= max_radius:
+                    break
+                search_radius = min(search_radius * 4, max_radius)
+
+            if len(rows) > k:
+                nearest = np.argpartition(distances, k - 1)[:k]
+                rows, distances = rows[nearest], distances[nearest]
+
+            order = np.argsort(distances)
+            return [
+                {'protest': self._docs[rows[i]], 'distance_km': round(float(distances[i]), 2)}
+                for i in order
+            ]
+
+    def get_stats(self) -> Dict:
+        """Index statistics for health endpoints"""
+        return {
+            'indexed_protests': len(self._row_by_id),
+            'grid_cells': len(self._grid),
+            'tombstones': self._tombstones,
+            'watermark': self._watermark.isoformat() if self._watermark else None
+        }
+
+
+# Global spatial index instance
+spatial_index_instance = None
+
+def get_spatial_index():
+    """Get or create spatial index instance"""
+    global spatial_index_instance
+    if spatial_index_instance is None:
+        spatial_index_instance = ProtestSpatialIndex()
+    return spatial_index_instance
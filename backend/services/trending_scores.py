@@ -0,0 +1,153 @@
+import os
+import sys
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.data_collection_models import Protest
+from models.config_models import ServiceConfig
+
+logger = logging.getLogger(__name__)
+
+# Scores decay to zero over this many days (matches Protest.calculate_trending_score)
+DECAY_DAYS = 30
+
+SCORE_PROJECTION = {
+    'start_date': 1,
+    'data_quality_score': 1,
+    'trending_score': 1,
+    'engagement_metrics.views': 1,
+    'engagement_metrics.bookmarks': 1,
+    'engagement_metrics.followers': 1
+}
+
+
+def compute_trending_scores(views: np.ndarray, bookmarks: np.ndarray, follows: np.ndarray,
+                            days_old: np.ndarray, quality: np.ndarray) -> np.ndarray:
+    """Vectorized form of Protest.calculate_trending_score"""
+    time_factor = np.maximum(0.0, 1.0 - days_old / DECAY_DAYS)
+    engagement_score = views * 0.1 + bookmarks * 2 + follows * 3
+    return engagement_score * time_factor * quality / 100
+
+
+class TrendingScoreJob:
+    """
+    Batch recomputation of protest trending scores.
+    Protests are streamed in chunks with a narrow projection, scored with NumPy
+    and written back with unordered bulk writes that only touch documents whose
+    score actually changed. Incremental runs rescore only protests whose
+    engagement counters changed since the previous run.
+    """
+
+    SERVICE_NAME = 'trending_score_job'
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or int(os.getenv('TRENDING_JOB_CHUNK_SIZE', 50000))
+        self.protest = Protest()
+        self.service_config = ServiceConfig()
+
+    def _get_last_run(self) -> Optional[datetime]:
+        value = self.service_config.get_config(self.SERVICE_NAME, 'last_run_at')
+        return datetime.fromisoformat(value) if value else None
+
+    def _set_last_run(self, run_at: datetime):
+        self.service_config.set_config(
+            self.SERVICE_NAME, 'last_run_at', run_at.isoformat(),
+            description='Start time of the last completed trending score run'
+        )
+
+    def _score_chunk(self, protests: List[Dict], now: datetime) -> int:
+        """Score one chunk and write back the changed scores"""
+        count = len(protests)
+        views = np.zeros(count)
+        bookmarks = np.zeros(count)
+        follows = np.zeros(count)
+        quality = np.empty(count)
+        current = np.empty(count)
+        start_dates = np.empty(count, dtype='datetime64[us]')
+
+        for i, protest in enumerate(protests):
+            engagement = protest.get('engagement_metrics') or {}
+            views[i] = engagement.get('views', 0) or 0
+            bookmarks[i] = engagement.get('bookmarks', 0) or 0
+            follows[i] = engagement.get('followers', 0) or 0
+            quality[i] = protest.get('data_quality_score') if protest.get('data_quality_score') is not None else 0.5
+            current[i] = protest.get('trending_score') or 0.0
+            start_dates[i] = protest.get('start_date') or now
+
+        # Whole days like timedelta.days, which floors
+        days_old = np.floor(
+            (np.datetime64(now, 'us') - start_dates) / np.timedelta64(1, 'D')
+        )
+
+        scores = compute_trending_scores(views, bookmarks, follows, days_old, quality)
+        changed = np.flatnonzero(~np.isclose(scores, current, rtol=1e-9, atol=1e-12))
+        if not len(changed):
+            return 0
+
+        operations = [
+            UpdateOne({'_id': protests[i]['_id']}, {'$set': {'trending_score': float(scores[i])}})
+            for i in changed
+        ]
+        result = self.protest.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    def run(self, incremental: bool = False) -> Dict:
+        """Recompute trending scores for all candidate protests, or only changed ones when incremental"""
+        started = datetime.now()
+        query = {'visibility': 'public'}
+
+        last_run = self._get_last_run() if incremental else None
+        if last_run:
+            query['engagement_updated_at'] = {'$gte': last_run}
+        else:
+            # Protests already at zero that are past the decay window can't change
+            query['$or'] = [
+                {'trending_score': {'$ne': 0}},
+                {'start_date': {'$gte': started - timedelta(days=DECAY_DAYS + 1)}}
+            ]
+
+        cursor = self.protest.collection.find(query, SCORE_PROJECTION).batch_size(min(self.chunk_size, 10000))
+
+        scanned = 0
+        updated = 0
+        chunk = []
+        for protest in cursor:
+            chunk.append(protest)
+            if len(chunk) >= self.chunk_size:
+                updated += self._score_chunk(chunk, started)
+                scanned += len(chunk)
+                chunk = []
+
+        if chunk:
+            updated += self._score_chunk(chunk, started)
+            scanned += len(chunk)
+
+        self._set_last_run(started)
+        elapsed = (datetime.now() - started).total_seconds()
+        mode = 'incremental' if last_run else 'full'
+        logger.info(f"Trending scores ({mode}): scanned {scanned}, updated {updated} in {elapsed:.1f}s")
+
+        return {
+            'mode': mode,
+            'scanned': scanned,
+            'updated': updated,
+            'elapsed_seconds': round(elapsed, 2)
+        }
+
+
+# Global trending job instance
+trending_score_job_instance = None
+
+def get_trending_score_job():
+    """Get or create trending score job instance"""
+    global trending_score_job_instance
+    if trending_score_job_instance is None:
+        trending_score_job_instance = TrendingScoreJob()
+    return trending_score_job_instance
@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import socket
+import atexit
+import threading
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Union
+
+from bson import ObjectId
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import NotificationHistory, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+
+def to_object_id(user_id: Union[ObjectId, str]) -> ObjectId:
+    return user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+
+
+class UnreadCounter:
+    """
+    Per-user unread notification counts for the notification badge.
+    Each user has a counter document that is incremented when notifications
+    are written and decremented by exactly the number of notifications a
+    read or read-all call changed, so counting unread notifications never
+    happens on the request path. Counts are cached in process for
+    NOTIFICATION_UNREAD_CACHE_TTL_SECONDS and adjusted in place by local
+    writes. A reconciliation pass every NOTIFICATION_UNREAD_RECONCILE_SECONDS
+    recounts unread notifications and corrects counters that drifted (e.g.
+    after a crash between the two writes), using compare-and-set on a
+    per-counter version so it never overwrites a counter that changed while
+    it was counting. A notification write and its counter update are separate
+    writes, so a mismatch is only corrected once a second pass sees it again
+    on an unchanged counter; one process at a time reconciles, under a lease.
+    """
+
+    def __init__(self, cache_ttl: float = None, reconcile_interval: float = None):
+        self.cache_ttl = cache_ttl or float(os.getenv('NOTIFICATION_UNREAD_CACHE_TTL_SECONDS', 15))
+        self.reconcile_interval = reconcile_interval or float(os.getenv('NOTIFICATION_UNREAD_RECONCILE_SECONDS', 3600))
+        self.max_entries = int(os.getenv('NOTIFICATION_UNREAD_CACHE_MAX_ENTRIES', 50000))
+        self.reconcile_on_start = os.getenv('NOTIFICATION_UNREAD_RECONCILE_ON_START', 'true').lower() == 'true'
+
+        self.notifications = NotificationHistory()
+        self.counters = NotificationCounter()
+
+        self._cache = OrderedDict()  # user id -> (cached_until, unread)
+        self._suspects = {}  # user id -> (version, stored, counted) of a mismatch seen last pass
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._stop_requested = threading.Event()
+        self._running = False
+        self._thread = None
+
+        self.stats = {'hits': 0, 'misses': 0, 'initialized': 0, 'updates': 0, 'reconciliations': 0,
+                      'corrected': 0, 'lease_skipped': 0, 'last_reconciled_at': None}
+
+        try:
+            self.notifications.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not ensure notification indexes: {e}")
+
+    def _cache_put(self, user_id: ObjectId, unread: int):
+        with self._lock:
+            self._cache[user_id] = (time.time() + self.cache_ttl, unread)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get_unread(self, user_id: Union[ObjectId, str]) -> int:
+        """Unread notification count for a user"""
+        user_id = to_object_id(user_id)
+        self._ensure_started()
+
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry and time.time() < entry[0]:
+                self._cache.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        unread = self.counters.get_unread(user_id)
+        if unread is None:
+            # First badge request since counters were introduced: count once
+            unread = self.counters.initialize(user_id, self.notifications.count({'user_id': user_id, 'read': False}))
+            self.stats['initialized'] += 1
+
+        self._cache_put(user_id, unread)
+        return unread
+
+    def _apply(self, deltas: Dict[ObjectId, int]):
+        """Write counter deltas and adjust cached counts to match"""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        self.counters.apply_deltas(deltas)
+        self.stats['updates'] += len(deltas)
+
+        with self._lock:
+            for user_id, delta in deltas.items():
+                entry = self._cache.get(user_id)
+                if entry:
+                    self._cache[user_id] = (entry[0], max(0, entry[1] + delta))
+
+    def record_created(self, user_ids: Iterable[Union[ObjectId, str]]):
+        """Count newly written unread notifications (one per user ID occurrence)"""
+        self._apply(Counter(to_object_id(user_id) for user_id in user_ids))
+
+    def record_read(self, user_id: Union[ObjectId, str], count: int = 1):
+        """Count notifications that just changed from unread to read"""
+        self._apply({to_object_id(user_id): -count})
+
+    def reconcile(self) -> Dict:
+        """Recount unread notifications and correct counters that drifted"""
+        started = time.time()
+        expected = self.counters.get_counters()
+        actual = self.notifications.count_unread_by_user()
+
+        corrected = skipped = pending = 0
+        suspects = {}
+        for user_id in set(expected) | set(actual):
+            stored, version = expected.get(user_id, (None, None))
+            unread = actual.get(user_id, 0)
+            if stored == unread or (stored is None and unread == 0):
+                continue
+
+            # A write in flight during the count settles before the next pass;
+            # only a mismatch seen twice on an unchanged counter is drift
+            observed = (version, stored, unread)
+            if self._suspects.get(user_id) != observed:
+                suspects[user_id] = observed
+                pending += 1
+                continue
+
+            # A counter that moved since it was read is left for the next pass
+            if self.counters.compare_and_set(user_id, stored, unread, version):
+                corrected += 1
+                with self._lock:
+                    self._cache.pop(user_id, None)
+            else:
+                skipped += 1
+        self._suspects = suspects
+
+        self.stats['reconciliations'] += 1
+        self.stats['corrected'] += corrected
+        self.stats['last_reconciled_at'] = time.time()
+
+        result = {'counters': len(expected), 'users_with_unread': len(actual), 'corrected': corrected,
+                  'skipped': skipped, 'pending': pending, 'elapsed_seconds': round(time.time() - started, 2)}
+        if corrected:
+            logger.info(f"Unread counter reconciliation corrected {corrected} counters: {result}")
+        return result
+
+    def _ensure_started(self):
+        """Start the reconciliation thread on first use"""
+        if self._running:
+            return
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        # The first two passes also seed counters for users whose unread notifications predate them
+        wait = 0 if self.reconcile_on_start else self.reconcile_interval
+        while not self._stop_requested.wait(wait):
+            try:
+                # Every process runs this loop; the lease lets one of them recount per interval
+                if self.counters.acquire_lease('unread_reconcile', self._owner, self.reconcile_interval):
+                    self.reconcile()
+                else:
+                    self.stats['lease_skipped'] += 1
+            except Exception as e:
+                logger.error(f"Unread counter reconciliation failed: {e}")
+            wait = self.reconcile_interval
+
+    def stop(self):
+        """Stop the reconciliation thread"""
+        self._running = False
+        self._stop_requested.set()
+
+    def get_stats(self) -> Dict:
+        """Cache and reconciliation statistics for health endpoints"""
+        with self._lock:
+            cached = len(self._cache)
+        return {
+            **self.stats,
+            'cached_users': cached,
+            'cache_ttl_seconds': self.cache_ttl,
+            'reconcile_interval_seconds': self.reconcile_interval
+        }
+
+
+# Global unread counter instance
+unread_counter_instance = None
+
+def get_unread_counter():
+    """Get or create unread counter instance"""
+    global unread_counter_instance
+    if unread_counter_instance is None:
+        unread_counter_instance = UnreadCounter()
+    return unread_counter_instance
@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import socket
+import atexit
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Union
+
+from bson import ObjectId
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.web_app_models import User, UserReport, Post, UserBookmark, UserFollow, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+# Counters that also keep a per-day bucket under statistics.daily, for "last N days" figures
+DAILY_FIELDS = {'reports_submitted': 'reports', 'posts_created': 'posts', 'login_count': 'logins'}
+
+DAY_FORMAT = '%Y-%m-%d'
+
+
+def to_object_id(user_id: Union[ObjectId, str]) -> ObjectId:
+    return user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+
+
+def day_key(moment: datetime) -> str:
+    """Daily bucket key for a UTC timestamp"""
+    return moment.strftime(DAY_FORMAT)
+
+
+class UserStatsService:
+    """
+    Denormalized per-user statistics kept in each user's statistics subdocument.
+    Content and interaction write paths apply atomic $inc deltas here (report,
+    post, bookmark, follow and login counts, plus per-day buckets for reports,
+    posts and logins), so profile and activity pages read one user document
+    instead of counting across collections. Every increment bumps
+    statistics.version. A reconciliation pass every
+    USER_STATS_RECONCILE_SECONDS recounts the derivable counters in batches of
+    USER_STATS_RECONCILE_BATCH_SIZE users, corrects drift with compare-and-set
+    on the version so it never overwrites a concurrent increment, rebuilds
+    the report and post daily buckets from created_at over the last
+    USER_STATS_DAILY_RETENTION_DAYS (so history from before the buckets
+    existed is filled in) and drops older buckets. Login counts cannot be
+    recounted (sessions expire) and are only ever incremented. One process at
+    a time reconciles, under a lease.
+    """
+
+    def __init__(self, reconcile_interval: float = None, batch_size: int = None):
+        self.reconcile_interval = reconcile_interval or float(os.getenv('USER_STATS_RECONCILE_SECONDS', 21600))
+        self.batch_size = batch_size or int(os.getenv('USER_STATS_RECONCILE_BATCH_SIZE', 500))
+        self.retention_days = int(os.getenv('USER_STATS_DAILY_RETENTION_DAYS', 366))
+        self.reconcile_on_start = os.getenv('USER_STATS_RECONCILE_ON_START', 'true').lower() == 'true'
+
+        self.users = User()
+        self.reports = UserReport()
+        self.posts = Post()
+        self.bookmarks = UserBookmark()
+        self.follows = UserFollow()
+        self.leases = NotificationCounter()  # Holds the shared maintenance leases
+
+        # Counter -> (model, extra match) it is recounted from
+        self.recounts = {
+            'reports_submitted': (self.reports, {}),
+            'reports_verified': (self.reports, {'verification_status': 'verified'}),
+            'posts_created': (self.posts, {}),
+            'bookmarks': (self.bookmarks, {}),
+            'follows': (self.follows, {'active': True})
+        }
+        # Daily bucket -> model whose created_at it is rebuilt from
+        self.daily_recounts = {'reports': self.reports, 'posts': self.posts}
+
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._stop_requested = threading.Event()
+        self._running = False
+        self._thread = None
+
+        self.stats = {'updates': 0, 'failed_updates': 0, 'reconciliations': 0, 'users_checked': 0,
+                      'corrected': 0, 'skipped': 0, 'lease_skipped': 0, 'last_reconciled_at': None}
+
+        for model in (self.reports, self.posts, self.bookmarks, self.follows):
+            try:
+                model.ensure_indexes()
+            except Exception as e:
+                logger.warning(f"Could not ensure statistics indexes: {e}")
+
+    def record(self, user_id: Union[ObjectId, str], at: datetime = None, active: bool = True,
+               **increments: int) -> bool:
+        """Apply counter deltas for one user; daily buckets use the date of the item (at), default now"""
+        self._ensure_started()
+        now = datetime.utcnow()
+        at = at or now
+
+        changes = {}
+        for field, amount in increments.items():
+            if not amount:
+                continue
+            changes[field] = amount
+            # Items older than the retention window no longer have a bucket to adjust
+            if field in DAILY_FIELDS and at >= now - timedelta(days=self.retention_days):
+                changes[f'daily.{day_key(at)}.{DAILY_FIELDS[field]}'] = amount
+
+        if not changes and not active:
+            return False
+
+        try:
+            updated = self.users.increment_statistics(to_object_id(user_id), changes, now if active else None)
+        except Exception as e:
+            # Reconciliation repairs the counters; the write path must not fail over them
+            self.stats['failed_updates'] += 1
+            logger.error(f"Failed to update statistics for user {user_id}: {e}")
+            return False
+
+        self.stats['updates'] += 1
+        return updated
+
+    def _count_by_user(self, model, user_ids: List[ObjectId], match: Dict) -> Dict[ObjectId, int]:
+        """Documents per user for one batch (runs on the collection so errors are not read as zero)"""
+        pipeline = [
+            {'$match': {'user_id': {'$in': user_ids}, **match}},
+            {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}}
+        ]
+        return {row['_id']: row['count'] for row in model.collection.aggregate(pipeline)}
+
+    def _count_daily_by_user(self, model, user_ids: List[ObjectId], since: datetime) -> Dict[ObjectId, Dict[str, int]]:
+        """Documents per user and UTC day created since a time, for one batch"""
+        pipeline = [
+            {'$match': {'user_id': {'$in': user_ids}, 'created_at': {'$gte': since}}},
+            {'$group': {
+                '_id': {'user_id': '$user_id',
+                        'day': {'$dateToString': {'format': DAY_FORMAT, 'date': '$created_at'}}},
+                'count': {'$sum': 1}
+            }}
+        ]
+        counts = defaultdict(dict)
+        for row in model.collection.aggregate(pipeline):
+            counts[row['_id']['user_id']][row['_id']['day']] = row['count']
+        return counts
+
+    def _daily_changes(self, user_id: ObjectId, stored_daily: Dict, actual_daily: Dict, expired_before: str) -> Dict:
+        """daily.<day>.<bucket> values that differ from the recounted report and post buckets"""
+        changes = {}
+        for bucket, counts in actual_daily.items():
+            user_counts = counts.get(user_id, {})
+            stored_days = {day for day, stored in stored_daily.items() if bucket in (stored or {})}
+            for day in set(user_counts) | stored_days:
+                if day < expired_before:
+                    continue
+                if (stored_daily.get(day) or {}).get(bucket, 0) != user_counts.get(day, 0):
+                    changes[f'daily.{day}.{bucket}'] = user_counts.get(day, 0)
+        return changes
+
+    def reconcile_users(self, users: List[Dict]) -> Dict:
+        """Recount one batch of users (documents with _id and statistics) and correct drift"""
+        user_ids = [user['_id'] for user in users]
+        actual = {field: self._count_by_user(model, user_ids, match)
+                  for field, (model, match) in self.recounts.items()}
+        expired_before = day_key(datetime.utcnow() - timedelta(days=self.retention_days))
+        # Whole days only, so the oldest retained bucket is not recounted from a partial day
+        window_start = datetime.strptime(expired_before, DAY_FORMAT)
+        actual_daily = {bucket: self._count_daily_by_user(model, user_ids, window_start)
+                        for bucket, model in self.daily_recounts.items()}
+
+        corrected = skipped = 0
+        for user in users:
+            stored = user.get('statistics') or {}
+            stored_daily = stored.get('daily') or {}
+            values = {field: counts.get(user['_id'], 0) for field, counts in actual.items()
+                      if stored.get(field) != counts.get(user['_id'], 0)}
+            values.update(self._daily_changes(user['_id'], stored_daily, actual_daily, expired_before))
+            expired = [f'daily.{day}' for day in stored_daily if day < expired_before]
+            if not values and not expired:
+                continue
+
+            # A user whose counters moved since the batch was read is left for the next pass
+            if self.users.set_statistics(user['_id'], stored.get('version'), values, expired):
+                corrected += 1
+            else:
+                skipped += 1
+
+        return {'users': len(users), 'corrected': corrected, 'skipped': skipped}
+
+    def reconcile_user(self, user_id: Union[ObjectId, str]) -> Dict:
+        """Recount a single user's statistics"""
+        user = self.users.collection.find_one({'_id': to_object_id(user_id)}, {'statistics': 1})
+        if not user:
+            return {'users': 0, 'corrected': 0, 'skipped': 0}
+        return self.reconcile_users([user])
+
+    def reconcile(self) -> Dict:
+        """Recount every user's statistics in batches and correct counters that drifted"""
+        started = time.time()
+        totals = {'users': 0, 'corrected': 0, 'skipped': 0}
+
+        after_id = None
+        while not self._stop_requested.is_set():
+            users = self.users.get_statistics_page(after_id, self.batch_size)
+            if not users:
+                break
+            for key, value in self.reconcile_users(users).items():
+                totals[key] += value
+            after_id = users[-1]['_id']
+
+        self.stats['reconciliations'] += 1
+        self.stats['users_checked'] += totals['users']
+        self.stats['corrected'] += totals['corrected']
+        self.stats['skipped'] += totals['skipped']
+        self.stats['last_reconciled_at'] = time.time()
+
+        result = {**totals, 'elapsed_seconds': round(time.time() - started, 2)}
+        if totals['corrected']:
+            logger.info(f"User statistics reconciliation corrected {totals['corrected']} users: {result}")
+        return result
+
+    def _ensure_started(self):
+        """Start the reconciliation thread on first use"""
+        if self._running:
+            return
+
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self):
+        # The first pass also seeds counters for users whose activity predates them
+        wait = 0 if self.reconcile_on_start else self.reconcile_interval
+        while not self._stop_requested.wait(wait):
+            try:
+                # Every process runs this loop; the lease lets one of them recount per interval
+                if self.leases.acquire_lease('user_stats_reconcile', self._owner, self.reconcile_interval):
+                    self.reconcile()
+                else:
+                    self.stats['lease_skipped'] += 1
+            except Exception as e:
+                logger.error(f"User statistics reconciliation failed: {e}")
+            wait = self.reconcile_interval
+
+    def stop(self):
+        """Stop the reconciliation thread"""
+        self._running = False
+        self._stop_requested.set()
+
+    def get_stats(self) -> Dict:
+        """Update and reconciliation statistics for health endpoints"""
+        return {
+            **self.stats,
+            'reconcile_interval_seconds': self.reconcile_interval,
+            'daily_retention_days': self.retention_days
+        }
+
+
+# Global user statistics service instance
+user_stats_service_instance = None
+
+def get_user_stats_service():
+    """Get or create user statistics service instance"""
+    global user_stats_service_instance
+    if user_stats_service_instance is None:
+        user_stats_service_instance = UserStatsService()
+    return user_stats_service_instance
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import database
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """DatabaseManager backed by an in-memory mongomock client, reset for each test."""
+    mongomock = pytest.importorskip('mongomock')
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://localhost:27017')
+    monkeypatch.setattr(database, 'MongoClient', mongomock.MongoClient)
+    monkeypatch.setattr(database.DatabaseManager, '_instance', None)
+    monkeypatch.setattr(database.DatabaseManager, '_client', None)
+
+    manager = database.DatabaseManager()
+    yield manager
+
+    manager._client.drop_database('protest_data_collection')
+    manager._client.drop_database('protest_web_app')
@@ -0,0 +1,154 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from services.alert_matching import (AlertMatchingEngine, area_cells, compile_alert, match_alert,
+                                     point_cell, protest_features, GEO_LEVELS)
+
+
+def make_alert(**fields):
+    alert = {'_id': ObjectId(), 'user_id': ObjectId(), 'alert_name': 'alert', 'alert_type': 'keyword',
+             'active': True, 'updated_at': datetime.now()}
+    alert.update(fields)
+    return alert
+
+
+def make_protest(title='', categories=(), lng=None, lat=None, country=None, place=''):
+    protest = {'title': title, 'description': '', 'location_description': place, 'categories': list(categories),
+               'source_metadata': {'country': country} if country else {}}
+    if lng is not None:
+        protest['location'] = {'type': 'Point', 'coordinates': [lng, lat]}
+    return protest
+
+
+def matches(alert, protest):
+    return match_alert(compile_alert(alert), protest_features(protest))
+
+
+class TestCompileAndMatch:
+    def test_alerts_without_their_criterion_cannot_match(self):
+        assert compile_alert(make_alert(keywords=[])) is None
+        assert compile_alert(make_alert(alert_type='location', coordinates=[2.3, 48.8])) is None
+        assert compile_alert(make_alert(alert_type='combined')) is None
+
+    def test_keywords_match_whole_words_and_phrases(self):
+        alert = make_alert(keywords=['Climate Strike', 'rent'])
+        assert matches(alert, make_protest('Global climate strike today')) == ['keyword:climate strike']
+        assert matches(alert, make_protest('Climate march against rent hikes')) == ['keyword:rent']
+        assert matches(alert, make_protest('Parent groups strike for climate')) is None
+
+    def test_category_match_is_case_insensitive(self):
+        alert = make_alert(alert_type='category', categories=['Labor'])
+        assert matches(alert, make_protest(categories=['labor', 'housing'])) == ['category:labor']
+        assert matches(alert, make_protest(categories=['housing'])) is None
+
+    def test_location_radius(self):
+        alert = make_alert(alert_type='location', coordinates=[2.35, 48.85], location_radius_km=10)
+        assert matches(alert, make_protest(lng=2.4, lat=48.9)) == ['location']
+        assert matches(alert, make_protest(lng=3.0, lat=48.85)) is None
+        assert matches(alert, make_protest()) is None
+
+    def test_combined_requires_every_criterion(self):
+        alert = make_alert(alert_type='combined', keywords=['strike'], categories=['labor'])
+        assert matches(alert, make_protest('Strike', categories=['labor'])) == ['keyword:strike', 'category:labor']
+        assert matches(alert, make_protest('Strike', categories=['climate'])) is None
+
+    def test_countries_and_cities_narrow_any_alert(self):
+        alert = make_alert(keywords=['strike'], countries=['France'], cities=['Lyon'])
+        assert matches(alert, make_protest('Strike', country='France', place='Lyon, France')) == ['keyword:strike']
+        assert matches(alert, make_protest('Strike', country='France', place='Paris, France')) is None
+        assert matches(alert, make_protest('Strike', country='Spain', place='Lyon')) is None
+
+
+class TestGeoCells:
+    def test_area_covers_its_centre_cell(self):
+        cells = area_cells(48.85, 2.35, 10)
+        level = cells[0][1]
+        assert point_cell(level, 48.85, 2.35) in cells
+        assert point_cell(level, 48.9, 2.4) in cells
+
+    def test_area_wraps_the_antimeridian(self):
+        cells = area_cells(0.0, 179.95, 30)
+        level = cells[0][1]
+        assert point_cell(level, 0.0, 179.9) in cells
+        assert point_cell(level, 0.0, -179.9) in cells
+
+    def test_large_areas_use_coarser_levels(self):
+        assert area_cells(0.0, 0.0, 5)[0][1] == 0
+        assert area_cells(0.0, 0.0, 2000)[0][1] == len(GEO_LEVELS) - 1
+
+
+@pytest.fixture
+def engine(mongo):
+    return AlertMatchingEngine()
+
+
+class TestAlertMatchingEngine:
+    def test_match_uses_every_index(self, engine):
+        keyword = make_alert(keywords=['strike'])
+        category = make_alert(alert_type='category', categories=['labor'])
+        location = make_alert(alert_type='location', coordinates=[179.95, 0.0], location_radius_km=30)
+        inactive = make_alert(keywords=['strike'], active=False)
+        engine.alerts.collection.insert_many([keyword, category, location, inactive])
+
+        protest = make_protest('General strike', categories=['labor'], lng=-179.9, lat=0.0)
+        matched = {compiled['id']: matched_on for compiled, matched_on in engine.match(protest)}
+
+        assert matched == {keyword['_id']: ['keyword:strike'],
+                           category['_id']: ['category:labor'],
+                           location['_id']: ['location']}
+
+    def test_only_candidates_from_postings_are_checked(self, engine):
+        engine.alerts.collection.insert_many([make_alert(keywords=[f'word{i}']) for i in range(50)])
+
+        assert engine.match(make_protest('word7 rally')) != []
+        assert engine.stats['candidates_checked'] == 1
+
+    def test_sync_applies_edits_and_deactivations(self, engine):
+        alert = make_alert(keywords=['strike'])
+        engine.alerts.collection.insert_one(alert)
+        assert len(engine.match(make_protest('strike'))) == 1
+
+        engine.alerts.collection.update_one({'_id': alert['_id']},
+                                            {'$set': {'active': False, 'updated_at': datetime.now()}})
+        engine._last_sync = 0.0
+        assert engine.match(make_protest('strike')) == []
+        assert engine.get_info()['alerts_indexed'] == 0
+
+
+class TestProcessProtest:
+    @pytest.fixture
+    def delivered(self, monkeypatch):
+        delivered = []
+
+        class Fanout:
+            def deliver(self, notifications, description=''):
+                delivered.extend(notifications)
+                return {'notified': len(notifications), 'failed': 0}
+
+        monkeypatch.setattr('services.alert_matching.get_notification_fanout', lambda: Fanout())
+        return delivered
+
+    def test_deleted_alerts_are_not_notified(self, engine, delivered):
+        kept, deleted = make_alert(keywords=['strike']), make_alert(keywords=['strike'])
+        engine.alerts.collection.insert_many([kept, deleted])
+        engine.sync()
+        engine.alerts.collection.delete_one({'_id': deleted['_id']})
+
+        result = engine.process_protest(ObjectId(), make_protest('General strike'))
+
+        assert result['matched_alerts'] == 1
+        assert [notification['user_id'] for notification in delivered] == [kept['user_id']]
+
+    def test_lookup_failure_is_an_error_not_an_empty_match(self, engine, delivered, monkeypatch):
+        engine.alerts.collection.insert_one(make_alert(keywords=['strike']))
+        engine.sync()
+
+        def fail(alert_ids):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(engine.alerts, 'get_active_ids', fail)
+
+        with pytest.raises(RuntimeError):
+            engine.process_protest(ObjectId(), make_protest('General strike'))
+        assert delivered == []
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from services.analytics_snapshot import ProtestSnapshot, SnapshotQueryError
+
+
+PROTESTS = [
+    {'_id': ObjectId(), 'start_date': datetime(2024, 1, 5), 'data_quality_score': 0.9,
+     'engagement_metrics': {'views': 100, 'shares': 4}, 'location': {'coordinates': [2.35, 48.85]},
+     'source_metadata': {'country': 'France'}, 'categories': ['climate', 'labor'],
+     'status': 'active', 'verification_status': 'verified'},
+    {'_id': ObjectId(), 'start_date': datetime(2024, 1, 20), 'data_quality_score': 0.5,
+     'engagement_metrics': {'views': 50}, 'location': {'coordinates': [13.4, 52.5]},
+     'source_metadata': {'country': 'Germany'}, 'categories': ['climate'],
+     'status': 'completed', 'verification_status': 'pending'},
+    {'_id': ObjectId(), 'start_date': datetime(2024, 2, 1), 'data_quality_score': None,
+     'engagement_metrics': {}, 'location': {'coordinates': [0, 0]},
+     'source_metadata': {}, 'categories': [],
+     'status': 'active'},
+]
+
+
+@pytest.fixture
+def snapshot():
+    return ProtestSnapshot.from_cursor(PROTESTS)
+
+
+class TestProtestSnapshot:
+    def test_missing_values_are_encoded(self, snapshot):
+        assert snapshot.size == 3
+        rows = snapshot.rows()
+        assert rows[2]['coordinates'] is None
+        assert rows[2]['data_quality_score'] is None
+        assert rows[0]['categories'] == ['climate', 'labor']
+
+    def test_count_by_category_explodes_multi_valued_rows(self, snapshot):
+        results = snapshot.query(group_by=['category'])
+        assert results == [{'_id': 'climate', 'count': 2}, {'_id': 'labor', 'count': 1}]
+
+    def test_metrics_skip_missing_values(self, snapshot):
+        results = snapshot.query(metrics={'avg_views': 'avg:views', 'total_views': 'sum:views',
+                                          'verified': 'verified_count', 'active': 'active_count'})
+        assert results == [{'_id': None, 'avg_views': 75.0, 'total_views': 150, 'verified': 1, 'active': 2}]
+
+    def test_time_groups_are_ordered(self, snapshot):
+        results = snapshot.query(group_by='month')
+        assert [item['_id'] for item in results] == ['2024-01', '2024-02']
+        assert [item['count'] for item in results] == [2, 1]
+
+    def test_group_by_several_keys(self, snapshot):
+        results = snapshot.query(group_by=['country', 'status'])
+        assert {'_id': {'country': None, 'status': 'active'}, 'count': 1} in results
+        assert len(results) == 3
+
+    def test_filters(self, snapshot):
+        assert len(snapshot.rows({'countries': ['France', 'Spain']})) == 1
+        assert len(snapshot.rows({'categories': 'climate', 'min_quality': 0.6})) == 1
+        assert len(snapshot.rows({'start_date_from': '2024-01-10', 'start_date_to': '2024-01-31'})) == 1
+        assert len(snapshot.rows({'has_coordinates': True})) == 2
+
+    def test_bbox_filter_drops_protests_without_coordinates(self, snapshot):
+        rows = snapshot.rows({'bbox': [-5, 40, 10, 51]})
+        assert [row['_id'] for row in rows] == [str(PROTESTS[0]['_id'])]
+
+    def test_invalid_queries_raise(self, snapshot):
+        with pytest.raises(SnapshotQueryError):
+            snapshot.query(group_by=['weekday'])
+        with pytest.raises(SnapshotQueryError):
+            snapshot.query(metrics={'x': 'median:views'})
+        with pytest.raises(SnapshotQueryError):
+            snapshot.query(filters={'bbox': [1, 2]})
+        with pytest.raises(SnapshotQueryError):
+            snapshot.query(filters={'start_date_from': 'yesterday'})
+
+    def test_save_and_load_round_trip(self, snapshot, tmp_path):
+        path = str(tmp_path / 'snapshot.npz')
+        snapshot.save(path)
+        loaded = ProtestSnapshot.load(path)
+
+        assert loaded.built_at == snapshot.built_at
+        assert loaded.query(group_by=['category']) == snapshot.query(group_by=['category'])
+        assert loaded.rows() == snapshot.rows()
+
+    def test_empty_snapshot(self):
+        empty = ProtestSnapshot.from_cursor([])
+        assert empty.query() == []
+        assert empty.query(group_by=['category']) == []
@@ -0,0 +1,85 @@
+import pytest
+
+from services import auth_cache
+from services.auth_cache import AuthCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module."""
+    now = {'value': 1000.0}
+    monkeypatch.setattr(auth_cache.time, 'time', lambda: now['value'])
+    return now
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setenv('AUTH_CACHE_ENABLED', 'true')
+    monkeypatch.setenv('AUTH_TOKEN_CACHE_TTL_SECONDS', '300')
+    monkeypatch.setenv('AUTH_PRINCIPAL_CACHE_TTL_SECONDS', '30')
+    return AuthCache(max_entries=100)
+
+
+class TestAuthCache:
+    def test_token_is_cached_until_ttl(self, cache, clock):
+        payload = {'user_id': 'u1', 'exp': clock['value'] + 3600}
+        cache.store_token('token-1', payload)
+
+        clock['value'] += 299
+        assert cache.get_token('token-1') == payload
+        clock['value'] += 1
+        assert cache.get_token('token-1') is None
+
+    def test_token_never_outlives_its_exp(self, cache, clock):
+        cache.store_token('token-1', {'user_id': 'u1', 'exp': clock['value'] + 10})
+
+        clock['value'] += 10
+        assert cache.get_token('token-1') is None
+        assert cache.stats['token_misses'] == 1
+
+    def test_raw_token_is_not_stored(self, cache, clock):
+        cache.store_token('secret-token', {'user_id': 'u1', 'exp': clock['value'] + 60})
+        assert 'secret-token' not in cache._tokens
+        assert AuthCache.token_key('secret-token') in cache._tokens
+
+    def test_principal_expires_after_ttl(self, cache, clock):
+        principal = cache.store_principal({'_id': 'u1', 'status': 'active', 'password_hash': 'x'})
+        assert 'password_hash' not in principal
+
+        clock['value'] += 29
+        assert cache.get_principal('u1') == principal
+        clock['value'] += 1
+        assert cache.get_principal('u1') is None
+
+    def test_invalidate_user_keeps_the_callers_token(self, cache, clock):
+        exp = clock['value'] + 3600
+        cache.store_token('current', {'user_id': 'u1', 'exp': exp})
+        cache.store_token('other-device', {'user_id': 'u1', 'exp': exp})
+        cache.store_token('someone-else', {'user_id': 'u2', 'exp': exp})
+        cache.store_principal({'_id': 'u1', 'status': 'active'})
+
+        cache.invalidate_user('u1', keep_token='current')
+
+        assert cache.get_principal('u1') is None
+        assert cache.get_token('other-device') is None
+        assert cache.get_token('current') is not None
+        assert cache.get_token('someone-else') is not None
+
+        # The kept token is still tracked, so a later invalidation drops it
+        cache.invalidate_user('u1')
+        assert cache.get_token('current') is None
+
+    def test_drop_token(self, cache, clock):
+        cache.store_token('token-1', {'user_id': 'u1', 'exp': clock['value'] + 60})
+        cache.drop_token('token-1')
+
+        assert cache.get_token('token-1') is None
+        assert 'u1' not in cache._user_tokens
+
+    def test_eviction_forgets_user_token_index(self, clock):
+        small = AuthCache(max_entries=1)
+        small.store_token('first', {'user_id': 'u1', 'exp': clock['value'] + 60})
+        small.store_token('second', {'user_id': 'u2', 'exp': clock['value'] + 60})
+
+        assert small.get_token('first') is None
+        assert 'u1' not in small._user_tokens
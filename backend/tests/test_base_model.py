@@ -0,0 +1,17 @@
+from bson import ObjectId
+
+from models.data_collection_models import Protest
+
+
+class TestFindByIds:
+    def test_invalid_ids_are_skipped_individually(self, mongo):
+        protests = Protest()
+        first = protests.collection.insert_one({'title': 'First'}).inserted_id
+        second = protests.collection.insert_one({'title': 'Second'}).inserted_id
+
+        found = protests.find_by_ids([str(first), 'not-an-id', second, None, str(first)])
+
+        assert set(found) == {first, second}
+
+    def test_unknown_ids_are_absent(self, mongo):
+        assert Protest().find_by_ids([ObjectId(), str(ObjectId())]) == {}
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLUEPRINTS = ['alerts', 'analytics', 'auth', 'export', 'protests', 'search',
+              'user_content', 'user_interactions', 'user_profile']
+
+
+def import_without_database(module):
+    """Import a module in a fresh interpreter with no MONGODB_URI, so any connection at import fails"""
+    env = {key: value for key, value in os.environ.items() if key != 'MONGODB_URI'}
+    return subprocess.run([sys.executable, '-c', f'import {module}'], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+class TestImportWithoutDatabase:
+    @pytest.mark.parametrize('blueprint', BLUEPRINTS)
+    def test_blueprint_imports(self, blueprint):
+        result = import_without_database(f'blueprints.{blueprint}')
+        assert result.returncode == 0, result.stderr
+
+    def test_app_imports(self):
+        result = import_without_database('app')
+        assert result.returncode == 0, result.stderr
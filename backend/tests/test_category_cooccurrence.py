@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from services.category_cooccurrence import CategoryCooccurrenceIndex, protest_cells
+
+
+JAN = (datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+
+def make_protest(day, categories, country=None, visibility='public'):
+    return {
+        '_id': ObjectId(),
+        'visibility': visibility,
+        'start_date': datetime(2024, 1, day, 15, 30),
+        'categories': categories,
+        'source_metadata': {'country': country} if country else {}
+    }
+
+
+@pytest.fixture
+def index(mongo):
+    return CategoryCooccurrenceIndex()
+
+
+def resync(index):
+    index._last_sync = 0.0
+
+
+class TestProtestCells:
+    def test_pairs_are_ordered_and_deduplicated(self):
+        cells = protest_cells(make_protest(3, ['labor', 'climate', 'labor', ''], country='France'))
+        assert cells == {
+            ('2024-01-03', 'total', '', ''): 1,
+            ('2024-01-03', 'category', 'climate', 'climate'): 1,
+            ('2024-01-03', 'category', 'labor', 'labor'): 1,
+            ('2024-01-03', 'category', 'climate', 'labor'): 1,
+            ('2024-01-03', 'country', 'climate', 'France'): 1,
+            ('2024-01-03', 'country', 'labor', 'France'): 1,
+        }
+
+    def test_non_public_or_undated_protests_count_nowhere(self):
+        assert protest_cells(None) == {}
+        assert protest_cells(make_protest(3, ['climate'], visibility='private')) == {}
+        assert protest_cells({'visibility': 'public', 'categories': ['climate']}) == {}
+
+
+class TestCategoryCooccurrenceIndex:
+    def test_matrix_after_rebuild(self, index):
+        index.protest.collection.insert_many([
+            make_protest(2, ['climate', 'labor'], country='France'),
+            make_protest(3, ['climate', 'labor', 'housing'], country='France'),
+            make_protest(4, ['climate']),
+            make_protest(5, ['labor'], visibility='private'),
+        ])
+        assert index.rebuild()['protests'] == 3
+        assert index.is_ready()
+
+        categories, matrix, total = index.matrix(*JAN)
+        assert categories == ['climate', 'housing', 'labor']
+        assert total == 3
+        np.testing.assert_array_equal(matrix, [[3, 1, 2], [1, 1, 1], [2, 1, 2]])
+
+        assert index.top_pairs(*JAN, limit=1) == [{'cat1': 'climate', 'cat2': 'labor', 'count': 2}]
+        assert index.category_country(*JAN)[0] == {'category': 'climate', 'country': 'France', 'count': 2}
+
+    def test_day_range_limits_counts(self, index):
+        index.protest.collection.insert_many([make_protest(2, ['climate', 'labor']), make_protest(20, ['climate'])])
+        index.rebuild()
+
+        categories, matrix, total = index.matrix(datetime(2024, 1, 10), datetime(2024, 1, 31))
+        assert categories == ['climate']
+        assert total == 1
+
+    def test_record_change_moves_counts_incrementally(self, index):
+        before = make_protest(2, ['climate', 'labor'])
+        index.protest.collection.insert_one(before)
+        index.rebuild()
+        index.matrix(*JAN)
+
+        after = dict(before, categories=['climate', 'housing'])
+        index.record_change(before, after)
+        index.record_change(None, make_protest(3, ['housing']))
+        resync(index)
+
+        categories, matrix, total = index.matrix(*JAN)
+        assert categories == ['climate', 'housing']
+        assert total == 2
+        np.testing.assert_array_equal(matrix, [[1, 1], [1, 2]])
+
+    def test_correlations(self, index):
+        index.protest.collection.insert_many([
+            make_protest(2, ['climate', 'labor']),
+            make_protest(3, ['climate', 'labor']),
+            make_protest(4, ['housing']),
+            make_protest(5, ['housing']),
+        ])
+        index.rebuild()
+
+        result = index.correlations(*JAN)
+        assert result['total_protests'] == 4
+        assert result['pairs'][0]['category_1'] == 'climate'
+        assert result['pairs'][0]['category_2'] == 'labor'
+        assert result['pairs'][0]['phi'] == 1.0
+        assert result['pairs'][0]['jaccard'] == 1.0
+
+    def test_not_ready_before_first_rebuild(self, index):
+        index.record_change(None, make_protest(2, ['climate']))
+        assert not index.is_ready()
+
+    def test_pair_whose_category_lost_its_own_cell_keeps_its_index(self, index):
+        # Drift from edits outside the collector can leave a pair without one side's diagonal cell
+        arrays = index._build_arrays({
+            ('2024-01-02', 'total', '', ''): 1,
+            ('2024-01-02', 'category', 'climate', 'climate'): 1,
+            ('2024-01-02', 'category', 'climate', 'labor'): 1,
+        })
+
+        assert arrays['categories'] == ['climate', 'labor']
+        _, rows, cols, _ = arrays['category']
+        assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (0, 1)]
@@ -0,0 +1,84 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, OperationFailure, ServerSelectionTimeoutError
+
+from services.engagement_buffer import EngagementCounterBuffer
+
+
+@pytest.fixture
+def buffer(mongo):
+    buffer = EngagementCounterBuffer(flush_interval=3600)
+    buffer._running = True  # Flush by hand; no background flusher
+    return buffer
+
+
+def fail_with(buffer, monkeypatch, error):
+    def bulk_increment_engagement(increments):
+        raise error
+    monkeypatch.setattr(buffer.protest, 'bulk_increment_engagement', bulk_increment_engagement)
+
+
+class TestEngagementCounterBuffer:
+    def test_increments_are_summed_and_written_once(self, buffer):
+        protest_id = buffer.protest.collection.insert_one({'engagement_metrics': {'views': 10}}).inserted_id
+        for _ in range(3):
+            buffer.increment(str(protest_id), 'views')
+        buffer.increment(protest_id, 'shares', 2)
+        assert buffer.get_pending(protest_id) == {'views': 3, 'shares': 2}
+
+        assert buffer.flush() == 1
+        assert buffer.flush() == 0
+        stored = buffer.protest.collection.find_one({'_id': protest_id})
+        assert stored['engagement_metrics'] == {'views': 13, 'shares': 2}
+        assert buffer.get_pending(protest_id) == {}
+
+    def test_bulk_write_error_requeues_only_failed_operations(self, buffer, monkeypatch):
+        written, failed, other = ObjectId(), ObjectId(), ObjectId()
+        buffer.increment(written, 'views')
+        buffer.increment(failed, 'views', 2)
+        buffer.increment(other, 'shares')
+        fail_with(buffer, monkeypatch, BulkWriteError({'writeErrors': [{'index': 1, 'errmsg': 'failed'}],
+                                                       'nModified': 2}))
+
+        assert buffer.flush() == 2
+        assert buffer.get_pending(failed) == {'views': 2}
+        assert buffer.get_pending(written) == {}
+        assert buffer.get_pending(other) == {}
+
+    def test_requeued_counts_merge_with_new_increments(self, buffer, monkeypatch):
+        protest_id = ObjectId()
+        buffer.increment(protest_id, 'views', 2)
+        fail_with(buffer, monkeypatch, ServerSelectionTimeoutError('no servers'))
+        buffer.flush()
+        buffer.increment(protest_id, 'views')
+
+        assert buffer.get_pending(protest_id) == {'views': 3}
+
+    def test_server_selection_timeout_requeues_the_batch(self, buffer, monkeypatch):
+        first, second = ObjectId(), ObjectId()
+        buffer.increment(first, 'views')
+        buffer.increment(second, 'bookmarks')
+        fail_with(buffer, monkeypatch, ServerSelectionTimeoutError('no servers'))
+
+        assert buffer.flush() == 0
+        assert buffer.get_pending(first) == {'views': 1}
+        assert buffer.get_pending(second) == {'bookmarks': 1}
+        assert buffer.stats['flush_failures'] == 1
+
+    def test_other_errors_drop_the_batch(self, buffer, monkeypatch):
+        protest_id = ObjectId()
+        buffer.increment(protest_id, 'views')
+        fail_with(buffer, monkeypatch, OperationFailure('write concern timeout'))
+
+        assert buffer.flush() == 0
+        assert buffer.get_pending(protest_id) == {}
+        assert buffer.stats['dropped_updates'] == 1
+
+    def test_zero_net_deltas_are_not_written(self, buffer):
+        protest_id = buffer.protest.collection.insert_one({'engagement_metrics': {'bookmarks': 4}}).inserted_id
+        buffer.increment(protest_id, 'bookmarks', 1)
+        buffer.increment(protest_id, 'bookmarks', -1)
+
+        assert buffer.flush() == 0
+        stored = buffer.protest.collection.find_one({'_id': protest_id})
+        assert 'engagement_updated_at' not in stored
@@ -0,0 +1,113 @@
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from flask import Flask, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+from blueprints import export
+from models.web_app_models import ExportRequest
+
+CONTENT = b'id,title\n' + b''.join(b'%d,protest %d\n' % (i, i) for i in range(200))
+
+
+@pytest.fixture
+def jobs(mongo, monkeypatch):
+    jobs = ExportRequest()
+    monkeypatch.setattr(export, 'get_export_jobs', lambda: jobs)
+    monkeypatch.setattr(export, 'EXPORT_DOWNLOAD_HANDOFF', '')
+    return jobs
+
+
+@pytest.fixture
+def completed_job(jobs, tmp_path):
+    path = tmp_path / 'export.csv'
+    path.write_bytes(CONTENT)
+    gzip_path = tmp_path / 'export.csv.gz'
+    gzip_path.write_bytes(gzip.compress(CONTENT))
+
+    user_id = ObjectId()
+    job_id = jobs.collection.insert_one({
+        'user_id': user_id,
+        'status': 'completed',
+        'format': 'csv',
+        'compression': 'none',
+        'file_path': str(path),
+        'gzip_file_path': str(gzip_path),
+        'etag': 'abc123',
+        'download_count': 0,
+        'expires_at': datetime.now() + timedelta(days=7)
+    }).inserted_id
+    return job_id, user_id
+
+
+@pytest.fixture
+def download(completed_job):
+    app = Flask(__name__)
+    job_id, user_id = completed_job
+    # Past auth_required and export_queue_required
+    view = export.download_export.__wrapped__.__wrapped__
+
+    def download(**headers):
+        with app.test_request_context(f'/api/export/download/{job_id}', headers=headers):
+            request.current_user = {'id': str(user_id), 'username': 'reader'}
+            response = view(str(job_id))
+            response.direct_passthrough = False
+            return response
+    return download
+
+
+def download_count(jobs, completed_job):
+    return jobs.collection.find_one({'_id': completed_job[0]})['download_count']
+
+
+class TestDownloadExport:
+    def test_full_download_is_counted(self, download, jobs, completed_job):
+        response = download()
+
+        assert response.status_code == 200
+        assert response.get_data() == CONTENT
+        assert response.headers['ETag'] == '"abc123"'
+        assert 'Accept-Encoding' in response.vary
+        assert download_count(jobs, completed_job) == 1
+
+    def test_gzip_copy_is_sent_when_accepted(self, download):
+        response = download(**{'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'] == '"abc123-gzip"'
+        assert gzip.decompress(response.get_data()) == CONTENT
+
+    def test_range_resumes_without_counting_again(self, download, jobs, completed_job):
+        response = download(Range='bytes=100-199')
+
+        assert response.status_code == 206
+        assert response.get_data() == CONTENT[100:200]
+        assert response.headers['Content-Range'] == f'bytes 100-199/{len(CONTENT)}'
+        assert download_count(jobs, completed_job) == 0
+
+    def test_unsatisfiable_range(self, download):
+        with pytest.raises(RequestedRangeNotSatisfiable) as excinfo:
+            download(Range=f'bytes={len(CONTENT) + 10}-')
+
+        assert excinfo.value.get_response().status_code == 416
+
+    def test_stale_if_range_sends_the_whole_file(self, download):
+        response = download(Range='bytes=100-199', **{'If-Range': '"outdated"'})
+
+        assert response.status_code == 200
+        assert response.get_data() == CONTENT
+
+    def test_matching_etag_is_not_modified(self, download, jobs, completed_job):
+        response = download(**{'If-None-Match': '"abc123"'})
+
+        assert response.status_code == 304
+        assert download_count(jobs, completed_job) == 0
+
+    def test_etag_of_the_other_encoding_does_not_match(self, download):
+        response = download(**{'If-None-Match': '"abc123"', 'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from models.web_app_models import ExportRequest
+
+
+@pytest.fixture
+def jobs(mongo):
+    jobs = ExportRequest()
+    jobs.ensure_indexes()
+    return jobs
+
+
+def queue(jobs, user_id=None, minutes_ago=0):
+    job_id = jobs.create_export_request(user_id or ObjectId(), 'protests', {})
+    jobs.collection.update_one({'_id': job_id},
+                               {'$set': {'requested_at': datetime.now() - timedelta(minutes=minutes_ago)}})
+    return job_id
+
+
+def expire_lease(jobs, job_id):
+    jobs.collection.update_one({'_id': job_id},
+                               {'$set': {'lease_expires_at': datetime.now() - timedelta(seconds=1)}})
+
+
+class TestClaimNext:
+    def test_claims_oldest_queued_job_once(self, jobs):
+        newer = queue(jobs, minutes_ago=1)
+        older = queue(jobs, minutes_ago=5)
+
+        first = jobs.claim_next('web-1:100:0', lease_seconds=60)
+        second = jobs.claim_next('web-2:200:0', lease_seconds=60)
+
+        assert first['_id'] == older
+        assert first['status'] == 'processing'
+        assert first['worker_id'] == 'web-1:100:0'
+        assert first['attempts'] == 1
+        assert second['_id'] == newer
+        assert jobs.claim_next('web-3:300:0', lease_seconds=60) is None
+
+    def test_progress_is_rejected_after_reassignment(self, jobs):
+        job_id = queue(jobs)
+        jobs.claim_next('web-1:100:0', lease_seconds=60)
+        assert jobs.update_progress(job_id, 'web-1:100:0', rows_written=10, lease_seconds=60)
+
+        expire_lease(jobs, job_id)
+        jobs.requeue_expired()
+        jobs.claim_next('web-2:200:0', lease_seconds=60)
+
+        assert not jobs.update_progress(job_id, 'web-1:100:0', rows_written=20, lease_seconds=60)
+        assert not jobs.complete_job(job_id, 'web-1:100:0', file_path='/tmp/stale.csv')
+        assert jobs.complete_job(job_id, 'web-2:200:0', file_path='/tmp/export.csv', record_count=5)
+
+
+class TestRequeueExpired:
+    def test_expired_leases_are_requeued_until_max_attempts(self, jobs):
+        retry, give_up, healthy = queue(jobs, minutes_ago=3), queue(jobs, minutes_ago=2), queue(jobs, minutes_ago=1)
+        for worker in ('web-1:100:0', 'web-1:100:1', 'web-1:100:2'):
+            jobs.claim_next(worker, lease_seconds=60)
+        jobs.collection.update_one({'_id': give_up}, {'$set': {'attempts': 3}})
+        expire_lease(jobs, retry)
+        expire_lease(jobs, give_up)
+
+        assert jobs.requeue_expired(max_attempts=3) == 2
+
+        retried = jobs.find_by_id(retry)
+        assert retried['status'] == 'queued'
+        assert 'worker_id' not in retried and 'lease_expires_at' not in retried
+        assert jobs.find_by_id(give_up)['status'] == 'failed'
+        assert jobs.find_by_id(healthy)['status'] == 'processing'
+
+
+class TestCancelJob:
+    def test_owner_cancels_active_job_and_worker_stops(self, jobs):
+        user_id = ObjectId()
+        job_id = queue(jobs, user_id)
+        jobs.claim_next('web-1:100:0', lease_seconds=60)
+
+        cancelled = jobs.cancel_job(job_id, user_id)
+
+        assert cancelled['status'] == 'cancelled'
+        assert not jobs.update_progress(job_id, 'web-1:100:0', rows_written=10, lease_seconds=60)
+
+    def test_only_the_owner_can_cancel(self, jobs):
+        job_id = queue(jobs)
+
+        assert jobs.cancel_job(job_id, ObjectId()) is None
+        assert jobs.find_by_id(job_id)['status'] == 'queued'
+
+    def test_finished_jobs_cannot_be_cancelled(self, jobs):
+        user_id = ObjectId()
+        job_id = queue(jobs, user_id)
+        jobs.claim_next('web-1:100:0', lease_seconds=60)
+        jobs.complete_job(job_id, 'web-1:100:0', file_path='/tmp/export.csv')
+
+        assert jobs.cancel_job(job_id, user_id) is None
+
+
+class TestReserveDailyExport:
+    def test_limit_is_enforced_per_user_and_day(self, jobs):
+        user_id = ObjectId()
+
+        assert [jobs.reserve_daily_export(user_id, '2024-01-02', limit=2) for _ in range(3)] == [True, True, False]
+        assert jobs.get_daily_export_count(user_id, '2024-01-02') == 2
+        assert jobs.reserve_daily_export(user_id, '2024-01-03', limit=2)
+        assert jobs.reserve_daily_export(ObjectId(), '2024-01-02', limit=2)
+
+    def test_released_reservation_can_be_taken_again(self, jobs):
+        user_id = ObjectId()
+        jobs.reserve_daily_export(user_id, '2024-01-02', limit=1)
+
+        jobs.release_daily_export(user_id, '2024-01-02')
+
+        assert jobs.reserve_daily_export(user_id, '2024-01-02', limit=1)
+        assert jobs.get_daily_export_count(user_id, '2024-01-02') == 1
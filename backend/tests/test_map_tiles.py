@@ -0,0 +1,59 @@
+import pytest
+
+from services.map_tiles import MapTileIndex
+
+
+PARIS = {'type': 'Point', 'coordinates': [2.35, 48.85]}
+BERLIN = {'type': 'Point', 'coordinates': [13.4, 52.5]}
+
+
+@pytest.fixture
+def index(mongo):
+    return MapTileIndex()
+
+
+def world_count(index):
+    """Protests counted in the zoom 0 cell, which covers the whole map"""
+    cell = index.tiles.collection.find_one({'_id': '0:'})
+    return cell['count'] if cell else 0
+
+
+class TestMapTileIndex:
+    def test_non_public_protests_are_not_counted(self, index):
+        index.record_change(None, {'location': PARIS, 'visibility': 'private'})
+        assert world_count(index) == 0
+
+        index.record_change(None, {'location': PARIS, 'visibility': 'public'})
+        assert world_count(index) == 1
+
+    def test_visibility_changes_move_protests_in_and_out(self, index):
+        public = {'location': PARIS, 'visibility': 'public'}
+        hidden = dict(public, visibility='private')
+
+        index.record_change(None, public)
+        index.record_change(public, hidden)
+        assert world_count(index) == 0
+        index.record_change(hidden, public)
+        assert world_count(index) == 1
+
+    def test_moves_update_cell_sums(self, index):
+        before = {'location': PARIS, 'visibility': 'public'}
+        after = dict(before, location=BERLIN)
+        index.record_change(None, before)
+        index.record_change(before, after)
+
+        cell = index.tiles.collection.find_one({'_id': '0:'})
+        assert (cell['count'], cell['lng_sum'], cell['lat_sum']) == pytest.approx((1, 13.4, 52.5))
+        assert index.record_change(after, dict(after)) == 0
+
+    def test_incremental_counts_match_rebuild(self, index):
+        protests = [{'location': PARIS, 'visibility': 'public'},
+                    {'location': BERLIN, 'visibility': 'private'},
+                    {'location': {'type': 'Point', 'coordinates': [0, 0]}, 'visibility': 'public'}]
+        for protest in protests:
+            index.record_change(None, protest)
+        incremental = world_count(index)
+
+        index.protest.collection.insert_many([dict(protest) for protest in protests])
+        index.rebuild()
+        assert world_count(index) == incremental == 1
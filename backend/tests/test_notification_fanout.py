@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from services.notification_fanout import NotificationFanout
+
+
+@pytest.fixture
+def make_fanout(mongo):
+    def make():
+        return NotificationFanout(chunk_size=2, docs_per_second=0, workers=0)
+    return make
+
+
+def user_notification_ids(mongo):
+    return sorted(doc['user_id'] for doc in mongo.web_app_db.notification_history.find())
+
+
+class TestBroadcastJobs:
+    def test_progress_is_visible_from_another_process(self, make_fanout):
+        accepting, polling = make_fanout(), make_fanout()
+        job_id = accepting.submit_user_fanout([str(ObjectId()) for _ in range(3)], 'Title', 'Message')
+
+        assert polling.get_job(job_id)['status'] == 'queued'
+        assert polling.get_job(job_id)['total'] == 3
+
+        job = polling._claim('web-2:200:0')
+        assert polling.run_job(job, 'web-2:200:0') == 'completed'
+
+        progress = accepting.get_job(job_id)
+        assert progress['status'] == 'completed'
+        assert progress['notified'] == 3
+        assert progress['chunks'] == 2
+
+    def test_unknown_job_is_not_found(self, make_fanout):
+        assert make_fanout().get_job(str(ObjectId())) is None
+        assert make_fanout().get_job('not-an-id') is None
+
+    def test_follower_fanout_resumes_after_its_cursor(self, mongo, make_fanout):
+        fanout = make_fanout()
+        protest_id = ObjectId()
+        followers = sorted(ObjectId() for _ in range(5))
+        for user_id in followers:
+            fanout.follows.follow_protest(user_id, protest_id)
+
+        job_id = fanout.submit_follower_fanout(protest_id, 'Update', 'Changed')
+        fanout.jobs.collection.update_one({'_id': ObjectId(job_id)}, {'$set': {'cursor': followers[2]}})
+        job = fanout._claim('web-1:100:0')
+        fanout.run_job(job, 'web-1:100:0')
+
+        assert user_notification_ids(mongo) == followers[3:]
+
+    def test_expired_lease_is_requeued_and_resumed(self, mongo, make_fanout):
+        crashed, survivor = make_fanout(), make_fanout()
+        user_ids = [ObjectId() for _ in range(4)]
+        job_id = crashed.submit_user_fanout(user_ids, 'Title', 'Message')
+
+        job = crashed._claim('web-1:100:0')
+        chunk = list(crashed.build_notifications(user_ids[:2], 'Title', 'Message'))
+        crashed._write_chunk(chunk)
+        crashed.jobs.update_progress(job['_id'], 'web-1:100:0', 2, 2, 0, crashed.lease_seconds)
+        # The worker dies without renewing its lease
+        crashed.jobs.collection.update_one(
+            {'_id': job['_id']}, {'$set': {'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)}}
+        )
+
+        job = survivor._claim('web-2:200:0')
+        assert job['attempts'] == 2
+        assert survivor.run_job(job, 'web-2:200:0') == 'completed'
+
+        assert user_notification_ids(mongo) == sorted(user_ids)
+        assert survivor.get_job(job_id)['notified'] == 4
+
+    def test_reassigned_job_stops_writing(self, mongo, make_fanout):
+        fanout = make_fanout()
+        fanout.submit_user_fanout([ObjectId() for _ in range(4)], 'Title', 'Message')
+        job = fanout._claim('web-1:100:0')
+        fanout.jobs.collection.update_one({'_id': job['_id']}, {'$set': {'worker_id': 'web-2:200:0'}})
+
+        assert fanout.run_job(job, 'web-1:100:0') == 'reassigned'
+        assert mongo.web_app_db.notification_history.count_documents({}) == 2
+
+
+class TestDeliver:
+    def test_writes_inline_regardless_of_size(self, mongo, make_fanout):
+        fanout = make_fanout()
+        notifications = list(fanout.build_notifications([ObjectId() for _ in range(5)], 'Alert', 'Matched'))
+
+        assert fanout.deliver(notifications) == {'notified': 5, 'failed': 0}
+        assert fanout.list_jobs() == []
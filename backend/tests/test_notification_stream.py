@@ -0,0 +1,94 @@
+import pytest
+from bson import ObjectId
+
+from services.notification_stream import NotificationStreamBroker, StreamFull
+
+
+@pytest.fixture
+def broker(mongo, monkeypatch):
+    broker = NotificationStreamBroker(max_connections=2)
+    # No source threads; tests publish directly
+    monkeypatch.setattr(broker, '_ensure_started', lambda: None)
+    return broker
+
+
+def notification(user_id):
+    return {'_id': ObjectId(), 'user_id': user_id, 'title': 'New'}
+
+
+class TestSubscriptions:
+    def test_events_reach_only_their_subscribers(self, broker):
+        protest_id = ObjectId()
+        follower, other = ObjectId(), ObjectId()
+        broker.follows.follow_protest(follower, protest_id)
+        following, not_following = broker.subscribe(follower), broker.subscribe(other)
+
+        broker.publish_notification(notification(follower))
+        broker.publish_protest_update({'_id': protest_id, 'status': 'cancelled'}, ['status'])
+
+        events = following.wait(0)
+        assert [event['event'] for event in events] == ['notification', 'protest_update']
+        assert events[1]['data']['status'] == 'cancelled'
+        assert not_following.wait(0) == []
+
+    def test_unsubscribe_leaves_no_channels_behind(self, broker):
+        protest_id = ObjectId()
+        user_id = ObjectId()
+        broker.follows.follow_protest(user_id, protest_id)
+        first, second = broker.subscribe(user_id), broker.subscribe(user_id)
+
+        broker.unsubscribe(first)
+        assert broker.get_stats()['connections'] == 1
+        broker.publish_notification(notification(user_id))
+        assert len(second.wait(0)) == 1 and first.wait(0) == []
+
+        broker.unsubscribe(second)
+        broker.unsubscribe(second)
+        stats = broker.get_stats()
+        assert (stats['connections'], stats['connected_users'], stats['followed_protests']) == (0, 0, 0)
+
+    def test_connection_cap(self, broker):
+        first = broker.subscribe(ObjectId())
+        broker.subscribe(ObjectId())
+
+        with pytest.raises(StreamFull):
+            broker.subscribe(ObjectId())
+        assert broker.stats['connections_rejected'] == 1
+
+        broker.unsubscribe(first)
+        broker.subscribe(ObjectId())
+
+    def test_failed_follow_lookup_releases_the_connection(self, broker, monkeypatch):
+        def fail(*args, **kwargs):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(broker.follows, 'find_many', fail)
+
+        with pytest.raises(RuntimeError):
+            broker.subscribe(ObjectId())
+        assert broker.get_stats()['connections'] == 0
+
+    def test_refresh_moves_protest_channels(self, broker):
+        old_protest, new_protest = ObjectId(), ObjectId()
+        user_id = ObjectId()
+        broker.follows.follow_protest(user_id, old_protest)
+        subscription = broker.subscribe(user_id)
+
+        broker.follows.unfollow_protest(user_id, old_protest)
+        broker.follows.follow_protest(user_id, new_protest)
+        broker.refresh_follows(subscription)
+
+        broker.publish_protest_update({'_id': old_protest, 'status': 'cancelled'})
+        broker.publish_protest_update({'_id': new_protest, 'status': 'active'})
+        assert [event['data']['protest_id'] for event in subscription.wait(0)] == [str(new_protest)]
+        assert broker.get_stats()['followed_protests'] == 1
+
+    def test_full_buffer_drops_oldest_events(self, broker):
+        broker.max_buffered_events = 2
+        user_id = ObjectId()
+        subscription = broker.subscribe(user_id)
+
+        for _ in range(3):
+            broker.publish_notification(notification(user_id))
+
+        assert len(subscription.wait(0)) == 2
+        assert subscription.dropped == 1
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def make_hasher(monkeypatch):
+    pools = []
+
+    def make(max_pending=1, timeout=5):
+        monkeypatch.setenv('BCRYPT_MAX_PENDING', str(max_pending))
+        monkeypatch.setenv('BCRYPT_TIMEOUT_SECONDS', str(timeout))
+        hasher = PasswordHasher(workers=1, rounds=4)
+        # Threads stand in for the process pool so tests can hold a hash open
+        pool = ThreadPoolExecutor(max_workers=2)
+        pools.append(pool)
+        monkeypatch.setattr(hasher, '_get_pool', lambda: pool)
+        return hasher
+
+    yield make
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def free_slots(hasher):
+    return hasher._slots._value
+
+
+class TestSlotAccounting:
+    def test_full_queue_rejects_immediately(self, make_hasher):
+        hasher = make_hasher(max_pending=1)
+        release = threading.Event()
+        caller = threading.Thread(target=hasher._run, args=(release.wait,))
+        caller.start()
+        while free_slots(hasher):
+            time.sleep(0.01)
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher._run(lambda: 'never runs')
+        assert hasher.stats['rejected'] == 1
+
+        release.set()
+        caller.join()
+        hasher._get_pool().shutdown(wait=True)
+        assert free_slots(hasher) == 1
+
+    def test_timed_out_hash_keeps_its_slot_until_it_finishes(self, make_hasher):
+        hasher = make_hasher(max_pending=1, timeout=0.05)
+        release = threading.Event()
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher._run(release.wait)
+        assert hasher.stats['timeouts'] == 1
+        assert free_slots(hasher) == 0
+
+        release.set()
+        hasher._get_pool().shutdown(wait=True)
+        assert free_slots(hasher) == 1
+
+    def test_failed_submit_releases_its_slot(self, make_hasher, monkeypatch):
+        hasher = make_hasher(max_pending=1)
+
+        def broken_pool():
+            raise RuntimeError('cannot start workers')
+        monkeypatch.setattr(hasher, '_get_pool', broken_pool)
+
+        with pytest.raises(RuntimeError):
+            hasher._run(lambda: None)
+        assert free_slots(hasher) == 1
+
+    def test_inline_hashing_releases_its_slot(self, monkeypatch):
+        monkeypatch.setenv('BCRYPT_MAX_PENDING', '1')
+        hasher = PasswordHasher(workers=0, rounds=4)
+
+        hashed = hasher.hash('correct horse')
+        assert hasher.verify('correct horse', hashed)
+        assert not hasher.verify('wrong horse', hashed)
+        assert free_slots(hasher) == 1
+
+
+class TestRehash:
+    def test_outdated_cost_is_upgraded(self):
+        hasher = PasswordHasher(workers=0, rounds=5)
+        old_hash = PasswordHasher(workers=0, rounds=4).hash('secret')
+
+        new_hash = hasher.rehash('secret', old_hash)
+
+        assert new_hash.startswith('$2b$05$')
+        assert hasher.rehash('secret', new_hash) is None
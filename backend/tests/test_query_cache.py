@@ -0,0 +1,78 @@
+import pytest
+
+from services import query_cache
+from services.query_cache import QueryCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module."""
+    now = {'value': 1000.0}
+    monkeypatch.setattr(query_cache.time, 'time', lambda: now['value'])
+    return now
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.delenv('QUERY_CACHE_REDIS_URL', raising=False)
+    monkeypatch.setenv('QUERY_CACHE_ENABLED', 'true')
+    return QueryCache(max_entries=3, default_ttl=60)
+
+
+class TestQueryCache:
+    def test_make_key_ignores_dict_order(self, cache):
+        assert cache.make_key('protests', {'a': 1, 'b': 2}) == cache.make_key('protests', {'b': 2, 'a': 1})
+        assert cache.make_key('protests', {'a': 1}) != cache.make_key('search', {'a': 1})
+
+    def test_entry_expires_after_ttl(self, cache, clock):
+        cache.set('key', {'count': 1}, ttl=10)
+        clock['value'] += 9
+        assert cache.get('key') == {'count': 1}
+
+        clock['value'] += 1
+        assert cache.get('key') is None
+        assert cache.stats['misses'] == 1
+
+    def test_bump_generation_invalidates_entries(self, cache):
+        cache.set('key', [1, 2, 3])
+        assert cache.bump_generation('protest created') == 1
+        assert cache.get('key') is None
+        assert cache.stats['invalidations'] == 1
+
+    def test_result_computed_across_a_bump_is_not_served(self, cache):
+        def compute():
+            # A write lands while the query is running
+            cache.bump_generation()
+            return ['stale']
+
+        assert cache.get_or_compute('protests', {'page': 1}, compute) == ['stale']
+        assert cache.get_or_compute('protests', {'page': 1}, lambda: ['fresh']) == ['fresh']
+        assert cache.get_or_compute('protests', {'page': 1}, lambda: ['unused']) == ['fresh']
+
+    def test_none_results_are_not_cached(self, cache):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return None
+
+        cache.get_or_compute('protests', 'missing', compute)
+        cache.get_or_compute('protests', 'missing', compute)
+        assert len(calls) == 2
+
+    def test_least_recently_used_entry_is_evicted(self, cache):
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+
+        assert cache.get('b') is None
+        assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a', 'c', 'd']
+        assert cache.stats['evictions'] == 1
+
+    def test_disabled_cache_stores_nothing(self, monkeypatch, clock):
+        monkeypatch.setenv('QUERY_CACHE_ENABLED', 'false')
+        disabled = QueryCache()
+        disabled.set('key', 'value')
+        assert disabled.get('key') is None
+        assert disabled.get_stats()['entries'] == 0
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from services.spatial_index import ProtestSpatialIndex, haversine_km
+
+
+def make_protest(lng, lat, **fields):
+    protest = {
+        '_id': ObjectId(),
+        'title': f'Protest at {lat},{lng}',
+        'location': {'type': 'Point', 'coordinates': [lng, lat]},
+        'visibility': 'public',
+        'status': 'active',
+        'categories': ['climate'],
+        'updated_at': datetime.now() - timedelta(minutes=1)
+    }
+    protest.update(fields)
+    return protest
+
+
+@pytest.fixture
+def index(mongo):
+    return ProtestSpatialIndex()
+
+
+def load(index, protests):
+    index.protest.collection.insert_many(protests)
+    index.refresh(force=True)
+
+
+def ids(results):
+    return [result['protest']['_id'] for result in results]
+
+
+class TestProtestSpatialIndex:
+    def test_haversine_matches_known_distance(self):
+        # Paris to London
+        distance = haversine_km(48.8566, 2.3522, np.radians([51.5074]), np.radians([-0.1278]))
+        assert distance[0] == pytest.approx(343.5, abs=1.0)
+
+    def test_nearest_is_sorted_by_distance(self, index):
+        far, near, middle = make_protest(2.0, 48.0), make_protest(2.01, 48.0), make_protest(2.5, 48.0)
+        load(index, [far, near, middle])
+
+        results = index.nearest(48.0, 2.0, k=3)
+        assert ids(results) == [far['_id'], near['_id'], middle['_id']]
+        assert results[0]['distance_km'] == 0
+
+    def test_radius_excludes_points_in_overlapping_cells(self, index):
+        inside, outside = make_protest(2.1, 48.0), make_protest(2.9, 48.0)
+        load(index, [inside, outside])
+
+        # Both points share the query's grid cell; only the distance check separates them
+        assert ids(index.nearest(48.0, 2.0, radius_km=10)) == [inside['_id']]
+
+    def test_search_crosses_the_antimeridian(self, index):
+        east, west, distant = make_protest(179.9, 0.0), make_protest(-179.9, 0.0), make_protest(178.0, 0.0)
+        load(index, [east, west, distant])
+
+        assert set(ids(index.nearest(0.0, 179.95, radius_km=25))) == {east['_id'], west['_id']}
+        assert set(ids(index.nearest(0.0, -179.95, radius_km=25))) == {east['_id'], west['_id']}
+
+    def test_search_near_the_pole_wraps_every_longitude(self, index):
+        across_pole = make_protest(100.0, 89.5)
+        load(index, [across_pole])
+
+        assert ids(index.nearest(89.5, -80.0, radius_km=200)) == [across_pole['_id']]
+
+    def test_k_grows_the_radius_until_enough_matches(self, index):
+        protests = [make_protest(2.0 + i, 48.0) for i in range(5)]
+        load(index, protests)
+
+        assert len(index.nearest(48.0, 2.0, k=5)) == 5
+        assert len(index.nearest(48.0, 2.0, k=2)) == 2
+
+    def test_category_filter(self, index):
+        climate, labor = make_protest(2.0, 48.0), make_protest(2.01, 48.0, categories=['labor'])
+        load(index, [climate, labor])
+
+        assert ids(index.nearest(48.0, 2.0, categories=['labor'])) == [labor['_id']]
+
+    def test_unindexable_protests_are_skipped(self, index):
+        private = make_protest(2.0, 48.0, visibility='private')
+        cancelled = make_protest(2.0, 48.0, status='cancelled')
+        unlocated = make_protest(0, 0)
+        load(index, [private, cancelled, unlocated])
+
+        assert index.nearest(48.0, 2.0) == []
+        assert index.get_stats()['indexed_protests'] == 0
+
+    def test_refresh_moves_and_drops_changed_protests(self, index):
+        moving, closing = make_protest(2.0, 48.0), make_protest(2.01, 48.0)
+        load(index, [moving, closing])
+
+        collection = index.protest.collection
+        collection.update_one({'_id': moving['_id']},
+                              {'$set': {'location.coordinates': [13.4, 52.5], 'updated_at': datetime.now()}})
+        collection.update_one({'_id': closing['_id']},
+                              {'$set': {'status': 'cancelled', 'updated_at': datetime.now()}})
+        assert index.refresh(force=True) == 2
+
+        assert index.nearest(48.0, 2.0, radius_km=50) == []
+        assert ids(index.nearest(52.5, 13.4, radius_km=50)) == [moving['_id']]
+        assert index.get_stats()['tombstones'] == 2
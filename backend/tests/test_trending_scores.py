@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.trending_scores import TrendingScoreJob
+
+
+@pytest.fixture
+def job(mongo):
+    return TrendingScoreJob()
+
+
+def make_protest(**fields):
+    protest = {'visibility': 'public', 'start_date': datetime.now() - timedelta(days=1),
+               'data_quality_score': 0.8, 'trending_score': 0.0,
+               'engagement_metrics': {'views': 0, 'bookmarks': 0, 'followers': 0}}
+    protest.update(fields)
+    return protest
+
+
+class TestTrendingScoreJob:
+    def test_full_run_scores_recent_protests(self, job):
+        protest_id = job.protest.collection.insert_one(make_protest(engagement_metrics={'views': 50})).inserted_id
+
+        result = job.run()
+        assert result['mode'] == 'full'
+        assert job.protest.collection.find_one({'_id': protest_id})['trending_score'] > 0
+
+    def test_incremental_run_picks_up_unbuffered_engagement(self, job):
+        engaged_id = job.protest.collection.insert_one(make_protest()).inserted_id
+        job.protest.collection.insert_one(make_protest())
+        job.run()
+
+        job.protest.update_engagement_metrics(engaged_id, 'views', 25)
+        result = job.run(incremental=True)
+
+        assert result['mode'] == 'incremental'
+        assert result['scanned'] == 1
+        assert result['updated'] == 1
@@ -0,0 +1,79 @@
+import pytest
+from bson import ObjectId
+
+from services.unread_counter import UnreadCounter
+
+
+@pytest.fixture
+def counter(mongo):
+    return UnreadCounter(cache_ttl=60, reconcile_interval=3600)
+
+
+def add_unread(counter, user_id, count):
+    counter.notifications.collection.insert_many([{'user_id': user_id, 'read': False} for _ in range(count)])
+
+
+def stored(counter, user_id):
+    return counter.counters.get_counters([user_id]).get(user_id, (None, None))[0]
+
+
+class TestReconcile:
+    def test_drift_is_corrected_once_seen_twice(self, counter):
+        user_id = ObjectId()
+        add_unread(counter, user_id, 3)
+        counter.counters.apply_deltas({user_id: 1})
+
+        first = counter.reconcile()
+        assert (first['pending'], first['corrected']) == (1, 0)
+        assert stored(counter, user_id) == 1
+
+        second = counter.reconcile()
+        assert (second['pending'], second['corrected']) == (0, 1)
+        assert stored(counter, user_id) == 3
+
+    def test_counter_that_moved_between_passes_is_left_alone(self, counter):
+        user_id = ObjectId()
+        add_unread(counter, user_id, 3)
+        counter.counters.apply_deltas({user_id: 1})
+        counter.reconcile()
+
+        # A write racing the count lands before the second pass
+        add_unread(counter, user_id, 1)
+        counter.record_created([user_id])
+
+        result = counter.reconcile()
+        assert (result['pending'], result['corrected']) == (1, 0)
+        assert stored(counter, user_id) == 2
+
+    def test_mismatch_that_settles_is_forgotten(self, counter):
+        user_id = ObjectId()
+        add_unread(counter, user_id, 2)
+        counter.counters.apply_deltas({user_id: 1})
+        counter.reconcile()
+
+        counter.record_created([user_id])
+
+        result = counter.reconcile()
+        assert (result['pending'], result['corrected']) == (0, 0)
+        assert counter._suspects == {}
+
+    def test_missing_counters_are_seeded(self, counter):
+        user_id = ObjectId()
+        add_unread(counter, user_id, 2)
+
+        counter.reconcile()
+        assert stored(counter, user_id) is None
+        counter.reconcile()
+        assert stored(counter, user_id) == 2
+
+    def test_correction_drops_the_cached_count(self, counter, monkeypatch):
+        monkeypatch.setattr(counter, '_ensure_started', lambda: None)
+        user_id = ObjectId()
+        add_unread(counter, user_id, 3)
+        counter.counters.apply_deltas({user_id: 1})
+        assert counter.get_unread(user_id) == 1
+
+        counter.reconcile()
+        counter.reconcile()
+
+        assert counter.get_unread(user_id) == 3
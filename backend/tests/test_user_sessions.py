@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models.web_app_models import UserSession
+
+
+class TestSessionClock:
+    def test_revocation_is_stamped_in_utc(self, mongo):
+        sessions = UserSession()
+        user_id = ObjectId()
+        token = sessions.create_session(user_id)
+
+        assert sessions.revoke_session(token, reason='logout')
+
+        session = sessions.collection.find_one({'session_token': token})
+        assert abs(session['revoked_at'] - datetime.utcnow()) < timedelta(minutes=1)
+        assert session['revoked_at'] >= session['created_at']
+
+    def test_expiry_is_compared_in_utc(self, mongo):
+        sessions = UserSession()
+        user_id = ObjectId()
+        # Written the way the login endpoint writes sessions
+        sessions.collection.insert_one({
+            'user_id': user_id,
+            'session_token': 'expired',
+            'created_at': datetime.utcnow() - timedelta(hours=2),
+            'expires_at': datetime.utcnow() - timedelta(minutes=1),
+            'active': True
+        })
+
+        assert sessions.get_session('expired') is None
+        assert sessions.get_user_sessions(user_id) == []
@@ -0,0 +1,38 @@
+import pytest
+
+from services.user_stats import UserStatsService
+
+
+@pytest.fixture
+def make_service(mongo, monkeypatch):
+    monkeypatch.setenv('USER_STATS_RECONCILE_ON_START', 'true')
+
+    def make(owner):
+        service = UserStatsService(reconcile_interval=3600)
+        service._owner = owner
+        service.passes = []
+        monkeypatch.setattr(service, 'reconcile', lambda: service.passes.append(owner))
+        # One loop iteration, then stop
+        waits = iter([False, True])
+        monkeypatch.setattr(service._stop_requested, 'wait', lambda timeout: next(waits))
+        return service
+    return make
+
+
+class TestReconcileLease:
+    def test_one_process_reconciles_per_interval(self, make_service):
+        first, second = make_service('web-1:100'), make_service('web-2:200')
+        first._run()
+        second._run()
+
+        assert first.passes == ['web-1:100']
+        assert second.passes == []
+        assert second.stats['lease_skipped'] == 1
+
+    def test_holder_renews_its_lease(self, make_service):
+        service = make_service('web-1:100')
+        service._run()
+        again = make_service('web-1:100')
+        again._run()
+
+        assert again.passes == ['web-1:100']